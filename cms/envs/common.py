@@ -149,6 +149,17 @@ BLOCK_STRUCTURES_SETTINGS = dict(
 
     # Backend storage options
     PRUNING_ACTIVE=False,
+
+    # Maximum total size, in bytes of serialized data, of the collected
+    # block structures kept in each process's in-process cache. The
+    # in-process cache is used only when storage backing is enabled.
+    # Set to 0 to disable it.
+    LOCAL_CACHE_MAX_SIZE=0,
+
+    # Whether to record the cost of each transformer when block
+    # structures are transformed, and report it as custom monitoring
+    # attributes.  The cost of collecting is always reported.
+    PROFILE_TRANSFORMERS=False,
 )
 
 ############################ FEATURE CONFIGURATION #############################
@@ -405,6 +416,21 @@ FEATURES = {
     # .. toggle_warnings: Also set settings.LIBRARY_AUTHORING_MICROFRONTEND_URL and see
     #   REDIRECT_TO_LIBRARY_AUTHORING_MICROFRONTEND for rollout.
     'ENABLE_LIBRARY_AUTHORING_MICROFRONTEND': False,
+
+    # .. toggle_name: FEATURES['PRECOMPUTE_CAPA_SCRIPT_CONTEXTS']
+    # .. toggle_implementation: DjangoSetting
+    # .. toggle_default: False
+    # .. toggle_description: Set to True to run the scripts of the problems of a course once for each seed their
+    #   learners can have when the course is published, and store the resulting contexts, for problems that aren't
+    #   randomized or are randomized per student.  The LMS reads these contexts instead of running the scripts in the
+    #   sandbox when it is enabled there.
+    # .. toggle_use_cases: temporary
+    # .. toggle_creation_date: 2026-10-18
+    # .. toggle_target_removal_date: 2027-04-18
+    # .. toggle_tickets: None
+    # .. toggle_warnings: Enable it in both Studio and the LMS.  Run the precompute_capa_script_contexts command for
+    #   the courses published before it was enabled.
+    'PRECOMPUTE_CAPA_SCRIPT_CONTEXTS': False,
 }
 
 ENABLE_JASMINE = False
@@ -916,6 +942,17 @@ CODE_JAIL = {
     "limit_overrides": {},
 }
 
+# Pool of sandboxed Python processes, started like the processes of CODE_JAIL,
+# which import the modules available to jailed code once, and then run many
+# executions.  Each worker runs as the CODE_JAIL user, so the workers count
+# against the NPROC limit of the executions which don't use the pool.
+CODE_JAIL_POOL = {
+    # How many workers can each process use?  0 disables the pool.
+    'size': 0,
+    # After how many executions is a worker replaced?
+    'max_executions': 100,
+}
+
 # Some courses are allowed to run unsafe code. This is a list of regexes, one
 # of them must match the course id for that course to run unsafe code.
 #
@@ -1415,6 +1452,7 @@ INSTALLED_APPS = [
 
     'openedx.core.djangoapps.content.course_overviews.apps.CourseOverviewsConfig',
     'openedx.core.djangoapps.content.block_structure.apps.BlockStructureConfig',
+    'openedx.core.djangoapps.content.capa_script_contexts.apps.CapaScriptContextsConfig',
 
     # edx-milestones service
     'milestones',
@@ -1911,6 +1949,10 @@ CACHES = {
     },
 }
 
+# The codec with which course structures are encoded in the 'course_structure_cache':
+# 'pickle' or, if installed, 'msgpack'.  See xmodule.modulestore.split_mongo.structure_codec.
+COURSE_STRUCTURE_CACHE_CODEC = 'pickle'
+
 ############################ OAUTH2 Provider ###################################
 
 
@@ -17,12 +17,15 @@ This is used by capa_module.
 import logging
 import os.path
 import re
+import threading
 from collections import OrderedDict
 from copy import deepcopy
 from datetime import datetime
+from hashlib import sha1
 from xml.sax.saxutils import unescape
 
 import six
+from codejail.safe_exec import SafeExecException, json_safe
 from django.utils.encoding import python_2_unicode_compatible
 from lxml import etree
 from pytz import UTC
@@ -74,8 +77,78 @@ html_problem_semantics = [
     "openendedrubric",
 ]
 
+# maximum number of parsed problem templates kept by a process
+PROBLEM_TEMPLATE_CACHE_SIZE = 1000
+
+# scripts using this name depend on the learner, and not only on the seed, so
+# their contexts can't be precomputed
+ANONYMOUS_STUDENT_ID_NAME = 'anonymous_student_id'
+
 log = logging.getLogger(__name__)
 
+
+class ProblemTemplateCache(object):
+    """
+    A bounded cache of the parsed XML trees of problems, before their
+    includes are processed, keyed by the hash of the problem XML and
+    evicting the least recently used trees.
+
+    Learners of a problem share its XML, and the parsed tree only depends on
+    the XML, so it is parsed and made compatible once per process.  Each
+    LoncapaProblem gets its own copy of the tree, since preprocessing the
+    problem for a learner's seed and state modifies it.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._templates = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_tree(self, problem_xml, prepare_tree):
+        """
+        Returns a copy of the root element of the tree parsed from the given
+        problem XML bytes, and prepared in place by the given function.
+        """
+        key = sha1(problem_xml).digest()
+        with self._lock:
+            template = self._templates.pop(key, None)
+            if template is not None:
+                self._templates[key] = template
+
+        if template is None:
+            template = etree.XML(problem_xml).getroottree()
+            prepare_tree(template.getroot())
+            with self._lock:
+                self._templates[key] = template
+                while len(self._templates) > self.max_size:
+                    self._templates.popitem(last=False)
+
+        return deepcopy(template).getroot()
+
+    def clear(self):
+        """
+        Removes all the templates.
+        """
+        with self._lock:
+            self._templates.clear()
+
+
+problem_templates = ProblemTemplateCache(PROBLEM_TEMPLATE_CACHE_SIZE)
+
+
+def script_hash(code, python_path, extra_files):
+    """
+    Returns the hex digest of the given script code, with the Python path and
+    the extra files it runs with, identifying its precomputed contexts.
+    """
+    hasher = sha1()
+    hasher.update(code.encode('utf-8'))
+    for path in python_path:
+        hasher.update(b'\0path\0' + path.encode('utf-8'))
+    for name, contents in extra_files:
+        hasher.update(b'\0file\0' + name.encode('utf-8') + b'\0' + sha1(contents).digest())
+    return hasher.hexdigest()
+
+
 #-----------------------------------------------------------------------------
 # main class for this module
 
@@ -91,6 +164,10 @@ class LoncapaSystem(object):
     Attributes:
         i18n: an object implementing the `gettext.Translations` interface so
             that we can use `.ugettext` to localize strings.
+        get_script_context: an optional function taking the hash of a problem
+            script and a seed, and returning the (error message, context) pair
+            precomputed by `LoncapaProblem.precompute_script_contexts` for
+            that seed, or None if it wasn't precomputed.
 
     See :class:`ModuleSystem` for documentation of other attributes.
 
@@ -110,7 +187,8 @@ class LoncapaSystem(object):
         seed,      # Why do we do this if we have self.seed?
         STATIC_URL,
         xqueue,
-        matlab_api_key=None
+        matlab_api_key=None,
+        get_script_context=None,
     ):
         self.ajax_url = ajax_url
         self.anonymous_student_id = anonymous_student_id
@@ -126,6 +204,7 @@ class LoncapaSystem(object):
         self.STATIC_URL = STATIC_URL                    # pylint: disable=invalid-name
         self.xqueue = xqueue
         self.matlab_api_key = matlab_api_key
+        self.get_script_context = get_script_context
 
 
 @python_2_unicode_compatible
@@ -184,23 +263,12 @@ class LoncapaProblem(object):
         problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
         self.problem_text = problem_text
 
-        # parse problem XML file into an element tree
+        # parse problem XML file into an element tree, or copy the tree
+        # already parsed from the same XML
         if isinstance(problem_text, six.text_type):
             # etree chokes on Unicode XML with an encoding declaration
             problem_text = problem_text.encode('utf-8')
-        self.tree = etree.XML(problem_text)
-
-        try:
-            self.make_xml_compatible(self.tree)
-        except Exception:
-            capa_module = self.capa_module
-            log.exception(
-                "CAPAProblemError: %s, id:%s, data: %s",
-                capa_module.display_name,
-                self.problem_id,
-                capa_module.data
-            )
-            raise
+        self.tree = problem_templates.get_tree(problem_text, self._make_template_compatible)
 
         # handle any <include file="foo"> tags
         self._process_includes()
@@ -236,6 +304,23 @@ class LoncapaProblem(object):
             if extract_tree:
                 self.extracted_tree = self._extract_html(self.tree)
 
+    def _make_template_compatible(self, tree):
+        """
+        Adjusts the parsed tree of the problem template in-place for
+        compatibility, logging the problem if it can't be.
+        """
+        try:
+            self.make_xml_compatible(tree)
+        except Exception:
+            capa_module = self.capa_module
+            log.exception(
+                "CAPAProblemError: %s, id:%s, data: %s",
+                capa_module.display_name,
+                self.problem_id,
+                capa_module.data
+            )
+            raise
+
     def make_xml_compatible(self, tree):
         """
         Adjust tree xml in-place for compatibility before creating
@@ -881,6 +966,32 @@ class LoncapaProblem(object):
 
         return path
 
+    def precompute_script_contexts(self, seeds):
+        """
+        Runs the script of the problem once for each of the given seeds, for
+        problems whose learners can only have a few seeds.
+
+        Returns a pair of the hash of the script and of a dict mapping each
+        seed to the error message of the execution, or None, and the JSON-safe
+        context it produced.  Returns None if the problem has no script, or
+        if its script depends on the learner.
+        """
+        all_code, python_path, extra_files = self._extract_script(self.tree)
+        if not all_code or ANONYMOUS_STUDENT_ID_NAME in all_code:
+            return None
+
+        contexts = {}
+        for seed in seeds:
+            context = {'seed': seed, ANONYMOUS_STUDENT_ID_NAME: None}
+            try:
+                self._safe_exec(all_code, context, seed, python_path, extra_files)
+            except SafeExecException as err:
+                emsg = six.text_type(err)
+            else:
+                emsg = None
+            contexts[seed] = (emsg, json_safe(context))
+        return script_hash(all_code, python_path, extra_files), contexts
+
     def _extract_context(self, tree):
         """
         Extract content of <script>...</script> from the problem.xml file, and exec it in the
@@ -888,10 +999,43 @@ class LoncapaProblem(object):
         variables for problem answer checking.
 
         Problem XML goes to Python execution context. Runs everything in script tags.
+
+        The context precomputed for the seed of the problem is used instead of
+        running the script, when the capa system provides it.
         """
         context = {}
         context['seed'] = self.seed
-        context['anonymous_student_id'] = self.capa_system.anonymous_student_id
+        context[ANONYMOUS_STUDENT_ID_NAME] = self.capa_system.anonymous_student_id
+
+        all_code, python_path, extra_files = self._extract_script(tree)
+        if all_code:
+            try:
+                precomputed = self._get_precomputed_context(all_code, python_path, extra_files)
+                if precomputed is None:
+                    self._safe_exec(all_code, context, self.seed, python_path, extra_files)
+                else:
+                    emsg, results = precomputed
+                    context.update(results)
+                    context['seed'] = self.seed
+                    context[ANONYMOUS_STUDENT_ID_NAME] = self.capa_system.anonymous_student_id
+                    if emsg:
+                        raise SafeExecException(emsg)
+            except Exception as err:
+                log.exception("Error while execing script code: " + all_code)
+                msg = Text("Error while executing script code: %s" % str(err))
+                raise responsetypes.LoncapaProblemError(msg)
+
+        # Store code source in context, along with the Python path needed to run it correctly.
+        context['script_code'] = all_code
+        context['python_path'] = python_path
+        context['extra_files'] = extra_files or None
+        return context
+
+    def _extract_script(self, tree):
+        """
+        Returns the Python code of the <script> tags of the problem, with the
+        Python path and the extra files needed to run it.
+        """
         all_code = ''
 
         python_path = []
@@ -922,30 +1066,35 @@ class LoncapaProblem(object):
                 extra_files.append(("python_lib.zip", zip_lib))
                 python_path.append("python_lib.zip")
 
-            try:
-                safe_exec(
-                    all_code,
-                    context,
-                    random_seed=self.seed,
-                    python_path=python_path,
-                    extra_files=extra_files,
-                    cache=self.capa_system.cache,
-                    limit_overrides_context=get_course_id_from_capa_module(
-                        self.capa_module
-                    ),
-                    slug=self.problem_id,
-                    unsafely=self.capa_system.can_execute_unsafe_code(),
-                )
-            except Exception as err:
-                log.exception("Error while execing script code: " + all_code)
-                msg = Text("Error while executing script code: %s" % str(err))
-                raise responsetypes.LoncapaProblemError(msg)
+        return all_code, python_path, extra_files
 
-        # Store code source in context, along with the Python path needed to run it correctly.
-        context['script_code'] = all_code
-        context['python_path'] = python_path
-        context['extra_files'] = extra_files or None
-        return context
+    def _get_precomputed_context(self, all_code, python_path, extra_files):
+        """
+        Returns the (error message, context) pair precomputed for the script
+        and the seed of the problem, or None.
+        """
+        get_script_context = self.capa_system.get_script_context
+        if get_script_context is None or ANONYMOUS_STUDENT_ID_NAME in all_code:
+            return None
+        return get_script_context(script_hash(all_code, python_path, extra_files), self.seed)
+
+    def _safe_exec(self, all_code, context, seed, python_path, extra_files):
+        """
+        Runs the script code in the given context, with the given seed.
+        """
+        safe_exec(
+            all_code,
+            context,
+            random_seed=seed,
+            python_path=python_path,
+            extra_files=extra_files,
+            cache=self.capa_system.cache,
+            limit_overrides_context=get_course_id_from_capa_module(
+                self.capa_module
+            ),
+            slug=self.problem_id,
+            unsafely=self.capa_system.can_execute_unsafe_code(),
+        )
 
     def _extract_html(self, problemtree):  # private
         """
@@ -0,0 +1,259 @@
+"""
+A pool of sandboxed Python workers, which have already imported the modules
+available to the code of capa problems.
+
+Running code with codejail starts a new sandboxed Python, which imports these
+modules again for each execution.  A worker of the pool is started with the
+same command and user as codejail's, and imports them once.  It then forks a
+child for each execution, which applies the same limits as codejail's and
+runs the code.  See pool_worker.py.
+
+A worker is replaced after `max_executions` executions, and after any
+execution that went over its limits.
+"""
+
+
+import base64
+import logging
+import os
+import select
+import subprocess
+import threading
+
+import six
+from codejail import jail_code
+from codejail.safe_exec import SafeExecException, json_safe
+from django.conf import settings
+
+from .pool_worker import read_message, write_message
+
+log = logging.getLogger(__name__)
+
+# We'll need the source of pool_worker.py to start the workers, so read it now.
+pool_worker_py_file = os.path.join(os.path.dirname(__file__), 'pool_worker.py')
+with open(pool_worker_py_file) as f:
+    pool_worker_py = f.read()
+
+# Seconds the pool waits for a worker after the REALTIME limit of an
+# execution, which the worker enforces, before giving up on the worker.
+WORKER_GRACE_SECONDS = 10
+
+
+class SandboxWorkerError(Exception):
+    """
+    A worker didn't answer, or answered with a broken message.
+    """
+
+
+class SandboxWorker(object):
+    """
+    A sandboxed Python process running the jobs of the pool.
+    """
+    def __init__(self, argv, preload_modules):
+        self.process = subprocess.Popen(argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        self.executions = 0
+        write_message(self.process.stdin, {'modules': preload_modules})
+
+    def run(self, job, timeout):
+        """
+        Sends the job to the worker and returns its result message.
+
+        Raises:
+            SandboxWorkerError if the worker doesn't answer within the timeout.
+        """
+        self.executions += 1
+        try:
+            write_message(self.process.stdin, job)
+            if not select.select([self.process.stdout], [], [], timeout)[0]:
+                raise SandboxWorkerError(u'The worker did not answer within {} seconds.'.format(timeout))
+            result = read_message(self.process.stdout)
+        except (IOError, OSError, ValueError) as err:
+            raise SandboxWorkerError(six.text_type(err))
+        if result is None:
+            raise SandboxWorkerError(u'The worker exited.')
+        return result
+
+    def close(self, terminate=False):
+        """
+        Stops the worker.  A worker stops at the end of its stdin.  A worker
+        which failed is terminated instead, which sudo, if any, passes on to
+        the sandboxed Python.
+        """
+        try:
+            self.process.stdin.close()
+        except (IOError, OSError):
+            pass
+        if terminate:
+            self.process.terminate()
+        try:
+            self.process.wait(timeout=WORKER_GRACE_SECONDS)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.process.stdout.close()
+
+
+class SandboxPool(object):
+    """
+    A pool of at most `size` sandboxed workers, each started with the given
+    command and importing the given modules before running any code.
+
+    A worker is started whenever one stops, so that the next execution finds
+    a worker which already imported the modules.  When all the workers are
+    busy, `safe_exec` returns False and the code should be run by codejail.
+    """
+    def __init__(self, size, max_executions, argv, preload_modules):
+        self.size = size
+        self.max_executions = max_executions
+        self.argv = argv
+        self.preload_modules = preload_modules
+        self._idle_workers = []
+        self._num_workers = 0
+        self._lock = threading.Lock()
+
+    def can_run(self, python_path, extra_files, limit_overrides_context=None):
+        """
+        Returns whether the pool can run code with the given Python path,
+        extra files and limits.
+
+        The pool only sends the extra files to its workers, so every entry of
+        the Python path must be one of these files.  It doesn't support the
+        PROXY limit.
+        """
+        extra_names = {name for name, _ in extra_files or ()}
+        if any(os.path.basename(path) not in extra_names for path in python_path or ()):
+            return False
+        return not jail_code.get_effective_limits(limit_overrides_context).get('PROXY')
+
+    def safe_exec(self, code, globals_dict, python_path=None, extra_files=None, limit_overrides_context=None,
+                  slug=None):
+        """
+        Runs the code in a worker of the pool, like `codejail.safe_exec.safe_exec`.
+
+        Returns False, without running the code, if all the workers are busy.
+
+        Raises:
+            SafeExecException if the code raised an exception, went over its
+            limits or the worker failed.
+        """
+        worker = self._acquire_worker()
+        if worker is None:
+            return False
+
+        limits = jail_code.get_effective_limits(limit_overrides_context)
+        job = {
+            'code': code,
+            'globals': json_safe(globals_dict),
+            'python_path': [os.path.basename(path) for path in python_path or ()],
+            'extra_files': [
+                [name, base64.b64encode(contents).decode('ascii')] for name, contents in extra_files or ()
+            ],
+            'limits': limits,
+        }
+        timeout = limits['REALTIME'] + WORKER_GRACE_SECONDS if limits.get('REALTIME') else None
+        try:
+            result = worker.run(job, timeout)
+        except SandboxWorkerError as err:
+            log.warning(u'Sandbox worker failed running %s: %s', slug, err)
+            self._release_worker(worker, stop=True, terminate=True)
+            raise SafeExecException(u"Couldn't execute jailed code: {}".format(err))
+
+        self._release_worker(
+            worker, stop=result['status'] == 'limit' or worker.executions >= self.max_executions,
+        )
+        if result['status'] != 'ok':
+            raise SafeExecException(u"Couldn't execute jailed code: {}".format(result['message']))
+        globals_dict.update(result['globals'])
+        return True
+
+    def close(self):
+        """
+        Stops the idle workers.
+        """
+        with self._lock:
+            workers, self._idle_workers = self._idle_workers, []
+            self._num_workers -= len(workers)
+        for worker in workers:
+            worker.close()
+
+    def _acquire_worker(self):
+        """
+        Returns an idle worker, or a new one if the pool isn't full, or None.
+        """
+        with self._lock:
+            if self._idle_workers:
+                return self._idle_workers.pop()
+            if self._num_workers >= self.size:
+                return None
+            self._num_workers += 1
+
+        worker = self._start_worker()
+        if worker is None:
+            with self._lock:
+                self._num_workers -= 1
+        return worker
+
+    def _release_worker(self, worker, stop, terminate=False):
+        """
+        Makes the worker idle, or stops it and starts its replacement.
+        """
+        if not stop:
+            with self._lock:
+                self._idle_workers.append(worker)
+            return
+
+        worker.close(terminate)
+        replacement = self._start_worker()
+        with self._lock:
+            if replacement is None:
+                self._num_workers -= 1
+            else:
+                self._idle_workers.append(replacement)
+
+    def _start_worker(self):
+        """
+        Returns a new worker, or None if it can't be started.
+        """
+        try:
+            return SandboxWorker(self.argv, self.preload_modules)
+        except (IOError, OSError):
+            log.exception(u'Could not start a sandbox worker.')
+            return None
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool(preload_modules):
+    """
+    Returns the sandbox pool of this process, configured by the
+    CODE_JAIL_POOL setting, or None if the pool is disabled.
+
+    The pool is disabled when its size is 0, or codejail isn't configured
+    to run Python in a sandbox.  A process forked from a process with a pool
+    gets its own pool, since the workers can't be shared.
+    """
+    global _pool, _pool_pid  # pylint: disable=global-statement
+
+    if not jail_code.is_configured('python'):
+        return None
+    pool_settings = getattr(settings, 'CODE_JAIL_POOL', None) or {}
+    if not pool_settings.get('size'):
+        return None
+
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            command = jail_code.COMMANDS['python']
+            argv = list(command['cmdline_start']) + ['-c', pool_worker_py]
+            if command['user']:
+                argv = ['sudo', '-u', command['user']] + argv
+            _pool = SandboxPool(
+                size=pool_settings['size'],
+                max_executions=pool_settings.get('max_executions', 100),
+                argv=argv,
+                preload_modules=preload_modules,
+            )
+            _pool_pid = os.getpid()
+        return _pool
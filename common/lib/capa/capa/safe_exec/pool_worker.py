@@ -0,0 +1,215 @@
+"""
+The program of the workers of the sandbox pool.
+
+This file isn't imported: its source is run by the sandboxed Python, which
+can't import capa, so it only uses the standard library.
+
+A worker first imports the modules named by its first message.  Then, for
+each job it reads, it forks a child which applies the limits of the job and
+runs its code.  Forked children start with the imported modules, and don't
+share any other state, since each job runs in its own process.  A child runs
+in its own session, with no file descriptor of the worker but the pipe of its
+result, and the processes left in its session are killed after its job.
+
+Messages are JSON objects, prefixed with their length, read from stdin and
+written to stdout.  The code of the jobs can't write to them, since stdin and
+stdout are redirected to /dev/null.
+"""
+
+import base64
+import json
+import os
+import resource
+import select
+import shutil
+import signal
+import struct
+import sys
+import tempfile
+import time
+import traceback
+
+HEADER = struct.Struct('>I')
+
+# The file descriptors closed in the children forked for the jobs.
+MAXFD = os.sysconf('SC_OPEN_MAX') if hasattr(os, 'sysconf') else 1024
+
+# The resource limits applied to the children for the limits of a job.  A
+# limit of 0 means no limit, as in codejail.
+RLIMITS = [
+    ('CPU', resource.RLIMIT_CPU),
+    ('VMEM', resource.RLIMIT_AS),
+    ('FSIZE', resource.RLIMIT_FSIZE),
+    ('NPROC', resource.RLIMIT_NPROC),
+]
+
+
+def read_message(stream):
+    """
+    Returns the next message of the stream, or None at its end.
+    """
+    header = stream.read(HEADER.size)
+    if len(header) < HEADER.size:
+        return None
+    return json.loads(stream.read(HEADER.unpack(header)[0]).decode('utf-8'))
+
+
+def write_message(stream, message):
+    """
+    Writes the message to the stream.
+    """
+    data = json.dumps(message).encode('utf-8')
+    stream.write(HEADER.pack(len(data)) + data)
+    stream.flush()
+
+
+def json_safe(globals_dict):
+    """
+    Returns the JSON-safe part of the globals, as codejail does.
+    """
+    ok_types = (type(None), int, float, bytes, str, list, tuple, dict)
+
+    def decode_object(obj):
+        if isinstance(obj, bytes):
+            return obj.decode('utf-8')
+        elif isinstance(obj, (list, tuple)):
+            return [decode_object(item) for item in obj]
+        elif isinstance(obj, dict):
+            return {key: decode_object(value) for key, value in obj.items()}
+        return obj
+
+    safe_dict = {}
+    for key, value in globals_dict.items():
+        if not isinstance(value, ok_types) or key == '__builtins__':
+            continue
+        try:
+            value = json.loads(json.dumps(decode_object(value)))
+            key = json.loads(json.dumps(decode_object(key)))
+        except Exception:  # pylint: disable=broad-except
+            continue
+        safe_dict[key] = value
+    return json.loads(json.dumps(safe_dict))
+
+
+def run_code(job):
+    """
+    Runs the code of the job, in the current process, and returns the
+    JSON-safe globals it produced.
+    """
+    for name, rlimit in RLIMITS:
+        limit = job['limits'].get(name)
+        if limit:
+            resource.setrlimit(rlimit, (limit, limit))
+
+    tmpdir = tempfile.mkdtemp(prefix='codejail-')
+    try:
+        os.chdir(tmpdir)
+        for name, contents in job['extra_files']:
+            with open(name, 'wb') as extra_file:
+                extra_file.write(base64.b64decode(contents))
+        sys.path.extend(job['python_path'])
+
+        globals_dict = job['globals']
+        exec(compile(job['code'], 'jailed_code', 'exec'), globals_dict)  # pylint: disable=exec-used
+        return json_safe(globals_dict)
+    finally:
+        os.chdir('/')
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def isolate_child(result_fd):
+    """
+    Isolates the child forked for a job from the worker: it gets its own
+    session, so that the worker can kill the processes it starts, and only
+    keeps the pipe of its result, so that neither it nor its processes can
+    read or write the messages of the worker.
+    """
+    os.setsid()
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+    os.closerange(3, result_fd)
+    os.closerange(result_fd + 1, MAXFD)
+
+
+def kill_job(pid):
+    """
+    Kills the processes left by the job forked as `pid`, in its session.
+    """
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except OSError:
+        pass
+
+
+def run_job(job):
+    """
+    Runs the job in a forked child, and returns its result message.
+    """
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            isolate_child(write_fd)
+            result = {'status': 'ok', 'globals': run_code(job)}
+        except BaseException:  # pylint: disable=broad-except
+            result = {'status': 'error', 'message': traceback.format_exc()}
+        try:
+            with os.fdopen(write_fd, 'wb') as result_file:
+                result_file.write(json.dumps(result).encode('utf-8'))
+        finally:
+            os._exit(0)  # pylint: disable=protected-access
+
+    os.close(write_fd)
+    realtime = job['limits'].get('REALTIME')
+    deadline = time.time() + realtime if realtime else None
+    chunks = []
+    timed_out = False
+    with os.fdopen(read_fd, 'rb') as result_file:
+        while True:
+            timeout = max(deadline - time.time(), 0) if deadline else None
+            if not select.select([result_file], [], [], timeout)[0]:
+                timed_out = True
+                os.kill(pid, signal.SIGKILL)
+                break
+            chunk = os.read(result_file.fileno(), 65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    _, status = os.waitpid(pid, 0)
+    # The processes started by the code don't outlive its job.
+    kill_job(pid)
+
+    if timed_out:
+        return {'status': 'limit', 'message': 'The code ran longer than {} seconds.'.format(realtime)}
+    if status != 0 or not chunks:
+        return {'status': 'limit', 'message': 'The code was stopped with status {}.'.format(status)}
+    return json.loads(b''.join(chunks).decode('utf-8'))
+
+
+def main():
+    """
+    Imports the preloaded modules, then runs jobs until the end of stdin.
+    """
+    messages_in = os.fdopen(os.dup(0), 'rb')
+    messages_out = os.fdopen(os.dup(1), 'wb')
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+
+    preload = read_message(messages_in)
+    for modname in preload['modules'] if preload else []:
+        try:
+            __import__(modname)
+        except Exception:  # pylint: disable=broad-except
+            pass
+
+    while True:
+        job = read_message(messages_in)
+        if job is None:
+            break
+        write_message(messages_out, run_job(job))
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,8 @@
 
 
 import hashlib
+import struct
+from functools import lru_cache
 
 from codejail.safe_exec import SafeExecException, json_safe
 from codejail.safe_exec import not_safe_exec as codejail_not_safe_exec
@@ -10,6 +12,7 @@ import six
 from six import text_type
 
 from . import lazymod
+from .pool import get_pool
 
 # Establish the Python environment for Capa.
 # Capa assumes float-friendly division always.
@@ -55,6 +58,10 @@ for name, modname in ASSUMED_IMPORTS:
 
 LAZY_IMPORTS = "".join(LAZY_IMPORTS)
 
+# The modules imported by the workers of the sandbox pool before they run any
+# code: those of the prolog and of the assumed imports.
+POOL_PRELOADED_MODULES = ["random2", "six"] + [modname for _, modname in ASSUMED_IMPORTS]
+
 
 def update_hash(hasher, obj):
     """
@@ -79,6 +86,146 @@ def update_hash(hasher, obj):
         hasher.update(six.b(repr(obj)))
 
 
+# The types of the globals which are passed to the code, as in json_safe.
+JSON_SAFE_TYPES = (type(None), int, float, bytes, six.text_type, list, tuple, dict)
+
+_LENGTH = struct.Struct('>I')
+_FLOAT = struct.Struct('>d')
+
+
+def _new_hasher():
+    """
+    Returns a hasher for the cache keys: BLAKE2b, which is faster than MD5,
+    where it is available.
+    """
+    if hasattr(hashlib, 'blake2b'):
+        return hashlib.blake2b(digest_size=16)  # pylint: disable=no-member
+    return hashlib.md5()
+
+
+@lru_cache(maxsize=256)
+def code_digest(code):
+    """
+    Returns the digest of the code identifying it in cache keys.  The digests
+    of the code of the problems are kept, since the same code runs many times.
+    """
+    hasher = _new_hasher()
+    hasher.update(code.encode('utf-8', 'surrogatepass'))
+    return hasher.digest()
+
+
+def _json_key(key):
+    """
+    Returns the string which the key of a dict becomes in JSON.
+    """
+    if isinstance(key, six.text_type):
+        return key
+    if isinstance(key, bytes):
+        return key.decode('utf-8')
+    if key is True:
+        return 'true'
+    if key is False:
+        return 'false'
+    if key is None:
+        return 'null'
+    if isinstance(key, int):
+        return int.__repr__(key)
+    if isinstance(key, float):
+        return float.__repr__(key)
+    raise TypeError(u'Keys must be JSON-safe, not {}'.format(type(key)))
+
+
+def _encode_str(value, out):
+    """
+    Appends the encoding of the string to `out`.
+    """
+    data = value.encode('utf-8', 'surrogatepass')
+    out += b's'
+    out += _LENGTH.pack(len(data))
+    out += data
+
+
+def _encode_value(value, out):
+    """
+    Appends the encoding of the value, as it is passed to the code, to `out`.
+
+    Raises:
+        An exception if the value isn't JSON-safe.
+    """
+    if value is None:
+        out += b'n'
+    elif value is True:
+        out += b't'
+    elif value is False:
+        out += b'f'
+    elif isinstance(value, int):
+        out += b'i'
+        out += int.__repr__(value).encode('ascii')
+        out += b';'
+    elif isinstance(value, float):
+        out += b'd'
+        out += _FLOAT.pack(value)
+    elif isinstance(value, six.text_type):
+        _encode_str(value, out)
+    elif isinstance(value, bytes):
+        _encode_str(value.decode('utf-8'), out)
+    elif isinstance(value, (list, tuple)):
+        out += b'l'
+        out += _LENGTH.pack(len(value))
+        for item in value:
+            _encode_value(item, out)
+    elif isinstance(value, dict):
+        # JSON turns the keys into strings, and keeps the last value of equal keys.
+        items = {_json_key(key): item for key, item in value.items()}
+        out += b'm'
+        out += _LENGTH.pack(len(items))
+        for key in sorted(items):
+            _encode_str(key, out)
+            _encode_value(items[key], out)
+    else:
+        raise TypeError(u'{} is not JSON-safe'.format(type(value)))
+
+
+def encode_json_safe(globals_dict):
+    """
+    Returns a canonical binary encoding of `json_safe(globals_dict)`, the
+    globals which are passed to the code, computed in a single pass.
+
+    Equal JSON-safe globals have the same encoding, whatever the order of the
+    keys of their dicts, and whether their sequences are lists or tuples.
+    """
+    names = {}
+    for name, value in globals_dict.items():
+        if name == '__builtins__' or not isinstance(value, JSON_SAFE_TYPES):
+            continue
+        try:
+            names[_json_key(name)] = value
+        except Exception:  # pylint: disable=broad-except
+            continue
+
+    out = bytearray(b'm')
+    for name in sorted(names):
+        # Skip the globals which aren't JSON-safe, like json_safe does.
+        mark = len(out)
+        try:
+            _encode_str(name, out)
+            _encode_value(names[name], out)
+        except Exception:  # pylint: disable=broad-except
+            del out[mark:]
+    return bytes(out)
+
+
+def make_cache_key(code, globals_dict, random_seed):
+    """
+    Returns the key of the cached execution of the code with the globals and
+    the random seed.
+    """
+    hasher = _new_hasher()
+    hasher.update(code_digest(code))
+    hasher.update(encode_json_safe(globals_dict))
+    return "safe_exec.%r.%s" % (random_seed, hasher.hexdigest())
+
+
 def safe_exec(
     code,
     globals_dict,
@@ -123,11 +270,7 @@ def safe_exec(
     """
     # Check the cache for a previous result.
     if cache:
-        safe_globals = json_safe(globals_dict)
-        md5er = hashlib.md5()
-        md5er.update(repr(code).encode('utf-8'))
-        update_hash(md5er, safe_globals)
-        key = "safe_exec.%r.%s" % (random_seed, md5er.hexdigest())
+        key = make_cache_key(code, globals_dict, random_seed)
         cached = cache.get(key)
         if cached is not None:
             # We have a cached result.  The result is a pair: the exception
@@ -141,15 +284,20 @@ def safe_exec(
     # Create the complete code we'll run.
     code_prolog = CODE_PROLOG % random_seed
 
-    # Decide which code executor to use.
+    # Decide which code executor to use.  Sandboxed code runs in a worker of
+    # the sandbox pool when one is available.
+    pool = None
     if unsafely:
         exec_fn = codejail_not_safe_exec
     else:
         exec_fn = codejail_safe_exec
+        pool = get_pool(POOL_PRELOADED_MODULES)
+        if pool is not None and not pool.can_run(python_path, extra_files, limit_overrides_context):
+            pool = None
 
     # Run the code!  Results are side effects in globals_dict.
     try:
-        exec_fn(
+        ran_in_pool = pool is not None and pool.safe_exec(
             code_prolog + LAZY_IMPORTS + code,
             globals_dict,
             python_path=python_path,
@@ -157,6 +305,15 @@ def safe_exec(
             limit_overrides_context=limit_overrides_context,
             slug=slug,
         )
+        if not ran_in_pool:
+            exec_fn(
+                code_prolog + LAZY_IMPORTS + code,
+                globals_dict,
+                python_path=python_path,
+                extra_files=extra_files,
+                limit_overrides_context=limit_overrides_context,
+                slug=slug,
+            )
     except SafeExecException as e:
         # Saving SafeExecException e in exception to be used later.
         exception = e
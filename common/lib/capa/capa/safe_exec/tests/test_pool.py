@@ -0,0 +1,152 @@
+"""Test pool.py"""
+
+
+import io
+import os
+import sys
+import textwrap
+import time
+import unittest
+import zipfile
+
+from codejail import jail_code
+from codejail.safe_exec import SafeExecException
+from mock import patch
+from six import text_type
+
+from capa.safe_exec.pool import SandboxPool, pool_worker_py
+
+LIMITS = {'CPU': 5, 'VMEM': 0, 'REALTIME': 5, 'FSIZE': 0, 'NPROC': 0, 'PROXY': 0}
+
+
+class TestSandboxPool(unittest.TestCase):
+    """
+    Test the pool of workers, run with this Python instead of a sandboxed one.
+    """
+    def setUp(self):
+        super(TestSandboxPool, self).setUp()
+        self.limits = dict(LIMITS)
+        patcher = patch.object(jail_code, 'get_effective_limits', side_effect=lambda context=None: dict(self.limits))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pool = self.new_pool()
+
+    def new_pool(self, size=1, max_executions=100):
+        """
+        Returns a new pool of workers running this Python.
+        """
+        pool = SandboxPool(
+            size=size,
+            max_executions=max_executions,
+            argv=[sys.executable, '-E', '-B', '-c', pool_worker_py],
+            preload_modules=['json', 'math'],
+        )
+        self.addCleanup(pool.close)
+        return pool
+
+    def worker_pid(self):
+        """
+        Returns the process id of the idle worker of the pool.
+        """
+        worker, = self.pool._idle_workers  # pylint: disable=protected-access
+        return worker.process.pid
+
+    def test_set_values(self):
+        g = {'b': 2}
+        self.assertTrue(self.pool.safe_exec("a = b * 17\nprint('not a message')", g))
+        self.assertEqual(g, {'a': 34, 'b': 2})
+
+    def test_isolated_executions(self):
+        g = {}
+        self.pool.safe_exec("import math; math.shared = 1", g)
+        self.pool.safe_exec("import math; shared = hasattr(math, 'shared')", g)
+        self.assertFalse(g['shared'])
+
+    def test_raising_exceptions(self):
+        self.pool.safe_exec("a = 1", {})
+        pid = self.worker_pid()
+        with self.assertRaises(SafeExecException) as cm:
+            self.pool.safe_exec("1/0", {})
+        self.assertIn("ZeroDivisionError", text_type(cm.exception))
+        self.assertEqual(self.worker_pid(), pid)
+
+    def test_isolated_descriptors(self):
+        g = {}
+        self.pool.safe_exec(textwrap.dedent("""\
+            import os
+            fds = []
+            for fd in range(3, 256):
+                try:
+                    os.fstat(fd)
+                except OSError:
+                    continue
+                fds.append(fd)
+            """), g)
+        # Only the pipe of the result is left open.
+        self.assertEqual(len(g['fds']), 1)
+
+    def test_killed_processes(self):
+        g = {}
+        self.pool.safe_exec(textwrap.dedent("""\
+            import os, time
+            pid = os.fork()
+            if pid == 0:
+                os.closerange(0, 256)
+                time.sleep(60)
+                os._exit(0)
+            """), g)
+        time.sleep(0.5)
+        self.assertFalse(self.is_running(g['pid']))
+
+    def is_running(self, pid):
+        """
+        Returns whether the process `pid` runs, and isn't a zombie.
+        """
+        try:
+            with open('/proc/{}/stat'.format(pid)) as stat:
+                return stat.read().split(')')[-1].split()[0] != 'Z'
+        except IOError:
+            return False
+
+    def test_python_lib(self):
+        zip_file = io.BytesIO()
+        with zipfile.ZipFile(zip_file, 'w') as python_lib:
+            python_lib.writestr('constant.py', 'THE_CONST = 23')
+        extra_files = [('python_lib.zip', zip_file.getvalue())]
+        self.assertTrue(self.pool.can_run(['python_lib.zip'], extra_files))
+
+        g = {}
+        self.pool.safe_exec(
+            "import constant; a = constant.THE_CONST", g, python_path=['python_lib.zip'], extra_files=extra_files,
+        )
+        self.assertEqual(g['a'], 23)
+
+    def test_cant_run(self):
+        self.assertFalse(self.pool.can_run(['/some/pylib'], []))
+        self.limits['PROXY'] = 1
+        self.assertFalse(self.pool.can_run([], []))
+
+    def test_replaced_after_max_executions(self):
+        self.pool = self.new_pool(max_executions=2)
+        self.pool.safe_exec("a = 1", {})
+        pid = self.worker_pid()
+        self.pool.safe_exec("a = 1", {})
+        self.assertNotEqual(self.worker_pid(), pid)
+
+    def test_replaced_after_limit(self):
+        self.limits['REALTIME'] = 1
+        self.pool.safe_exec("a = 1", {})
+        pid = self.worker_pid()
+        with self.assertRaises(SafeExecException):
+            self.pool.safe_exec("while True: pass", {})
+        self.assertNotEqual(self.worker_pid(), pid)
+
+        g = {}
+        self.pool.safe_exec("a = 1", g)
+        self.assertEqual(g['a'], 1)
+
+    def test_busy(self):
+        worker = self.pool._acquire_worker()  # pylint: disable=protected-access
+        self.assertFalse(self.pool.safe_exec("a = 1", {}))
+        self.pool._release_worker(worker, stop=False)  # pylint: disable=protected-access
+        self.assertTrue(self.pool.safe_exec("a = 1", {}))
@@ -12,14 +12,14 @@ import random2 as random
 import six
 from codejail import jail_code
 from codejail.django_integration import ConfigureCodeJailMiddleware
-from codejail.safe_exec import SafeExecException
+from codejail.safe_exec import SafeExecException, json_safe
 from django.conf import settings
 from django.core.exceptions import MiddlewareNotUsed
 from django.test import override_settings
 from six import text_type, unichr
 from six.moves import range
 
-from capa.safe_exec import safe_exec, update_hash
+from capa.safe_exec import make_cache_key, safe_exec, update_hash
 
 
 class TestSafeExec(unittest.TestCase):
@@ -321,6 +321,57 @@ class TestUpdateHash(unittest.TestCase):
         self.assertEqual(h1, h2)
 
 
+class TestMakeCacheKey(unittest.TestCase):
+    """Test that safe_exec.make_cache_key canonicalizes the globals passed to the code."""
+
+    def key(self, globals_dict, code="a = 1", random_seed=None):
+        return make_cache_key(code, globals_dict, random_seed)
+
+    def test_simple_cases(self):
+        self.assertNotEqual(self.key({'a': 1}), self.key({'a': 10}))
+        self.assertNotEqual(self.key({'a': 1}), self.key({'a': "1"}))
+        self.assertNotEqual(self.key({'a': 1}), self.key({'a': 1.0}))
+        self.assertNotEqual(self.key({'a': 1}), self.key({'a': True}))
+        self.assertNotEqual(self.key({'a': [1, 2]}), self.key({'a': [2, 1]}))
+        self.assertNotEqual(self.key({'a': ["ab"]}), self.key({'a': ["a", "b"]}))
+        self.assertNotEqual(self.key({'a': 1}, code="a = 2"), self.key({'a': 1}))
+        self.assertNotEqual(self.key({'a': 1}, random_seed=1), self.key({'a': 1}))
+
+    def test_dict_ordering(self):
+        d1 = {k: 1 for k in "abcdefghijklmnopqrstuvwxyz"}
+        d2 = {k: 1 for k in reversed("abcdefghijklmnopqrstuvwxyz")}
+        self.assertEqual(self.key({'d': d1}), self.key({'d': d2}))
+        self.assertEqual(self.key({'a': [1, 2, [d1], 3]}), self.key({'a': [1, 2, [d2], 3]}))
+
+    def test_json_safe(self):
+        globals_dict = {
+            'tuple': (1, 2.5, None),
+            'bytes': b"caf\xc3\xa9",
+            'keys': {2: "two", None: "none", False: [b"no"]},
+            'unsafe': object(),
+            'unsafe_item': [1, {2, 3}],
+            'undecodable': b"\xff",
+            '__builtins__': {},
+        }
+        self.assertEqual(self.key(globals_dict), self.key(json_safe(globals_dict)))
+        self.assertEqual(self.key(globals_dict), self.key({
+            'tuple': [1, 2.5, None],
+            'bytes': u"caf\xe9",
+            'keys': {'2': "two", 'null': "none", 'false': ["no"]},
+        }))
+
+    def test_safe_exec_key(self):
+        cache = {}
+        key = make_cache_key("a = b + 1", {'b': 1}, 5)
+        safe_exec("a = b + 1", {'b': 1}, random_seed=5, cache=DictCache(cache))
+        self.assertEqual(list(cache), [key])
+
+        g = {'b': 1}
+        cache[key] = (None, {'a': 17})
+        safe_exec("a = b + 1", g, random_seed=5, cache=DictCache(cache))
+        self.assertEqual(g['a'], 17)
+
+
 class TestRealProblems(unittest.TestCase):
     def test_802x(self):
         code = textwrap.dedent("""\
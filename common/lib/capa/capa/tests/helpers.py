@@ -78,6 +78,7 @@ def test_capa_system(render_template=None):
             'default_queuename': 'testqueue',
             'waittime': 10
         },
+        get_script_context=None,
     )
     return the_system
 
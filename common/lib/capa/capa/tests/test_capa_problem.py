@@ -10,10 +10,11 @@ import ddt
 import six
 from lxml import etree
 from markupsafe import Markup
-from mock import patch
+from mock import Mock, patch
 
+from capa.capa_problem import LoncapaProblem, problem_templates
 from capa.responsetypes import LoncapaProblemError
-from capa.tests.helpers import new_loncapa_problem
+from capa.tests.helpers import new_loncapa_problem, test_capa_system
 from openedx.core.djangolib.markup import HTML
 
 
@@ -789,3 +790,110 @@ class CAPAProblemReportHelpersTest(unittest.TestCase):
         # Ensure that the answer is a string so that the dict returned from this
         # function can eventualy be serialized to json without issues.
         self.assertIsInstance(problem.get_question_answers()['1_solution_1'], six.text_type)
+
+
+class ProblemTemplateCacheTest(unittest.TestCase):
+    """
+    Tests that problems with the same XML share its parsed template.
+    """
+    xml = textwrap.dedent("""
+        <problem>
+            <optionresponse>
+                <optioninput label="Color">
+                    <option correct="False">yellow</option>
+                    <option correct="True">blue</option>
+                </optioninput>
+            </optionresponse>
+        </problem>
+    """)
+
+    def setUp(self):
+        super(ProblemTemplateCacheTest, self).setUp()
+        problem_templates.clear()
+        self.addCleanup(problem_templates.clear)
+
+    def test_parsed_once(self):
+        with patch.object(
+            LoncapaProblem, 'make_xml_compatible', autospec=True, side_effect=LoncapaProblem.make_xml_compatible,
+        ) as mock_make_xml_compatible:
+            first_problem = new_loncapa_problem(self.xml, seed=1)
+            second_problem = new_loncapa_problem(self.xml, seed=2)
+        self.assertEqual(mock_make_xml_compatible.call_count, 1)
+
+        # Each problem has its own copy of the compatible, preprocessed tree.
+        self.assertIsNot(first_problem.tree, second_problem.tree)
+        self.assertEqual(etree.tostring(first_problem.tree), etree.tostring(second_problem.tree))
+        self.assertEqual(first_problem.tree.find('.//optioninput').get('options'), "('yellow','blue')")
+        first_problem.tree.find('.//optioninput').set('correct', 'yellow')
+        self.assertEqual(new_loncapa_problem(self.xml).tree.find('.//optioninput').get('correct'), 'blue')
+
+    def test_incompatible_problem_not_cached(self):
+        xml = self.xml.replace('correct="False"', 'correct="True"')
+        for _ in range(2):
+            with self.assertRaises(LoncapaProblemError):
+                new_loncapa_problem(xml)
+
+
+class ScriptContextPrecomputeTest(unittest.TestCase):
+    """
+    Tests the precomputation of the contexts of problem scripts.
+    """
+    xml = textwrap.dedent("""
+        <problem>
+            <script type="loncapa/python">
+        x = random.randint(0, 1000000)
+            </script>
+            <stringresponse answer="$x">
+                <textline size="20"/>
+            </stringresponse>
+        </problem>
+    """)
+
+    def _new_problem(self, seed, get_script_context=None, xml=None):
+        """
+        Returns a new problem with the given seed, whose capa system provides
+        the given precomputed contexts.
+        """
+        capa_system = test_capa_system()
+        capa_system.get_script_context = get_script_context
+        return new_loncapa_problem(xml or self.xml, capa_system=capa_system, seed=seed)
+
+    def test_precompute(self):
+        precomputed_hash, contexts = self._new_problem(seed=1).precompute_script_contexts([1, 2])
+        self.assertEqual(sorted(contexts), [1, 2])
+        for seed in (1, 2):
+            emsg, context = contexts[seed]
+            self.assertIsNone(emsg)
+            self.assertEqual(context['seed'], seed)
+            self.assertEqual(context['x'], self._new_problem(seed=seed).context['x'])
+
+        get_script_context = Mock(return_value=None)
+        self._new_problem(seed=2, get_script_context=get_script_context)
+        get_script_context.assert_called_once_with(precomputed_hash, 2)
+
+    def test_precomputed_context(self):
+        get_script_context = Mock(return_value=(None, {'x': 'precomputed', 'seed': 1}))
+        with patch('capa.capa_problem.safe_exec') as mock_safe_exec:
+            problem = self._new_problem(seed=3, get_script_context=get_script_context)
+        self.assertFalse(mock_safe_exec.called)
+        self.assertEqual(problem.context['x'], 'precomputed')
+        self.assertEqual(problem.context['seed'], 3)
+        self.assertEqual(problem.context['anonymous_student_id'], 'student')
+        self.assertIn('random.randint', problem.context['script_code'])
+
+    def test_precomputed_error(self):
+        get_script_context = Mock(return_value=(u'ZeroDivisionError', {}))
+        with self.assertRaises(LoncapaProblemError):
+            self._new_problem(seed=1, get_script_context=get_script_context)
+
+    def test_not_precomputed(self):
+        context = self._new_problem(seed=1, get_script_context=Mock(return_value=None)).context
+        self.assertEqual(context['x'], self._new_problem(seed=1).context['x'])
+
+    def test_learner_dependent_script(self):
+        xml = self.xml.replace('random.randint(0, 1000000)', 'len(anonymous_student_id)')
+        get_script_context = Mock(return_value=(None, {'x': 'precomputed'}))
+        problem = self._new_problem(seed=1, get_script_context=get_script_context, xml=xml)
+        self.assertIsNone(problem.precompute_script_contexts([1]))
+        self.assertFalse(get_script_context.called)
+        self.assertEqual(problem.context['x'], len('student'))
@@ -1,6 +1,7 @@
 """Implements basics of Capa, including class CapaModule."""
 
 
+import copy
 import json
 import logging
 import re
@@ -12,13 +13,15 @@ from lxml import etree
 from pkg_resources import resource_string
 from web_fragments.fragment import Fragment
 from xblock.core import XBlock
+from xblock.scorable import Score
 
 from capa import responsetypes
+from capa.correctmap import CorrectMap
 from xmodule.contentstore.django import contentstore
 from xmodule.editing_module import EditingMixin
 from xmodule.exceptions import NotFoundError, ProcessingError
 from xmodule.raw_module import RawMixin
-from xmodule.util.sandboxing import get_python_lib_zip
+from xmodule.util.sandboxing import can_execute_unsafe_code, get_python_lib_zip
 from xmodule.util.xmodule_django import add_webpack_to_fragment
 from xmodule.x_module import (
     HTMLSnippet,
@@ -30,14 +33,28 @@ from xmodule.x_module import (
 )
 from xmodule.xml_module import XmlMixin
 
-from .capa_base import CapaMixin, ComplexEncoder, _
+from .capa_base import NUM_RANDOMIZATION_BINS, RANDOMIZATION, CapaMixin, ComplexEncoder, _, unmask_lcp_event
 
 log = logging.getLogger("edx.courseware")
 
+# The response types which grade answers by themselves, without running code
+# of the problem or sending the answers to a grader.  The answers to problems
+# which only have these responses can be rescored in a batch.
+BATCH_RESCORE_RESPONSE_TYPES = (
+    responsetypes.ChoiceResponse,
+    responsetypes.FormulaResponse,
+    responsetypes.MultipleChoiceResponse,
+    responsetypes.NumericalResponse,
+    responsetypes.OptionResponse,
+    responsetypes.StringResponse,
+    responsetypes.TrueFalseResponse,
+)
+
 
 @XBlock.wants('user')
 @XBlock.needs('i18n')
 @XBlock.wants('call_to_action')
+@XBlock.wants('capa_script_contexts')
 class ProblemBlock(
         CapaMixin, RawMixin, XmlMixin, EditingMixin,
         XModuleDescriptorToXBlockMixin, XModuleToXBlockMixin, HTMLSnippet, ResourceTemplates, XModuleMixin):
@@ -390,6 +407,96 @@ class ProblemBlock(
             maximum_score = lcp.get_max_score()
         return maximum_score
 
+    def precompute_script_contexts(self, cache=None):
+        """
+        Runs the script of the problem once for each seed its learners can
+        have, if they can only have a few seeds.  The executions are cached
+        in the given cache, like the executions of the problems of learners.
+
+        Returns the hash of the script and the dict of its contexts by seed
+        computed by `LoncapaProblem.precompute_script_contexts`, or None if
+        the contexts of the problem can't be precomputed.
+        """
+        from capa.capa_problem import LoncapaProblem
+
+        if self.rerandomize == RANDOMIZATION.NEVER:
+            seeds = [1]
+        elif self.rerandomize == RANDOMIZATION.PER_STUDENT:
+            seeds = list(range(NUM_RANDOMIZATION_BINS))
+        else:
+            return None
+
+        lcp = LoncapaProblem(
+            problem_text=self.data,
+            id=self.location.html_id(),
+            capa_system=self._offline_capa_system(cache),
+            capa_module=self,
+            state={},
+            seed=seeds[0],
+            minimal_init=True,
+        )
+        return lcp.precompute_script_contexts(seeds)
+
+    def batch_rescorer(self, cache=None):
+        """
+        Returns a ProblemBatchRescorer of the problem, or None if the answers
+        to the problem can't be rescored without binding the problem to each
+        learner.
+
+        The answers to a problem can be rescored in a batch when all its
+        responses are graded by capa itself, and the problem doesn't use the
+        anonymous id of the learner.  The responses which run code of the problem to grade
+        answers, like customresponse, or send them to a grader, like
+        externalresponse, are rescored by the problem of each learner.
+        """
+        from capa.capa_problem import ANONYMOUS_STUDENT_ID_NAME, LoncapaProblem
+
+        if ANONYMOUS_STUDENT_ID_NAME in self.data:
+            return None
+        try:
+            lcp = LoncapaProblem(
+                problem_text=self.data,
+                id=self.location.html_id(),
+                capa_system=self._offline_capa_system(cache),
+                capa_module=self,
+                state={},
+                seed=1,
+                minimal_init=True,
+            )
+        except responsetypes.LoncapaProblemError:
+            log.exception(u"LcpFatalError for block {} while checking batch rescoring".format(str(self.location)))
+            return None
+
+        if not lcp.responders or not all(
+                type(responder) in BATCH_RESCORE_RESPONSE_TYPES for responder in lcp.responders.values()):
+            return None
+        return ProblemBatchRescorer(self, self._offline_capa_system(cache))
+
+    def _offline_capa_system(self, cache=None):
+        """
+        Returns a LoncapaSystem for the problem which isn't bound to a learner,
+        and can only be used to run its script and grade answers.
+        """
+        from capa.capa_problem import LoncapaSystem
+
+        course_id = self.location.course_key
+        return LoncapaSystem(
+            ajax_url=None,
+            anonymous_student_id=None,
+            cache=cache,
+            can_execute_unsafe_code=(lambda: can_execute_unsafe_code(course_id)),
+            get_python_lib_zip=(lambda: get_python_lib_zip(contentstore, course_id)),
+            DEBUG=None,
+            filestore=self.runtime.resources_fs,
+            i18n=self.runtime.service(self, "i18n"),
+            node_path=None,
+            render_template=None,
+            seed=None,
+            STATIC_URL=None,
+            xqueue=None,
+            matlab_api_key=None,
+        )
+
     def generate_report_data(self, user_state_iterator, limit_responses=None):
         """
         Return a list of student responses to this block in a readable way.
@@ -490,3 +597,145 @@ class ProblemBlock(
                 if correct_answer_text is not None:
                     report[_("Correct Answer")] = correct_answer_text
                 yield (user_state.username, report)
+
+
+class ProblemBatchRescorer(object):
+    """
+    Rescores the answers of many learners to a problem, without binding the
+    problem to each of them.
+
+    The problem is parsed once for each seed of the learners, rather than once
+    for each learner, and the answers of a learner are graded by the problem
+    of their seed like `CapaMixin.rescore` does.
+    """
+    def __init__(self, block, capa_system):
+        self.block = block
+        self.capa_system = capa_system
+        self._capa_module = _BatchRescoreModule(block)
+        self._problems = {}
+
+    def rescore(self, state, track_function):
+        """
+        Grades again the answers of the given problem state of a learner who
+        answered the problem, and tracks the rescoring with the given track
+        function of the learner.
+
+        Returns the new problem state of the learner, and their new score, or
+        None if the problem state doesn't have the seed of the learner.
+
+        Raises:
+            StudentInputError, ResponseError or LoncapaProblemError if the
+            answers can't be graded.
+        """
+        seed = state.get('seed')
+        if seed is None:
+            return None
+
+        lcp = self._get_problem(seed)
+        lcp.student_answers = state.get('student_answers', {})
+        lcp.has_saved_answers = state.get('has_saved_answers', False)
+        lcp.correct_map = CorrectMap()
+        lcp.correct_map.set_dict(state.get('correct_map', {}))
+        lcp.done = state.get('done', False)
+        lcp.input_state = state.get('input_state', {})
+        self._capa_module.track_function = track_function
+
+        new_state = dict(state)
+        if state.get('score') is None:
+            orig_score = self._calculate_score(lcp)
+            self.set_score(new_state, orig_score)
+        else:
+            orig_score = self.block.fields['score'].from_json(state['score'])
+
+        event_info = {
+            'state': lcp.get_state(),
+            'problem_id': six.text_type(self.block.location),
+            'orig_score': orig_score.raw_earned,
+            'orig_total': orig_score.raw_possible,
+        }
+        # Make sure that the attempt number is always at least 1 for grading purposes,
+        # even if the number of attempts have been reset and this problem is regraded.
+        lcp.context['attempt'] = max(state.get('attempts', 0), 1)
+        try:
+            lcp.correct_map.update(lcp.get_grade_from_current_answers(None))
+            new_score = self._calculate_score(lcp)
+        except (responsetypes.StudentInputError, responsetypes.ResponseError, responsetypes.LoncapaProblemError):
+            log.warning("Input error in capa_module:problem_rescore", exc_info=True)
+            event_info['failure'] = 'input_error'
+            self._track(lcp, 'problem_rescore_fail', event_info)
+            raise
+        except Exception:
+            event_info['failure'] = 'unexpected'
+            self._track(lcp, 'problem_rescore_fail', event_info)
+            raise
+        new_state['correct_map'] = lcp.correct_map.get_dict()
+
+        event_info['new_score'] = new_score.raw_earned
+        event_info['new_total'] = new_score.raw_possible
+        event_info['correct_map'] = lcp.correct_map.get_dict()
+        event_info['success'] = 'correct' if all(
+            lcp.correct_map.is_correct(answer_id) for answer_id in lcp.correct_map
+        ) else 'incorrect'
+        event_info['attempts'] = state.get('attempts', 0)
+        self._track(lcp, 'problem_rescore', event_info)
+        return new_state, new_score
+
+    def set_score(self, state, score):
+        """
+        Sets the score of the given problem state of a learner, like
+        `CapaMixin.set_score` sets the score of the problem.
+        """
+        state['score'] = self.block.fields['score'].to_json(score)
+
+    def _get_problem(self, seed):
+        """
+        Returns the LoncapaProblem of the given seed, parsing it the first
+        time the seed is needed.
+        """
+        from capa.capa_problem import LoncapaProblem
+
+        if seed not in self._problems:
+            self._problems[seed] = LoncapaProblem(
+                problem_text=self.block.data,
+                id=self.block.location.html_id(),
+                capa_system=self.capa_system,
+                capa_module=self._capa_module,
+                state={},
+                seed=seed,
+                extract_tree=False,
+            )
+        return self._problems[seed]
+
+    def _calculate_score(self, lcp):
+        """
+        Returns the score of the correctness map of the LoncapaProblem.
+        """
+        lcp_score = lcp.calculate_score()
+        return Score(raw_earned=lcp_score['score'], raw_possible=lcp_score['total'])
+
+    def _track(self, lcp, title, event_info):
+        """
+        Tracks the event of the learner being rescored, with unmasked choice names.
+        """
+        event_unmasked = copy.deepcopy(event_info)
+        unmask_lcp_event(lcp, event_unmasked)
+        self._capa_module.track_function(title, event_unmasked)
+
+
+class _BatchRescoreModule(object):
+    """
+    The capa module of the problems of a ProblemBatchRescorer: the problem
+    block, with a runtime which tracks the events of the learner being
+    rescored, e.g. the hints displayed to them.
+    """
+    def __init__(self, block):
+        self.block = block
+        self.track_function = None
+
+    @property
+    def runtime(self):
+        # Capa only uses the runtime of its module to track events.
+        return self
+
+    def __getattr__(self, name):
+        return getattr(self.block, name)
@@ -0,0 +1,98 @@
+"""
+Compares the course structure codecs of the CourseStructureCache on
+exported course structures.
+
+Export the structures to compare, as extended JSON, with e.g.:
+
+    mongoexport --db edxapp --collection modulestore.structures \\
+        --query '{"_id": {"$oid": "<structure id>"}}' --out structures.json
+
+and then run:
+
+    python benchmark_structure_codecs.py structures.json
+"""
+
+
+import timeit
+
+from bson import json_util
+
+from xmodule.modulestore.split_mongo.mongo_connection import structure_from_mongo
+from xmodule.modulestore.split_mongo.structure_codec import STRUCTURE_CODECS, msgpack
+
+try:
+    import click
+except ImportError:
+    click = None
+
+
+def load_structures(structure_files):
+    """
+    Returns the structures read from the given files of extended JSON
+    documents, one per line, converted by structure_from_mongo.
+    """
+    structures = []
+    for structure_file in structure_files:
+        for line in structure_file:
+            if line.strip():
+                structures.append(structure_from_mongo(json_util.loads(line)))
+    return structures
+
+
+def benchmark_codec(codec, structure, repeat):
+    """
+    Returns a dict of the best encoding and decoding times, in ms, and the
+    encoded sizes, in bytes, of the given structure with the given codec.
+    """
+    data = codec.dumps(structure)
+    compressed_data = codec.compress(data)
+    if codec.loads(codec.decompress(compressed_data)) != structure:
+        raise ValueError(u'The {} codec does not round-trip structure {}'.format(codec.name, structure['_id']))
+
+    def encode():  # pylint: disable=missing-docstring
+        codec.compress(codec.dumps(structure))
+
+    def decode():  # pylint: disable=missing-docstring
+        codec.loads(codec.decompress(compressed_data))
+
+    return {
+        'encode_ms': min(timeit.repeat(encode, number=1, repeat=repeat)) * 1000,
+        'decode_ms': min(timeit.repeat(decode, number=1, repeat=repeat)) * 1000,
+        'uncompressed_size': len(data),
+        'compressed_size': len(compressed_data),
+    }
+
+
+if click is not None:
+    @click.command()
+    @click.argument('structure_files', type=click.File('r'), nargs=-1, required=True)
+    @click.option('--repeat', help='Number of times each operation is timed.', default=10)
+    def cli(structure_files, repeat):
+        """
+        Print the encoding and decoding times and the sizes of each structure
+        with each available codec.
+        """
+        codecs = [
+            codec_class() for name, codec_class in sorted(STRUCTURE_CODECS.items())
+            if name != 'msgpack' or msgpack is not None
+        ]
+        row = u'{:<26} {:>7} {:<8} {:>10} {:>10} {:>12} {:>12}'
+        click.echo(row.format('structure', 'blocks', 'codec', 'encode_ms', 'decode_ms', 'size', 'compressed'))
+        for structure in load_structures(structure_files):
+            for codec in codecs:
+                result = benchmark_codec(codec, structure, repeat)
+                click.echo(row.format(
+                    str(structure['_id']),
+                    len(structure['blocks']),
+                    codec.name,
+                    u'{:.2f}'.format(result['encode_ms']),
+                    u'{:.2f}'.format(result['decode_ms']),
+                    result['uncompressed_size'],
+                    result['compressed_size'],
+                ))
+
+if __name__ == '__main__':
+    if click is not None:
+        cli()  # pylint: disable=no-value-for-parameter
+    else:
+        print("Aborted! Module 'click' is not installed.")
@@ -2,6 +2,7 @@
 
 import logging
 import sys
+from collections import OrderedDict
 
 import six
 from contracts import contract, new_contract
@@ -85,8 +86,54 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
         self.module_data = module_data
         self.default_class = default_class
         self.local_modules = {}
+        # Map of definition id to the definitions prefetched for lazily
+        # loaded blocks, in least recently cached order.
+        self.definition_cache = OrderedDict()
+        # Ids of the definitions of lazily loaded blocks that are yet to be
+        # prefetched, in the order the blocks were loaded (as keys).
+        self.pending_definition_ids = OrderedDict()
         self._services['library_tools'] = LibraryToolsService(modulestore, user_id=None)
 
+    def cache_definitions(self, definitions):
+        """
+        Caches the given definitions for the lazy loading of the blocks'
+        definitions, evicting the least recently cached definitions beyond
+        the modulestore's DEFINITION_CACHE_MAX_SIZE.
+        """
+        for definition in definitions:
+            self.definition_cache[definition['_id']] = definition
+        max_size = getattr(self.modulestore, 'DEFINITION_CACHE_MAX_SIZE', 0)
+        while len(self.definition_cache) > max_size:
+            self.definition_cache.popitem(last=False)
+
+    def add_pending_definitions(self, definition_ids):
+        """
+        Marks the given definitions, of lazily loaded blocks, to be
+        prefetched when the first of them is accessed.
+        """
+        for definition_id in definition_ids:
+            if definition_id not in self.definition_cache:
+                self.pending_definition_ids[definition_id] = None
+
+    def get_cached_definition(self, course_key, definition_id):
+        """
+        Returns the prefetched definition with the given id, or None.
+
+        If the definition is pending, it's prefetched first, along with the
+        next pending definitions, in a batch of up to the modulestore's
+        DEFINITION_CACHE_MAX_SIZE definitions.
+        """
+        if definition_id in self.pending_definition_ids:
+            del self.pending_definition_ids[definition_id]
+            batch = [definition_id]
+            max_size = getattr(self.modulestore, 'DEFINITION_CACHE_MAX_SIZE', 0)
+            while self.pending_definition_ids and len(batch) < max_size:
+                batch.append(self.pending_definition_ids.popitem(last=False)[0])
+            query_size = self.modulestore.DEFINITION_PREFETCH_BATCH_SIZE
+            for start in range(0, len(batch), query_size):
+                self.cache_definitions(self.modulestore.get_definitions(course_key, batch[start:start + query_size]))
+        return self.definition_cache.get(definition_id)
+
     @lazy
     @contract(returns="dict(BlockKey: BlockKey)")
     def _parent_map(self):
@@ -201,6 +248,7 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
                 block_key.type,
                 definition_id,
                 convert_fields,
+                get_cached_definition=self.get_cached_definition,
             )
         else:
             definition_loader = None
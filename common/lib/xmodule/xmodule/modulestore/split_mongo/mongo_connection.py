@@ -7,14 +7,12 @@ import datetime
 import logging
 import math
 import re
-import zlib
 from contextlib import contextmanager
 from time import time
 
 import pymongo
 import pytz
 import six
-from six.moves import cPickle as pickle
 from contracts import check, new_contract
 from mongodb_proxy import autoretry_read
 # Import this just to export it
@@ -23,9 +21,11 @@ from pymongo.errors import DuplicateKeyError  # pylint: disable=unused-import
 from xmodule.exceptions import HeartbeatFailure
 from xmodule.modulestore import BlockData
 from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.modulestore.split_mongo.structure_codec import DEFAULT_CODEC, get_structure_codec
 from xmodule.mongo_utils import connect_to_mongodb, create_collection_index
 
 try:
+    from django.conf import settings
     from django.core.cache import caches, InvalidCacheBackendError
     DJANGO_AVAILABLE = True
 except ImportError:
@@ -207,64 +207,75 @@ def structure_to_mongo(structure, course_context=None):
 class CourseStructureCache(object):
     """
     Wrapper around django cache object to cache course structure objects.
-    The course structures are pickled and compressed when cached.
+    The course structures are encoded by a StructureCodec, configured by the
+    COURSE_STRUCTURE_CACHE_CODEC django setting, and compressed when cached.
 
     If the 'course_structure_cache' doesn't exist, then don't do anything for
     for set and get.
     """
-    def __init__(self):
+    def __init__(self, codec=None):
         self.cache = None
+        self.codec = None
         if DJANGO_AVAILABLE:
             try:
                 self.cache = get_cache('course_structure_cache')
             except InvalidCacheBackendError:
                 pass
+            else:
+                self.codec = get_structure_codec(codec or getattr(settings, 'COURSE_STRUCTURE_CACHE_CODEC', None))
+
+    def _cache_key(self, key):
+        """
+        Returns the cache key of the structure with the given key.  The
+        structures encoded by the default codec keep their historical keys.
+        """
+        if self.codec.name == DEFAULT_CODEC:
+            return key
+        return u'{}.{}'.format(self.codec.name, key)
 
     def get(self, key, course_context=None):
-        """Pull the compressed, pickled struct data from cache and deserialize."""
+        """Pull the compressed, encoded struct data from cache and deserialize."""
         if self.cache is None:
             return None
 
         with TIMER.timer("CourseStructureCache.get", course_context) as tagger:
+            tagger.tag(codec=self.codec.name)
             try:
-                compressed_pickled_data = self.cache.get(key)
-                tagger.tag(from_cache=str(compressed_pickled_data is not None).lower())
+                compressed_data = self.cache.get(self._cache_key(key))
+                tagger.tag(from_cache=str(compressed_data is not None).lower())
 
-                if compressed_pickled_data is None:
+                if compressed_data is None:
                     # Always log cache misses, because they are unexpected
                     tagger.sample_rate = 1
                     return None
 
-                tagger.measure('compressed_size', len(compressed_pickled_data))
+                tagger.measure('compressed_size', len(compressed_data))
 
-                pickled_data = zlib.decompress(compressed_pickled_data)
-                tagger.measure('uncompressed_size', len(pickled_data))
+                data = self.codec.decompress(compressed_data)
+                tagger.measure('uncompressed_size', len(data))
 
-                if six.PY2:
-                    return pickle.loads(pickled_data)
-                else:
-                    return pickle.loads(pickled_data, encoding='latin-1')
+                return self.codec.loads(data)
             except Exception:
                 # The cached data is corrupt in some way, get rid of it.
                 log.warning("CourseStructureCache: Bad data in cache for %s", course_context)
-                self.cache.delete(key)
+                self.cache.delete(self._cache_key(key))
                 return None
 
     def set(self, key, structure, course_context=None):
-        """Given a structure, will pickle, compress, and write to cache."""
+        """Given a structure, will encode, compress, and write to cache."""
         if self.cache is None:
             return None
 
         with TIMER.timer("CourseStructureCache.set", course_context) as tagger:
-            pickled_data = pickle.dumps(structure, 4)  # Protocol can't be incremented until cache is cleared
-            tagger.measure('uncompressed_size', len(pickled_data))
+            tagger.tag(codec=self.codec.name)
+            data = self.codec.dumps(structure)
+            tagger.measure('uncompressed_size', len(data))
 
-            # 1 = Fastest (slightly larger results)
-            compressed_pickled_data = zlib.compress(pickled_data, 1)
-            tagger.measure('compressed_size', len(compressed_pickled_data))
+            compressed_data = self.codec.compress(data)
+            tagger.measure('compressed_size', len(compressed_data))
 
             # Stuctures are immutable, so we set a timeout of "never"
-            self.cache.set(key, compressed_pickled_data, None)
+            self.cache.set(self._cache_key(key), compressed_data, None)
 
 
 class MongoConnection(object):
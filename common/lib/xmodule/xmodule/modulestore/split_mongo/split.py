@@ -59,7 +59,7 @@ import copy
 import datetime
 import hashlib
 import logging
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 from importlib import import_module
 
 import six
@@ -709,6 +709,12 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
     DEFAULT_ROOT_LIBRARY_BLOCK_TYPE = 'library'
     DEFAULT_ROOT_COURSE_BLOCK_TYPE = 'course'
 
+    # The maximum number of definitions cached by the runtime of a course
+    # version for lazily loaded blocks, and prefetched at once for them.
+    DEFINITION_CACHE_MAX_SIZE = 1000
+    # The maximum number of definitions fetched per query when prefetching.
+    DEFINITION_PREFETCH_BATCH_SIZE = 250
+
     def __init__(self, contentstore, doc_store_config, fs_root, render_template,
                  default_class=None,
                  error_tracker=null_error_tracker,
@@ -779,7 +785,8 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
             base_block_ids: list of BlockIds to fetch
             course_key: the destination course providing the context
             depth: how deep below these to prefetch
-            lazy: whether to load definitions now or later
+            lazy: whether to load definitions now or later; if later, they are
+                prefetched into the runtime's definition cache in bulk
         """
         with self.bulk_operations(course_key, emit_signals=False):
             new_module_data = {}
@@ -812,10 +819,38 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
                         # convert_fields gets done later in the runtime's xblock_from_json
                         block.fields.update(definition.get('fields'))
                         block.definition_loaded = True
+            else:
+                self._prefetch_definitions(system, new_module_data)
 
             system.module_data.update(new_module_data)
             return system.module_data
 
+    def _prefetch_definitions(self, system, module_data):
+        """
+        Marks the definitions of the given lazily loaded blocks to be
+        prefetched into the definition cache of the given runtime when the
+        first of them is accessed, in batches of up to
+        DEFINITION_CACHE_MAX_SIZE definitions, rather than loaded with a
+        query per block when each block is accessed.
+
+        Arguments:
+            system: a CachingDescriptorSystem
+            module_data: a dict mapping BlockKey -> BlockData of the blocks
+        """
+        definition_ids = [
+            definition_id
+            for definition_id in OrderedDict.fromkeys(
+                block.definition
+                for block in six.itervalues(module_data)
+                if block.definition is not None and not block.definition_loaded
+            )
+            if definition_id not in system.definition_cache
+        ]
+
+        # A single block's definition is no cheaper to prefetch.
+        if len(definition_ids) > 1:
+            system.add_pending_definitions(definition_ids)
+
     @contract(course_entry=CourseEnvelope, block_keys="list(BlockKey)", depth="int | None")
     def _load_items(self, course_entry, block_keys, depth=0, **kwargs):
         """
@@ -0,0 +1,178 @@
+"""
+Codecs used by the CourseStructureCache to encode course structures.
+
+A codec encodes a structure in the shape returned by structure_from_mongo,
+that is with its blocks in a {BlockKey: BlockData} map, and decodes it back
+into that same shape, so that a cache hit needs no further conversion.
+"""
+
+
+import datetime
+import logging
+import zlib
+
+import pytz
+import six
+from bson.objectid import ObjectId
+from six.moves import cPickle as pickle
+
+from xmodule.modulestore import BlockData
+from xmodule.modulestore.split_mongo import BlockKey
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+log = logging.getLogger(__name__)
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=pytz.utc)
+
+
+class StructureCodec(object):
+    """
+    Base class of the course structure codecs.
+
+    The encoded structures are compressed with zlib at its fastest level,
+    which yields slightly larger results.
+    """
+    # The name by which the codec is configured.  Unless the codec is the
+    # default one, the name also namespaces the cache keys of the structures
+    # it encodes, so that codecs can be switched without reading data encoded
+    # by another codec.
+    name = None
+
+    def dumps(self, structure):
+        """
+        Returns the serialized, uncompressed bytes of the given structure.
+        """
+        raise NotImplementedError
+
+    def loads(self, data):
+        """
+        Returns the structure deserialized from the given uncompressed bytes.
+        """
+        raise NotImplementedError
+
+    def compress(self, data):
+        """
+        Returns the given serialized bytes, compressed.
+        """
+        return zlib.compress(data, 1)
+
+    def decompress(self, data):
+        """
+        Returns the given compressed bytes, decompressed.
+        """
+        return zlib.decompress(data)
+
+
+class PickleStructureCodec(StructureCodec):
+    """
+    Encodes course structures with pickle.
+    """
+    name = 'pickle'
+
+    def dumps(self, structure):
+        return pickle.dumps(structure, 4)  # Protocol can't be incremented until cache is cleared
+
+    def loads(self, data):
+        if six.PY2:
+            return pickle.loads(data)
+        else:
+            return pickle.loads(data, encoding='latin-1')
+
+
+class MsgpackStructureCodec(StructureCodec):
+    """
+    Encodes course structures with msgpack.
+
+    The BSON and modulestore types found in structures are encoded as msgpack
+    extension types, so that they are decoded straight into the objects that
+    structure_from_mongo returns.
+    """
+    name = 'msgpack'
+
+    OBJECT_ID = 1
+    DATETIME = 2
+    NAIVE_DATETIME = 3
+    BLOCK_KEY = 4
+    BLOCK_DATA = 5
+
+    def dumps(self, structure):
+        # Without strict_types, msgpack would encode BlockKeys as plain arrays.
+        return msgpack.packb(structure, default=self._default, use_bin_type=True, strict_types=True)
+
+    def loads(self, data):
+        return msgpack.unpackb(data, ext_hook=self._ext_hook, raw=False, strict_map_key=False)
+
+    def _default(self, obj):
+        """
+        Returns the msgpack extension type encoding the given object.
+        """
+        if isinstance(obj, ObjectId):
+            return msgpack.ExtType(self.OBJECT_ID, obj.binary)
+        if isinstance(obj, BlockKey):
+            return msgpack.ExtType(self.BLOCK_KEY, self.dumps(list(obj)))
+        if isinstance(obj, BlockData):
+            return msgpack.ExtType(self.BLOCK_DATA, self.dumps(obj.to_storable()))
+        if isinstance(obj, datetime.datetime):
+            if obj.tzinfo is None:
+                microseconds = _total_microseconds(obj - EPOCH.replace(tzinfo=None))
+                return msgpack.ExtType(self.NAIVE_DATETIME, self.dumps(microseconds))
+            return msgpack.ExtType(self.DATETIME, self.dumps(_total_microseconds(obj - EPOCH)))
+        # Subclasses of the native types, such as bson's Int64.
+        for native_type in six.integer_types + (float, six.text_type, six.binary_type, dict):
+            if isinstance(obj, native_type):
+                return native_type(obj)
+        if isinstance(obj, (list, tuple)):
+            return list(obj)
+        raise TypeError(u'Cannot encode {!r} in a course structure'.format(obj))
+
+    def _ext_hook(self, code, data):
+        """
+        Returns the object encoded by the given msgpack extension type.
+        """
+        if code == self.OBJECT_ID:
+            return ObjectId(data)
+        if code == self.BLOCK_KEY:
+            return BlockKey(*self.loads(data))
+        if code == self.BLOCK_DATA:
+            return BlockData(**self.loads(data))
+        if code == self.DATETIME:
+            return EPOCH + datetime.timedelta(microseconds=self.loads(data))
+        if code == self.NAIVE_DATETIME:
+            return EPOCH.replace(tzinfo=None) + datetime.timedelta(microseconds=self.loads(data))
+        return msgpack.ExtType(code, data)
+
+
+def _total_microseconds(delta):
+    """
+    Returns the given timedelta in whole microseconds.
+    """
+    return (delta.days * 86400 + delta.seconds) * 10 ** 6 + delta.microseconds
+
+
+DEFAULT_CODEC = PickleStructureCodec.name
+
+STRUCTURE_CODECS = {
+    codec.name: codec
+    for codec in (PickleStructureCodec, MsgpackStructureCodec)
+}
+
+
+def get_structure_codec(name=None):
+    """
+    Returns an instance of the structure codec with the given name, or of the
+    default codec if no name is given or the codec's library isn't installed.
+
+    Raises:
+        ValueError: if there is no codec with the given name.
+    """
+    name = name or DEFAULT_CODEC
+    if name not in STRUCTURE_CODECS:
+        raise ValueError(u'Unknown course structure codec: {}'.format(name))
+    if name == MsgpackStructureCodec.name and msgpack is None:
+        log.warning(u"The %s course structure codec requires msgpack; using %s instead.", name, DEFAULT_CODEC)
+        name = DEFAULT_CODEC
+    return STRUCTURE_CODECS[name]()
@@ -0,0 +1,98 @@
+""" Test the course structure codecs of split_mongo/structure_codec """
+
+
+import datetime
+import unittest
+
+import ddt
+import pytz
+from bson.objectid import ObjectId
+
+from xmodule.modulestore import BlockData
+from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.modulestore.split_mongo.mongo_connection import structure_from_mongo
+from xmodule.modulestore.split_mongo.structure_codec import (
+    DEFAULT_CODEC,
+    MsgpackStructureCodec,
+    PickleStructureCodec,
+    get_structure_codec,
+    msgpack
+)
+
+
+def make_structure():
+    """
+    Returns a structure as converted by structure_from_mongo.
+    """
+    version = ObjectId()
+    edited_on = datetime.datetime(2020, 5, 17, 12, 30, 15, 123456, tzinfo=pytz.utc)
+    edit_info = {
+        'previous_version': ObjectId(),
+        'update_version': version,
+        'source_version': None,
+        'edited_on': edited_on,
+        'edited_by': 42,
+        'original_usage': None,
+        'original_usage_version': None,
+    }
+    return structure_from_mongo({
+        '_id': version,
+        'root': ['course', 'course'],
+        'previous_version': ObjectId(),
+        'original_version': ObjectId(),
+        'edited_on': edited_on,
+        'edited_by': 42,
+        'schema_version': 1,
+        'blocks': [
+            {
+                'block_type': 'course',
+                'block_id': 'course',
+                'definition': ObjectId(),
+                'fields': {'children': [['chapter', 'chapter1']], 'display_name': u'Cours é'},
+                'defaults': {},
+                'asides': {},
+                'edit_info': edit_info,
+            },
+            {
+                'block_type': 'chapter',
+                'block_id': 'chapter1',
+                'definition': ObjectId(),
+                'fields': {'start': '2020-01-01T00:00:00Z', 'weight': 0.5, 'graded': True, 'xml_attributes': {}},
+                'defaults': {'display_name': 'Chapter'},
+                'asides': {},
+                'edit_info': dict(edit_info, edited_on=datetime.datetime(2020, 5, 17)),
+            },
+        ],
+    })
+
+
+@ddt.ddt
+class TestStructureCodec(unittest.TestCase):
+    """
+    Tests that the structure codecs round-trip structures.
+    """
+    @ddt.data(PickleStructureCodec, MsgpackStructureCodec)
+    def test_round_trip(self, codec_class):
+        if codec_class is MsgpackStructureCodec and msgpack is None:
+            self.skipTest('msgpack is not installed')
+
+        codec = codec_class()
+        structure = make_structure()
+        decoded_structure = codec.loads(codec.decompress(codec.compress(codec.dumps(structure))))
+
+        self.assertEqual(decoded_structure, structure)
+        self.assertIsInstance(decoded_structure['root'], BlockKey)
+        for block_key, block in decoded_structure['blocks'].items():
+            self.assertIsInstance(block_key, BlockKey)
+            self.assertIsInstance(block, BlockData)
+            self.assertFalse(block.definition_loaded)
+        self.assertEqual(
+            decoded_structure['blocks'][BlockKey('course', 'course')].fields['children'],
+            [BlockKey('chapter', 'chapter1')],
+        )
+
+    def test_get_structure_codec(self):
+        self.assertEqual(get_structure_codec().name, DEFAULT_CODEC)
+        self.assertIsInstance(get_structure_codec('pickle'), PickleStructureCodec)
+        with self.assertRaises(ValueError):
+            get_structure_codec('unknown')
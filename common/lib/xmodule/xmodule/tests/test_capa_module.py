@@ -3339,3 +3339,71 @@ class ProblemBlockReportGenerationTest(unittest.TestCase):
         iterator = iter([self._user_state(suffix='_dynamath')])
         report_data = list(descriptor.generate_report_data(iterator))
         self.assertEqual(0, len(report_data))
+
+
+class ProblemBatchRescorerTest(unittest.TestCase):
+    """
+    Tests the rescoring of the answers of learners without binding the problem to them.
+    """
+
+    def _state(self, answer, **kwargs):
+        """
+        Returns the problem state of a learner who answered the last created problem.
+        """
+        state = {
+            'seed': 1,
+            'done': True,
+            'attempts': 1,
+            'student_answers': {CapaFactory.answer_key(): answer},
+            'correct_map': {CapaFactory.answer_key(): {'correctness': 'incorrect', 'npoints': None}},
+        }
+        state.update(kwargs)
+        return state
+
+    def test_rescore(self):
+        rescorer = CapaFactory.create().batch_rescorer()
+        track_function = Mock()
+
+        new_state, new_score = rescorer.rescore(self._state('3.14'), track_function)
+        self.assertEqual(new_score, Score(raw_earned=1, raw_possible=1))
+        self.assertEqual(new_state['correct_map'][CapaFactory.answer_key()]['correctness'], 'correct')
+        self.assertEqual(new_state['score'], Score(raw_earned=0, raw_possible=1))
+        self.assertEqual(new_state['student_answers'], {CapaFactory.answer_key(): '3.14'})
+        track_function.assert_called_once()
+        event_type, event_info = track_function.call_args[0]
+        self.assertEqual(event_type, 'problem_rescore')
+        self.assertEqual((event_info['orig_score'], event_info['new_score']), (0, 1))
+        self.assertEqual(event_info['success'], 'correct')
+
+        # The problem parsed for the first learner grades the answers of the next ones.
+        new_state, new_score = rescorer.rescore(self._state('3'), track_function)
+        self.assertEqual(new_score, Score(raw_earned=0, raw_possible=1))
+        self.assertEqual(new_state['correct_map'][CapaFactory.answer_key()]['correctness'], 'incorrect')
+
+    def test_rescore_without_seed(self):
+        rescorer = CapaFactory.create().batch_rescorer()
+        self.assertIsNone(rescorer.rescore(self._state('3.14', seed=None), Mock()))
+
+    def test_rescore_input_error(self):
+        rescorer = CapaFactory.create().batch_rescorer()
+        track_function = Mock()
+        with self.assertRaises(StudentInputError):
+            rescorer.rescore(self._state('3.14+'), track_function)
+        self.assertEqual(track_function.call_args[0][0], 'problem_rescore_fail')
+
+    def test_no_batch_rescorer(self):
+        custom_xml = textwrap.dedent("""
+            <problem>
+            <customresponse cfn="check_func">
+                <textline/>
+                <answer type="loncapa/python">
+            def check_func(expect, answer_given):
+                return {'ok': answer_given == expect, 'msg': ''}
+                </answer>
+            </customresponse>
+            </problem>
+        """)
+        self.assertIsNone(CapaFactory.create(xml=custom_xml).batch_rescorer())
+
+        anonymous_xml = CapaFactory.sample_problem_xml.replace('pi', 'pi, $anonymous_student_id')
+        self.assertIsNone(CapaFactory.create(xml=anonymous_xml).batch_rescorer())
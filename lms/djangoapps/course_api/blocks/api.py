@@ -7,6 +7,7 @@ import lms.djangoapps.course_blocks.api as course_blocks_api
 from lms.djangoapps.course_blocks.transformers.access_denied_filter import AccessDeniedMessageFilterTransformer
 from lms.djangoapps.course_blocks.transformers.hidden_content import HiddenContentTransformer
 from lms.djangoapps.course_blocks.transformers.hide_empty import HideEmptyTransformer
+from openedx.core.djangoapps.content.block_structure.profiling import TransformerTimings
 from openedx.core.djangoapps.content.block_structure.transformers import BlockStructureTransformers
 from openedx.core.lib.mobile_utils import is_request_from_mobile_app
 
@@ -30,6 +31,7 @@ def get_blocks(
         block_types_filter=None,
         hide_access_denials=False,
         allow_start_dates_in_future=False,
+        debug_timings=False,
 ):
     """
     Return a serialized representation of the course blocks.
@@ -62,6 +64,9 @@ def get_blocks(
         allow_start_dates_in_future (bool): When True, will allow blocks to be
             returned that can bypass the StartDateTransformer's filter to show
             blocks with start dates in the future.
+        debug_timings (bool): When True, the cost of each transformer is
+            returned in a debug_timings section of the result.  Supported
+            only when return_type is 'dict'.
     """
 
     if HIDE_ACCESS_DENIALS_FLAG.is_enabled():
@@ -105,6 +110,9 @@ def get_blocks(
     if include_completion:
         transformers += [BlockCompletionTransformer()]
 
+    if debug_timings and transformers.timings is None:
+        transformers.timings = TransformerTimings()
+
     # transform
     blocks = course_blocks_api.get_course_blocks(
         user,
@@ -137,4 +145,6 @@ def get_blocks(
         serializer = BlockSerializer(blocks, context=serializer_context, many=True)
 
     # return serialized data
+    if debug_timings and return_type == 'dict':
+        return dict(serializer.data, debug_timings=transformers.timings.report())
     return serializer.data
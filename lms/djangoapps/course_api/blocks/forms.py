@@ -23,6 +23,7 @@ class BlockListGetForm(Form):
     """
     all_blocks = ExtendedNullBooleanField(required=False)
     block_counts = MultiValueField(required=False)
+    debug_timings = ExtendedNullBooleanField(required=False)
     depth = CharField(required=False)
     nav_depth = IntegerField(required=False, min_value=0)
     requested_fields = MultiValueField(required=False)
@@ -103,6 +104,8 @@ class BlockListGetForm(Form):
             return
 
         cleaned_data['user'] = self._clean_requested_user(cleaned_data, usage_key.course_key)
+        if cleaned_data.get('debug_timings'):
+            self._verify_debug_timings(self.initial['requesting_user'], usage_key.course_key)
         return cleaned_data
 
     def clean_username(self):
@@ -171,6 +174,19 @@ class BlockListGetForm(Form):
 
         return AnonymousUser()
 
+    @staticmethod
+    def _verify_debug_timings(requesting_user, course_key):
+        """
+        Verifies the requesting user can request the debug timings.
+        """
+        if not permissions.can_access_debug_timings(requesting_user, course_key):
+            raise PermissionDenied(
+                "'{requesting_username}' does not have permission to access debug timings in '{course_key}'.".format(
+                    requesting_username=requesting_user.username,
+                    course_key=str(course_key),
+                )
+            )
+
     @staticmethod
     def _verify_all_blocks(requesting_user, course_key):  # pylint: disable=useless-return
         """
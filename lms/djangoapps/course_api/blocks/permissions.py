@@ -31,6 +31,14 @@ def can_access_others_blocks(requesting_user, course_key):
     return has_access(requesting_user, CourseStaffRole.ROLE, course_key)
 
 
+def can_access_debug_timings(requesting_user, course_key):
+    """
+    Returns whether the requesting_user can access the debug timings
+    of the transformers for the course.
+    """
+    return has_access(requesting_user, CourseStaffRole.ROLE, course_key)
+
+
 def can_access_self_blocks(requesting_user: User, course_key: CourseKey) -> AccessResponse:
     """
     Returns whether the requesting_user can access own blocks.
@@ -55,6 +55,7 @@ class TestBlockListGetForm(FormTestMixin, SharedModuleStoreTestCase):
         self.cleaned_data = {
             'all_blocks': None,
             'block_counts': set(),
+            'debug_timings': None,
             'depth': 0,
             'nav_depth': None,
             'return_type': 'dict',
@@ -165,6 +166,18 @@ class TestBlockListGetForm(FormTestMixin, SharedModuleStoreTestCase):
         self.initial = {'requesting_user': self.staff}
         self.get_form(expected_valid=True)
 
+    #-- debug timings
+
+    def test_debug_timings_by_student(self):
+        self.form_data['debug_timings'] = True
+        self.assert_raises_permission_denied()
+
+    def test_debug_timings_by_staff(self):
+        self.initial = {'requesting_user': self.staff}
+        self.form_data['debug_timings'] = True
+        form = self.get_form(expected_valid=True)
+        assert form.cleaned_data['debug_timings'] is True
+
     #-- depth
 
     def test_depth_integer(self):
@@ -276,6 +276,20 @@ class TestBlocksView(SharedModuleStoreTestCase):
             self.assertEqual(block_data['type'], block_key.block_type)
             self.assertEqual(block_data['display_name'], self.store.get_item(block_key).display_name or '')
 
+    def test_debug_timings_param_non_staff(self):
+        self.verify_response(403, params={'debug_timings': True})
+
+    def test_debug_timings_param(self):
+        self.client.login(username=self.admin_user.username, password='test')
+        response = self.verify_response(params={'debug_timings': True})
+        self.verify_response_block_dict(response)
+        transformer_names = [timing['transformer'] for timing in response.data['debug_timings']]
+        self.assertIn('visibility', transformer_names)
+        self.assertIn('blocks_api', transformer_names)
+        for timing in response.data['debug_timings']:
+            self.assertEqual(timing['phase'], 'transform')
+            self.assertGreaterEqual(timing['time_ms'], 0)
+
     def test_return_type_param(self):
         response = self.verify_response(params={'return_type': 'list'})
         self.verify_response_block_list(response)
@@ -14,6 +14,7 @@ class BlockCompletionTransformer(BlockStructureTransformer):
     Keep track of the completion of each block within the block structure.
     """
     READ_VERSION = 1
+    COLLECT_SCOPE = BlockStructureTransformer.COLLECT_SCOPE_BLOCK
     WRITE_VERSION = 1
     COMPLETION = 'completion'
     COMPLETE = 'complete'
@@ -31,6 +31,7 @@ class MilestonesAndSpecialExamsTransformer(BlockStructureTransformer):
     """
     WRITE_VERSION = 1
     READ_VERSION = 1
+    COLLECT_SCOPE = BlockStructureTransformer.COLLECT_SCOPE_BLOCK
 
     @classmethod
     def name(cls):
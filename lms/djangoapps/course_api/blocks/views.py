@@ -115,6 +115,13 @@ class BlocksView(DeveloperErrorViewMixin, ListAPIView):
 
           Example: block_types_filter=vertical,html
 
+        * debug_timings: (boolean) Provide a value of "true" to return the
+          cost of each transformer applied to the blocks in a debug_timings
+          section of the response. Available only to users with course staff
+          permissions, and only when return_type is dict.
+
+          Example: debug_timings=true
+
     **Response Values**
 
         The following fields are returned with a successful response.
@@ -196,6 +203,12 @@ class BlocksView(DeveloperErrorViewMixin, ListAPIView):
           * Additional XBlock fields can be included in the response if they are
             configured via the COURSE_BLOCKS_API_EXTRA_FIELDS Django setting and
             requested via the "requested_fields" parameter.
+
+        * debug_timings: (list) Returned only if the "debug_timings" parameter
+          is true. For each transformer, in the order in which it was applied,
+          the phase ("transform"), the transformer's name, its wall time in
+          milliseconds (time_ms), and the number of blocks it visited
+          (blocks_visited) and removed (blocks_removed).
     """
 
     def list(self, request, usage_key_string, hide_access_denials=False):  # pylint: disable=arguments-differ
@@ -229,6 +242,7 @@ class BlocksView(DeveloperErrorViewMixin, ListAPIView):
                     params.cleaned_data['return_type'],
                     params.cleaned_data.get('block_types_filter', None),
                     hide_access_denials=hide_access_denials,
+                    debug_timings=params.cleaned_data.get('debug_timings', False),
                 )
             )
             # If the username is an empty string, and not None, then we are requesting
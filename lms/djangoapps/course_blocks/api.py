@@ -4,6 +4,8 @@ get_course_blocks function.
 """
 
 
+from collections import deque
+
 from django.conf import settings
 from edx_when import field_data
 
@@ -109,3 +111,61 @@ def get_course_blocks(
         starting_block_usage_key,
         collected_block_structure,
     )
+
+
+def get_course_blocks_for_users(
+        users,
+        starting_block_usage_key,
+        collected_block_structure=None,
+        allow_start_dates_in_future=False,
+        include_completion=False,
+        include_has_scheduled_content=False,
+):
+    """
+    Generator of the transformed block structures for each of the given
+    users, starting at starting_block_usage_key, using the default
+    transformers.
+
+    Equivalent to calling get_course_blocks for each user, except that
+    the collected block structure is retrieved once and the output of
+    transformers that do not depend on the individual user is computed
+    once per group of users for whom it is the same.  See
+    BlockStructureManager.get_transformed_for_usages.
+
+    Arguments:
+        users (iterable(django.contrib.auth.models.User)) - User
+            objects for which the block structure is to be transformed.
+
+        See get_course_blocks for the remaining arguments.
+
+    Yields:
+        tuple(User, BlockStructureBlockData) - Each user with their
+            transformed block structure, in the order of the users.
+    """
+    # Users whose transformers have been handed to the manager, in order.
+    pending_users = deque()
+
+    def _transformers_for_users():
+        """
+        Yields the transformers for each user, with their usage_info.
+        """
+        for user in users:
+            transformers = BlockStructureTransformers(get_course_block_access_transformers(user))
+            if include_completion:
+                transformers += [BlockCompletionTransformer()]
+            transformers.usage_info = CourseUsageInfo(
+                starting_block_usage_key.course_key,
+                user,
+                allow_start_dates_in_future,
+                include_has_scheduled_content
+            )
+            pending_users.append(user)
+            yield transformers
+
+    block_structures = get_block_structure_manager(starting_block_usage_key.course_key).get_transformed_for_usages(
+        _transformers_for_users(),
+        starting_block_usage_key,
+        collected_block_structure,
+    )
+    for block_structure in block_structures:
+        yield pending_users.popleft(), block_structure
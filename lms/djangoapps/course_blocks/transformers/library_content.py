@@ -23,6 +23,52 @@ from ..utils import get_student_module_as_dict
 logger = logging.getLogger(__name__)
 
 
+def _collect_library_content_keys(transformer, block_structure):
+    """
+    Collects the keys of the library_content blocks in the given block
+    structure, so the transform signatures of the library content
+    transformers need not traverse the whole structure.
+    """
+    block_structure.set_transformer_data(
+        transformer,
+        'library_content_keys',
+        [block_key for block_key in block_structure if block_key.block_type == 'library_content'],
+    )
+
+
+def _library_content_signature(transformer, usage_info, block_structure):
+    """
+    Returns the transform signature of the library content transformers:
+    the selections stored for the user in each library_content block, or
+    None if any of them is still to be made or updated, in which case
+    the transforms save state and publish events for the user.
+    """
+    signature = []
+    for block_key in block_structure.get_transformer_data(transformer, 'library_content_keys', []):
+        if block_key not in block_structure:
+            continue
+        library_children = block_structure.get_children(block_key)
+        if not library_children:
+            continue
+
+        state_dict = get_student_module_as_dict(usage_info.user, usage_info.course_key, block_key)
+        stored_selected = [tuple(selected_block) for selected_block in state_dict.get('selected', [])]
+        selected = [
+            selected_block for selected_block in stored_selected
+            if usage_info.course_key.make_usage_key(*selected_block) in library_children
+        ]
+        block_keys = LibraryContentBlock.make_selection(
+            selected,
+            library_children,
+            block_structure.get_xblock_field(block_key, 'max_count'),
+            block_structure.get_xblock_field(block_key, 'mode'),
+        )
+        if any(block_keys[changed] for changed in ('invalid', 'overlimit', 'added')):
+            return None
+        signature.append((block_key, tuple(stored_selected)))
+    return tuple(signature)
+
+
 class ContentLibraryTransformer(FilteringTransformerMixin, BlockStructureTransformer):
     """
     A transformer that manipulates the block structure by removing all
@@ -31,8 +77,9 @@ class ContentLibraryTransformer(FilteringTransformerMixin, BlockStructureTransfo
 
     Staff users are not to be exempted from library content pathways.
     """
-    WRITE_VERSION = 1
-    READ_VERSION = 1
+    WRITE_VERSION = 2
+    READ_VERSION = 2
+    COLLECT_SCOPE = BlockStructureTransformer.COLLECT_SCOPE_DESCENDANTS
 
     @classmethod
     def name(cls):
@@ -51,6 +98,7 @@ class ContentLibraryTransformer(FilteringTransformerMixin, BlockStructureTransfo
         block_structure.request_xblock_fields('mode')
         block_structure.request_xblock_fields('max_count')
         block_structure.request_xblock_fields('category')
+        _collect_library_content_keys(cls, block_structure)
         store = modulestore()
 
         # needed for analytics purposes
@@ -74,6 +122,10 @@ class ContentLibraryTransformer(FilteringTransformerMixin, BlockStructureTransfo
                 summary = summarize_block(child_key)
                 block_structure.set_transformer_block_field(child_key, cls, 'block_analytics_summary', summary)
 
+    def transform_signature(self, usage_info, block_structure):
+        # Selections of library content are made per user.
+        return _library_content_signature(self, usage_info, block_structure)
+
     def transform_block_filters(self, usage_info, block_structure):
         all_library_children = set()
         all_selected_children = set()
@@ -192,8 +244,9 @@ class ContentLibraryOrderTransformer(BlockStructureTransformer):
 
     Staff users are *not* exempted from library content pathways.
     """
-    WRITE_VERSION = 1
-    READ_VERSION = 1
+    WRITE_VERSION = 2
+    READ_VERSION = 2
+    COLLECT_SCOPE = BlockStructureTransformer.COLLECT_SCOPE_BLOCK
 
     @classmethod
     def name(cls):
@@ -209,8 +262,10 @@ class ContentLibraryOrderTransformer(BlockStructureTransformer):
         Collects any information that's necessary to execute this
         transformer's transform method.
         """
-        # There is nothing to collect
-        pass  # pylint:disable=unnecessary-pass
+        _collect_library_content_keys(cls, block_structure)
+
+    def transform_signature(self, usage_info, block_structure):
+        return _library_content_signature(self, usage_info, block_structure)
 
     def transform(self, usage_info, block_structure):
         """
@@ -242,4 +297,6 @@ class ContentLibraryOrderTransformer(BlockStructureTransformer):
                     )
                 else:
                     ordering_data = {block[1]: position for position, block in enumerate(state_dict['selected'])}
-                    library_children.sort(key=lambda block, data=ordering_data: data[block.block_id])
+                    block_structure.sort_children(
+                        block_key, key=lambda block, data=ordering_data: data[block.block_id]
+                    )
@@ -5,7 +5,9 @@ Start Date Transformer implementation.
 from datetime import datetime
 from pytz import UTC
 
+from common.djangoapps.student.roles import CourseBetaTesterRole
 from lms.djangoapps.courseware.access_utils import check_start_date
+from lms.djangoapps.courseware.masquerade import get_course_masquerade
 from openedx.core.djangoapps.content.block_structure.transformer import (
     BlockStructureTransformer,
     FilteringTransformerMixin
@@ -33,6 +35,7 @@ class StartDateTransformer(FilteringTransformerMixin, BlockStructureTransformer)
     """
     WRITE_VERSION = 1
     READ_VERSION = 1
+    COLLECT_SCOPE = BlockStructureTransformer.COLLECT_SCOPE_ANCESTORS
     MERGED_START_DATE = 'merged_start_date'
 
     @classmethod
@@ -88,6 +91,18 @@ class StartDateTransformer(FilteringTransformerMixin, BlockStructureTransformer)
             func_merge_ancestors=max,
         )
 
+    def transform_signature(self, usage_info, block_structure):
+        # Masquerading changes the start date check in ways that are
+        # not captured by the user's roles.
+        if get_course_masquerade(usage_info.user, usage_info.course_key):
+            return None
+        return (
+            usage_info.has_staff_access,
+            usage_info.allow_start_dates_in_future,
+            usage_info.include_has_scheduled_content,
+            CourseBetaTesterRole(usage_info.course_key).has_user(usage_info.user),
+        )
+
     def transform_block_filters(self, usage_info, block_structure):
         # Users with staff access bypass the Start Date check.
         if usage_info.has_staff_access or usage_info.allow_start_dates_in_future:
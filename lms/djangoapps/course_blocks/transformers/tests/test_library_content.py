@@ -6,11 +6,12 @@ Tests for ContentLibraryTransformer.
 from six.moves import range
 import mock
 
-from openedx.core.djangoapps.content.block_structure.api import clear_course_from_cache
+from openedx.core.djangoapps.content.block_structure.api import clear_course_from_cache, get_block_structure_manager
 from openedx.core.djangoapps.content.block_structure.transformers import BlockStructureTransformers
 from common.djangoapps.student.tests.factories import CourseEnrollmentFactory
 
 from ...api import get_course_blocks
+from ...usage_info import CourseUsageInfo
 from ..library_content import ContentLibraryTransformer, ContentLibraryOrderTransformer
 from .helpers import CourseStructureTestCase
 
@@ -348,3 +349,26 @@ class ContentLibraryOrderTransformerTestCase(CourseStructureTestCase):
                 expected_children_without_hiding_or_gating,
                 [child.block_id for child in children],
             )
+
+    @mock.patch('lms.djangoapps.course_blocks.transformers.library_content.get_student_module_as_dict')
+    def test_transform_signature(self, mocked):
+        """
+        Test that the transform signature is the user's stored selection,
+        and None while the selection is still to be made.
+        """
+        block_structure = get_block_structure_manager(self.course.id).get_collected()
+        usage_info = CourseUsageInfo(self.course.id, self.user)
+        transformer = ContentLibraryOrderTransformer()
+
+        mocked.return_value = {
+            'selected': [
+                ['vertical', 'vertical_vertical3'],
+            ]
+        }
+        self.assertEqual(
+            transformer.transform_signature(usage_info, block_structure),
+            ((self.blocks['library_content1'].location, (('vertical', 'vertical_vertical3'),)),),
+        )
+
+        mocked.return_value = {}
+        self.assertIsNone(transformer.transform_signature(usage_info, block_structure))
@@ -31,6 +31,7 @@ class UserPartitionTransformer(BlockStructureTransformer):
     """
     WRITE_VERSION = 1
     READ_VERSION = 1
+    COLLECT_SCOPE = BlockStructureTransformer.COLLECT_SCOPE_ANCESTORS
 
     @classmethod
     def name(cls):
@@ -78,6 +79,19 @@ class UserPartitionTransformer(BlockStructureTransformer):
             merged_group_access = _MergedGroupAccess(user_partitions, xblock, merged_parent_access_list)
             block_structure.set_transformer_block_field(block_key, cls, 'merged_group_access', merged_group_access)
 
+    def transform_signature(self, usage_info, block_structure):
+        if has_access(usage_info.user, 'staff', usage_info.course_key):
+            return 'staff'
+
+        user_partitions = block_structure.get_transformer_data(self, 'user_partitions')
+        if not user_partitions:
+            return ()
+
+        user_groups = get_user_partition_groups(usage_info.course_key, user_partitions, usage_info.user, 'id')
+        return tuple(sorted(
+            (partition_id, group.id) for partition_id, group in six.iteritems(user_groups)
+        ))
+
     def transform(self, usage_info, block_structure):
         user = usage_info.user
         SplitTestTransformer().transform(usage_info, block_structure)
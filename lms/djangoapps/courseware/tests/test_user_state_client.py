@@ -4,13 +4,16 @@ defined in edx_user_state_client.
 """
 
 
+import json
 from collections import defaultdict
 
 from django.db import connections
-
+from django.test import TestCase
 from edx_user_state_client.tests import UserStateClientTestBase
+from mock import patch
+from opaque_keys.edx.locator import CourseLocator
 
-from lms.djangoapps.courseware.tests.factories import UserFactory
+from lms.djangoapps.courseware.tests.factories import StudentModuleFactory, UserFactory
 from lms.djangoapps.courseware.user_state_client import DjangoXBlockUserStateClient
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 
@@ -36,3 +39,74 @@ class TestDjangoUserStateClient(UserStateClientTestBase, ModuleStoreTestCase):
         super(TestDjangoUserStateClient, self).setUp()
         self.client = DjangoXBlockUserStateClient()
         self.users = defaultdict(UserFactory.create)
+
+
+class TestDjangoUserStateClientForUsers(TestCase):
+    """
+    Tests of the retrieval of the state of many users at once.
+    """
+    def setUp(self):
+        super(TestDjangoUserStateClientForUsers, self).setUp()
+        self.client = DjangoXBlockUserStateClient()
+        self.course_keys = [CourseLocator('org', 'course', 'run_{}'.format(index)) for index in range(2)]
+        self.users = [UserFactory.create() for _ in range(3)]
+        self.blocks = [
+            course_key.make_usage_key('problem', 'problem_{}'.format(index))
+            for course_key in self.course_keys
+            for index in range(2)
+        ]
+        for user_index, user in enumerate(self.users):
+            for block_index, block in enumerate(self.blocks):
+                StudentModuleFactory.create(
+                    student=user,
+                    course_id=block.course_key,
+                    module_state_key=block,
+                    state=json.dumps({'user': user_index, 'block': block_index, 'other': True}),
+                )
+        # Deleted and never stored state is not retrieved.
+        StudentModuleFactory.create(
+            student=self.users[0], course_id=self.course_keys[0],
+            module_state_key=self.course_keys[0].make_usage_key('problem', 'deleted'), state='{}',
+        )
+        StudentModuleFactory.create(
+            student=self.users[0], course_id=self.course_keys[0],
+            module_state_key=self.course_keys[0].make_usage_key('problem', 'unseen'), state=None,
+        )
+
+    def _get_states(self, usernames, block_keys, fields=None):
+        """
+        Returns a map of the (username, usage key) to the state of the
+        states retrieved for the given users and blocks.
+        """
+        return {
+            (state.username, state.block_key): state.state
+            for state in self.client.get_many_for_users(usernames, block_keys, fields=fields)
+        }
+
+    def test_get_many_for_users(self):
+        usernames = [user.username for user in self.users[1:]] + ['not_a_user']
+        block_keys = self.blocks[1:] + [
+            self.course_keys[0].make_usage_key('problem', name) for name in ['deleted', 'unseen']
+        ]
+        with self.assertNumQueries(3):
+            states = self._get_states(usernames, block_keys)
+        self.assertEqual(states, {
+            (self.users[user_index].username, self.blocks[block_index]): {
+                'user': user_index, 'block': block_index, 'other': True,
+            }
+            for user_index in range(1, 3)
+            for block_index in range(1, 4)
+        })
+        self.assertEqual(
+            self._get_states(usernames, block_keys, fields=['user']),
+            {key: {'user': state['user']} for key, state in states.items()},
+        )
+
+    @patch.object(DjangoXBlockUserStateClient, 'BLOCKS_CHUNK_SIZE', 1)
+    @patch.object(DjangoXBlockUserStateClient, 'USERS_CHUNK_SIZE', 2)
+    def test_chunked_queries(self):
+        usernames = [user.username for user in self.users]
+        # 2 queries for the users, and 2 chunks of users x 2 blocks per course.
+        with self.assertNumQueries(10):
+            states = self._get_states(usernames, self.blocks)
+        self.assertEqual(len(states), len(self.users) * len(self.blocks))
@@ -19,7 +19,7 @@ from edx_django_utils import monitoring as monitoring_utils
 from edx_user_state_client.interface import XBlockUserState, XBlockUserStateClient
 from xblock.fields import Scope
 
-from lms.djangoapps.courseware.models import BaseStudentModuleHistory, StudentModule
+from lms.djangoapps.courseware.models import BaseStudentModuleHistory, StudentModule, chunks
 
 try:
     import simplejson as json
@@ -53,6 +53,12 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
     # Use this sample rate for DataDog events.
     API_DATADOG_SAMPLE_RATE = 0.1
 
+    # Number of users, and of blocks, in the IN clauses of the queries of
+    # get_many_for_users, within the limit of sqlite3 on the number of
+    # parameters of a query.
+    USERS_CHUNK_SIZE = 400
+    BLOCKS_CHUNK_SIZE = 400
+
     class ServiceUnavailable(XBlockUserStateClient.ServiceUnavailable):
         """
         This error is raised if the service backing this client is currently unavailable.
@@ -106,6 +112,40 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
                 usage_key = student_module.module_state_key.map_into_course(student_module.course_id)
                 yield (student_module, usage_key)
 
+    def _get_student_modules_for_users(self, usernames, block_keys):
+        """
+        Retrieve the username, usage key, state and modification time of the
+        :class:`~StudentModule`s of the supplied ``usernames`` and ``block_keys``,
+        with a query per course and per chunk of users and of blocks.
+
+        Arguments:
+            usernames (list of str): The names of the users to load `StudentModule`s for.
+            block_keys (list of :class:`~UsageKey`): The set of XBlocks to load data for.
+        """
+        usernames_by_id = {}
+        for usernames_chunk in chunks(usernames, self.USERS_CHUNK_SIZE):
+            usernames_by_id.update(User.objects.filter(username__in=usernames_chunk).values_list('id', 'username'))
+
+        course_key_func = attrgetter('course_key')
+        by_course = itertools.groupby(
+            sorted(block_keys, key=course_key_func),
+            course_key_func,
+        )
+
+        for course_key, usage_keys in by_course:
+            usage_keys = list(usage_keys)
+            for user_ids_chunk in chunks(usernames_by_id, self.USERS_CHUNK_SIZE):
+                for usage_keys_chunk in chunks(usage_keys, self.BLOCKS_CHUNK_SIZE):
+                    query = StudentModule.objects.filter(
+                        student_id__in=user_ids_chunk,
+                        course_id=course_key,
+                        module_state_key__in=usage_keys_chunk,
+                    ).values_list('student_id', 'module_state_key', 'state', 'modified')
+
+                    for user_id, module_state_key, state, modified in query.iterator():
+                        usage_key = module_state_key.map_into_course(course_key)
+                        yield (usernames_by_id[user_id], usage_key, state, modified)
+
     def _nr_attribute_name(self, function_name, stat_name, block_type=None):
         """
         Return an attribute name (string) representing the provided descriptors.
@@ -209,6 +249,64 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         duration = (finish_time - evt_time) * 1000  # milliseconds
         self._nr_stat_accumulate('get_many', 'duration', duration)
 
+    def get_many_for_users(self, usernames, block_keys, scope=Scope.user_state, fields=None):
+        """
+        Retrieve the stored XBlock state of each of the specified users for the
+        specified XBlock usages, with chunked queries over all the users rather
+        than with a query per user. The state is parsed as it is yielded.
+
+        Arguments:
+            usernames ([str]): The names of the users whose state should be retrieved
+            block_keys ([UsageKey]): A list of UsageKeys identifying which xblock states to load.
+            scope (Scope): The scope to load data from
+            fields: A list of field values to retrieve. If None, retrieve all stored fields.
+
+        Yields:
+            XBlockUserState tuples for each specified user and UsageKey in block_keys,
+            in no particular order. field_state is a dict mapping field names to values.
+        """
+        if scope != Scope.user_state:
+            raise ValueError(u"Only Scope.user_state is supported, not {}".format(scope))
+
+        evt_time = time()
+
+        # count how many times this function gets called
+        self._nr_stat_increment('get_many_for_users', 'calls')
+
+        # keep track of users and blocks requested
+        self._nr_stat_accumulate('get_many_for_users', 'users_requested', len(usernames))
+        self._nr_stat_accumulate('get_many_for_users', 'blocks_requested', len(block_keys))
+
+        modules = self._get_student_modules_for_users(usernames, block_keys)
+        for username, usage_key, module_state, modified in modules:
+            if module_state is None:
+                continue
+
+            state = json.loads(module_state)
+
+            # If the state is the empty dict, then it has been deleted, and so
+            # conformant UserStateClients should treat it as if it doesn't exist.
+            if state == {}:
+                continue
+
+            # collect statistics for custom attribute reporting
+            self._nr_block_stat_increment('get_many_for_users', usage_key.block_type, 'blocks_out')
+            self._nr_block_stat_accumulate('get_many_for_users', usage_key.block_type, 'size', len(module_state))
+
+            # filter state on fields
+            if fields is not None:
+                state = {
+                    field: state[field]
+                    for field in fields
+                    if field in state
+                }
+            yield XBlockUserState(username, usage_key, state, modified, scope)
+
+        # The rest of this method exists only to report custom attributes.
+        finish_time = time()
+        duration = (finish_time - evt_time) * 1000  # milliseconds
+        self._nr_stat_accumulate('get_many_for_users', 'duration', duration)
+
     def set_many(self, username, block_keys_to_state, scope=Scope.user_state):
         """
         Set fields for a particular XBlock.
@@ -0,0 +1,522 @@
+"""
+Vectorized computation of the course grades of batches of users.
+
+CourseGrade computes a user's grade by creating a ProblemScore for each
+scorable block of the user's course structure, and aggregating them per
+subsection and per assignment type in Python.  The BatchCourseGrader instead
+loads the scores of a batch of users in bulk into users x blocks arrays, and
+applies the blocks' weights, the users' visibility of the blocks, the
+aggregation per subsection and assignment type, including the dropping of the
+lowest scores, and the grade cutoffs as array operations.
+
+The floating point operations of CourseGrade are performed in the same order,
+so the computed grades are identical to those of CourseGrade when it updates
+the grades of a user from the user's current scores.
+"""
+
+
+from collections import OrderedDict
+
+import numpy as np
+import six
+from django.conf import settings
+from submissions.models import ScoreSummary
+
+from common.djangoapps.student.models import anonymous_id_for_user
+from lms.djangoapps.courseware.models import StudentModule
+from xmodule.graders import AssignmentFormatGrader, WeightedSubsectionsGrader
+
+from .config import assume_zero_if_absent, should_persist_grades
+from .course_grade import CourseGradeBase
+from .models import PersistentSubsectionGradeOverride
+from .scores import possibly_scored
+from .transformer import GradesTransformer
+
+
+class ScorableBlocks(object):
+    """
+    The scorable blocks of a course, indexed as the columns of a ScoreMatrix,
+    with their grading attributes as arrays.
+    """
+    def __init__(self, collected_block_structure):
+        self.keys = [
+            block_key for block_key in collected_block_structure.topological_traversal(filter_func=possibly_scored)
+            if collected_block_structure.get_xblock_field(block_key, 'has_score', False)
+        ]
+        self.columns = {block_key: column for column, block_key in enumerate(self.keys)}
+
+        weights = [collected_block_structure.get_xblock_field(block_key, 'weight') for block_key in self.keys]
+        max_scores = [
+            collected_block_structure.get_transformer_block_field(block_key, GradesTransformer, 'max_score')
+            for block_key in self.keys
+        ]
+        explicit_graded = [
+            collected_block_structure.get_transformer_block_field(
+                block_key, GradesTransformer, GradesTransformer.EXPLICIT_GRADED_FIELD_NAME,
+            )
+            for block_key in self.keys
+        ]
+
+        # None values are represented as NaN.
+        self.weights = _float_array(weights)
+        self.max_scores = _float_array(max_scores)
+        # Grading is enabled for a block unless it is explicitly disabled.
+        self.explicit_graded = np.array([graded is not False for graded in explicit_graded], dtype=bool)
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class ScoreMatrix(object):
+    """
+    The scores of a batch of users on the scorable blocks of a course, as
+    arrays with a row per user and a column per block.
+
+    The scores are looked up with the precedence of scores.get_score, without
+    persisted blocks: the Submissions API, then the courseware student module,
+    then the latest content of the block.
+    """
+    def __init__(self, course_key, users, scorable_blocks):
+        self.users = list(users)
+        self.scorable_blocks = scorable_blocks
+        shape = (len(self.users), len(scorable_blocks))
+
+        csm_found = np.zeros(shape, dtype=bool)
+        csm_correct = np.full(shape, np.nan)
+        csm_total = np.full(shape, np.nan)
+        self._load_csm_scores(course_key, csm_found, csm_correct, csm_total)
+
+        submissions_found = np.zeros(shape, dtype=bool)
+        submissions_earned = np.zeros(shape)
+        submissions_possible = np.zeros(shape)
+        submissions_attempted = np.zeros(shape, dtype=bool)
+        self._load_submissions_scores(
+            course_key, submissions_found, submissions_earned, submissions_possible, submissions_attempted,
+        )
+
+        # Raw scores from the courseware student module if found, else from
+        # the latest content of the blocks.
+        raw_earned = np.where(csm_found & ~np.isnan(csm_correct), csm_correct, 0.0)
+        raw_possible = np.where(csm_found, csm_total, scorable_blocks.max_scores)
+
+        # Weighted as by scores.weighted_score.  Blocks without a max score
+        # have no score.
+        has_raw_possible = ~np.isnan(raw_possible)
+        weights = np.broadcast_to(scorable_blocks.weights, shape)
+        use_weight = ~np.isnan(weights) & has_raw_possible & (raw_possible != 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            weighted_earned = np.where(use_weight, raw_earned * weights / raw_possible, raw_earned)
+        weighted_possible = np.where(use_weight, weights, raw_possible)
+
+        # Scores from the Submissions API take precedence.
+        self.from_submissions = submissions_found
+        self.scored = submissions_found | has_raw_possible
+        self.earned = np.where(submissions_found, submissions_earned, weighted_earned)
+        self.possible = np.where(submissions_found, submissions_possible, weighted_possible)
+        self.graded = self.scored & (self.possible > 0.0) & scorable_blocks.explicit_graded
+        self.attempted = np.where(submissions_found, submissions_attempted, csm_found & ~np.isnan(csm_correct))
+
+    def exclude_hidden(self, visible):
+        """
+        Removes the scores of the blocks that are not in the users' course
+        structures, given as a boolean array of the shape of the matrix.
+        """
+        self.scored &= visible
+        self.graded &= visible
+        self.attempted &= visible
+
+    def _load_csm_scores(self, course_key, found, correct, total):
+        """
+        Fills the given arrays with the scores stored in the courseware
+        student module for the users, with a single query.
+        """
+        rows = {user.id: row for row, user in enumerate(self.users)}
+        # Locations in StudentModule don't necessarily have course key info
+        # attached to them, see ScoresClient.fetch_scores.
+        columns = {
+            block_key.replace(version=None, branch=None): column
+            for block_key, column in six.iteritems(self.scorable_blocks.columns)
+        }
+        scores = StudentModule.objects.filter(
+            course_id=course_key,
+            student_id__in=list(rows),
+            module_state_key__in=self.scorable_blocks.keys,
+        ).values_list('student_id', 'module_state_key', 'grade', 'max_grade')
+        for user_id, location, grade, max_grade in scores:
+            column = columns.get(location.map_into_course(course_key))
+            if column is None or max_grade is None:
+                continue
+            row = rows[user_id]
+            found[row, column] = True
+            total[row, column] = max_grade
+            if grade is not None:
+                correct[row, column] = grade
+
+    def _load_submissions_scores(self, course_key, found, earned, possible, attempted):
+        """
+        Fills the given arrays with the scores stored by the Submissions API
+        for the users, with a single query.
+
+        The Submissions API only reads the scores of a single student, so
+        the latest scores are read from its models as its get_scores does,
+        without the hidden (0/0) scores.
+        """
+        rows = {
+            anonymous_id_for_user(user, course_key, save=False): row
+            for row, user in enumerate(self.users)
+        }
+        columns = {
+            six.text_type(block_key): column
+            for block_key, column in six.iteritems(self.scorable_blocks.columns)
+        }
+        summaries = ScoreSummary.objects.filter(
+            student_item__course_id=six.text_type(course_key),
+            student_item__student_id__in=list(rows),
+        ).select_related('latest', 'student_item')
+        for summary in summaries:
+            score = summary.latest
+            column = columns.get(summary.student_item.item_id)
+            if column is None or score.is_hidden():
+                continue
+            row = rows[summary.student_item.student_id]
+            found[row, column] = True
+            earned[row, column] = score.points_earned
+            possible[row, column] = score.points_possible
+            attempted[row, column] = bool(score.created_at)
+
+
+class BatchCourseGrade(object):
+    """
+    The course grade of a user, as computed by a BatchCourseGrader.
+
+    Only the course level values of the grade are computed, so unlike a
+    CourseGrade, it has no subsection or chapter grades.
+    """
+    def __init__(self, user, course_data, percent, letter_grade, passed, attempted):
+        self.user = user
+        self.course_data = course_data
+        self.percent = percent
+        self.letter_grade = letter_grade or None
+        self.passed = passed
+        self.attempted = attempted
+
+    def __str__(self):
+        return u'Course Grade: percent: {}, letter_grade: {}, passed: {}'.format(
+            six.text_type(self.percent),
+            self.letter_grade,
+            self.passed,
+        )
+
+
+class BatchCourseGrader(object):
+    """
+    Computes the course grades of batches of users in a course, with array
+    operations over all the users of a batch.
+    """
+    # The default number of users graded together.
+    BATCH_SIZE = 500
+
+    def __init__(self, course_data):
+        """
+        Arguments:
+            course_data (CourseData) - The course, which must have a
+                collected block structure.
+
+        Raises:
+            ValueError if the course's grader can't be vectorized.
+        """
+        self.course_data = course_data
+        course = CourseGradeBase._prep_course_for_grading(course_data.course)  # pylint: disable=protected-access
+        self.grader = course.grader
+        self.grade_cutoffs = course.grade_cutoffs
+        if not self.is_supported(self.grader):
+            raise ValueError(u'The grader of course {} can not be vectorized.'.format(course_data.course_key))
+
+        self.scorable_blocks = ScorableBlocks(course_data.collected_structure)
+        # Map of the frozenset of the block keys of a user's course
+        # structure to the _CourseLayout of the structure.
+        self._layouts = {}
+
+    @staticmethod
+    def is_supported(grader):
+        """
+        Returns whether grades computed with the given course grader can be
+        vectorized.
+        """
+        return (
+            isinstance(grader, WeightedSubsectionsGrader) and
+            all(isinstance(subgrader, AssignmentFormatGrader) for subgrader, _, _ in grader.subgraders) and
+            not settings.GENERATE_PROFILE_SCORES
+        )
+
+    def grade(self, users_and_structures):
+        """
+        Returns a list of the BatchCourseGrade of each of the given users.
+
+        Arguments:
+            users_and_structures (list of (User, BlockStructureBlockData)) -
+                The users, with their transformed course structures.
+        """
+        course_grades, _ = self.grade_with_scores(users_and_structures)
+        return course_grades
+
+    def grade_with_scores(self, users_and_structures):
+        """
+        Returns a list of the BatchCourseGrade of each of the given users,
+        and the ScoreMatrix of their scores, without the scores of the
+        blocks that are not in their course structures.
+
+        Arguments:
+            users_and_structures (list of (User, BlockStructureBlockData)) -
+                The users, with their transformed course structures.
+        """
+        users = [user for user, _ in users_and_structures]
+        scores = ScoreMatrix(self.course_data.course_key, users, self.scorable_blocks)
+        overrides = self._load_overrides(users)
+
+        # Users with the same visible blocks are graded together.
+        rows_by_layout = OrderedDict()
+        for row, (_, course_structure) in enumerate(users_and_structures):
+            layout = self._get_layout(course_structure)
+            rows_by_layout.setdefault(layout, []).append(row)
+
+        percents = np.zeros(len(users))
+        attempted = np.zeros(len(users), dtype=bool)
+        visible = np.zeros((len(users), len(self.scorable_blocks)), dtype=bool)
+        for layout, rows in six.iteritems(rows_by_layout):
+            rows = np.array(rows)
+            earned, possible, subsections_attempted = self._subsection_totals(layout, scores, rows, overrides)
+            percents[rows] = self._grader_percents(layout, earned, possible)
+            attempted[rows] = subsections_attempted.any(axis=1)
+            visible[np.ix_(rows, layout.columns)] = True
+        scores.exclude_hidden(visible)
+
+        if assume_zero_if_absent(self.course_data.course_key):
+            attempted[:] = True
+
+        percents = _round_percents(percents)
+        letter_grades = self._letter_grades(percents)
+        passed = self._passed(percents)
+        course_grades = [
+            BatchCourseGrade(
+                user, self.course_data, float(percents[row]), letter_grades[row], passed[row], bool(attempted[row]),
+            )
+            for row, user in enumerate(users)
+        ]
+        return course_grades, scores
+
+    def _get_layout(self, course_structure):
+        """
+        Returns the _CourseLayout of the given course structure.
+        """
+        layout_key = frozenset(course_structure.get_block_keys())
+        layout = self._layouts.get(layout_key)
+        if layout is None:
+            layout = self._layouts[layout_key] = _CourseLayout(course_structure, self.scorable_blocks)
+        return layout
+
+    def _load_overrides(self, users):
+        """
+        Returns a map of (user row, subsection key) to the (earned, possible,
+        first attempted) graded values of the subsection grade overrides of
+        the given users.
+
+        CourseGrade applies the overrides of persisted subsection grades
+        when it persists the updated subsection grades.
+        """
+        course_key = self.course_data.course_key
+        if not should_persist_grades(course_key):
+            return {}
+        rows = {user.id: row for row, user in enumerate(users)}
+        overrides = PersistentSubsectionGradeOverride.objects.filter(
+            grade__course_id=course_key,
+            grade__user_id__in=list(rows),
+        ).values_list(
+            'grade__user_id', 'grade__usage_key', 'earned_graded_override', 'possible_graded_override',
+            'grade__first_attempted',
+        )
+        return {
+            (rows[user_id], usage_key.replace(course_key=course_key)): (earned, possible, first_attempted)
+            for user_id, usage_key, earned, possible, first_attempted in overrides
+        }
+
+    def _subsection_totals(self, layout, scores, rows, overrides):
+        """
+        Returns arrays, with a row per given user row and a column per
+        subsection of the given layout, of the graded earned and possible
+        totals of the subsections, and of whether they were attempted.
+        """
+        shape = (len(rows), len(layout.subsection_keys))
+        earned = np.zeros(shape)
+        possible = np.zeros(shape)
+        attempted = np.zeros(shape, dtype=bool)
+
+        graded = scores.graded[rows]
+        graded_earned = np.where(graded, scores.earned[rows], 0.0)
+        graded_possible = np.where(graded, scores.possible[rows], 0.0)
+        scored_attempted = scores.scored[rows] & scores.attempted[rows]
+
+        for index, columns in enumerate(layout.subsection_columns):
+            # Summed in the order of xmodule.graders.aggregate_scores.
+            for column in columns:
+                earned[:, index] += graded_earned[:, column]
+                possible[:, index] += graded_possible[:, column]
+            if columns:
+                attempted[:, index] = scored_attempted[:, columns].any(axis=1)
+
+        positions = {row: position for position, row in enumerate(rows)}
+        for (row, subsection_key), (earned_override, possible_override, first_attempted) in six.iteritems(overrides):
+            index = layout.subsection_indices.get(subsection_key)
+            position = positions.get(row)
+            if index is None or position is None:
+                continue
+            if earned_override is not None:
+                earned[position, index] = earned_override
+            if possible_override is not None:
+                possible[position, index] = possible_override
+            if first_attempted is not None:
+                attempted[position, index] = True
+
+        return earned, possible, attempted
+
+    def _grader_percents(self, layout, earned, possible):
+        """
+        Returns the percents computed by the course's WeightedSubsectionsGrader
+        from the given subsection totals of the users of the given layout.
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # As by SubsectionGrade.percent_graded.
+            subsection_percents = np.where(possible > 0, np.around(earned / possible, decimals=2), 0.0)
+
+        total_percents = np.zeros(earned.shape[0])
+        for subgrader, _, weight in self.grader.subgraders:
+            indices = layout.graded_subsections_by_format.get(subgrader.type, [])
+            subgrader_percents = _assignment_format_percents(
+                subgrader, subsection_percents[:, indices], possible[:, indices] > 0,
+            )
+            total_percents += subgrader_percents * weight
+        return total_percents
+
+    def _letter_grades(self, percents):
+        """
+        Returns the letter grades of the given percents, as by
+        CourseGrade._compute_letter_grade.
+        """
+        letter_grades = [None] * len(percents)
+        unassigned = np.ones(len(percents), dtype=bool)
+        cutoffs = self.grade_cutoffs
+        for letter_grade in sorted(cutoffs, key=lambda x: cutoffs[x], reverse=True):
+            matching = unassigned & (percents >= cutoffs[letter_grade])
+            for row in np.flatnonzero(matching):
+                letter_grades[row] = letter_grade
+            unassigned &= ~matching
+        return letter_grades
+
+    def _passed(self, percents):
+        """
+        Returns whether the given percents are passing, as by
+        CourseGrade._compute_passed.
+        """
+        nonzero_cutoffs = [cutoff for cutoff in self.grade_cutoffs.values() if cutoff > 0]
+        if not nonzero_cutoffs:
+            return [None] * len(percents)
+        return [bool(passed) for passed in percents >= min(nonzero_cutoffs)]
+
+
+class _CourseLayout(object):
+    """
+    The subsections of a user's course structure, in the order in which
+    CourseGrade grades them, with the scorable blocks of each subsection.
+    """
+    def __init__(self, course_structure, scorable_blocks):
+        # Usage keys of the subsections, and a map of a subsection's usage
+        # key to its index in that list.
+        self.subsection_keys = []
+        self.subsection_indices = {}
+        # Columns in the ScoreMatrix of each subsection's scorable blocks.
+        self.subsection_columns = []
+        # Map of a subsection format to the indices of the graded
+        # subsections of that format.
+        self.graded_subsections_by_format = OrderedDict()
+
+        for chapter_key in course_structure.get_children(course_structure.root_block_usage_key):
+            for subsection_key in course_structure.get_children(chapter_key):
+                if subsection_key in self.subsection_indices:
+                    continue
+                index = self.subsection_indices[subsection_key] = len(self.subsection_keys)
+                self.subsection_keys.append(subsection_key)
+                self.subsection_columns.append([
+                    scorable_blocks.columns[block_key]
+                    for block_key in course_structure.post_order_traversal(
+                        filter_func=possibly_scored,
+                        start_node=subsection_key,
+                    )
+                    if block_key in scorable_blocks.columns
+                ])
+
+                subsection = course_structure[subsection_key]
+                if getattr(subsection, 'graded', False):
+                    subsection_format = getattr(subsection, 'format', '')
+                    self.graded_subsections_by_format.setdefault(subsection_format, []).append(index)
+
+        # Columns in the ScoreMatrix of the scorable blocks of all the
+        # subsections.
+        self.columns = sorted(set(column for columns in self.subsection_columns for column in columns))
+
+
+def _assignment_format_percents(grader, percents, present):
+    """
+    Returns the percents computed by the given AssignmentFormatGrader, as by
+    its grade and total_with_drops methods, for each row of the given
+    subsection percents.  Only the present subsections of a row are in its
+    grade sheet.
+    """
+    num_rows, num_subsections = percents.shape
+
+    # Move the present subsections of each row first, keeping their order.
+    order = np.argsort(~present, axis=1, kind='stable')
+    percents = np.take_along_axis(np.where(present, percents, 0.0), order, axis=1)
+    num_present = present.sum(axis=1)
+
+    # Each row's breakdown has a mark per present subsection, padded with
+    # zero percent marks up to the grader's min_count.
+    min_count = int(float(grader.min_count))
+    num_marks = np.maximum(num_present, min_count)
+    width = max(num_subsections, min_count)
+    marks = np.zeros((num_rows, width))
+    marks[:, :num_subsections] = percents
+    in_breakdown = np.arange(width) < num_marks[:, None]
+
+    # Drop the marks that total_with_drops drops: the last drop_count marks
+    # of the breakdown stably sorted by descending percent.
+    included = in_breakdown.copy()
+    if grader.drop_count > 0:
+        sort_keys = np.where(in_breakdown, -marks, -np.inf)
+        sorted_indices = np.argsort(sort_keys, axis=1, kind='stable')
+        dropped = sorted_indices[:, max(width - grader.drop_count, 0):]
+        np.put_along_axis(included, dropped, False, axis=1)
+
+    # Summed in the order of total_with_drops.
+    totals = np.zeros(num_rows)
+    for index in range(width):
+        totals += np.where(included[:, index], marks[:, index], 0.0)
+
+    num_kept = num_marks - grader.drop_count
+    return np.where(num_kept > 0, totals / np.maximum(num_kept, 1), totals)
+
+
+def _round_percents(percents):
+    """
+    Returns the given grader percents rounded as by
+    CourseGrade._compute_percent.
+    """
+    numbers = percents * 100 + 0.05
+    rounded = np.where(numbers >= 0, np.floor(numbers + 0.5), np.ceil(numbers - 0.5))
+    return rounded / 100
+
+
+def _float_array(values):
+    """
+    Returns a float array of the given values, with NaN for None values.
+    """
+    return np.array([np.nan if value is None else value for value in values], dtype=float)
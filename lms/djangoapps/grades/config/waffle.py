@@ -84,6 +84,18 @@ WRITABLE_GRADEBOOK = u'writable_gradebook'
 # .. toggle_tickets: https://github.com/edx/edx-platform/pull/21389
 BULK_MANAGEMENT = u'bulk_management'
 
+# .. toggle_name: grades.incremental_course_grade_update
+# .. toggle_implementation: CourseWaffleFlag
+# .. toggle_default: False
+# .. toggle_description: When enabled, a course grade is recomputed from the subsection totals persisted with it when
+#   a single subsection grade changes, instead of from all the subsection grades of the learner.
+# .. toggle_use_cases: temporary
+# .. toggle_creation_date: 2026-10-18
+# .. toggle_target_removal_date: 2027-04-18
+# .. toggle_warnings: Course grades computed before the flag is enabled are recomputed in full on their next update.
+# .. toggle_tickets: None
+INCREMENTAL_COURSE_GRADE_UPDATE = u'incremental_course_grade_update'
+
 
 def waffle():
     """
@@ -136,6 +148,11 @@ def waffle_flags():
             BULK_MANAGEMENT,
             __name__,
         ),
+        INCREMENTAL_COURSE_GRADE_UPDATE: CourseWaffleFlag(
+            namespace,
+            INCREMENTAL_COURSE_GRADE_UPDATE,
+            __name__,
+        ),
     }
 
 
@@ -153,3 +170,11 @@ def gradebook_can_see_bulk_management(course_key):
     (provided that course contains a masters track, as of this writing)
     """
     return waffle_flags()[BULK_MANAGEMENT].is_enabled(course_key)
+
+
+def is_incremental_course_grade_update_enabled(course_key):
+    """
+    Returns whether course grades are updated incrementally from a single
+    subsection grade change for the given course.
+    """
+    return waffle_flags()[INCREMENTAL_COURSE_GRADE_UPDATE].is_enabled(course_key)
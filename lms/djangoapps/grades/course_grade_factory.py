@@ -3,21 +3,27 @@ Course Grade Factory Class
 """
 
 
-from collections import namedtuple
+import itertools
+from collections import deque, namedtuple
 from logging import getLogger
 
 import six
+from django.db import transaction
 from six import text_type
 
+from lms.djangoapps.course_blocks.api import get_course_blocks, get_course_blocks_for_users
 from openedx.core.djangoapps.signals.signals import (
     COURSE_GRADE_CHANGED,
     COURSE_GRADE_NOW_FAILED,
     COURSE_GRADE_NOW_PASSED
 )
 
+from .batch_grading import BatchCourseGrader
 from .config import assume_zero_if_absent, should_persist_grades
+from .config.waffle import is_incremental_course_grade_update_enabled
 from .course_data import CourseData
 from .course_grade import CourseGrade, ZeroCourseGrade
+from .grader_state import GraderState
 from .models import PersistentCourseGrade
 from .models_api import prefetch_grade_overrides_and_visible_blocks
 
@@ -83,6 +89,29 @@ class CourseGradeFactory(object):
             force_update_subsections=force_update_subsections
         )
 
+    def update_from_subsection_grade(self, user, subsection_grade, course=None, course_structure=None):
+        """
+        Updates and returns the CourseGrade of the given user in the course,
+        after the given subsection grade of the user was updated.
+
+        When enabled for the course, the course grade is recomputed from the
+        GraderState persisted with it, updated with the subsection grade, so
+        that the user's other subsection grades aren't read.  The course
+        grade is computed from all the subsection grades when the persisted
+        state may be stale: when the course content, its grading policy or
+        the subsections of the user's course structure changed since the
+        course grade was persisted.
+
+        At least one of course or course_structure should be provided.
+        """
+        course_data = CourseData(user, course, structure=course_structure)
+        course_key = course_data.course_key
+        if should_persist_grades(course_key) and is_incremental_course_grade_update_enabled(course_key):
+            course_grade = self._update_incrementally(user, course_data, subsection_grade)
+            if course_grade is not None:
+                return course_grade
+        return self._update(user, course_data)
+
     def iter(
             self,
             users,
@@ -109,10 +138,175 @@ class CourseGradeFactory(object):
             user=None, course=course, collected_block_structure=collected_block_structure, course_key=course_key,
         )
         stats_tags = [u'action:{}'.format(course_data.course_key)]
+        if not force_update:
+            for user in users:
+                yield self._iter_grade_result(user, course_data, force_update)
+            return
+
+        # When recomputing grades, transform the course structure for all
+        # users in one pass, so the work shared between users is only done
+        # once.
+        users = iter(users)
+        course_structures = self._iter_course_structures(users, course_data)
+        for user, course_structure in course_structures:
+            yield self._iter_grade_result(user, course_data, force_update, course_structure)
+
+        # If transforming in one pass failed, the remaining users' course
+        # structures are computed individually.
         for user in users:
             yield self._iter_grade_result(user, course_data, force_update)
 
-    def _iter_grade_result(self, user, course_data, force_update):
+    def iter_computed(
+            self,
+            users,
+            course=None,
+            collected_block_structure=None,
+            course_key=None,
+            batch_size=None,
+    ):
+        """
+        Given a course and an iterable of students (User), yield a GradeResult
+        for every student, as does iter, with a course grade computed from the
+        student's current scores.
+
+        The course grades are computed for batches of batch_size students at
+        once by a BatchCourseGrader, and equal those that update computes
+        when forced to update the subsection grades.  They are neither
+        persisted nor signaled, and only their course level values are
+        computed.
+
+        Raises:
+            ValueError if the course's grader can't be vectorized.  See
+            BatchCourseGrader.is_supported.
+        """
+        for results, _ in self.iter_computed_batches(
+                users, course, collected_block_structure, course_key, batch_size,
+        ):
+            for result in results:
+                yield result
+
+    def iter_computed_batches(
+            self,
+            users,
+            course=None,
+            collected_block_structure=None,
+            course_key=None,
+            batch_size=None,
+    ):
+        """
+        Given a course and an iterable of students (User), yield for each
+        batch of students the list of their GradeResults, as iter_computed
+        does, with the ScoreMatrix of the current scores of the students
+        that were graded, or None if none were.  The scores of the blocks
+        that are not in a student's course structure are excluded.
+
+        Raises:
+            ValueError if the course's grader can't be vectorized.  See
+            BatchCourseGrader.is_supported.
+        """
+        course_data = CourseData(
+            user=None, course=course, collected_block_structure=collected_block_structure, course_key=course_key,
+        )
+        batch_grader = BatchCourseGrader(course_data)
+        batch_size = batch_size or BatchCourseGrader.BATCH_SIZE
+
+        # If transforming in one pass fails, the remaining users' course
+        # structures are computed individually.
+        users = iter(users)
+        users_and_structures = itertools.chain(
+            self._iter_course_structures(users, course_data),
+            ((user, None) for user in users),
+        )
+        batch = []
+        for user, course_structure in users_and_structures:
+            if course_structure is None:
+                try:
+                    course_structure = get_course_blocks(
+                        user, course_data.location, collected_block_structure=course_data.collected_structure,
+                    )
+                except Exception as exc:  # pylint: disable=broad-except
+                    course_structure = exc
+            batch.append((user, course_structure))
+            if len(batch) == batch_size:
+                yield self._grade_batch(batch_grader, course_data, batch)
+                batch = []
+        if batch:
+            yield self._grade_batch(batch_grader, course_data, batch)
+
+    def _grade_batch(self, batch_grader, course_data, batch):
+        """
+        Returns a list of the GradeResults of the given batch of users with
+        their course structures, or with the exceptions raised when
+        transforming them, and the ScoreMatrix of the graded users.
+        """
+        graded_users = [
+            (user, course_structure) for user, course_structure in batch
+            if not isinstance(course_structure, Exception)
+        ]
+        scores = None
+        try:
+            if graded_users:
+                course_grades, scores = batch_grader.grade_with_scores(graded_users)
+            else:
+                course_grades = []
+            course_grades = dict(zip((user.id for user, _ in graded_users), course_grades))
+        except Exception as exc:  # pylint: disable=broad-except
+            course_grades = {user.id: exc for user, _ in graded_users}
+
+        results = []
+        for user, course_structure in batch:
+            course_grade = course_structure if isinstance(course_structure, Exception) else course_grades[user.id]
+            if isinstance(course_grade, Exception):
+                log.error(
+                    u'Cannot grade student %s in course %s because of exception: %s',
+                    user.id,
+                    course_data.course_key,
+                    text_type(course_grade)
+                )
+                results.append(self.GradeResult(user, None, course_grade))
+            else:
+                results.append(self.GradeResult(user, course_grade, None))
+        return results, scores
+
+    @staticmethod
+    def _iter_course_structures(users, course_data):
+        """
+        Yields each of the given users with their transformed course
+        structure.  If transforming fails, the users that have been
+        consumed but not yet transformed are yielded with a None
+        structure, and iteration stops.
+        """
+        pending_users = deque()
+
+        def _record_pending(users):
+            for user in users:
+                pending_users.append(user)
+                yield user
+
+        course_structures = get_course_blocks_for_users(
+            _record_pending(users),
+            course_data.location,
+            collected_block_structure=course_data.collected_structure,
+        )
+        while True:
+            try:
+                user, course_structure = next(course_structures)
+            except StopIteration:
+                return
+            except Exception as exc:  # pylint: disable=broad-except
+                log.exception(
+                    u'Grades: Unable to transform course structures in one pass for course %s: %s',
+                    course_data.course_key,
+                    text_type(exc),
+                )
+                break
+            pending_users.popleft()
+            yield user, course_structure
+
+        for user in pending_users:
+            yield user, None
+
+    def _iter_grade_result(self, user, course_data, force_update, course_structure=None):
         try:
             kwargs = {
                 'user': user,
@@ -120,6 +314,8 @@ class CourseGradeFactory(object):
                 'collected_block_structure': course_data.collected_structure,
                 'course_key': course_data.course_key,
             }
+            if course_structure is not None:
+                kwargs['course_structure'] = course_structure
             if force_update:
                 kwargs['force_update_subsections'] = True
 
@@ -188,17 +384,93 @@ class CourseGradeFactory(object):
         should_persist = should_persist and course_grade.attempted
         if should_persist:
             course_grade._subsection_grade_factory.bulk_create_unsaved()
-            PersistentCourseGrade.update_or_create(
-                user_id=user.id,
-                course_id=course_data.course_key,
-                course_version=course_data.version,
-                course_edited_timestamp=course_data.edited_on,
-                grading_policy_hash=course_data.grading_policy_hash,
-                percent_grade=course_grade.percent,
-                letter_grade=course_grade.letter_grade or "",
-                passed=course_grade.passed,
+            CourseGradeFactory._persist(user, course_data, course_grade, GraderState.from_course_grade(course_grade))
+
+        CourseGradeFactory._send_grade_signals(user, course_data, course_grade)
+
+        log.info(
+            u'Grades: Update, %s, User: %s, %s, persisted: %s',
+            course_data.full_string(), user.id, course_grade, should_persist,
+        )
+
+        return course_grade
+
+    @staticmethod
+    def _update_incrementally(user, course_data, subsection_grade):
+        """
+        Updates, saves, and returns the CourseGrade of the given user from
+        the GraderState persisted with it and the given subsection grade.
+        Sends the same signals as _update.
+
+        Returns None if the user has no persisted course grade, or if its
+        persisted state may be stale.
+
+        The persisted grade is locked while it is updated, so that concurrent
+        updates of the same grade apply their subsections one after another.
+        """
+        with transaction.atomic():
+            try:
+                persistent_grade = PersistentCourseGrade.read_for_update(user.id, course_data.course_key)
+            except PersistentCourseGrade.DoesNotExist:
+                return None
+            if (
+                    not persistent_grade.grader_state or
+                    persistent_grade.course_version != (course_data.version or '') or
+                    persistent_grade.grading_policy_hash != course_data.grading_policy_hash
+            ):
+                return None
+            grader_state = GraderState.from_json(persistent_grade.grader_state)
+            if (
+                    grader_state is None or
+                    not grader_state.matches_structure(course_data.structure) or
+                    not grader_state.update_subsection(subsection_grade)
+            ):
+                return None
+
+            course = CourseGrade._prep_course_for_grading(course_data.course)  # pylint: disable=protected-access
+            grade_cutoffs = course_data.course.grade_cutoffs
+            percent = CourseGrade._compute_percent(grader_state.grade(course.grader))  # pylint: disable=protected-access
+            course_grade = CourseGrade(
+                user,
+                course_data,
+                percent,
+                CourseGrade._compute_letter_grade(grade_cutoffs, percent),  # pylint: disable=protected-access
+                CourseGrade._compute_passed(grade_cutoffs, percent),  # pylint: disable=protected-access
             )
+            CourseGradeFactory._persist(user, course_data, course_grade, grader_state)
 
+        CourseGradeFactory._send_grade_signals(user, course_data, course_grade)
+
+        log.info(
+            u'Grades: Incremental update, %s, User: %s, %s, subsection: %s',
+            course_data.full_string(), user.id, course_grade, subsection_grade.location,
+        )
+        return course_grade
+
+    @staticmethod
+    def _persist(user, course_data, course_grade, grader_state):
+        """
+        Saves the given CourseGrade, computed from the given GraderState.
+        """
+        PersistentCourseGrade.update_or_create(
+            user_id=user.id,
+            course_id=course_data.course_key,
+            course_version=course_data.version,
+            course_edited_timestamp=course_data.edited_on,
+            grading_policy_hash=course_data.grading_policy_hash,
+            percent_grade=course_grade.percent,
+            letter_grade=course_grade.letter_grade or "",
+            passed=course_grade.passed,
+            grader_state=grader_state.to_json(),
+        )
+
+    @staticmethod
+    def _send_grade_signals(user, course_data, course_grade):
+        """
+        Sends a COURSE_GRADE_CHANGED signal to listeners and
+        COURSE_GRADE_NOW_PASSED if learner has passed course or
+        COURSE_GRADE_NOW_FAILED if learner is now failing course
+        """
         COURSE_GRADE_CHANGED.send_robust(
             sender=None,
             user=user,
@@ -219,10 +491,3 @@ class CourseGradeFactory(object):
                 course_id=course_data.course_key,
                 grade=course_grade,
             )
-
-        log.info(
-            u'Grades: Update, %s, User: %s, %s, persisted: %s',
-            course_data.full_string(), user.id, course_grade, should_persist,
-        )
-
-        return course_grade
@@ -0,0 +1,138 @@
+"""
+The state from which the course grader computes a user's course grade.
+
+The course grader only needs the graded totals of the user's graded
+subsections, per assignment type, in course order.  Persisting them with the
+course grade allows the course grade to be recomputed when a single subsection
+grade changes, without reading the user's other subsection grades.
+"""
+
+
+import json
+from collections import OrderedDict
+
+import six
+
+from xmodule.graders import AggregatedScore
+
+from .scores import compute_percent
+
+
+class GraderState(object):
+    """
+    The graded totals of a user's graded subsections, in a map of each
+    subsection format to an ordered map of the serialized usage keys of the
+    subsections of that format to their (earned, possible) graded totals.
+
+    All the graded subsections of the user's course structure are included,
+    even those without possible points, so that the state can be checked
+    against the structure.
+    """
+    VERSION = 1
+
+    def __init__(self, subsections_by_format):
+        self.subsections_by_format = subsections_by_format
+
+    @classmethod
+    def from_course_grade(cls, course_grade):
+        """
+        Returns the state of the given CourseGrade.
+        """
+        subsections_by_format = OrderedDict()
+        for chapter in six.itervalues(course_grade.chapter_grades):
+            for subsection_grade in chapter['sections']:
+                if subsection_grade.graded:
+                    subsections = subsections_by_format.setdefault(subsection_grade.format, OrderedDict())
+                    subsections.setdefault(
+                        six.text_type(subsection_grade.location),
+                        (subsection_grade.graded_total.earned, subsection_grade.graded_total.possible),
+                    )
+        return cls(subsections_by_format)
+
+    @classmethod
+    def from_json(cls, value):
+        """
+        Returns the state serialized in the given JSON string, or None if it
+        was serialized by another version of the GraderState.
+        """
+        state = json.loads(value)
+        if state.get('version') != cls.VERSION:
+            return None
+        return cls(OrderedDict(
+            (subsection_format, OrderedDict((usage_key, tuple(total)) for usage_key, total in subsections))
+            for subsection_format, subsections in state['subsections']
+        ))
+
+    def to_json(self):
+        """
+        Returns the state serialized as a JSON string.
+        """
+        return json.dumps({
+            'version': self.VERSION,
+            'subsections': [
+                [subsection_format, [[usage_key, list(total)] for usage_key, total in six.iteritems(subsections)]]
+                for subsection_format, subsections in six.iteritems(self.subsections_by_format)
+            ],
+        }, separators=(',', ':'))
+
+    def matches_structure(self, course_structure):
+        """
+        Returns whether the state has the graded subsections of the given
+        course structure, in the same order.
+        """
+        subsection_keys_by_format = OrderedDict()
+        for chapter_key in course_structure.get_children(course_structure.root_block_usage_key):
+            for subsection_key in course_structure.get_children(chapter_key):
+                subsection = course_structure[subsection_key]
+                if getattr(subsection, 'graded', False):
+                    subsection_keys = subsection_keys_by_format.setdefault(getattr(subsection, 'format', ''), [])
+                    usage_key = six.text_type(subsection_key)
+                    if usage_key not in subsection_keys:
+                        subsection_keys.append(usage_key)
+        return subsection_keys_by_format == OrderedDict(
+            (subsection_format, list(subsections))
+            for subsection_format, subsections in six.iteritems(self.subsections_by_format)
+        )
+
+    def update_subsection(self, subsection_grade):
+        """
+        Updates the state with the given subsection grade.
+
+        Returns whether the state has the subsection of the grade, which
+        is the case for the graded subsections of the structure from
+        which the state was computed.
+        """
+        if not subsection_grade.graded:
+            return True
+        subsections = self.subsections_by_format.get(subsection_grade.format, {})
+        usage_key = six.text_type(subsection_grade.location)
+        if usage_key not in subsections:
+            return False
+        subsections[usage_key] = (subsection_grade.graded_total.earned, subsection_grade.graded_total.possible)
+        return True
+
+    def grade(self, grader):
+        """
+        Returns the result of the given course grader on the state.
+        """
+        grade_sheet = {
+            subsection_format: OrderedDict(
+                (usage_key, _GradedTotal(earned, possible))
+                for usage_key, (earned, possible) in six.iteritems(subsections)
+                if possible > 0
+            )
+            for subsection_format, subsections in six.iteritems(self.subsections_by_format)
+        }
+        return grader.grade(grade_sheet)
+
+
+class _GradedTotal(object):
+    """
+    The graded total of a subsection, with the attributes of a SubsectionGrade
+    that the course graders use.
+    """
+    display_name = u''
+
+    def __init__(self, earned, possible):
+        self.graded_total = AggregatedScore(tw_earned=earned, tw_possible=possible, graded=True, first_attempted=None)
+        self.percent_graded = compute_percent(earned, possible)
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grades', '0018_add_waffle_flag_defaults'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='persistentcoursegrade',
+            name='grader_state',
+            field=models.TextField(blank=True, null=True, verbose_name='Graded subsection totals'),
+        ),
+    ]
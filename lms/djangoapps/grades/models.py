@@ -11,8 +11,9 @@ persisted, course grades are also immune to changes in course content.
 
 import json
 import logging
+import threading
 from base64 import b64encode
-from collections import defaultdict, namedtuple
+from collections import OrderedDict, defaultdict, namedtuple
 from hashlib import sha1
 
 import six
@@ -37,6 +38,10 @@ log = logging.getLogger(__name__)
 
 BLOCK_RECORD_LIST_VERSION = 1
 
+# Maximum number of block records in the distinct block record lists
+# interned by a process.
+BLOCK_RECORD_LIST_INTERN_SIZE = 100000
+
 # Used to serialize information about a block at the time it was used in
 # grade calculation.
 BlockRecord = namedtuple('BlockRecord', ['locator', 'weight', 'raw_possible', 'graded'])
@@ -124,8 +129,83 @@ class BlockRecordList(object):
     def from_list(cls, blocks, course_key):
         """
         Return a BlockRecordList from the given list and course_key.
+
+        The learners of a course mostly see the same blocks, so the
+        BlockRecordLists are interned: a process returns the same
+        BlockRecordList for equal lists of block records, and so only
+        serializes and hashes each distinct list once.
         """
-        return cls(blocks, course_key)
+        return _interned_block_record_lists.intern(cls, blocks, course_key)
+
+
+class _BlockRecordListInterner(object):
+    """
+    A bounded map of the distinct lists of block records of a course to
+    their BlockRecordList, evicting the least recently used lists once
+    they hold more than max_records block records in total.
+
+    The records are the key, rather than the course version and the
+    learner's partition groups, since they also hold the learner's possible
+    scores, which are part of the hash.  The lists are mapped by the hash of
+    their records, so that the records are only held by the BlockRecordLists,
+    and the records of a list found by hash are compared to the given ones.
+    The types of their fields are compared too, as 1 and 1.0 are equal but
+    serialized differently.
+    """
+    def __init__(self, max_records):
+        self.max_records = max_records
+        self._block_record_lists = OrderedDict()
+        self._num_records = 0
+        self._lock = threading.Lock()
+
+    def intern(self, block_record_list_class, blocks, course_key):
+        """
+        Returns the interned BlockRecordList of the given blocks.
+        """
+        blocks = tuple(blocks)
+        key = hash((block_record_list_class, course_key, blocks))
+        with self._lock:
+            block_record_list = self._block_record_lists.pop(key, None)
+            if block_record_list is not None:
+                self._num_records -= len(block_record_list)
+                if not self._is_list_of(block_record_list, block_record_list_class, blocks, course_key):
+                    block_record_list = None
+            if block_record_list is None:
+                block_record_list = block_record_list_class(blocks, course_key)
+            self._block_record_lists[key] = block_record_list
+            self._num_records += len(block_record_list)
+            while self._num_records > self.max_records and len(self._block_record_lists) > 1:
+                _, evicted_block_record_list = self._block_record_lists.popitem(last=False)
+                self._num_records -= len(evicted_block_record_list)
+        return block_record_list
+
+    def clear(self):
+        """
+        Removes all the interned lists.
+        """
+        with self._lock:
+            self._block_record_lists.clear()
+            self._num_records = 0
+
+    @staticmethod
+    def _is_list_of(block_record_list, block_record_list_class, blocks, course_key):
+        """
+        Returns whether the given BlockRecordList is of the given blocks,
+        with fields of the same types.
+        """
+        return (
+            type(block_record_list) is block_record_list_class and  # pylint: disable=unidiomatic-typecheck
+            block_record_list.course_key == course_key and
+            block_record_list.blocks == blocks and
+            all(
+                type(field) is type(other_field)  # pylint: disable=unidiomatic-typecheck
+                for block, other_block in zip(block_record_list.blocks, blocks)
+                for field, other_field in zip(block, other_block)
+            )
+        )
+
+
+_interned_block_record_lists = _BlockRecordListInterner(BLOCK_RECORD_LIST_INTERN_SIZE)
 
 
 @python_2_unicode_compatible
@@ -188,7 +268,7 @@ class VisibleBlocks(models.Model):
         """
         prefetched = get_cache(cls._CACHE_NAMESPACE).get(cls._cache_key(user_id, blocks.course_key))
         if prefetched is not None:
-            model = prefetched.get(blocks.hash_value)
+            model = prefetched.get(blocks.hash_value) or cls._course_cache(blocks.course_key).get(blocks.hash_value)
             if not model:
                 # We still have to do a get_or_create, because
                 # another user may have had this block hash created,
@@ -196,7 +276,7 @@ class VisibleBlocks(models.Model):
                 model, _ = cls.objects.get_or_create(
                     hashed=blocks.hash_value, blocks_json=blocks.json_value, course_id=blocks.course_key,
                 )
-                cls._update_cache(user_id, blocks.course_key, [model])
+            cls._update_cache(user_id, blocks.course_key, [model])
         else:
             model, _ = cls.objects.get_or_create(
                 hashed=blocks.hash_value,
@@ -231,7 +311,13 @@ class VisibleBlocks(models.Model):
         only for those that aren't already created.
         """
         cached_records = cls.bulk_read(user_id, course_key)
+        course_cache = cls._course_cache(course_key)
         non_existent_brls = {brl for brl in block_record_lists if brl.hash_value not in cached_records}
+        # Those created by other users of the course in this request.
+        existing = [course_cache[brl.hash_value] for brl in non_existent_brls if brl.hash_value in course_cache]
+        if existing:
+            cls._update_cache(user_id, course_key, existing)
+            non_existent_brls = {brl for brl in non_existent_brls if brl.hash_value not in course_cache}
         cls.bulk_create(user_id, course_key, non_existent_brls)
 
     @classmethod
@@ -247,6 +333,7 @@ class VisibleBlocks(models.Model):
         )
         prefetched = {grade.visible_blocks.hashed: grade.visible_blocks for grade in grades_with_blocks}
         get_cache(cls._CACHE_NAMESPACE)[cls._cache_key(user_id, course_key)] = prefetched
+        cls._course_cache(course_key).update(prefetched)
         return prefetched
 
     @classmethod
@@ -255,14 +342,27 @@ class VisibleBlocks(models.Model):
         Adds a specific set of visible blocks to the request cache.
         This assumes that prefetch has already been called.
         """
-        get_cache(cls._CACHE_NAMESPACE)[cls._cache_key(user_id, course_key)].update(
-            {visible_block.hashed: visible_block for visible_block in visible_blocks}
-        )
+        visible_blocks_by_hash = {visible_block.hashed: visible_block for visible_block in visible_blocks}
+        get_cache(cls._CACHE_NAMESPACE)[cls._cache_key(user_id, course_key)].update(visible_blocks_by_hash)
+        cls._course_cache(course_key).update(visible_blocks_by_hash)
+
+    @classmethod
+    def _course_cache(cls, course_key):
+        """
+        Returns the request cache of the visible blocks prefetched or saved
+        for all the users of the given course, keyed by hash, so that those
+        of a user are reused for the other users of a request or task.
+        """
+        return get_cache(cls._CACHE_NAMESPACE).setdefault(cls._course_cache_key(course_key), {})
 
     @classmethod
     def _cache_key(cls, user_id, course_key):
         return u"visible_blocks_cache.{}.{}".format(course_key, user_id)
 
+    @classmethod
+    def _course_cache_key(cls, course_key):
+        return u"visible_blocks_cache.{}".format(course_key)
+
 
 @python_2_unicode_compatible
 class PersistentSubsectionGrade(TimeStampedModel):
@@ -549,6 +649,9 @@ class PersistentCourseGrade(TimeStampedModel):
     # Information related to course completion
     passed_timestamp = models.DateTimeField(u'Date learner earned a passing grade', blank=True, null=True)
 
+    # Serialized GraderState from which the grade was computed
+    grader_state = models.TextField(u'Graded subsection totals', blank=True, null=True)
+
     _CACHE_NAMESPACE = u"grades.models.PersistentCourseGrade"
 
     def __str__(self):
@@ -605,6 +708,16 @@ class PersistentCourseGrade(TimeStampedModel):
             # grades were not prefetched for the course, so fetch it
             return cls.objects.get(user_id=user_id, course_id=course_id)
 
+    @classmethod
+    def read_for_update(cls, user_id, course_id):
+        """
+        Reads a grade from database, bypassing the prefetched grades, and
+        locks it until the end of the current transaction.
+
+        Raises PersistentCourseGrade.DoesNotExist if applicable
+        """
+        return cls.objects.select_for_update().get(user_id=user_id, course_id=course_id)
+
     @classmethod
     def update_or_create(cls, user_id, course_id, **kwargs):
         """
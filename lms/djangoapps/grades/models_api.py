@@ -5,6 +5,7 @@ Provides Python APIs exposed from Grades models.
 
 from opaque_keys.edx.keys import CourseKey, UsageKey
 
+from lms.djangoapps.grades.config import should_persist_grades as _should_persist_grades
 from lms.djangoapps.grades.models import PersistentCourseGrade as _PersistentCourseGrade
 from lms.djangoapps.grades.models import PersistentSubsectionGrade as _PersistentSubsectionGrade
 from lms.djangoapps.grades.models import PersistentSubsectionGradeOverride as _PersistentSubsectionGradeOverride
@@ -26,6 +27,20 @@ def prefetch_course_and_subsection_grades(course_key, users):
     _PersistentSubsectionGrade.prefetch(course_key, users)
 
 
+def get_persisted_course_grade(user_id, course_key):
+    """
+    Returns the persisted course grade of the given user in the given
+    course, or None if there is none or grades are not persisted for
+    the course.  Reads the prefetched course grades if there are any.
+    """
+    if not _should_persist_grades(course_key):
+        return None
+    try:
+        return _PersistentCourseGrade.read(user_id, course_key)
+    except _PersistentCourseGrade.DoesNotExist:
+        return None
+
+
 def clear_prefetched_course_grades(course_key):
     _PersistentCourseGrade.clear_prefetched_data(course_key)
     _PersistentSubsectionGrade.clear_prefetched_data(course_key)
@@ -0,0 +1,117 @@
+"""
+Pending subsection grade updates, coalesced per user and course.
+
+Each score change of a user in a course is recorded in the cache, and only the
+first change recorded while no update is scheduled schedules a task.  When the
+task runs, after a short window, it takes all the changes recorded since, so
+that each subsection containing changed scores is updated once, however many
+of its scores changed.  Without a shared cache, each change schedules its own
+task.
+"""
+
+
+from collections import OrderedDict
+from logging import getLogger
+
+from django.core.cache import cache
+
+log = getLogger(__name__)
+
+# Number of seconds for which the recorded changes are kept; long enough for
+# their task to run even when the grading queue is backed up.
+PENDING_UPDATES_TIMEOUT_SECONDS = 60 * 60
+
+
+class PendingSubsectionUpdates(object):
+    """
+    The pending score changes of a user in a course, each as the keyword
+    arguments of a recalculate_subsection_grade_v3 task.
+
+    The changes are numbered by an atomically incremented counter, so that
+    concurrent processes never overwrite each other's changes.
+    """
+    def __init__(self, user_id, course_id):
+        self.user_id = user_id
+        self.course_id = course_id
+        self._key_prefix = u'grades.pending_subsection_updates.{}.{}'.format(user_id, course_id)
+
+    def add(self, update_kwargs):
+        """
+        Records the given score change.
+
+        Returns the number of the change if a task should be scheduled to
+        update the subsection grades from it and the changes recorded after
+        it, or None if an already scheduled task will.
+        """
+        cache.add(self._counter_key, 0, PENDING_UPDATES_TIMEOUT_SECONDS)
+        try:
+            number = cache.incr(self._counter_key)
+        except ValueError:
+            # The counter was evicted since it was added.
+            cache.set(self._counter_key, 1, PENDING_UPDATES_TIMEOUT_SECONDS)
+            number = 1
+        cache.set(self._update_key(number), update_kwargs, PENDING_UPDATES_TIMEOUT_SECONDS)
+
+        # Added after the change, so that the scheduled task is sure to
+        # find it.
+        if cache.add(self._scheduled_key, number, PENDING_UPDATES_TIMEOUT_SECONDS):
+            return number
+        return None
+
+    def pop(self, number):
+        """
+        Removes the change of the given number, which its task was given, and
+        removes and returns the changes recorded after it, in order.
+
+        Changes recorded from now on schedule a new task.  A change recorded
+        concurrently may be returned both here and to the new task, but none
+        is missed.
+        """
+        cache.delete(self._scheduled_key)
+        last_number = cache.get(self._counter_key) or 0
+        keys = [self._update_key(later_number) for later_number in range(number + 1, last_number + 1)]
+        updates = cache.get_many(keys)
+        cache.delete_many([self._update_key(number)] + keys)
+        if len(updates) < len(keys):
+            log.info(
+                u'Grades: %d of the pending subsection updates of user %s in course %s were not found.',
+                len(keys) - len(updates), self.user_id, self.course_id,
+            )
+        return [updates[key] for key in keys if key in updates]
+
+    @property
+    def _counter_key(self):
+        return self._key_prefix + u'.counter'
+
+    @property
+    def _scheduled_key(self):
+        return self._key_prefix + u'.scheduled'
+
+    def _update_key(self, number):
+        return u'{}.{}'.format(self._key_prefix, number)
+
+
+def coalesce_updates(updates):
+    """
+    Returns the given score changes, as keyword arguments of
+    recalculate_subsection_grade_v3 tasks, with a single change per block.
+
+    A block's change is its latest, with the event metadata and expected
+    modification time of that change.  It only updates grades if higher if
+    all the block's changes did, and forces the update of subsections if any
+    did.
+    """
+    coalesced = OrderedDict()
+    for update in updates:
+        previous = coalesced.pop(update['usage_id'], None)
+        if previous is not None:
+            update = dict(
+                update,
+                only_if_higher=bool(previous['only_if_higher'] and update['only_if_higher']),
+                force_update_subsections=bool(
+                    previous.get('force_update_subsections') or update.get('force_update_subsections')
+                ),
+            )
+        # Re-inserted, so that the blocks are ordered by their latest change.
+        coalesced[update['usage_id']] = update
+    return list(coalesced.values())
@@ -0,0 +1,98 @@
+"""
+Measurements of the cost of grading operations, recorded as machine-readable
+results that can be compared with those of a previous run.
+"""
+
+
+import json
+import tracemalloc
+from contextlib import contextmanager
+from timeit import default_timer
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from edx_django_utils.cache import RequestCache
+
+
+class GradesBenchmark(object):
+    """
+    Records the wall time, the number of database queries and the peak
+    memory allocated by each measured grading operation.
+
+    The times include the overhead of tracing the memory allocations, which
+    is the same in all runs.
+    """
+    def __init__(self, spec):
+        self.spec = spec
+        self.results = []
+
+    @contextmanager
+    def measure(self, operation, num_users):
+        """
+        Measures the body of the context, as the given operation on the
+        given number of users.  The request cache is cleared beforehand, so
+        that each operation starts cold.
+        """
+        RequestCache.clear_all_namespaces()
+        tracemalloc.start()
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                start = default_timer()
+                yield
+                seconds = default_timer() - start
+            _, peak_memory = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.results.append({
+            'operation': operation,
+            'users': num_users,
+            'seconds': seconds,
+            'seconds_per_user': seconds / num_users if num_users else None,
+            'queries': len(queries),
+            'queries_per_user': float(len(queries)) / num_users if num_users else None,
+            'peak_memory_bytes': peak_memory,
+        })
+
+    def to_json(self):
+        """
+        Returns the spec and the results of the benchmark as a JSON string.
+        """
+        return json.dumps({'spec': self.spec._asdict(), 'results': self.results}, indent=2, sort_keys=True)
+
+    def write(self, path):
+        """
+        Writes the spec and the results of the benchmark to the given path.
+        """
+        with open(path, 'w') as results_file:
+            results_file.write(self.to_json())
+
+    def find_regressions(self, baseline, time_tolerance=0.25):
+        """
+        Returns messages describing the operations that made more queries,
+        or took more than time_tolerance longer, than in the given baseline,
+        the JSON results of a previous run of the benchmark with the same
+        spec.
+
+        Raises:
+            ValueError if the baseline was run with another spec.
+        """
+        baseline = json.loads(baseline)
+        if baseline['spec'] != self.spec._asdict():
+            raise ValueError(u'The baseline was run with another synthetic course.')
+
+        baseline_results = {result['operation']: result for result in baseline['results']}
+        regressions = []
+        for result in self.results:
+            baseline_result = baseline_results.get(result['operation'])
+            if baseline_result is None:
+                continue
+            if result['queries'] > baseline_result['queries']:
+                regressions.append(u'{operation} made {queries} queries, instead of {baseline}.'.format(
+                    operation=result['operation'], queries=result['queries'], baseline=baseline_result['queries'],
+                ))
+            if result['seconds'] > baseline_result['seconds'] * (1 + time_tolerance):
+                regressions.append(u'{operation} took {seconds:.3f}s, instead of {baseline:.3f}s.'.format(
+                    operation=result['operation'], seconds=result['seconds'], baseline=baseline_result['seconds'],
+                ))
+        return regressions
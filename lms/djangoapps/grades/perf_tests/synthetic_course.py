@@ -0,0 +1,183 @@
+"""
+Synthetic courses and learners, of configurable size, for benchmarking the
+computation of grades.
+
+The learners, their enrollments and their scores are bulk created in the
+database, without the signals sent when learners enroll or are scored, so
+that large courses can be generated quickly.
+"""
+
+
+import random
+from collections import OrderedDict, namedtuple
+
+from django.contrib.auth import get_user_model
+
+from capa.tests.response_xml_factory import MultipleChoiceResponseXMLFactory
+from common.djangoapps.student.models import CourseEnrollment, UserProfile
+from lms.djangoapps.courseware.models import StudentModule
+from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+
+# Fields of a SyntheticCourseSpec, with their default values.
+SPEC_DEFAULTS = OrderedDict([
+    ('chapters', 4),
+    ('subsections_per_chapter', 4),
+    ('problems_per_subsection', 5),
+    ('learners', 100),
+    # Probability that a learner has a score on a problem.
+    ('score_density', 0.5),
+    # Number of the lowest homework scores dropped.
+    ('drop_count', 2),
+    ('seed', 0),
+])
+
+# Number of rows created per query.
+BULK_CREATE_BATCH_SIZE = 1000
+
+
+class SyntheticCourseSpec(namedtuple('SyntheticCourseSpec', list(SPEC_DEFAULTS))):
+    """
+    The size of a synthetic course and of its learners.
+
+    The last subsection of each chapter is an exam, and the other
+    subsections are homework.  Each subsection has a single vertical with
+    the problems of the subsection.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_dict(cls, values):
+        """
+        Returns the spec with the given values, and the default values of
+        the other fields.
+
+        Raises:
+            ValueError if a value is given for an unknown field.
+        """
+        unknown_fields = set(values) - set(cls._fields)
+        if unknown_fields:
+            raise ValueError(u'Unknown synthetic course fields: {}'.format(u', '.join(sorted(unknown_fields))))
+        return cls(**dict(SPEC_DEFAULTS, **values))
+
+    @property
+    def num_homeworks(self):
+        """
+        Returns the number of homework subsections of the course.
+        """
+        if self.subsections_per_chapter < 2:
+            return self.chapters * self.subsections_per_chapter
+        return self.chapters * (self.subsections_per_chapter - 1)
+
+    @property
+    def num_exams(self):
+        """
+        Returns the number of exam subsections of the course.
+        """
+        return self.chapters * self.subsections_per_chapter - self.num_homeworks
+
+
+def create_synthetic_course(store, spec, user_id):
+    """
+    Creates the course of the given spec in the given modulestore.
+
+    Returns the course, reloaded from the modulestore, and the list of the
+    usage keys of its problems.
+    """
+    problem_xml = MultipleChoiceResponseXMLFactory().build_xml(
+        question_text='The correct answer is Choice 2',
+        choices=[False, True, False],
+        choice_names=['choice_0', 'choice_1', 'choice_2'],
+    )
+    course = CourseFactory.create(display_name=u'Synthetic Course')
+    problem_keys = []
+    with store.bulk_operations(course.id):
+        for chapter_index in range(spec.chapters):
+            chapter = ItemFactory.create(
+                parent=course, category='chapter', display_name=u'Chapter {}'.format(chapter_index),
+            )
+            for subsection_index in range(spec.subsections_per_chapter):
+                is_exam = spec.subsections_per_chapter > 1 and subsection_index == spec.subsections_per_chapter - 1
+                subsection = ItemFactory.create(
+                    parent=chapter,
+                    category='sequential',
+                    display_name=u'Subsection {}.{}'.format(chapter_index, subsection_index),
+                    graded=True,
+                    format='Exam' if is_exam else 'Homework',
+                )
+                vertical = ItemFactory.create(parent=subsection, category='vertical')
+                for problem_index in range(spec.problems_per_subsection):
+                    problem = ItemFactory.create(
+                        parent=vertical,
+                        category='problem',
+                        display_name=u'Problem {}'.format(problem_index),
+                        data=problem_xml,
+                    )
+                    problem_keys.append(problem.location)
+
+        grader = [{
+            'type': 'Homework',
+            'min_count': spec.num_homeworks,
+            'drop_count': spec.drop_count,
+            'short_label': 'HW',
+            'weight': 0.6 if spec.num_exams else 1.0,
+        }]
+        if spec.num_exams:
+            grader.append({'type': 'Exam', 'min_count': spec.num_exams, 'drop_count': 0, 'weight': 0.4})
+        course.set_grading_policy({'GRADER': grader, 'GRADE_CUTOFFS': {'A': 0.8, 'B': 0.6, 'C': 0.4}})
+        store.update_item(course, user_id)
+
+    CourseOverview.get_from_id(course.id)
+    return store.get_course(course.id), problem_keys
+
+
+def create_synthetic_learners(course_key, problem_keys, spec):
+    """
+    Creates the learners of the given spec, enrolled in the given course,
+    with a score on each of the given problems with the spec's density.
+
+    Returns the list of the learners, ordered by id.
+    """
+    user_model = get_user_model()
+    username_prefix = u'synthetic_learner_{}_'.format(spec.seed)
+    user_model.objects.bulk_create(
+        [
+            user_model(
+                username=u'{}{}'.format(username_prefix, index),
+                email=u'{}{}@example.com'.format(username_prefix, index),
+            )
+            for index in range(spec.learners)
+        ],
+        batch_size=BULK_CREATE_BATCH_SIZE,
+    )
+    # Not all databases return the ids of bulk created rows.
+    learners = list(user_model.objects.filter(username__startswith=username_prefix).order_by('id'))
+
+    UserProfile.objects.bulk_create(
+        [UserProfile(user=learner, name=learner.username) for learner in learners],
+        batch_size=BULK_CREATE_BATCH_SIZE,
+    )
+    CourseEnrollment.objects.bulk_create(
+        [CourseEnrollment(user=learner, course_id=course_key, mode='audit', is_active=True) for learner in learners],
+        batch_size=BULK_CREATE_BATCH_SIZE,
+    )
+
+    rng = random.Random(spec.seed)
+    StudentModule.objects.bulk_create(
+        (
+            StudentModule(
+                student=learner,
+                course_id=course_key,
+                module_state_key=problem_key,
+                module_type='problem',
+                state='{}',
+                grade=float(rng.randint(0, 1)),
+                max_grade=1.0,
+            )
+            for learner in learners
+            for problem_key in problem_keys
+            if rng.random() < spec.score_density
+        ),
+        batch_size=BULK_CREATE_BATCH_SIZE,
+    )
+    return learners
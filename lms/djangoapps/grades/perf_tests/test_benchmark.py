@@ -0,0 +1,53 @@
+"""
+Tests for the GradesBenchmark.
+"""
+
+
+import json
+
+from django.test import TestCase
+
+from common.djangoapps.student.tests.factories import UserFactory
+
+from .benchmark import GradesBenchmark
+from .synthetic_course import SyntheticCourseSpec
+
+
+class GradesBenchmarkTest(TestCase):
+    """
+    Tests the measurements of the GradesBenchmark and their comparison.
+    """
+    def setUp(self):
+        super(GradesBenchmarkTest, self).setUp()
+        self.spec = SyntheticCourseSpec.from_dict({'learners': 2})
+
+    def _run_benchmark(self, num_users):
+        """
+        Returns a benchmark of the creation of the given number of users.
+        """
+        benchmark = GradesBenchmark(self.spec)
+        with benchmark.measure('create users', num_users):
+            for _ in range(num_users):
+                UserFactory.create()
+        return benchmark
+
+    def test_measure(self):
+        benchmark = self._run_benchmark(2)
+        result, = json.loads(benchmark.to_json())['results']
+        self.assertEqual(result['operation'], 'create users')
+        self.assertEqual(result['users'], 2)
+        self.assertGreater(result['queries'], 0)
+        self.assertEqual(result['queries_per_user'], result['queries'] / 2.0)
+        self.assertGreater(result['peak_memory_bytes'], 0)
+
+    def test_find_regressions(self):
+        baseline = self._run_benchmark(1).to_json()
+        self.assertEqual(self._run_benchmark(1).find_regressions(baseline, time_tolerance=1000), [])
+
+        regressions = self._run_benchmark(2).find_regressions(baseline, time_tolerance=1000)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn(u'create users made', regressions[0])
+
+    def test_unknown_spec_field(self):
+        with self.assertRaises(ValueError):
+            SyntheticCourseSpec.from_dict({'students': 2})
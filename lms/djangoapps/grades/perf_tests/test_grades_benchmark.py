@@ -0,0 +1,117 @@
+"""
+Benchmark of the computation of grades on a synthetic course.
+
+The benchmark only runs when the path of its results file is set, e.g.:
+
+    GRADES_BENCHMARK_RESULTS=grades_benchmark.json \\
+    GRADES_BENCHMARK_SPEC='{"learners": 1000, "score_density": 0.8}' \\
+    pytest lms/djangoapps/grades/perf_tests/test_grades_benchmark.py
+
+GRADES_BENCHMARK_SPEC overrides the fields of the default SyntheticCourseSpec.
+When GRADES_BENCHMARK_BASELINE is set to the results file of a previous run
+with the same spec, the benchmark fails if an operation made more queries,
+or took GRADES_BENCHMARK_TIME_TOLERANCE (0.25 by default) longer, than in that
+run.
+"""
+
+
+import json
+import os
+import unittest
+
+from django.urls import reverse
+from edx_toggles.toggles.testutils import override_waffle_flag
+from mock import patch
+
+from common.djangoapps.student.tests.factories import UserFactory
+from lms.djangoapps.instructor_task.tasks_helper.grades import CourseGradeReport
+from lms.djangoapps.instructor_task.tests.test_base import TestReportMixin
+from xmodule.modulestore.tests.django_utils import SharedModuleStoreTestCase
+
+from ..config.models import PersistentGradesEnabledFlag
+from ..config.waffle import WRITABLE_GRADEBOOK, waffle_flags
+from ..context import graded_subsections_for_course
+from ..course_grade_factory import CourseGradeFactory
+from ..subsection_grade_factory import SubsectionGradeFactory
+from .benchmark import GradesBenchmark
+from .synthetic_course import SyntheticCourseSpec, create_synthetic_course, create_synthetic_learners
+
+RESULTS_PATH = os.environ.get('GRADES_BENCHMARK_RESULTS')
+
+
+@unittest.skipUnless(RESULTS_PATH, 'GRADES_BENCHMARK_RESULTS is not set.')
+class GradesBenchmarkTest(TestReportMixin, SharedModuleStoreTestCase):
+    """
+    Times the grading operations on the learners of a synthetic course.
+    """
+    # Use this attribute to skip this test on regular unittest CI runs.
+    perf_test = True
+
+    @classmethod
+    def setUpClass(cls):
+        super(GradesBenchmarkTest, cls).setUpClass()
+        cls.spec = SyntheticCourseSpec.from_dict(json.loads(os.environ.get('GRADES_BENCHMARK_SPEC') or '{}'))
+        cls.staff = UserFactory.create(is_staff=True)
+        cls.course, cls.problem_keys = create_synthetic_course(cls.store, cls.spec, cls.staff.id)
+
+    def setUp(self):
+        super(GradesBenchmarkTest, self).setUp()
+        PersistentGradesEnabledFlag.objects.create(enabled=True, enabled_for_all_courses=True)
+        self.learners = create_synthetic_learners(self.course.id, self.problem_keys, self.spec)
+        self.benchmark = GradesBenchmark(self.spec)
+
+    @patch('lms.djangoapps.instructor_task.tasks_helper.runner._get_current_task')
+    def test_grading(self, _get_current_task):
+        num_learners = len(self.learners)
+
+        # Computes and persists the subsection grades.
+        with self.benchmark.measure('SubsectionGradeFactory.create', num_learners):
+            for learner in self.learners:
+                subsection_grade_factory = SubsectionGradeFactory(learner, course=self.course)
+                for subsection in graded_subsections_for_course(subsection_grade_factory.course_data.structure):
+                    subsection_grade_factory.create(subsection)
+
+        with self.benchmark.measure('CourseGradeFactory.update', num_learners):
+            for learner in self.learners:
+                CourseGradeFactory().update(learner, self.course)
+
+        with self.benchmark.measure('CourseGradeFactory.read', num_learners):
+            for learner in self.learners:
+                CourseGradeFactory().read(learner, self.course)
+
+        with self.benchmark.measure('CourseGradeFactory.iter', num_learners):
+            for _, course_grade, error in CourseGradeFactory().iter(self.learners, course=self.course):
+                self.assertIsNotNone(course_grade, error)
+
+        with self.benchmark.measure('CourseGradeFactory.update forced', num_learners):
+            for learner in self.learners:
+                CourseGradeFactory().update(learner, self.course, force_update_subsections=True)
+
+        with self.benchmark.measure('CourseGradeReport.generate', num_learners):
+            result = CourseGradeReport.generate(None, None, self.course.id, {}, 'graded')
+        self.assertDictContainsSubset({'succeeded': num_learners, 'failed': 0}, result)
+
+        self.client.login(username=self.staff.username, password='test')
+        with override_waffle_flag(waffle_flags()[WRITABLE_GRADEBOOK], active=True):
+            with self.benchmark.measure('Gradebook API', num_learners):
+                url = reverse('grades_api:v1:course_gradebook', kwargs={'course_id': self.course.id})
+                while url:
+                    response = self.client.get(url)
+                    self.assertEqual(response.status_code, 200)
+                    url = response.data['next']
+
+        self.benchmark.write(RESULTS_PATH)
+        self._assert_no_regressions()
+
+    def _assert_no_regressions(self):
+        """
+        Asserts that no operation regressed since the baseline run, if any.
+        """
+        baseline_path = os.environ.get('GRADES_BENCHMARK_BASELINE')
+        if not baseline_path:
+            return
+        with open(baseline_path) as baseline_file:
+            baseline = baseline_file.read()
+        time_tolerance = float(os.environ.get('GRADES_BENCHMARK_TIME_TOLERANCE') or 0.25)
+        regressions = self.benchmark.find_regressions(baseline, time_tolerance)
+        self.assertFalse(regressions, u'\n'.join(regressions))
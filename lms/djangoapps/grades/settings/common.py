@@ -4,3 +4,10 @@ def plugin_settings(settings):
 
     # Queue to use for updating grades due to grading policy change
     settings.POLICY_CHANGE_GRADES_ROUTING_KEY = settings.DEFAULT_PRIORITY_QUEUE
+
+    # Storage of the snapshots of the persisted subsection grades of courses
+    settings.GRADES_SNAPSHOT_SETTINGS = {
+        'STORAGE_CLASS': None,
+        'STORAGE_KWARGS': {},
+        'DIRECTORY_PREFIX': 'grades_snapshots/',
+    }
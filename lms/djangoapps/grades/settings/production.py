@@ -12,3 +12,8 @@ def plugin_settings(settings):
     settings.POLICY_CHANGE_GRADES_ROUTING_KEY = settings.ENV_TOKENS.get(
         'POLICY_CHANGE_GRADES_ROUTING_KEY', settings.DEFAULT_PRIORITY_QUEUE,
     )
+
+    # Storage of the snapshots of the persisted subsection grades of courses
+    settings.GRADES_SNAPSHOT_SETTINGS = settings.ENV_TOKENS.get(
+        'GRADES_SNAPSHOT_SETTINGS', settings.GRADES_SNAPSHOT_SETTINGS,
+    )
@@ -7,7 +7,10 @@ from contextlib import contextmanager
 from logging import getLogger
 
 import six
+from django.conf import settings
+from django.db.models.signals import post_delete
 from django.dispatch import receiver
+from django.utils.timezone import now
 from opaque_keys.edx.keys import LearningContextKey
 from submissions.models import score_reset, score_set
 from xblock.scorable import ScorableXBlockMixin, Score
@@ -23,9 +26,14 @@ from common.djangoapps.util.date_utils import to_timestamp
 from .. import events
 from ..constants import ScoreDatabaseTableEnum
 from ..course_grade_factory import CourseGradeFactory
+from ..models import PersistentSubsectionGrade, PersistentSubsectionGradeOverride
+from ..pending_updates import PendingSubsectionUpdates
 from ..scores import weighted_score
+from ..snapshot import drop_subsection_grade_from_snapshot
 from lms.djangoapps.grades.tasks import (
+    COALESCED_RECALCULATE_GRADE_DELAY_SECONDS,
     RECALCULATE_GRADE_DELAY_SECONDS,
+    recalculate_coalesced_subsection_grades,
     recalculate_course_and_subsection_grades_for_user,
     recalculate_subsection_grade_v3
 )
@@ -224,31 +232,59 @@ def enqueue_subsection_update(sender, **kwargs):  # pylint: disable=unused-argum
     context_key = LearningContextKey.from_string(kwargs['course_id'])
     if not context_key.is_course:
         return  # If it's not a course, it has no subsections, so skip the subsection grading update
+    update_kwargs = dict(
+        user_id=kwargs['user_id'],
+        anonymous_user_id=kwargs.get('anonymous_user_id'),
+        course_id=kwargs['course_id'],
+        usage_id=kwargs['usage_id'],
+        only_if_higher=kwargs.get('only_if_higher'),
+        expected_modified_time=to_timestamp(kwargs['modified']),
+        score_deleted=kwargs.get('score_deleted', False),
+        event_transaction_id=six.text_type(get_event_transaction_id()),
+        event_transaction_type=six.text_type(get_event_transaction_type()),
+        score_db_table=kwargs['score_db_table'],
+        force_update_subsections=kwargs.get('force_update_subsections', False),
+    )
+    if settings.FEATURES.get('COALESCE_SUBSECTION_GRADE_UPDATES'):
+        update_number = PendingSubsectionUpdates(kwargs['user_id'], kwargs['course_id']).add(update_kwargs)
+        if update_number is not None:
+            recalculate_coalesced_subsection_grades.apply_async(
+                kwargs=dict(update=update_kwargs, update_number=update_number),
+                countdown=COALESCED_RECALCULATE_GRADE_DELAY_SECONDS,
+            )
+        return
     recalculate_subsection_grade_v3.apply_async(
-        kwargs=dict(
-            user_id=kwargs['user_id'],
-            anonymous_user_id=kwargs.get('anonymous_user_id'),
-            course_id=kwargs['course_id'],
-            usage_id=kwargs['usage_id'],
-            only_if_higher=kwargs.get('only_if_higher'),
-            expected_modified_time=to_timestamp(kwargs['modified']),
-            score_deleted=kwargs.get('score_deleted', False),
-            event_transaction_id=six.text_type(get_event_transaction_id()),
-            event_transaction_type=six.text_type(get_event_transaction_type()),
-            score_db_table=kwargs['score_db_table'],
-            force_update_subsections=kwargs.get('force_update_subsections', False),
-        ),
+        kwargs=update_kwargs,
         countdown=RECALCULATE_GRADE_DELAY_SECONDS,
     )
 
 
+@receiver(post_delete, sender=PersistentSubsectionGradeOverride)
+def subsection_grade_override_deleted_handler(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Drops the grade of a deleted override from the stored snapshot of the
+    subsection grades of its course, and marks the grade as modified so that
+    the next refresh of the snapshot reads it again, without the override.
+    """
+    grades = PersistentSubsectionGrade.objects.filter(id=instance.grade_id)
+    grade = grades.values('user_id', 'course_id', 'usage_key').first()
+    if grade is None:
+        return
+    grades.update(modified=now())
+    drop_subsection_grade_from_snapshot(grade['course_id'], grade['user_id'], grade['usage_key'])
+
+
 @receiver(SUBSECTION_SCORE_CHANGED)
-def recalculate_course_grade_only(sender, course, course_structure, user, **kwargs):  # pylint: disable=unused-argument
+def recalculate_course_grade_only(
+        sender, course, course_structure, user, subsection_grade, **kwargs
+):  # pylint: disable=unused-argument
     """
     Updates a saved course grade, but does not update the subsection
     grades the user has in this course.
     """
-    CourseGradeFactory().update(user, course=course, course_structure=course_structure)
+    CourseGradeFactory().update_from_subsection_grade(
+        user, subsection_grade, course=course, course_structure=course_structure,
+    )
 
 
 @receiver(ENROLLMENT_TRACK_UPDATED)
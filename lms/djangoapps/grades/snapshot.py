@@ -0,0 +1,400 @@
+"""
+Columnar snapshots of the persisted subsection grades of a course.
+
+Reading persisted subsection grades through PersistentSubsectionGrade creates
+a model instance, and loads the VisibleBlocks, of every grade.  Analytics
+reads, such as paging through the grades of all the learners of a course, only
+need a few values of each grade, so a SubsectionGradesSnapshot holds them in
+numpy arrays instead: the user, the subsection, the earned and possible points,
+with any override applied, and the time of the first attempt.
+
+Snapshots are stored per course, and refreshed incrementally: a refresh only
+reads the grades, and overrides, modified since the snapshot was last
+refreshed.  Deleted grades are only dropped when a snapshot is rebuilt, but a
+grade whose override is deleted is dropped from the stored snapshot at once,
+and read again by its next refresh.
+"""
+
+
+import datetime
+import logging
+import os
+from io import BytesIO
+
+import numpy as np
+import pytz
+import six
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models import Q
+from django.utils.timezone import make_naive
+from opaque_keys.edx.keys import CourseKey, UsageKey
+
+from openedx.core.storage import get_storage
+
+from .models import PersistentSubsectionGrade
+
+log = logging.getLogger(__name__)
+
+# Grades modified less than this long before the latest modification seen by a
+# snapshot are read again by its next refresh, in case they were committed
+# after the snapshot was refreshed.
+REFRESH_OVERLAP = datetime.timedelta(minutes=10)
+
+# Number of grades fetched from the database at a time.
+QUERY_CHUNK_SIZE = 10000
+
+_GRADE_FIELDS = (
+    'user_id',
+    'usage_key',
+    'earned_all',
+    'possible_all',
+    'earned_graded',
+    'possible_graded',
+    'first_attempted',
+    'modified',
+    'override__earned_all_override',
+    'override__possible_all_override',
+    'override__earned_graded_override',
+    'override__possible_graded_override',
+    'override__modified',
+)
+
+
+class SubsectionGradesSnapshot(object):
+    """
+    The persisted subsection grades of a course, as arrays sorted by user id
+    and subsection.
+
+    Attributes:
+        course_key: The course of the grades.
+        subsections: The list of the usage keys of the graded subsections,
+            which `subsection_indices` index.
+        modified: The latest modification time of the grades, or None if
+            there are none.
+        user_ids, subsection_indices: int64 arrays of the user and subsection
+            of each grade.
+        earned_all, possible_all, earned_graded, possible_graded: float64
+            arrays of the points of each grade, overrides applied.
+        first_attempted: datetime64[us] array of the UTC time of the first
+            attempt of each grade, NaT if there was none.
+    """
+    ARRAYS = (
+        'user_ids',
+        'subsection_indices',
+        'earned_all',
+        'possible_all',
+        'earned_graded',
+        'possible_graded',
+        'first_attempted',
+    )
+
+    def __init__(self, course_key, subsections, modified, **arrays):
+        self.course_key = course_key
+        self.subsections = subsections
+        self.modified = modified
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    @classmethod
+    def read(cls, course_key, modified_since=None):
+        """
+        Returns a snapshot of the persisted subsection grades of the given
+        course, or only of those modified, or whose override was modified,
+        since the given time.
+        """
+        grades = PersistentSubsectionGrade.objects.filter(course_id=course_key)
+        if modified_since is not None:
+            grades = grades.filter(Q(modified__gte=modified_since) | Q(override__modified__gte=modified_since))
+
+        subsections, subsection_index_of = [], {}
+        columns = [[] for _ in cls.ARRAYS]
+        modified = None
+        for row in grades.values_list(*_GRADE_FIELDS).iterator(chunk_size=QUERY_CHUNK_SIZE):
+            (
+                user_id, usage_key, earned_all, possible_all, earned_graded, possible_graded,
+                first_attempted, grade_modified, earned_all_override, possible_all_override,
+                earned_graded_override, possible_graded_override, override_modified,
+            ) = row
+            if usage_key.run is None:
+                # pylint: disable=unexpected-keyword-arg,no-value-for-parameter
+                usage_key = usage_key.replace(course_key=course_key)
+            subsection_index = subsection_index_of.get(usage_key)
+            if subsection_index is None:
+                subsection_index = subsection_index_of[usage_key] = len(subsections)
+                subsections.append(usage_key)
+
+            for column, value in zip(columns, (
+                    user_id,
+                    subsection_index,
+                    _overridden(earned_all, earned_all_override),
+                    _overridden(possible_all, possible_all_override),
+                    _overridden(earned_graded, earned_graded_override),
+                    _overridden(possible_graded, possible_graded_override),
+                    _naive_utc(first_attempted),
+            )):
+                column.append(value)
+            modified = max(dt for dt in (modified, grade_modified, override_modified) if dt is not None)
+
+        dtypes = (np.int64, np.int64, np.float64, np.float64, np.float64, np.float64, 'datetime64[us]')
+        arrays = {
+            name: np.array(column, dtype=dtype)
+            for name, column, dtype in zip(cls.ARRAYS, columns, dtypes)
+        }
+        return cls(course_key, subsections, modified, **arrays)._sorted()
+
+    def updated(self, other):
+        """
+        Returns a snapshot of the grades of this snapshot, updated with those
+        of the given snapshot.
+        """
+        subsections = list(self.subsections)
+        subsection_index_of = {subsection: index for index, subsection in enumerate(subsections)}
+        remapped_indices = []
+        for subsection in other.subsections:
+            if subsection not in subsection_index_of:
+                subsection_index_of[subsection] = len(subsections)
+                subsections.append(subsection)
+            remapped_indices.append(subsection_index_of[subsection])
+        other_subsection_indices = np.array(remapped_indices, dtype=np.int64)[other.subsection_indices]
+
+        # Keep the grades that aren't in the other snapshot.
+        num_subsections = max(len(subsections), 1)
+        keep = np.isin(
+            self.user_ids * num_subsections + self.subsection_indices,
+            other.user_ids * num_subsections + other_subsection_indices,
+            invert=True,
+        )
+        arrays = {
+            name: np.concatenate([
+                getattr(self, name)[keep],
+                other_subsection_indices if name == 'subsection_indices' else getattr(other, name),
+            ])
+            for name in self.ARRAYS
+        }
+        modified = max([dt for dt in (self.modified, other.modified) if dt is not None] or [None])
+        return SubsectionGradesSnapshot(self.course_key, subsections, modified, **arrays)._sorted()
+
+    def for_users(self, user_ids):
+        """
+        Returns a snapshot of the grades of the given users.
+        """
+        return self._subset(np.isin(self.user_ids, np.asarray(user_ids, dtype=np.int64)))
+
+    def without_grade(self, user_id, subsection):
+        """
+        Returns a snapshot of the grades of this snapshot but the grade of the
+        given user in the given subsection.
+        """
+        if subsection not in self.subsections:
+            return self
+        dropped = (self.user_ids == user_id) & (self.subsection_indices == self.subsections.index(subsection))
+        return self._subset(~dropped)
+
+    def iter_pages(self, users_per_page):
+        """
+        Yields snapshots of the grades of the users, in pages of up to
+        `users_per_page` users, in order of user id.  The pages' arrays are
+        views of this snapshot's arrays.
+        """
+        user_ids = np.unique(self.user_ids)
+        for page_start in range(0, len(user_ids), users_per_page):
+            page_user_ids = user_ids[page_start:page_start + users_per_page]
+            start = np.searchsorted(self.user_ids, page_user_ids[0], side='left')
+            end = np.searchsorted(self.user_ids, page_user_ids[-1], side='right')
+            yield self._subset(slice(start, end))
+
+    def to_matrix(self, name, user_ids):
+        """
+        Returns a float64 array of the given points of the grades of the given
+        users, with a row per user and a column per subsection, and NaN where
+        the user has no grade.
+        """
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        matrix = np.full((len(user_ids), len(self.subsections)), np.nan)
+        if not len(user_ids) or not len(self):
+            return matrix
+        order = np.argsort(user_ids, kind='stable')
+        sorted_user_ids = user_ids[order]
+        positions = np.minimum(np.searchsorted(sorted_user_ids, self.user_ids), len(user_ids) - 1)
+        found = sorted_user_ids[positions] == self.user_ids
+        matrix[order[positions[found]], self.subsection_indices[found]] = getattr(self, name)[found]
+        return matrix
+
+    def equals(self, other):
+        """
+        Returns whether this snapshot holds the same grades as the given one.
+        """
+        if len(self) != len(other) or self.modified != other.modified:
+            return False
+        if self.subsections != other.subsections:
+            return False
+        return all(
+            np.array_equal(getattr(self, name).view(np.int64), getattr(other, name).view(np.int64))
+            if name == 'first_attempted' else np.array_equal(getattr(self, name), getattr(other, name))
+            for name in self.ARRAYS
+        )
+
+    def to_bytes(self):
+        """
+        Returns the snapshot serialized as a compressed numpy archive.
+        """
+        buff = BytesIO()
+        np.savez_compressed(
+            buff,
+            course_key=np.array(six.text_type(self.course_key)),
+            subsections=np.array([six.text_type(subsection) for subsection in self.subsections], dtype=np.unicode_),
+            modified=np.array(_naive_utc(self.modified), dtype='datetime64[us]'),
+            **{name: getattr(self, name) for name in self.ARRAYS}
+        )
+        return buff.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Returns the snapshot deserialized from the given bytes.
+        """
+        archive = np.load(BytesIO(data), allow_pickle=False)
+        modified = archive['modified'][()]
+        course_key = CourseKey.from_string(six.text_type(archive['course_key']))
+        return cls(
+            course_key,
+            # Deprecated usage keys lose the run of their course in strings.
+            [UsageKey.from_string(subsection).map_into_course(course_key) for subsection in archive['subsections']],
+            None if np.isnat(modified) else modified.item().replace(tzinfo=pytz.utc),
+            **{name: archive[name] for name in cls.ARRAYS}
+        )
+
+    def _sorted(self):
+        """
+        Returns this snapshot with its grades sorted by user id and subsection.
+        """
+        return self._subset(np.lexsort((self.subsection_indices, self.user_ids)))
+
+    def _subset(self, index):
+        """
+        Returns a snapshot of the grades selected by the given numpy index.
+        """
+        return SubsectionGradesSnapshot(
+            self.course_key,
+            self.subsections,
+            self.modified,
+            **{name: getattr(self, name)[index] for name in self.ARRAYS}
+        )
+
+
+def get_subsection_grades_snapshot(course_key, refresh=True):
+    """
+    Returns the SubsectionGradesSnapshot of the given course.  It's built if
+    the course has none yet, and otherwise refreshed with the grades modified
+    since it was stored, unless `refresh` is False.
+    """
+    snapshot = _load_snapshot(course_key)
+    if snapshot is None:
+        return rebuild_subsection_grades_snapshot(course_key)
+    if refresh:
+        modified_since = snapshot.modified - REFRESH_OVERLAP if snapshot.modified is not None else None
+        updated_snapshot = snapshot.updated(SubsectionGradesSnapshot.read(course_key, modified_since))
+        if not updated_snapshot.equals(snapshot):
+            _save_snapshot(updated_snapshot)
+        snapshot = updated_snapshot
+    return snapshot
+
+
+def rebuild_subsection_grades_snapshot(course_key):
+    """
+    Reads all the persisted subsection grades of the given course into a new
+    snapshot, which is stored and returned.
+    """
+    snapshot = SubsectionGradesSnapshot.read(course_key)
+    _save_snapshot(snapshot)
+    log.info(u'Grades: Rebuilt the snapshot of %d subsection grades of course %s', len(snapshot), course_key)
+    return snapshot
+
+
+def drop_subsection_grade_from_snapshot(course_key, user_id, subsection):
+    """
+    Drops the grade of the given user in the given subsection from the stored
+    snapshot of the given course, if there is one.
+    """
+    snapshot = _load_snapshot(course_key)
+    if snapshot is None:
+        return
+    updated_snapshot = snapshot.without_grade(user_id, subsection)
+    if len(updated_snapshot) != len(snapshot):
+        _save_snapshot(updated_snapshot)
+
+
+def _load_snapshot(course_key):
+    """
+    Returns the stored snapshot of the given course, or None if there is none.
+    """
+    storage, path = _snapshot_storage(), _snapshot_path(course_key)
+    if not storage.exists(path):
+        return None
+    with storage.open(path, 'rb') as snapshot_file:
+        return SubsectionGradesSnapshot.from_bytes(snapshot_file.read())
+
+
+def _save_snapshot(snapshot):
+    """
+    Stores the given snapshot, replacing the stored snapshot of its course.
+    """
+    storage, path = _snapshot_storage(), _snapshot_path(snapshot.course_key)
+    content = ContentFile(snapshot.to_bytes())
+    try:
+        local_path = storage.path(path)
+    except NotImplementedError:
+        local_path = None
+
+    if local_path is not None:
+        # Write the snapshot under a temporary name and rename it over the
+        # stored one, so that readers never see a partial or missing snapshot.
+        temp_path = storage.save(path + u'.tmp', content)
+        os.rename(storage.path(temp_path), local_path)
+    else:
+        # Remote storages replace an overwritten file at once, but those that
+        # don't overwrite files would store it under another name.
+        if storage.exists(path) and storage.get_available_name(path) != path:
+            storage.delete(path)
+        storage.save(path, content)
+
+
+def _snapshot_storage():
+    """
+    Get django Storage object for the grades snapshots.
+    """
+    return get_storage(
+        settings.GRADES_SNAPSHOT_SETTINGS.get('STORAGE_CLASS'),
+        **settings.GRADES_SNAPSHOT_SETTINGS.get('STORAGE_KWARGS', {})
+    )
+
+
+def _snapshot_path(course_key):
+    """
+    Returns the storage path of the snapshot of the given course.
+    """
+    # replace any '/' in the course key so they aren't interpreted
+    # as folder separators.
+    return u'{}{}.npz'.format(
+        settings.GRADES_SNAPSHOT_SETTINGS.get('DIRECTORY_PREFIX', ''),
+        six.text_type(course_key).replace('/', '_'),
+    )
+
+
+def _overridden(value, override):
+    """
+    Returns the given override of a value, if any, or else the value.
+    """
+    return value if override is None else override
+
+
+def _naive_utc(value):
+    """
+    Returns the given aware datetime as a naive UTC datetime, as stored in
+    numpy datetime64 arrays.  None is returned as is.
+    """
+    return None if value is None else make_naive(value, pytz.utc)
@@ -3,6 +3,7 @@ This module contains tasks for asynchronous execution of grade updates.
 """
 
 
+from collections import OrderedDict
 from logging import getLogger
 
 import six
@@ -35,6 +36,7 @@ from .constants import ScoreDatabaseTableEnum
 from .course_grade_factory import CourseGradeFactory
 from .exceptions import DatabaseNotReadyError
 from .grade_utils import are_grades_frozen
+from .pending_updates import PendingSubsectionUpdates, coalesce_updates
 from .signals.signals import SUBSECTION_SCORE_CHANGED
 from .subsection_grade_factory import SubsectionGradeFactory
 from .transformer import GradesTransformer
@@ -48,6 +50,8 @@ KNOWN_RETRY_ERRORS = (  # Errors we expect occasionally, should be resolved on r
     DatabaseNotReadyError,
 )
 RECALCULATE_GRADE_DELAY_SECONDS = 2  # to prevent excessive _has_db_updated failures. See TNL-6424.
+# Window during which the score changes of a user in a course are coalesced into a single update, when enabled.
+COALESCED_RECALCULATE_GRADE_DELAY_SECONDS = 10
 RETRY_DELAY_SECONDS = 40
 SUBSECTION_GRADE_TIMEOUT_SECONDS = 300
 
@@ -189,6 +193,85 @@ def recalculate_subsection_grade_v3(self, **kwargs):
     _recalculate_subsection_grade(self, **kwargs)
 
 
+@shared_task(
+    bind=True,
+    base=LoggedPersistOnFailureTask,
+    time_limit=SUBSECTION_GRADE_TIMEOUT_SECONDS,
+)
+@set_code_owner_attribute
+def recalculate_coalesced_subsection_grades(self, **kwargs):
+    """
+    Updates the saved subsection grades of a user from a score change, and
+    from the score changes of the user in the same course recorded after it,
+    updating each affected subsection once.
+
+    Keyword Arguments:
+        update (dict): the keyword arguments of the recalculate_subsection_grade_v3
+            task of the score change.
+        update_number (int): number of the score change among the changes
+            recorded by PendingSubsectionUpdates.
+    """
+    first_update = kwargs['update']
+    pending_updates = PendingSubsectionUpdates(first_update['user_id'], first_update['course_id'])
+    updates = [first_update] + pending_updates.pop(kwargs['update_number'])
+    try:
+        _recalculate_coalesced_subsection_grades(self, updates)
+    except Exception as exc:
+        if not isinstance(exc, KNOWN_RETRY_ERRORS):
+            log.info(u"Grades: coalesced update failure: {}. task id: {}. kwargs={}".format(
+                repr(exc),
+                self.request.id,
+                kwargs,
+            ))
+        # The score changes were taken from the cache, so they are retried
+        # individually.
+        for update_kwargs in coalesce_updates(updates):
+            recalculate_subsection_grade_v3.apply_async(kwargs=update_kwargs, countdown=RETRY_DELAY_SECONDS)
+
+
+def _recalculate_coalesced_subsection_grades(self, updates):
+    """
+    Updates the saved subsection grades containing the blocks of the given
+    score changes, each the keyword arguments of a
+    recalculate_subsection_grade_v3 task for the same user and course.
+
+    The changes whose scores aren't yet in the database are recalculated
+    by recalculate_subsection_grade_v3 tasks, which retry until they are.
+    """
+    course_key = CourseLocator.from_string(updates[0]['course_id'])
+    if are_grades_frozen(course_key):
+        log.info(
+            u"Attempted _recalculate_coalesced_subsection_grades for course '%s', but grades are frozen.", course_key,
+        )
+        return
+
+    set_custom_attributes_for_course_key(course_key)
+    # The changes are correlated with the event of the latest change.
+    set_event_transaction_id(updates[-1].get('event_transaction_id'))
+    set_event_transaction_type(updates[-1].get('event_transaction_type'))
+
+    block_updates = []
+    for update_kwargs in coalesce_updates(updates):
+        scored_block_usage_key = UsageKey.from_string(update_kwargs['usage_id']).replace(course_key=course_key)
+        if _has_db_updated_with_new_score(self, scored_block_usage_key, **update_kwargs):
+            block_updates.append((
+                scored_block_usage_key,
+                update_kwargs['only_if_higher'],
+                update_kwargs['score_deleted'],
+                update_kwargs.get('force_update_subsections', False),
+            ))
+        else:
+            recalculate_subsection_grade_v3.apply_async(kwargs=update_kwargs, countdown=RETRY_DELAY_SECONDS)
+
+    num_subsections = _update_subsection_grades_for_blocks(course_key, updates[0]['user_id'], block_updates)
+    set_custom_attribute('num_coalesced_score_changes', len(updates))
+    set_custom_attribute('num_coalesced_subsection_updates', num_subsections)
+    log.info(
+        u'Grades: Coalesced %d score changes of user %s in course %s into %d subsection updates.',
+        len(updates), updates[0]['user_id'], course_key, num_subsections,
+    )
+
+
 def _recalculate_subsection_grade(self, **kwargs):
     """
     Updates a saved subsection grade.
@@ -315,22 +398,63 @@ def _update_subsection_grades(
     for each subsection containing the given block, and to signal
     that those subsection grades were updated.
     """
+    _update_subsection_grades_for_blocks(
+        course_key,
+        user_id,
+        [(scored_block_usage_key, only_if_higher, score_deleted, force_update_subsections)],
+    )
+
+
+def _update_subsection_grades_for_blocks(course_key, user_id, block_updates):
+    """
+    Updates the subsection grades in the database for each subsection
+    containing any of the given blocks, once per subsection, and signals
+    that those subsection grades were updated.
+
+    Arguments:
+        block_updates (list of (UsageKey, only_if_higher, score_deleted,
+            force_update_subsections)): the blocks whose scores changed.
+            A subsection is only updated if higher if all the changes of
+            its blocks are, and as if a score was deleted or with forced
+            updates if any of them is.
+
+    Returns the number of updated subsections.
+    """
+    if not block_updates:
+        return 0
+
     student = User.objects.get(id=user_id)
     store = modulestore()
     with store.bulk_operations(course_key):
         course_structure = get_course_blocks(student, store.make_course_usage_key(course_key))
-        subsections_to_update = course_structure.get_transformer_block_field(
-            scored_block_usage_key,
-            GradesTransformer,
-            'subsections',
-            set(),
-        )
+
+        # Map of the usage key of each subsection to update to its
+        # (only_if_higher, score_deleted, force_update_subsections).
+        subsections_to_update = OrderedDict()
+        for scored_block_usage_key, only_if_higher, score_deleted, force_update_subsections in block_updates:
+            for subsection_usage_key in course_structure.get_transformer_block_field(
+                    scored_block_usage_key,
+                    GradesTransformer,
+                    'subsections',
+                    set(),
+            ):
+                update_args = (only_if_higher, score_deleted, force_update_subsections)
+                previous = subsections_to_update.get(subsection_usage_key)
+                if previous is not None:
+                    update_args = (
+                        previous[0] and only_if_higher,
+                        previous[1] or score_deleted,
+                        previous[2] or force_update_subsections,
+                    )
+                subsections_to_update[subsection_usage_key] = update_args
 
         course = store.get_course(course_key, depth=0)
         subsection_grade_factory = SubsectionGradeFactory(student, course, course_structure)
 
-        for subsection_usage_key in subsections_to_update:
+        num_updated = 0
+        for subsection_usage_key, update_args in six.iteritems(subsections_to_update):
             if subsection_usage_key in course_structure:
+                only_if_higher, score_deleted, force_update_subsections = update_args
                 subsection_grade = subsection_grade_factory.update(
                     course_structure[subsection_usage_key],
                     only_if_higher,
@@ -344,6 +468,8 @@ def _update_subsection_grades(
                     user=student,
                     subsection_grade=subsection_grade,
                 )
+                num_updated += 1
+        return num_updated
 
 
 def _course_task_args(course_key, **kwargs):
@@ -0,0 +1,147 @@
+"""
+Tests for the BatchCourseGrader.
+"""
+
+
+import ddt
+import six
+from django.test.utils import override_settings
+from submissions import api as submissions_api
+
+from capa.tests.response_xml_factory import MultipleChoiceResponseXMLFactory
+from common.djangoapps.student.models import CourseEnrollment, anonymous_id_for_user
+from common.djangoapps.student.tests.factories import UserFactory
+from lms.djangoapps.courseware.tests.factories import StudentModuleFactory
+from openedx.core.djangoapps.content.block_structure.api import get_course_in_cache
+from xmodule.modulestore.tests.django_utils import SharedModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+
+from ..batch_grading import BatchCourseGrader, ScorableBlocks, ScoreMatrix
+from ..course_data import CourseData
+from ..course_grade_factory import CourseGradeFactory
+from ..models import PersistentSubsectionGrade, PersistentSubsectionGradeOverride
+
+
+@ddt.ddt
+class BatchCourseGraderTest(SharedModuleStoreTestCase):
+    """
+    Tests that the BatchCourseGrader computes the same course grades as
+    the CourseGradeFactory.
+    """
+    ENABLED_SIGNALS = ['course_published']
+
+    @classmethod
+    def setUpClass(cls):
+        super(BatchCourseGraderTest, cls).setUpClass()
+        cls.course = CourseFactory.create()
+        cls.problems = []
+        problem_xml = MultipleChoiceResponseXMLFactory().build_xml(
+            question_text='The correct answer is Choice 3',
+            choices=[False, False, True, False],
+            choice_names=['choice_0', 'choice_1', 'choice_2', 'choice_3']
+        )
+        with cls.store.bulk_operations(cls.course.id):
+            chapter = ItemFactory.create(parent=cls.course, category='chapter')
+            cls.subsections = []
+            for index, (subsection_format, graded) in enumerate([
+                    ('Homework', True),
+                    ('Homework', True),
+                    ('Homework', True),
+                    ('Homework', True),
+                    ('Exam', True),
+                    ('', False),
+            ]):
+                subsection = ItemFactory.create(
+                    parent=chapter,
+                    category='sequential',
+                    display_name=u'Subsection {}'.format(index),
+                    graded=graded,
+                    format=subsection_format,
+                )
+                cls.subsections.append(subsection)
+                vertical = ItemFactory.create(parent=subsection, category='vertical')
+                cls.problems.append(ItemFactory.create(parent=vertical, category='problem', data=problem_xml))
+                cls.problems.append(ItemFactory.create(parent=vertical, category='problem', weight=3, data=problem_xml))
+            cls.course.set_grading_policy({
+                'GRADER': [
+                    {'type': 'Homework', 'min_count': 5, 'drop_count': 2, 'short_label': 'HW', 'weight': 0.6},
+                    {'type': 'Exam', 'min_count': 1, 'drop_count': 0, 'short_label': 'Exam', 'weight': 0.4},
+                ],
+                'GRADE_CUTOFFS': {'A': 0.8, 'B': 0.5, 'C': 0.2},
+            })
+            cls.store.update_item(cls.course, 0)
+
+    def setUp(self):
+        super(BatchCourseGraderTest, self).setUp()
+        self.users = [UserFactory.create() for _ in range(6)]
+        for index, user in enumerate(self.users):
+            CourseEnrollment.enroll(user, self.course.id)
+            # Each user answers a different subset of the problems.
+            for problem_index, problem in enumerate(self.problems):
+                if (problem_index + index) % 3:
+                    StudentModuleFactory.create(
+                        student=user,
+                        course_id=self.course.id,
+                        module_state_key=problem.location,
+                        grade=(problem_index * index) % 2,
+                        max_grade=1,
+                    )
+
+    def _assert_same_grades(self, users):
+        """
+        Asserts that iter_computed computes the same grades as update.
+        """
+        computed_grades = {
+            user.id: course_grade
+            for user, course_grade, _ in CourseGradeFactory().iter_computed(users, course=self.course, batch_size=4)
+        }
+        self.assertEqual(len(computed_grades), len(users))
+        for user in users:
+            expected_grade = CourseGradeFactory().update(user, self.course, force_update_subsections=True)
+            computed_grade = computed_grades[user.id]
+            self.assertEqual(computed_grade.percent, expected_grade.percent)
+            self.assertEqual(computed_grade.letter_grade, expected_grade.letter_grade)
+            self.assertEqual(computed_grade.passed, expected_grade.passed)
+            self.assertEqual(computed_grade.attempted, expected_grade.attempted)
+
+    def test_same_grades(self):
+        self._assert_same_grades(self.users)
+
+    def test_same_grades_with_override(self):
+        user = self.users[1]
+        CourseGradeFactory().update(user, self.course, force_update_subsections=True)
+        grade = PersistentSubsectionGrade.read_grade(user.id, self.subsections[4].location)
+        PersistentSubsectionGradeOverride.objects.create(grade=grade, earned_graded_override=6.0)
+        self._assert_same_grades(self.users)
+
+    def test_same_grades_with_submissions(self):
+        for index, user in enumerate(self.users[:3]):
+            submission = submissions_api.create_submission(
+                {
+                    'student_id': anonymous_id_for_user(user, self.course.id),
+                    'course_id': six.text_type(self.course.id),
+                    'item_id': six.text_type(self.problems[index].location),
+                    'item_type': 'problem',
+                },
+                'any answer',
+            )
+            submissions_api.set_score(submission['uuid'], index, 2)
+        self._assert_same_grades(self.users)
+
+    def test_score_matrix_queries(self):
+        scorable_blocks = ScorableBlocks(get_course_in_cache(self.course.id))
+        # The scores of all the users are read from the courseware student
+        # module and the Submissions API with a query each.
+        with self.assertNumQueries(2):
+            ScoreMatrix(self.course.id, self.users, scorable_blocks)
+
+    @ddt.data(True, False)
+    def test_is_supported(self, generate_profile_scores):
+        with override_settings(GENERATE_PROFILE_SCORES=generate_profile_scores):
+            self.assertEqual(BatchCourseGrader.is_supported(self.course.grader), not generate_profile_scores)
+            if generate_profile_scores:
+                course_data = CourseData(
+                    None, course=self.course, collected_block_structure=get_course_in_cache(self.course.id),
+                )
+                with self.assertRaises(ValueError):
+                    BatchCourseGrader(course_data)
@@ -9,7 +9,7 @@ import ddt
 from django.conf import settings
 from mock import patch
 from six import text_type
-from edx_toggles.toggles.testutils import override_waffle_switch
+from edx_toggles.toggles.testutils import override_waffle_flag, override_waffle_switch
 from lms.djangoapps.courseware.access import has_access
 from lms.djangoapps.grades.config.tests.utils import persistent_grades_feature_flags
 from openedx.core.djangoapps.content.block_structure.factory import BlockStructureFactory
@@ -17,9 +17,15 @@ from common.djangoapps.student.tests.factories import UserFactory
 from xmodule.modulestore.tests.django_utils import SharedModuleStoreTestCase
 from xmodule.modulestore.tests.factories import CourseFactory
 
-from ..config.waffle import ASSUME_ZERO_GRADE_IF_ABSENT, waffle_switch
+from ..config.waffle import (
+    ASSUME_ZERO_GRADE_IF_ABSENT,
+    INCREMENTAL_COURSE_GRADE_UPDATE,
+    waffle_flags,
+    waffle_switch
+)
 from ..course_grade import CourseGrade, ZeroCourseGrade
 from ..course_grade_factory import CourseGradeFactory
+from ..models import PersistentCourseGrade
 from ..subsection_grade import ReadSubsectionGrade, ZeroSubsectionGrade
 from .base import GradeTestBase
 from .utils import mock_get_score
@@ -128,6 +134,58 @@ class TestCourseGradeFactory(GradeTestBase):
         with self.assertNumQueries(3):
             _assert_read(expected_pass=False, expected_percent=0.0)  # updated to grade of 0.0
 
+    def _update_from_subsection_grade(self, incremental):
+        """
+        Updates the grade of the first subsection to full marks, and returns
+        the course grade updated from it, and whether the course grade was
+        computed from all the subsection grades.
+        """
+        grade_factory = CourseGradeFactory()
+        with mock_get_score(2, 2):
+            subsection_grade = self.subsection_grade_factory.update(self.course_structure[self.sequence.location])
+        with override_waffle_flag(waffle_flags()[INCREMENTAL_COURSE_GRADE_UPDATE], active=incremental):
+            with patch.object(CourseGradeFactory, '_update', wraps=CourseGradeFactory._update) as mock_update:
+                course_grade = grade_factory.update_from_subsection_grade(
+                    self.request.user, subsection_grade, course=self.course, course_structure=self.course_structure,
+                )
+        return course_grade, mock_update.called
+
+    @ddt.data(True, False)
+    def test_update_from_subsection_grade(self, incremental):
+        with mock_get_score(1, 2):
+            CourseGradeFactory().update(self.request.user, self.course, force_update_subsections=True)
+
+        course_grade, fully_updated = self._update_from_subsection_grade(incremental)
+        self.assertEqual(fully_updated, not incremental)
+        self.assertEqual(course_grade.percent, 0.75)
+        self.assertEqual(course_grade.letter_grade, u'Pass')
+        self.assertEqual(CourseGradeFactory().read(self.request.user, self.course).percent, 0.75)
+
+        # The persisted state was updated too.
+        course_grade, fully_updated = self._update_from_subsection_grade(incremental=True)
+        self.assertFalse(fully_updated)
+        self.assertEqual(course_grade.percent, 0.75)
+
+    def test_update_from_subsection_grade_locks_grade(self):
+        with mock_get_score(1, 2):
+            CourseGradeFactory().update(self.request.user, self.course, force_update_subsections=True)
+
+        with patch.object(
+            PersistentCourseGrade, 'read_for_update', wraps=PersistentCourseGrade.read_for_update,
+        ) as mock_read_for_update:
+            _, fully_updated = self._update_from_subsection_grade(incremental=True)
+        self.assertFalse(fully_updated)
+        mock_read_for_update.assert_called_once_with(self.request.user.id, self.course.id)
+
+    def test_update_from_subsection_grade_with_stale_state(self):
+        with mock_get_score(1, 2):
+            CourseGradeFactory().update(self.request.user, self.course, force_update_subsections=True)
+        PersistentCourseGrade.objects.filter(user_id=self.request.user.id).update(grading_policy_hash=u'stale')
+
+        course_grade, fully_updated = self._update_from_subsection_grade(incremental=True)
+        self.assertTrue(fully_updated)
+        self.assertEqual(course_grade.percent, 0.75)
+
     @patch.dict(settings.FEATURES, {'ASSUME_ZERO_GRADE_IF_ABSENT_FOR_ALL_TESTS': False})
     @ddt.data(*itertools.product((True, False), (True, False)))
     @ddt.unpack
@@ -15,6 +15,7 @@ import six
 from django.db.utils import IntegrityError
 from django.test import TestCase
 from django.utils.timezone import now
+from edx_django_utils.cache import RequestCache
 from freezegun import freeze_time
 from mock import patch
 from opaque_keys import InvalidKeyError
@@ -28,7 +29,8 @@ from lms.djangoapps.grades.models import (
     PersistentCourseGrade,
     PersistentSubsectionGrade,
     PersistentSubsectionGradeOverride,
-    VisibleBlocks
+    VisibleBlocks,
+    _BlockRecordListInterner
 )
 from common.djangoapps.student.tests.factories import UserFactory
 from common.djangoapps.track.event_transaction_utils import get_event_transaction_id, get_event_transaction_type
@@ -64,6 +66,44 @@ class BlockRecordListTestCase(TestCase):
             brs
         )
 
+    def test_from_list_interned(self):
+        locator = BlockUsageLocator(course_key=self.course_key, block_type='problem', block_id='block_id')
+        block_record_list = BlockRecordList.from_list(
+            [BlockRecord(locator=locator, weight=1, raw_possible=10, graded=True)], self.course_key,
+        )
+        self.assertIs(
+            BlockRecordList.from_list(
+                (BlockRecord(locator=locator, weight=1, raw_possible=10, graded=True),), self.course_key,
+            ),
+            block_record_list,
+        )
+        # Equal records serialized differently are not the same list.
+        other_block_record_list = BlockRecordList.from_list(
+            [BlockRecord(locator=locator, weight=1, raw_possible=10.0, graded=True)], self.course_key,
+        )
+        self.assertIsNot(other_block_record_list, block_record_list)
+        self.assertNotEqual(other_block_record_list.hash_value, block_record_list.hash_value)
+
+    def test_interned_records_bounded(self):
+        interner = _BlockRecordListInterner(max_records=3)
+        records = [
+            BlockRecord(
+                locator=BlockUsageLocator(course_key=self.course_key, block_type='problem', block_id=block_id),
+                weight=1,
+                raw_possible=10,
+                graded=True,
+            )
+            for block_id in ('a', 'b', 'c')
+        ]
+        first_list = interner.intern(BlockRecordList, records[:2], self.course_key)
+        second_list = interner.intern(BlockRecordList, records[2:], self.course_key)
+        self.assertIs(interner.intern(BlockRecordList, records[:2], self.course_key), first_list)
+
+        # Interning a third list evicts the least recently used one.
+        interner.intern(BlockRecordList, records[1:2], self.course_key)
+        self.assertIs(interner.intern(BlockRecordList, records[:2], self.course_key), first_list)
+        self.assertIsNot(interner.intern(BlockRecordList, records[2:], self.course_key), second_list)
+
 
 class GradesModelTestCase(TestCase):
     """
@@ -201,6 +241,28 @@ class VisibleBlocksTest(GradesModelTestCase):
         with self.assertRaises(AttributeError):
             visible_blocks.blocks = expected_blocks
 
+    def test_bulk_get_or_create_across_users(self):
+        """
+        Ensures that the visible blocks created for a user are reused for
+        the other users of the course in the same request.
+        """
+        RequestCache.clear_all_namespaces()
+        self.addCleanup(RequestCache.clear_all_namespaces)
+        block_record_lists = [
+            BlockRecordList.from_list([self.record_a], self.course_key),
+            BlockRecordList.from_list([self.record_a, self.record_b], self.course_key),
+        ]
+        VisibleBlocks.bulk_read(self.user_id, self.course_key)
+        VisibleBlocks.bulk_get_or_create(self.user_id, self.course_key, block_record_lists)
+
+        other_user_id = self.user_id + 1
+        VisibleBlocks.bulk_read(other_user_id, self.course_key)
+        with self.assertNumQueries(0):
+            VisibleBlocks.bulk_get_or_create(other_user_id, self.course_key, block_record_lists)
+            visible_blocks = VisibleBlocks.cached_get_or_create(other_user_id, block_record_lists[1])
+        self.assertEqual(visible_blocks.hashed, block_record_lists[1].hash_value)
+        self.assertEqual(VisibleBlocks.objects.filter(course_id=self.course_key).count(), 2)
+
 
 @ddt.ddt
 class PersistentSubsectionGradeTest(GradesModelTestCase):
@@ -0,0 +1,194 @@
+"""
+Tests for the snapshots of persisted subsection grades.
+"""
+
+
+import os
+import shutil
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pytz
+from django.test import TestCase
+from django.test.utils import override_settings
+from opaque_keys.edx.locator import BlockUsageLocator, CourseLocator
+
+from common.djangoapps.student.tests.factories import UserFactory
+
+from ..models import BlockRecord, BlockRecordList, PersistentSubsectionGrade, PersistentSubsectionGradeOverride
+from ..snapshot import SubsectionGradesSnapshot, get_subsection_grades_snapshot, rebuild_subsection_grades_snapshot
+
+
+class SubsectionGradesSnapshotTest(TestCase):
+    """
+    Tests the SubsectionGradesSnapshot and its storage.
+    """
+    def setUp(self):
+        super(SubsectionGradesSnapshotTest, self).setUp()
+        self.course_key = CourseLocator(org='some_org', course='some_course', run='some_run')
+        self.subsections = [
+            BlockUsageLocator(course_key=self.course_key, block_type='sequential', block_id='subsection_{}'.format(i))
+            for i in range(3)
+        ]
+        self.problem = BlockUsageLocator(course_key=self.course_key, block_type='problem', block_id='problem')
+        self.users = [UserFactory.create() for _ in range(4)]
+        self.first_attempted = datetime(2020, 1, 1, 12, 30, 45, tzinfo=pytz.UTC)
+
+        self.storage_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.storage_dir)
+        settings_override = override_settings(GRADES_SNAPSHOT_SETTINGS={
+            'STORAGE_CLASS': 'django.core.files.storage.FileSystemStorage',
+            'STORAGE_KWARGS': {'location': self.storage_dir},
+            'DIRECTORY_PREFIX': 'grades_snapshots/',
+        })
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def _create_grade(self, user, subsection_index, earned, first_attempted=None):
+        """
+        Creates or updates the grade of the given user in the given subsection.
+        """
+        return PersistentSubsectionGrade.update_or_create_grade(
+            user_id=user.id,
+            usage_key=self.subsections[subsection_index],
+            earned_all=earned,
+            possible_all=10.0,
+            earned_graded=earned,
+            possible_graded=10.0,
+            visible_blocks=BlockRecordList(
+                [BlockRecord(locator=self.problem, weight=1, raw_possible=10, graded=True)], self.course_key,
+            ),
+            first_attempted=first_attempted,
+        )
+
+    def _create_grades(self):
+        """
+        Creates grades for all but the last user, and in all subsections but
+        the first for the first user.
+        """
+        for user_index, user in enumerate(self.users[:-1]):
+            for subsection_index in range(len(self.subsections)):
+                if user_index or subsection_index:
+                    earned = float(user_index + subsection_index)
+                    self._create_grade(user, subsection_index, earned, self.first_attempted)
+
+    def _earned_graded_matrix(self, snapshot):
+        """
+        Returns the earned graded points of the users in the given snapshot,
+        with a column per subsection of the test course.
+        """
+        matrix = snapshot.to_matrix('earned_graded', [user.id for user in self.users])
+        columns = [snapshot.subsections.index(subsection) for subsection in self.subsections]
+        return matrix[:, columns]
+
+    def test_read(self):
+        self._create_grades()
+        grade = PersistentSubsectionGrade.read_grade(self.users[2].id, self.subsections[1])
+        PersistentSubsectionGradeOverride.objects.create(grade=grade, earned_graded_override=7.0)
+
+        snapshot = SubsectionGradesSnapshot.read(self.course_key)
+        self.assertEqual(len(snapshot), 8)
+        self.assertEqual(sorted(snapshot.subsections), sorted(self.subsections))
+        self.assertTrue(np.all(np.diff(snapshot.user_ids) >= 0))
+        self.assertTrue(np.all(snapshot.first_attempted == np.datetime64('2020-01-01T12:30:45', 'us')))
+        np.testing.assert_array_equal(
+            self._earned_graded_matrix(snapshot),
+            [[np.nan, 1, 2], [1, 2, 3], [2, 7, 4], [np.nan, np.nan, np.nan]],
+        )
+        # The override only applies to the graded points.
+        np.testing.assert_array_equal(
+            snapshot.to_matrix('earned_all', [self.users[2].id])[0, snapshot.subsections.index(self.subsections[1])],
+            3,
+        )
+
+    def test_bytes_round_trip(self):
+        self._create_grades()
+        self._create_grade(self.users[3], 0, 5.0)
+        snapshot = SubsectionGradesSnapshot.read(self.course_key)
+        loaded_snapshot = SubsectionGradesSnapshot.from_bytes(snapshot.to_bytes())
+        self.assertEqual(loaded_snapshot.course_key, self.course_key)
+        self.assertEqual(loaded_snapshot.modified, snapshot.modified)
+        self.assertTrue(loaded_snapshot.equals(snapshot))
+        self.assertTrue(np.isnat(loaded_snapshot.first_attempted).any())
+
+    def test_deprecated_keys_bytes_round_trip(self):
+        self.course_key = CourseLocator(org='some_org', course='some_course', run='some_run', deprecated=True)
+        self.subsections = [self.course_key.make_usage_key('sequential', 'subsection_{}'.format(i)) for i in range(3)]
+        self.problem = self.course_key.make_usage_key('problem', 'problem')
+        self._create_grades()
+        snapshot = SubsectionGradesSnapshot.read(self.course_key)
+        loaded_snapshot = SubsectionGradesSnapshot.from_bytes(snapshot.to_bytes())
+        self.assertEqual(loaded_snapshot.course_key, self.course_key)
+        self.assertEqual(loaded_snapshot.subsections, snapshot.subsections)
+        self.assertEqual(loaded_snapshot.subsections[0].course_key.run, 'some_run')
+        self.assertTrue(loaded_snapshot.equals(snapshot))
+
+    def test_empty_snapshot(self):
+        snapshot = rebuild_subsection_grades_snapshot(self.course_key)
+        self.assertEqual(len(snapshot), 0)
+        self.assertIsNone(snapshot.modified)
+        self.assertTrue(get_subsection_grades_snapshot(self.course_key).equals(snapshot))
+
+    def test_refresh(self):
+        self._create_grades()
+        snapshot = get_subsection_grades_snapshot(self.course_key)
+
+        self._create_grade(self.users[1], 0, 9.0)
+        self._create_grade(self.users[3], 2, 6.0)
+        self.assertTrue(get_subsection_grades_snapshot(self.course_key, refresh=False).equals(snapshot))
+
+        refreshed_snapshot = get_subsection_grades_snapshot(self.course_key)
+        self.assertEqual(len(refreshed_snapshot), 9)
+        np.testing.assert_array_equal(
+            self._earned_graded_matrix(refreshed_snapshot),
+            [[np.nan, 1, 2], [9, 2, 3], [2, 3, 4], [np.nan, np.nan, 6]],
+        )
+        # The refreshed snapshot was stored.
+        self.assertTrue(get_subsection_grades_snapshot(self.course_key, refresh=False).equals(refreshed_snapshot))
+        np.testing.assert_array_equal(
+            self._earned_graded_matrix(rebuild_subsection_grades_snapshot(self.course_key)),
+            self._earned_graded_matrix(refreshed_snapshot),
+        )
+
+    def test_save_replaces_snapshot(self):
+        self._create_grades()
+        rebuild_subsection_grades_snapshot(self.course_key)
+        self._create_grade(self.users[3], 2, 6.0)
+        snapshot = rebuild_subsection_grades_snapshot(self.course_key)
+        self.assertEqual(
+            os.listdir(os.path.join(self.storage_dir, 'grades_snapshots')),
+            ['course-v1:some_org+some_course+some_run.npz'],
+        )
+        self.assertTrue(get_subsection_grades_snapshot(self.course_key, refresh=False).equals(snapshot))
+
+    def test_override_deleted(self):
+        self._create_grades()
+        grade = PersistentSubsectionGrade.read_grade(self.users[2].id, self.subsections[1])
+        override = PersistentSubsectionGradeOverride.objects.create(grade=grade, earned_graded_override=7.0)
+        snapshot = get_subsection_grades_snapshot(self.course_key)
+        self.assertEqual(self._earned_graded_matrix(snapshot)[2, 1], 7)
+
+        override.delete()
+        np.testing.assert_array_equal(
+            self._earned_graded_matrix(get_subsection_grades_snapshot(self.course_key, refresh=False)),
+            [[np.nan, 1, 2], [1, 2, 3], [2, np.nan, 4], [np.nan, np.nan, np.nan]],
+        )
+        np.testing.assert_array_equal(
+            self._earned_graded_matrix(get_subsection_grades_snapshot(self.course_key)),
+            [[np.nan, 1, 2], [1, 2, 3], [2, 3, 4], [np.nan, np.nan, np.nan]],
+        )
+
+    def test_for_users_and_pages(self):
+        self._create_grades()
+        snapshot = SubsectionGradesSnapshot.read(self.course_key)
+
+        user_ids = [self.users[0].id, self.users[2].id]
+        self.assertEqual(sorted(set(snapshot.for_users(user_ids).user_ids)), user_ids)
+
+        pages = list(snapshot.iter_pages(2))
+        self.assertEqual([len(page) for page in pages], [5, 3])
+        self.assertEqual(
+            [sorted(set(page.user_ids)) for page in pages],
+            [[self.users[0].id, self.users[1].id], [self.users[2].id]],
+        )
@@ -13,8 +13,9 @@ import pytz
 import six
 from django.conf import settings
 from django.db.utils import IntegrityError
+from django.test.utils import override_settings
 from django.utils import timezone
-from mock import MagicMock, patch
+from mock import MagicMock, call, patch
 from six.moves import range
 
 from edx_toggles.toggles.testutils import override_waffle_flag
@@ -31,6 +32,7 @@ from lms.djangoapps.grades.tasks import (
     compute_all_grades_for_course,
     compute_grades_for_course,
     compute_grades_for_course_v2,
+    recalculate_coalesced_subsection_grades,
     recalculate_subsection_grade_v3
 )
 from openedx.core.djangoapps.content.block_structure.exceptions import BlockStructureNotFound
@@ -144,6 +146,69 @@ class RecalculateSubsectionGradeTest(HasCourseWithProblemsMixin, ModuleStoreTest
             PROBLEM_WEIGHTED_SCORE_CHANGED.send(sender=None, **send_args)
             mock_task_apply.assert_called_once_with(countdown=RECALCULATE_GRADE_DELAY_SECONDS, kwargs=local_task_args)
 
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    @patch.dict(settings.FEATURES, {'COALESCE_SUBSECTION_GRADE_UPDATES': True})
+    @patch('lms.djangoapps.grades.signals.signals.SUBSECTION_SCORE_CHANGED.send')
+    def test_coalesced_subsection_updates(self, mock_subsection_signal):
+        """
+        Ensures that the score changes in a subsection are coalesced into a
+        single update of the subsection.
+        """
+        self.set_up_course(create_multiple_subsections=True)
+        problem2 = ItemFactory.create(parent=self.sequential, category='problem')
+        send_args = self.problem_weighted_score_changed_kwargs
+        with patch(
+            'lms.djangoapps.grades.tasks.recalculate_coalesced_subsection_grades.apply_async',
+            return_value=None
+        ) as mock_task_apply:
+            PROBLEM_WEIGHTED_SCORE_CHANGED.send(sender=None, **send_args)
+            PROBLEM_WEIGHTED_SCORE_CHANGED.send(
+                sender=None, **dict(send_args, usage_id=six.text_type(problem2.location))
+            )
+            PROBLEM_WEIGHTED_SCORE_CHANGED.send(sender=None, **send_args)
+            # Only the first change scheduled a task.
+            self.assertEqual(mock_task_apply.call_count, 1)
+            task_kwargs = mock_task_apply.call_args[1]['kwargs']
+
+            mock_score = MagicMock(
+                modified=datetime.utcnow().replace(tzinfo=pytz.UTC) + timedelta(days=1), grade=1.0, max_grade=2.0,
+            )
+            with self.mock_csm_get_score(mock_score):
+                with mock_get_score(1, 2):
+                    recalculate_coalesced_subsection_grades.apply(kwargs=task_kwargs)
+            self.assertEqual(mock_subsection_signal.call_count, 1)
+            self.assertEqual(mock_subsection_signal.call_args[1]['subsection_grade'].location, self.sequential.location)
+
+            # Changes made after the task ran schedule a new task.
+            PROBLEM_WEIGHTED_SCORE_CHANGED.send(sender=None, **send_args)
+            self.assertEqual(mock_task_apply.call_count, 2)
+
+    @patch('lms.djangoapps.grades.tasks.SUBSECTION_SCORE_CHANGED.send')
+    @patch('lms.djangoapps.grades.tasks.SubsectionGradeFactory')
+    @patch('lms.djangoapps.grades.tasks.get_course_blocks')
+    def test_coalesced_update_flags_per_subsection(self, mock_get_course_blocks, mock_factory, _mock_signal):
+        """
+        Ensures that the flags of the coalesced updates of a subsection
+        don't apply to the other subsections of the same blocks.
+        """
+        self.set_up_course()
+        subsections_of = {'problem1': ['subsection1'], 'problem2': ['subsection1', 'subsection2']}
+        course_structure = mock_get_course_blocks.return_value
+        course_structure.get_transformer_block_field.side_effect = (
+            lambda block_key, _transformer, _field_name, _default: subsections_of[block_key]
+        )
+        course_structure.__contains__.return_value = True
+        course_structure.__getitem__.side_effect = lambda block_key: block_key
+
+        num_updated = tasks._update_subsection_grades_for_blocks(  # pylint: disable=protected-access
+            self.course.id, self.user.id, [('problem1', False, True, True), ('problem2', True, False, False)],
+        )
+        self.assertEqual(num_updated, 2)
+        self.assertEqual(mock_factory.return_value.update.call_args_list, [
+            call('subsection1', False, True, True),
+            call('subsection2', True, False, False),
+        ])
+
     @patch('lms.djangoapps.grades.signals.signals.SUBSECTION_SCORE_CHANGED.send')
     def test_triggers_subsection_score_signal(self, mock_subsection_signal):
         """
@@ -164,10 +229,10 @@ class RecalculateSubsectionGradeTest(HasCourseWithProblemsMixin, ModuleStoreTest
             self.assertEqual(mock_block_structure_create.call_count, 1)
 
     @ddt.data(
-        (ModuleStoreEnum.Type.mongo, 1, 36, True),
-        (ModuleStoreEnum.Type.mongo, 1, 36, False),
-        (ModuleStoreEnum.Type.split, 3, 36, True),
-        (ModuleStoreEnum.Type.split, 3, 36, False),
+        (ModuleStoreEnum.Type.mongo, 1, 38, True),
+        (ModuleStoreEnum.Type.mongo, 1, 38, False),
+        (ModuleStoreEnum.Type.split, 3, 38, True),
+        (ModuleStoreEnum.Type.split, 3, 38, False),
     )
     @ddt.unpack
     def test_query_counts(self, default_store, num_mongo_calls, num_sql_calls, create_multiple_subsections):
@@ -179,8 +244,8 @@ class RecalculateSubsectionGradeTest(HasCourseWithProblemsMixin, ModuleStoreTest
                     self._apply_recalculate_subsection_grade()
 
     @ddt.data(
-        (ModuleStoreEnum.Type.mongo, 1, 36),
-        (ModuleStoreEnum.Type.split, 3, 36),
+        (ModuleStoreEnum.Type.mongo, 1, 38),
+        (ModuleStoreEnum.Type.split, 3, 38),
     )
     @ddt.unpack
     def test_query_counts_dont_change_with_more_content(self, default_store, num_mongo_calls, num_sql_calls):
@@ -240,8 +305,8 @@ class RecalculateSubsectionGradeTest(HasCourseWithProblemsMixin, ModuleStoreTest
             self.assertEqual(len(PersistentSubsectionGrade.bulk_read_grades(self.user.id, self.course.id)), 0)
 
     @ddt.data(
-        (ModuleStoreEnum.Type.mongo, 1, 37),
-        (ModuleStoreEnum.Type.split, 3, 37),
+        (ModuleStoreEnum.Type.mongo, 1, 39),
+        (ModuleStoreEnum.Type.split, 3, 39),
     )
     @ddt.unpack
     def test_persistent_grades_enabled_on_course(self, default_store, num_mongo_queries, num_sql_queries):
@@ -16,6 +16,9 @@ OPTIMIZE_GET_LEARNERS_FOR_COURSE = 'optimize_get_learners_for_course'
 # Course override flags
 GENERATE_PROBLEM_GRADE_REPORT_VERIFIED_ONLY = 'generate_problem_grade_report_verified_only'
 GENERATE_COURSE_GRADE_REPORT_VERIFIED_ONLY = 'generate_course_grade_report_verified_only'
+GENERATE_SHARDED_COURSE_GRADE_REPORT = 'generate_sharded_course_grade_report'
+GENERATE_BATCHED_PROBLEM_GRADE_REPORT = 'generate_batched_problem_grade_report'
+RESCORE_PROBLEMS_IN_BATCH = 'rescore_problems_in_batch'
 
 
 def waffle_flags():
@@ -33,6 +36,21 @@ def waffle_flags():
             flag_name=GENERATE_COURSE_GRADE_REPORT_VERIFIED_ONLY,
             module_name=__name__,
         ),
+        GENERATE_SHARDED_COURSE_GRADE_REPORT: CourseWaffleFlag(
+            waffle_namespace=INSTRUCTOR_TASK_WAFFLE_FLAG_NAMESPACE,
+            flag_name=GENERATE_SHARDED_COURSE_GRADE_REPORT,
+            module_name=__name__,
+        ),
+        GENERATE_BATCHED_PROBLEM_GRADE_REPORT: CourseWaffleFlag(
+            waffle_namespace=INSTRUCTOR_TASK_WAFFLE_FLAG_NAMESPACE,
+            flag_name=GENERATE_BATCHED_PROBLEM_GRADE_REPORT,
+            module_name=__name__,
+        ),
+        RESCORE_PROBLEMS_IN_BATCH: CourseWaffleFlag(
+            waffle_namespace=INSTRUCTOR_TASK_WAFFLE_FLAG_NAMESPACE,
+            flag_name=RESCORE_PROBLEMS_IN_BATCH,
+            module_name=__name__,
+        ),
     }
 
 
@@ -59,3 +77,29 @@ def course_grade_report_verified_only(course_id):
     False otherwise.
     """
     return waffle_flags()[GENERATE_COURSE_GRADE_REPORT_VERIFIED_ONLY].is_enabled(course_id)
+
+
+def sharded_course_grade_report_enabled(course_id):
+    """
+    Returns True if course grade reports should be generated in
+    shards by parallel subtasks in the given course, False otherwise.
+    """
+    return waffle_flags()[GENERATE_SHARDED_COURSE_GRADE_REPORT].is_enabled(course_id)
+
+
+def batched_problem_grade_report_enabled(course_id):
+    """
+    Returns True if problem grade reports should compute the grades
+    and read the problem scores of each batch of students at once in
+    the given course, False otherwise.
+    """
+    return waffle_flags()[GENERATE_BATCHED_PROBLEM_GRADE_REPORT].is_enabled(course_id)
+
+
+def rescore_problems_in_batch_enabled(course_id):
+    """
+    Returns True if rescoring tasks should grade the answers to problems
+    which support it without instantiating the problem for each student
+    in the given course, False otherwise.
+    """
+    return waffle_flags()[RESCORE_PROBLEMS_IN_BATCH].is_enabled(course_id)
@@ -20,13 +20,15 @@ import hashlib
 import json
 import logging
 import os.path
+import shutil
+import tempfile
 from uuid import uuid4
 
 import six
 from boto.exception import BotoServerError
 from django.conf import settings
 from django.contrib.auth.models import User
-from django.core.files.base import ContentFile
+from django.core.files.base import ContentFile, File
 from django.db import models, transaction
 from django.utils.encoding import python_2_unicode_compatible
 from django.utils.translation import ugettext as _
@@ -196,9 +198,8 @@ class InstructorTask(models.Model):
 class ReportStore(object):
     """
     Simple abstraction layer that can fetch and store CSV files for reports
-    download. Should probably refactor later to create a ReportFile object that
-    can simply be appended to for the sake of memory efficiency, rather than
-    passing in the whole dataset. Doing that for now just because it's simpler.
+    download. Reports too large to be held in memory can be appended to a
+    ReportFile and stored with `store_report_file`.
     """
     @classmethod
     def from_config(cls, config_name):
@@ -230,17 +231,81 @@ class ReportStore(object):
             )
         return DjangoStorageReportStore.from_config(config_name)
 
-    def _get_utf8_encoded_rows(self, rows):
+
+def _get_utf8_encoded_rows(rows):
+    """
+    Given a list of `rows` containing unicode strings, return a new list of
+    rows with those strings encoded as utf-8 for CSV compatibility.
+    """
+    for row in rows:
+        if six.PY2:
+            yield [six.text_type(item).encode('utf-8') for item in row]
+        else:
+            yield [six.text_type(item) for item in row]
+
+
+class ReportFile(object):
+    """
+    A CSV report that rows can be appended to as they are generated, so that
+    the whole report never has to be held in memory.
+
+    The rows are encoded as they are written, and spooled to a temporary file
+    that is kept in memory until it grows past SPOOL_MAX_SIZE bytes.
+    """
+    # Size in bytes past which the report is spooled to disk.
+    SPOOL_MAX_SIZE = 5 * 1024 * 1024
+
+    # Size in bytes of the encoded rows buffered before they are spooled.
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self):
+        self.file = tempfile.SpooledTemporaryFile(max_size=self.SPOOL_MAX_SIZE)
+        self.row_count = 0
+        # Adding unicode signature (BOM) for MS Excel 2013 compatibility
+        if six.PY2:
+            self.file.write(codecs.BOM_UTF8)
+
+    def write_rows(self, rows):
+        """
+        Appends the given rows (each row is an iterable of strings) to the
+        report, in csv format.
+        """
+        buff = six.BytesIO() if six.PY2 else six.StringIO()
+        csvwriter = csv.writer(buff)
+        for row in _get_utf8_encoded_rows(rows):
+            csvwriter.writerow(row)
+            self.row_count += 1
+            if buff.tell() >= self.CHUNK_SIZE:
+                self._spool(buff)
+        self._spool(buff)
+
+    def append_file(self, csv_file):
+        """
+        Appends the rows of the given file, as stored from another ReportFile,
+        to the report. The file is copied in chunks, without being decoded, so
+        its rows are not counted in `row_count`.
+        """
+        if six.PY2:
+            # Skip the unicode signature of the appended file.
+            csv_file.read(len(codecs.BOM_UTF8))
+        shutil.copyfileobj(csv_file, self.file)
+
+    def _spool(self, buff):
+        """
+        Moves the contents of the given buffer to the spooled file.
+        """
+        contents = buff.getvalue()
+        if not isinstance(contents, bytes):
+            contents = contents.encode('utf-8')
+        self.file.write(contents)
+        buff.seek(0)
+        buff.truncate()
+
+    def close(self):
         """
-        Given a list of `rows` containing unicode strings, return a
-        new list of rows with those strings encoded as utf-8 for CSV
-        compatibility.
+        Discards the report's spooled file.
         """
-        for row in rows:
-            if six.PY2:
-                yield [six.text_type(item).encode('utf-8') for item in row]
-            else:
-                yield [six.text_type(item) for item in row]
+        self.file.close()
 
 
 class DjangoStorageReportStore(ReportStore):
@@ -296,14 +361,41 @@ class DjangoStorageReportStore(ReportStore):
         Given a course_id, filename, and rows (each row is an iterable of
         strings), write the rows to the storage backend in csv format.
         """
-        output_buffer = ContentFile('')
-        # Adding unicode signature (BOM) for MS Excel 2013 compatibility
-        if six.PY2:
-            output_buffer.write(codecs.BOM_UTF8)
-        csvwriter = csv.writer(output_buffer)
-        csvwriter.writerows(self._get_utf8_encoded_rows(rows))
-        output_buffer.seek(0)
-        self.store(course_id, filename, output_buffer)
+        report_file = ReportFile()
+        report_file.write_rows(rows)
+        self.store_report_file(course_id, filename, report_file)
+
+    def store_report_file(self, course_id, filename, report_file):
+        """
+        Store the rows appended to the given ReportFile, which is then closed.
+        The storage backend reads the spooled file in chunks, so the report is
+        never loaded into memory as a whole.
+        """
+        path = self.path_to(course_id, filename)
+        try:
+            report_file.file.seek(0)
+            self.storage.save(path, File(report_file.file))
+        finally:
+            report_file.close()
+
+    def open(self, course_id, filename):
+        """
+        Return the file named `filename` stored for `course_id`, opened for
+        reading in binary mode.
+        """
+        return self.storage.open(self.path_to(course_id, filename), 'rb')
+
+    def exists(self, course_id, filename):
+        """
+        Return whether a file named `filename` is stored for `course_id`.
+        """
+        return self.storage.exists(self.path_to(course_id, filename))
+
+    def delete(self, course_id, filename):
+        """
+        Delete the file named `filename` stored for `course_id`, if any.
+        """
+        self.storage.delete(self.path_to(course_id, filename))
 
     def links_for(self, course_id):
         """
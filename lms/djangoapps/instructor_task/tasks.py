@@ -29,13 +29,19 @@ from django.utils.translation import ugettext_noop
 from edx_django_utils.monitoring import set_code_owner_attribute
 
 from lms.djangoapps.bulk_email.tasks import perform_delegate_email_batches
+from lms.djangoapps.instructor_task.config.waffle import sharded_course_grade_report_enabled
 from lms.djangoapps.instructor_task.tasks_base import BaseInstructorTask
 from lms.djangoapps.instructor_task.tasks_helper.certs import generate_students_certificates
 from lms.djangoapps.instructor_task.tasks_helper.enrollments import (
     upload_may_enroll_csv,
     upload_students_csv
 )
-from lms.djangoapps.instructor_task.tasks_helper.grades import CourseGradeReport, ProblemGradeReport, ProblemResponses
+from lms.djangoapps.instructor_task.tasks_helper.grades import (
+    CourseGradeReport,
+    ProblemGradeReport,
+    ProblemResponses,
+    ShardedCourseGradeReport
+)
 from lms.djangoapps.instructor_task.tasks_helper.misc import (
     cohort_students_and_upload,
     upload_course_survey_report,
@@ -44,11 +50,13 @@ from lms.djangoapps.instructor_task.tasks_helper.misc import (
     upload_proctored_exam_results_report
 )
 from lms.djangoapps.instructor_task.tasks_helper.module_state import (
+    BatchRescoreContext,
+    batch_rescore_problem_module_state,
     delete_problem_module_state,
     override_score_module_state,
     perform_module_state_update,
-    rescore_problem_module_state,
-    reset_attempts_module_state
+    reset_attempts_module_state,
+    select_for_batch_rescore
 )
 from lms.djangoapps.instructor_task.tasks_helper.runner import run_main_task
 
@@ -74,12 +82,19 @@ def rescore_problem(entry_id, xmodule_instance_args):
 
     `xmodule_instance_args` provides information needed by _get_module_instance_for_task()
     to instantiate an xmodule instance.
+
+    When the rescore_problems_in_batch flag is enabled for the course, the submissions
+    to problems which support it are graded without instantiating the problem for each
+    student; see batch_rescore_problem_module_state().
     """
     # Translators: This is a past-tense verb that is inserted into task progress messages as {action}.
     action_name = ugettext_noop('rescored')
-    update_fcn = partial(rescore_problem_module_state, xmodule_instance_args)
+    context = BatchRescoreContext()
+    update_fcn = partial(batch_rescore_problem_module_state, xmodule_instance_args, context)
 
-    visit_fcn = partial(perform_module_state_update, update_fcn, None)
+    visit_fcn = partial(
+        perform_module_state_update, update_fcn, select_for_batch_rescore, prefetch_fcn=context.prefetch,
+    )
     return run_main_task(entry_id, visit_fcn, action_name)
 
 
@@ -194,10 +209,72 @@ def calculate_grades_csv(entry_id, xmodule_instance_args):
         xmodule_instance_args.get('task_id'), entry_id, action_name
     )
 
-    task_fn = partial(CourseGradeReport.generate, xmodule_instance_args)
+    task_fn = partial(_generate_course_grade_report, xmodule_instance_args)
     return run_main_task(entry_id, task_fn, action_name)
 
 
+def _generate_course_grade_report(xmodule_instance_args, entry_id, course_id, task_input, action_name):
+    """
+    Generates a course grade report, in shards generated by parallel subtasks
+    if sharded grade reports are enabled for the course.
+    """
+    if sharded_course_grade_report_enabled(course_id):
+        create_shard_subtask = partial(_create_grades_csv_shard_subtask, entry_id, xmodule_instance_args)
+        return ShardedCourseGradeReport.queue_shards(
+            create_shard_subtask, xmodule_instance_args, entry_id, course_id, task_input, action_name,
+        )
+    return CourseGradeReport.generate(xmodule_instance_args, entry_id, course_id, task_input, action_name)
+
+
+def _create_grades_csv_shard_subtask(entry_id, xmodule_instance_args, shard, initial_subtask_status):
+    """Creates a subtask to generate the given shard of a course grade report."""
+    return calculate_grades_csv_shard.subtask(
+        (entry_id, xmodule_instance_args, shard, initial_subtask_status.to_dict()),
+        task_id=initial_subtask_status.task_id,
+    )
+
+
+def _create_merge_grades_csv_shards_subtask(entry_id, xmodule_instance_args, num_shards, initial_subtask_status):
+    """Creates a subtask to merge the shards of a course grade report."""
+    return merge_grades_csv_shards.subtask(
+        (entry_id, xmodule_instance_args, num_shards, initial_subtask_status.to_dict()),
+        task_id=initial_subtask_status.task_id,
+    )
+
+
+@shared_task
+@set_code_owner_attribute
+def calculate_grades_csv_shard(entry_id, xmodule_instance_args, shard, subtask_status_dict):
+    """
+    Grade the users of a shard of a course, for a sharded course grade report.
+
+    `shard` is a dict describing the shard, and `subtask_status_dict` the
+    SubtaskStatus of the subtask, as queued by calculate_grades_csv.
+    """
+    # Translators: This is a past-tense verb that is inserted into task progress messages as {action}.
+    action_name = ugettext_noop('graded')
+    create_merge_subtask = partial(
+        _create_merge_grades_csv_shards_subtask, entry_id, xmodule_instance_args, shard['num_shards'],
+    )
+    return ShardedCourseGradeReport.generate_shard(
+        create_merge_subtask, xmodule_instance_args, entry_id, shard, subtask_status_dict, action_name,
+    )
+
+
+@shared_task(base=BaseInstructorTask)
+@set_code_owner_attribute
+def merge_grades_csv_shards(entry_id, xmodule_instance_args, num_shards, subtask_status_dict):
+    """
+    Merge the shards of a sharded course grade report and push the result to
+    an S3 bucket for download.
+    """
+    # Translators: This is a past-tense verb that is inserted into task progress messages as {action}.
+    action_name = ugettext_noop('graded')
+    return ShardedCourseGradeReport.merge_shards(
+        xmodule_instance_args, entry_id, num_shards, subtask_status_dict, action_name,
+    )
+
+
 @shared_task(base=BaseInstructorTask)
 @set_code_owner_attribute
 def calculate_problem_grade_report(entry_id, xmodule_instance_args):
@@ -2,14 +2,18 @@
 Functionality for generating grade reports.
 """
 
+import json
 import logging
 from collections import OrderedDict, defaultdict
 from datetime import datetime
 from itertools import chain
 from time import time
+from uuid import uuid4
 
+import numpy as np
 import re
 import six
+from celery.states import FAILURE, SUCCESS
 from lms.djangoapps.course_blocks.api import get_course_blocks
 from django.conf import settings
 from django.contrib.auth import get_user_model
@@ -24,17 +28,28 @@ from lms.djangoapps.certificates.models import CertificateWhitelist, GeneratedCe
 from lms.djangoapps.courseware.courses import get_course_by_id
 from lms.djangoapps.courseware.user_state_client import DjangoXBlockUserStateClient
 from lms.djangoapps.grades.api import (
+    BatchCourseGrader,
     CourseGradeFactory,
     context as grades_context,
+    get_persisted_course_grade,
     prefetch_course_and_subsection_grades,
+    prefetch_course_grades,
 )
 from lms.djangoapps.instructor_analytics.basic import list_problem_responses
 from lms.djangoapps.instructor_analytics.csvs import format_dictlist
 from lms.djangoapps.instructor_task.config.waffle import (
+    batched_problem_grade_report_enabled,
     course_grade_report_verified_only,
     optimize_get_learners_switch_enabled,
     problem_grade_report_verified_only,
 )
+from lms.djangoapps.instructor_task.models import InstructorTask, ReportFile, ReportStore
+from lms.djangoapps.instructor_task.subtasks import (
+    SubtaskStatus,
+    check_subtask_is_valid,
+    initialize_subtask_info,
+    update_subtask_status,
+)
 from lms.djangoapps.teams.models import CourseTeamMembership
 from lms.djangoapps.verify_student.services import IDVerificationService
 from openedx.core.djangoapps.content.block_structure.api import get_course_in_cache
@@ -43,11 +58,12 @@ from openedx.core.djangoapps.user_api.course_tag.api import BulkCourseTags
 from openedx.core.lib.cache_utils import get_cache
 from common.djangoapps.student.models import CourseEnrollment
 from common.djangoapps.student.roles import BulkRoleCache
+from common.djangoapps.util.db import outer_atomic
 from xmodule.modulestore.django import modulestore
 from xmodule.partitions.partitions_service import PartitionService
 from xmodule.split_test_module import get_split_user_partitions
 from .runner import TaskProgress
-from .utils import upload_csv_to_report_store
+from .utils import upload_csv_to_report_store, upload_report_file_to_report_store
 
 TASK_LOG = logging.getLogger('edx.celery.task')
 
@@ -55,6 +71,10 @@ ENROLLED_IN_COURSE = 'enrolled'
 
 NOT_ENROLLED_IN_COURSE = 'unenrolled'
 
+NOT_AVAILABLE = 'Not Available'
+
+NOT_ATTEMPTED = 'Not Attempted'
+
 
 def _user_enrollment_status(user, course_id):
     """
@@ -71,6 +91,16 @@ def _flatten(iterable):
     return list(chain.from_iterable(iterable))
 
 
+def _score_values(scores, integral):
+    """
+    Returns an object array of the given float scores, with the scores of
+    the given integral mask as ints, as the Submissions API stores them.
+    """
+    values = scores.astype(object)
+    values[integral] = scores[integral].astype(int).tolist()
+    return values
+
+
 class GradeReportBase(object):
     """
     Base class for grade reports (ProblemGradeReport and CourseGradeReport).
@@ -351,6 +381,17 @@ class _ProblemGradeReportContext(object):
     def course_structure(self):
         return get_course_in_cache(self.course_id)
 
+    @lazy
+    def batched_grading(self):
+        """
+        Returns whether the grades and problem scores of each batch of
+        students are computed at once from the students' current scores.
+        """
+        return (
+            batched_problem_grade_report_enabled(self.course_id) and
+            BatchCourseGrader.is_supported(self.course.grader)
+        )
+
     def update_status(self, message):
         """
         Updates the status on the celery task to the given message.
@@ -426,11 +467,17 @@ class CourseGradeReport(object):
         error_headers = self._error_headers()
         batched_rows = self._batched_rows(context)
 
-        context.update_status(u'Compiling grades')
-        success_rows, error_rows = self._compile(context, batched_rows)
+        success_file, error_file = ReportFile(), ReportFile()
+        try:
+            context.update_status(u'Compiling grades')
+            success_file.write_rows([success_headers])
+            self._compile(context, batched_rows, success_file, error_file, error_headers)
 
-        context.update_status(u'Uploading grades')
-        self._upload(context, success_headers, success_rows, error_headers, error_rows)
+            context.update_status(u'Uploading grades')
+            self._upload(context, success_file, error_file)
+        finally:
+            success_file.close()
+            error_file.close()
 
         return context.update_status(u'Completed grades')
 
@@ -455,40 +502,45 @@ class CourseGradeReport(object):
         """
         return ["Student ID", "Username", "Error"]
 
-    def _batched_rows(self, context):
+    def _batched_rows(self, context, start_id=None, end_id=None):
         """
-        A generator of batches of (success_rows, error_rows) for this report.
+        A generator of batches of (success_rows, error_rows) for this report,
+        optionally only for the users whose ids are in [start_id, end_id).
         """
-        for users in self._batch_users(context):
+        for users in self._batch_users(context, start_id, end_id):
             users = [u for u in users if u is not None]
             yield self._rows_for_users(context, users)
 
-    def _compile(self, context, batched_rows):
+    def _compile(self, context, batched_rows, success_file, error_file, error_headers=None):
         """
-        Compiles and returns the complete list of (success_rows, error_rows) for
-        the given batched_rows and context.
+        Appends the (success_rows, error_rows) of each of the given
+        batched_rows to the given report files, one batch at a time, so that
+        only a single batch of rows is held in memory. The error_headers, if
+        any, are written before the first error row.
         """
-        # partition and chain successes and errors
-        success_rows, error_rows = zip(*batched_rows)
-        success_rows = list(chain(*success_rows))
-        error_rows = list(chain(*error_rows))
+        succeeded = failed = 0
+        for success_rows, error_rows in batched_rows:
+            success_file.write_rows(success_rows)
+            if error_rows and error_headers and not error_file.row_count:
+                error_file.write_rows([error_headers])
+            error_file.write_rows(error_rows)
+            succeeded += len(success_rows)
+            failed += len(error_rows)
 
         # update metrics on task status
-        context.task_progress.succeeded = len(success_rows)
-        context.task_progress.failed = len(error_rows)
+        context.task_progress.succeeded = succeeded
+        context.task_progress.failed = failed
         context.task_progress.attempted = context.task_progress.succeeded + context.task_progress.failed
         context.task_progress.total = context.task_progress.attempted
-        return success_rows, error_rows
 
-    def _upload(self, context, success_headers, success_rows, error_headers, error_rows):
+    def _upload(self, context, success_file, error_file):
         """
-        Creates and uploads a CSV for the given headers and rows.
+        Uploads a CSV for each of the given report files that has rows.
         """
         date = datetime.now(UTC)
-        upload_csv_to_report_store([success_headers] + success_rows, 'grade_report', context.course_id, date)
-        if len(error_rows) > 0:
-            error_rows = [error_headers] + error_rows
-            upload_csv_to_report_store(error_rows, 'grade_report_err', context.course_id, date)
+        upload_report_file_to_report_store(success_file, 'grade_report', context.course_id, date)
+        if error_file.row_count > 0:
+            upload_report_file_to_report_store(error_file, 'grade_report_err', context.course_id, date)
 
     def _grades_header(self, context):
         """
@@ -502,9 +554,21 @@ class CourseGradeReport(object):
             grades_header.append(assignment_info['average_header'])
         return grades_header
 
-    def _batch_users(self, context):
+    def _enrolled_users(self, context):
         """
-        Returns a generator of batches of users.
+        Returns a queryset of the users enrolled in the course of this report.
+        """
+        filter_kwargs = {
+            'courseenrollment__course_id': context.course_id,
+        }
+        if context.report_for_verified_only:
+            filter_kwargs['courseenrollment__mode'] = CourseMode.VERIFIED
+        return get_user_model().objects.filter(**filter_kwargs)
+
+    def _batch_users(self, context, start_id=None, end_id=None):
+        """
+        Returns a generator of batches of users, optionally only of the users
+        whose ids are in [start_id, end_id).
         """
 
         def grouper(iterable, chunk_size=self.USER_BATCH_SIZE, fillvalue=None):
@@ -518,9 +582,9 @@ class CourseGradeReport(object):
                 course_id (CourseLocator): course_id to return enrollees for.
                 verified_only (boolean): is a boolean when True, returns only verified enrollees.
             """
-            if optimize_get_learners_switch_enabled():
+            if optimize_get_learners_switch_enabled() or start_id is not None or end_id is not None:
                 TASK_LOG.info(u'%s, Creating Course Grade with optimization', task_log_message)
-                return users_for_course_v2(course_id, verified_only=verified_only)
+                return users_for_course_v2()
 
             TASK_LOG.info(u'%s, Creating Course Grade without optimization', task_log_message)
             return users_for_course(course_id, verified_only=verified_only)
@@ -528,8 +592,8 @@ class CourseGradeReport(object):
         def users_for_course(course_id, verified_only=False):
             """
             Get all the enrolled users in a course.
-            This method fetches & loads the enrolled user objects at once which may cause
-            out-of-memory errors in large courses. This method will be removed when
+            This method fetches the enrolled user objects in a single query, streamed from
+            the database without being cached. This method will be removed when
             `OPTIMIZE_GET_LEARNERS_FOR_COURSE` waffle flag is removed.
             """
             users = CourseEnrollment.objects.users_enrolled_in(
@@ -538,30 +602,28 @@ class CourseGradeReport(object):
                 verified_only=verified_only,
             )
             users = users.select_related('profile')
-            return grouper(users)
+            return grouper(users.iterator())
 
-        def users_for_course_v2(course_id, verified_only=False):
+        def users_for_course_v2():
             """
             Get all the enrolled users in a course chunk by chunk.
             This generator method fetches & loads the enrolled user objects on demand which in chunk
             size defined. This method is a workaround to avoid out-of-memory errors.
             """
-            filter_kwargs = {
-                'courseenrollment__course_id': course_id,
-            }
-            if verified_only:
-                filter_kwargs['courseenrollment__mode'] = CourseMode.VERIFIED
-
-            user_ids_list = get_user_model().objects.filter(**filter_kwargs).values_list('id', flat=True).order_by('id')
+            enrolled_users = self._enrolled_users(context)
+            user_ids_list = enrolled_users.values_list('id', flat=True).order_by('id')
+            if start_id is not None:
+                user_ids_list = user_ids_list.filter(id__gte=start_id)
+            if end_id is not None:
+                user_ids_list = user_ids_list.filter(id__lt=end_id)
             user_chunks = grouper(user_ids_list)
             for user_ids in user_chunks:
                 user_ids = [user_id for user_id in user_ids if user_id is not None]
                 min_id = min(user_ids)
                 max_id = max(user_ids)
-                users = get_user_model().objects.filter(
+                users = enrolled_users.filter(
                     id__gte=min_id,
                     id__lte=max_id,
-                    **filter_kwargs
                 ).select_related('profile')
                 yield users
         course_id = context.course_id
@@ -706,6 +768,235 @@ class CourseGradeReport(object):
             return success_rows, error_rows
 
 
+class ShardedCourseGradeReport(CourseGradeReport):
+    """
+    Class to generate Grade Reports in shards, in parallel.
+
+    The enrolled users are split into ranges of user ids, each graded into
+    partial CSVs by its own subtask.  The progress of each shard is tracked by
+    its SubtaskStatus in the InstructorTask.  Once all the shards are done, a
+    last subtask merges the partial CSVs in order into the final report.
+    """
+    # Directory, within the course's report directory, of the partial CSVs.
+    SHARDS_DIRECTORY = u'grade_report_shards'
+
+    @classmethod
+    def queue_shards(cls, create_shard_subtask, _xmodule_instance_args, _entry_id, course_id, _task_input, action_name):
+        """
+        Public method to queue the subtasks generating the shards of a grade
+        report.
+
+        `create_shard_subtask` is a function of a shard and of its initial
+        SubtaskStatus, that returns the subtask generating the shard.
+        """
+        entry = InstructorTask.objects.get(pk=_entry_id)
+        # Subtasks are already defined if this task is run again, e.g. after
+        # losing its connection to the broker, in which case they're kept.
+        if len(entry.subtasks) > 0 and len(entry.task_output) > 0:
+            TASK_LOG.warning(u'Task %s: grade report shards have already been queued', entry.task_id)
+            return json.loads(entry.task_output)
+
+        with modulestore().bulk_operations(course_id):
+            context = _CourseGradeReportContext(_xmodule_instance_args, _entry_id, course_id, _task_input, action_name)
+            report = cls()
+            num_users, user_id_ranges = report._shard_user_id_ranges(context, settings.COURSE_GRADE_REPORT_SHARDS)
+            if num_users == 0:
+                return report._generate(context)
+
+        shard_task_ids = [str(uuid4()) for _ in user_id_ranges]
+        merge_task_id = str(uuid4())
+        with outer_atomic():
+            progress = initialize_subtask_info(entry, action_name, num_users, shard_task_ids + [merge_task_id])
+
+        TASK_LOG.info(u'%s, Queueing %d grade report shards', context.task_info_string, len(shard_task_ids))
+        for index, ((start_id, end_id), shard_task_id) in enumerate(zip(user_id_ranges, shard_task_ids)):
+            shard = {
+                'index': index,
+                'num_shards': len(shard_task_ids),
+                'start_id': start_id,
+                'end_id': end_id,
+                'merge_task_id': merge_task_id,
+            }
+            create_shard_subtask(shard, SubtaskStatus.create(shard_task_id)).apply_async()
+        return progress
+
+    @classmethod
+    def generate_shard(cls, create_merge_subtask, _xmodule_instance_args, entry_id, shard, subtask_status_dict,
+                       action_name):
+        """
+        Public method to generate the partial CSVs of a shard of a grade report.
+
+        `create_merge_subtask` is a function of the initial SubtaskStatus of
+        the merge, that returns the subtask merging the shards.  It is queued
+        once the last shard is done.
+        """
+        subtask_status = SubtaskStatus.from_dict(subtask_status_dict)
+        check_subtask_is_valid(entry_id, subtask_status.task_id, subtask_status)
+
+        entry = None
+        try:
+            entry = InstructorTask.objects.get(pk=entry_id)
+            task_input = json.loads(entry.task_input)
+            context = _CourseGradeReportContext(
+                _xmodule_instance_args, entry_id, entry.course_id, task_input, action_name,
+            )
+            with modulestore().bulk_operations(entry.course_id):
+                cls()._generate_shard(context, entry.task_id, shard)
+        except Exception:
+            TASK_LOG.exception(
+                u'InstructorTask ID: %s, Failed to generate grade report shard %d', entry_id, shard['index'],
+            )
+            subtask_status.increment(state=FAILURE)
+            try:
+                cls._update_shard_status(entry_id, subtask_status, shard, create_merge_subtask)
+            finally:
+                # The report can't be merged anymore, so the shards generated
+                # so far are deleted now, in case the merge never runs.
+                if entry is not None:
+                    cls()._delete_shards(entry.course_id, entry.task_id, shard['num_shards'])
+            raise
+
+        subtask_status.increment(
+            succeeded=context.task_progress.succeeded,
+            failed=context.task_progress.failed,
+            state=SUCCESS,
+        )
+        cls._update_shard_status(entry_id, subtask_status, shard, create_merge_subtask)
+        return subtask_status.to_dict()
+
+    @classmethod
+    def merge_shards(cls, _xmodule_instance_args, entry_id, num_shards, subtask_status_dict, action_name):
+        """
+        Public method to merge the partial CSVs of the shards of a grade
+        report into the final report.
+        """
+        subtask_status = SubtaskStatus.from_dict(subtask_status_dict)
+        check_subtask_is_valid(entry_id, subtask_status.task_id, subtask_status)
+
+        entry = None
+        try:
+            entry = InstructorTask.objects.get(pk=entry_id)
+            failed_shards = json.loads(entry.subtasks)['failed']
+            if failed_shards:
+                raise ValueError(u'{} of the {} grade report shards failed'.format(failed_shards, num_shards))
+            task_input = json.loads(entry.task_input)
+            context = _CourseGradeReportContext(
+                _xmodule_instance_args, entry_id, entry.course_id, task_input, action_name,
+            )
+            with modulestore().bulk_operations(entry.course_id):
+                cls()._merge_shards(context, entry.task_id, num_shards)
+        except Exception:
+            TASK_LOG.exception(u'InstructorTask ID: %s, Failed to merge the grade report shards', entry_id)
+            subtask_status.increment(state=FAILURE)
+            update_subtask_status(entry_id, subtask_status.task_id, subtask_status)
+            raise
+        finally:
+            if entry is not None:
+                cls()._delete_shards(entry.course_id, entry.task_id, num_shards)
+
+        subtask_status.increment(state=SUCCESS)
+        update_subtask_status(entry_id, subtask_status.task_id, subtask_status)
+        return subtask_status.to_dict()
+
+    @classmethod
+    def _update_shard_status(cls, entry_id, subtask_status, shard, create_merge_subtask):
+        """
+        Updates the status of the given shard, and queues the merge of the
+        shards if it was the last one left.
+        """
+        num_remaining = update_subtask_status(entry_id, subtask_status.task_id, subtask_status)
+        # Only the merge subtask remains once the last shard is done.
+        if num_remaining == 1:
+            try:
+                create_merge_subtask(SubtaskStatus.create(shard['merge_task_id'])).apply_async()
+            except Exception:
+                # The merge won't run to delete the shards.
+                entry = InstructorTask.objects.get(pk=entry_id)
+                cls()._delete_shards(entry.course_id, entry.task_id, shard['num_shards'])
+                raise
+
+    def _shard_user_id_ranges(self, context, num_shards):
+        """
+        Returns the number of users enrolled in the course, and a list of up to
+        num_shards [start_id, end_id) ranges of user ids that split them into
+        shards of about the same size.  The first range has no start_id, and
+        the last one no end_id.
+        """
+        user_ids = self._enrolled_users(context).values_list('id', flat=True).order_by('id')
+        num_users = user_ids.count()
+        num_shards = max(1, min(num_shards, num_users))
+        boundary_ids = [user_ids[num_users * index // num_shards] for index in range(1, num_shards)]
+        return num_users, list(zip([None] + boundary_ids, boundary_ids + [None]))
+
+    def _shard_file_names(self, task_id, index):
+        """
+        Returns the names of the partial success and error CSVs of a shard.
+        """
+        shard_name = u'{}/{}/{:04d}'.format(self.SHARDS_DIRECTORY, task_id, index)
+        return shard_name + u'.csv', shard_name + u'_err.csv'
+
+    def _generate_shard(self, context, task_id, shard):
+        """
+        Generates and stores the partial CSVs, without headers, of the given
+        shard.  The error CSV is only stored if there are errors.
+        """
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        success_file_name, error_file_name = self._shard_file_names(task_id, shard['index'])
+        success_file, error_file = ReportFile(), ReportFile()
+        try:
+            context.update_status(u'Compiling grades of shard {}'.format(shard['index']))
+            batched_rows = self._batched_rows(context, shard['start_id'], shard['end_id'])
+            self._compile(context, batched_rows, success_file, error_file)
+
+            # Replace the files of a previous attempt at this shard, if any.
+            for file_name, report_file in [(success_file_name, success_file), (error_file_name, error_file)]:
+                report_store.delete(context.course_id, file_name)
+                if report_file is success_file or report_file.row_count > 0:
+                    report_store.store_report_file(context.course_id, file_name, report_file)
+        finally:
+            success_file.close()
+            error_file.close()
+
+    def _merge_shards(self, context, task_id, num_shards):
+        """
+        Appends the partial CSVs of the shards, in order, to the final report
+        files and uploads them.
+        """
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        shard_file_names = [self._shard_file_names(task_id, index) for index in range(num_shards)]
+        success_file, error_file = ReportFile(), ReportFile()
+        try:
+            context.update_status(u'Merging grades')
+            success_file.write_rows([self._success_headers(context)])
+            error_file.write_rows([self._error_headers()])
+            has_errors = False
+            for success_file_name, error_file_name in shard_file_names:
+                with report_store.open(context.course_id, success_file_name) as shard_file:
+                    success_file.append_file(shard_file)
+                if report_store.exists(context.course_id, error_file_name):
+                    has_errors = True
+                    with report_store.open(context.course_id, error_file_name) as shard_file:
+                        error_file.append_file(shard_file)
+
+            context.update_status(u'Uploading grades')
+            date = datetime.now(UTC)
+            upload_report_file_to_report_store(success_file, 'grade_report', context.course_id, date)
+            if has_errors:
+                upload_report_file_to_report_store(error_file, 'grade_report_err', context.course_id, date)
+        finally:
+            success_file.close()
+            error_file.close()
+
+    def _delete_shards(self, course_id, task_id, num_shards):
+        """
+        Deletes the partial CSVs of the shards of the given task, if any.
+        """
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        for index in range(num_shards):
+            for file_name in self._shard_file_names(task_id, index):
+                report_store.delete(course_id, file_name)
+
+
 class ProblemGradeReport(GradeReportBase):
     """
     Class to encapsulate functionality related to generating Problem Grade Reports.
@@ -765,6 +1056,9 @@ class ProblemGradeReport(GradeReportBase):
         Returns a list of rows for the given users for this report.
         """
         self.log_additional_info_for_testing(context, 'ProblemGradeReport: Starting to process new user batch.')
+        if context.batched_grading:
+            return self._batched_grading_rows_for_users(context, users)
+
         success_rows, error_rows = [], []
         for student, course_grade, error in CourseGradeFactory().iter(
             users,
@@ -774,14 +1068,7 @@ class ProblemGradeReport(GradeReportBase):
         ):
             context.task_progress.attempted += 1
             if not course_grade:
-                err_msg = text_type(error)
-                # There was an error grading this student.
-                if not err_msg:
-                    err_msg = 'Unknown error'
-                error_rows.append(
-                    [student.id, student.email, student.username] +
-                    [err_msg]
-                )
+                error_rows.append(self._error_row(student, error))
                 context.task_progress.failed += 1
                 continue
 
@@ -790,12 +1077,12 @@ class ProblemGradeReport(GradeReportBase):
                 try:
                     problem_score = course_grade.problem_scores[block_location]
                 except KeyError:
-                    earned_possible_values.append(['Not Available', 'Not Available'])
+                    earned_possible_values.append([NOT_AVAILABLE, NOT_AVAILABLE])
                 else:
                     if problem_score.first_attempted:
                         earned_possible_values.append([problem_score.earned, problem_score.possible])
                     else:
-                        earned_possible_values.append(['Not Attempted', problem_score.possible])
+                        earned_possible_values.append([NOT_ATTEMPTED, problem_score.possible])
 
             context.task_progress.succeeded += 1
             enrollment_status = _user_enrollment_status(student, context.course_id)
@@ -807,6 +1094,90 @@ class ProblemGradeReport(GradeReportBase):
 
         return success_rows, error_rows
 
+    def _batched_grading_rows_for_users(self, context, users):
+        """
+        Returns a list of rows for the given users for this report, with the
+        grades of the users computed at once, and their problem scores
+        read from the users x blocks matrix of their current scores.
+
+        As in the per-user path, the Grade column holds the persisted course
+        grade of a user when there is one, since it may be frozen or differ
+        from the current scores, and the computed one otherwise.  The
+        persisted grades are read from the prefetched rows, so only users
+        without one are read through the CourseGradeFactory.
+        """
+        prefetch_course_grades(context.course_id, users)
+        grade_factory = CourseGradeFactory()
+        success_rows, error_rows = [], []
+        for results, scores in grade_factory.iter_computed_batches(
+            users,
+            course=context.course,
+            collected_block_structure=context.course_structure,
+            course_key=context.course_id,
+        ):
+            if scores is not None:
+                rows = {user.id: row for row, user in enumerate(scores.users)}
+                earned_possible_values = self._earned_possible_values(context, scores)
+            for student, course_grade, error in results:
+                context.task_progress.attempted += 1
+                if not course_grade:
+                    error_rows.append(self._error_row(student, error))
+                    context.task_progress.failed += 1
+                    continue
+
+                persisted_grade = get_persisted_course_grade(student.id, context.course_id)
+                if persisted_grade is not None:
+                    percent = persisted_grade.percent_grade
+                else:
+                    # An absent grade may still be read as a zero grade.
+                    percent = (grade_factory.read(
+                        student,
+                        course=context.course,
+                        collected_block_structure=context.course_structure,
+                        course_key=context.course_id,
+                        create_if_needed=False,
+                    ) or course_grade).percent
+
+                context.task_progress.succeeded += 1
+                enrollment_status = _user_enrollment_status(student, context.course_id)
+                success_rows.append(
+                    [student.id, student.email, student.username] +
+                    [enrollment_status, percent] +
+                    earned_possible_values[rows[student.id]]
+                )
+
+        return success_rows, error_rows
+
+    @staticmethod
+    def _earned_possible_values(context, scores):
+        """
+        Returns, for each user of the given ScoreMatrix, the list of the
+        earned and possible values of the scorable blocks of the report.
+        """
+        columns = [scores.scorable_blocks.columns.get(block_key) for block_key in context.graded_scorable_blocks_header]
+        indices = np.array([column or 0 for column in columns], dtype=int)
+        available = scores.scored[:, indices] & np.array([column is not None for column in columns], dtype=bool)
+        attempted = scores.attempted[:, indices]
+        earned = _score_values(scores.earned[:, indices], scores.from_submissions[:, indices])
+        possible = _score_values(scores.possible[:, indices], scores.from_submissions[:, indices])
+
+        values = np.empty((len(scores.users), 2 * len(columns)), dtype=object)
+        values[:, 0::2] = np.where(available, np.where(attempted, earned, NOT_ATTEMPTED), NOT_AVAILABLE)
+        values[:, 1::2] = np.where(available, possible, NOT_AVAILABLE)
+        return values.tolist()
+
+    @staticmethod
+    def _error_row(student, error):
+        """
+        Returns the row of the error report for the given student, who
+        could not be graded because of the given error.
+        """
+        err_msg = text_type(error)
+        # There was an error grading this student.
+        if not err_msg:
+            err_msg = 'Unknown error'
+        return [student.id, student.email, student.username] + [err_msg]
+
     def _batched_rows(self, context):
         """
         A generator of batches of (success_rows, error_rows) for this report.
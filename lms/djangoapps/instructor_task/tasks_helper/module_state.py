@@ -5,34 +5,51 @@ Instructor Tasks related to module state.
 
 import json
 import logging
+from collections import namedtuple
+from datetime import datetime
 from time import time
 
 import six
+from django.conf import settings
+from django.core.cache import cache
 from django.utils.translation import ugettext_noop
 from opaque_keys.edx.keys import UsageKey
+from pytz import UTC
 from xblock.runtime import KvsFieldData
 from xblock.scorable import Score
 
 from capa.responsetypes import LoncapaProblemError, ResponseError, StudentInputError
 from lms.djangoapps.courseware.courses import get_course_by_id, get_problems_in_section
 from lms.djangoapps.courseware.model_data import DjangoKeyValueStore, FieldDataCache
-from lms.djangoapps.courseware.models import StudentModule
+from lms.djangoapps.courseware.models import StudentModule, chunks
 from lms.djangoapps.courseware.module_render import get_module_for_descriptor_internal
+from lms.djangoapps.courseware.user_state_client import DjangoXBlockUserStateClient
 from lms.djangoapps.grades.api import events as grades_events
+from lms.djangoapps.grades.api import signals as grades_signals
 from common.djangoapps.student.models import get_user_by_username_or_email
 from common.djangoapps.track.event_transaction_utils import create_new_event_transaction_id, set_event_transaction_type
 from common.djangoapps.track.views import task_track
 from common.djangoapps.util.db import outer_atomic
 from xmodule.modulestore.django import modulestore
 
+from ..config.waffle import rescore_problems_in_batch_enabled
 from ..exceptions import UpdateProblemModuleStateError
 from .runner import TaskProgress
 from .utils import UNKNOWN_TASK_ID, UPDATE_STATUS_FAILED, UPDATE_STATUS_SKIPPED, UPDATE_STATUS_SUCCEEDED
 
 TASK_LOG = logging.getLogger('edx.celery.task')
 
+# The number of StudentModules visited at once by perform_module_state_update.
+MODULES_CHUNK_SIZE = 500
 
-def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, task_input, action_name):
+# The problem of a StudentModule rescored in batch, as sent in the SCORE_PUBLISHED
+# signal.  The problem's descriptor is shared by all the students of the task, so it
+# isn't sent, lest the score of the student be set on it.
+RescoredProblem = namedtuple('RescoredProblem', ['location', 'weight'])
+
+
+def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, task_input, action_name,
+                                prefetch_fcn=None):
     """
     Performs generic update by visiting StudentModule instances with the update_fcn provided.
 
@@ -44,6 +61,9 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
     on the particular student module failed.
     A raised exception indicates a fatal condition -- that no other student modules should be considered.
 
+    If `prefetch_fcn` is not None, it is called with the problems by usage key string and each chunk of the
+    StudentModules before they are updated, so that the data needed to update them can be loaded at once.
+
     The return value is a dict containing the task's results, with the following keys:
 
           'attempted': number of attempts made
@@ -89,22 +109,25 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
     task_progress = TaskProgress(action_name, len(modules_to_update), start_time)
     task_progress.update_task_state()
 
-    for module_to_update in modules_to_update:
-        task_progress.attempted += 1
-        module_descriptor = problems[six.text_type(module_to_update.module_state_key)]
-        # There is no try here:  if there's an error, we let it throw, and the task will
-        # be marked as FAILED, with a stack trace.
-        update_status = update_fcn(module_descriptor, module_to_update, task_input)
-        if update_status == UPDATE_STATUS_SUCCEEDED:
-            # If the update_fcn returns true, then it performed some kind of work.
-            # Logging of failures is left to the update_fcn itself.
-            task_progress.succeeded += 1
-        elif update_status == UPDATE_STATUS_FAILED:
-            task_progress.failed += 1
-        elif update_status == UPDATE_STATUS_SKIPPED:
-            task_progress.skipped += 1
-        else:
-            raise UpdateProblemModuleStateError(u"Unexpected update_status returned: {}".format(update_status))
+    for modules_chunk in chunks(modules_to_update, MODULES_CHUNK_SIZE):
+        if prefetch_fcn is not None:
+            prefetch_fcn(problems, modules_chunk)
+        for module_to_update in modules_chunk:
+            task_progress.attempted += 1
+            module_descriptor = problems[six.text_type(module_to_update.module_state_key)]
+            # There is no try here:  if there's an error, we let it throw, and the task will
+            # be marked as FAILED, with a stack trace.
+            update_status = update_fcn(module_descriptor, module_to_update, task_input)
+            if update_status == UPDATE_STATUS_SUCCEEDED:
+                # If the update_fcn returns true, then it performed some kind of work.
+                # Logging of failures is left to the update_fcn itself.
+                task_progress.succeeded += 1
+            elif update_status == UPDATE_STATUS_FAILED:
+                task_progress.failed += 1
+            elif update_status == UPDATE_STATUS_SKIPPED:
+                task_progress.skipped += 1
+            else:
+                raise UpdateProblemModuleStateError(u"Unexpected update_status returned: {}".format(update_status))
 
     return task_progress.update_task_state()
 
@@ -196,6 +219,179 @@ def rescore_problem_module_state(xmodule_instance_args, module_descriptor, stude
         return UPDATE_STATUS_SUCCEEDED
 
 
+class BatchRescoreContext(object):
+    """
+    The data shared by the rescoring in batch of the StudentModules of a task.
+
+    The batch rescorer of each problem is created once for all the students of
+    the task.  The states of the students are loaded by `prefetch` for each
+    chunk of StudentModules, with the bulk queries of the user state client,
+    rather than with the StudentModules of the whole task.
+    """
+    def __init__(self):
+        self._rescorers = {}
+        self._states = {}
+        self._user_state_client = DjangoXBlockUserStateClient()
+
+    def get_rescorer(self, course_id, usage_key, module_descriptor):
+        """
+        Returns the batch rescorer of the given problem, or None if the answers
+        to the problem are rescored by the problem of each student.
+        """
+        if usage_key not in self._rescorers:
+            self._rescorers[usage_key] = None
+            if (
+                    rescore_problems_in_batch_enabled(course_id) and
+                    hasattr(module_descriptor, 'batch_rescorer') and
+                    _is_open_to_learners(module_descriptor)
+            ):
+                self._rescorers[usage_key] = module_descriptor.batch_rescorer(cache=cache)
+        return self._rescorers[usage_key]
+
+    def prefetch(self, problems, student_modules):
+        """
+        Loads the states of the given StudentModules whose problems are rescored
+        in batch.  It is the `prefetch_fcn` of `perform_module_state_update`.
+        """
+        self._states = {}
+        usernames, usage_keys = set(), set()
+        for student_module in student_modules:
+            usage_key = student_module.module_state_key
+            rescorer = self.get_rescorer(student_module.course_id, usage_key, problems[six.text_type(usage_key)])
+            if rescorer is not None:
+                state_key = self._state_key(student_module)
+                self._states[state_key] = {}
+                usernames.add(state_key[0])
+                usage_keys.add(state_key[1])
+        if usernames:
+            user_states = self._user_state_client.get_many_for_users(list(usernames), list(usage_keys))
+            for username, usage_key, state, _, _ in user_states:
+                self._states[(username, usage_key)] = state
+
+    def get_state(self, student_module):
+        """
+        Returns the state of the given StudentModule, loaded by `prefetch`.
+        """
+        return self._states[self._state_key(student_module)]
+
+    @staticmethod
+    def _state_key(student_module):
+        """
+        Returns the username and the usage key of the state of the given
+        StudentModule, as yielded by the user state client.
+        """
+        usage_key = student_module.module_state_key.map_into_course(student_module.course_id)
+        return student_module.student.username, usage_key
+
+
+def select_for_batch_rescore(student_modules):
+    """
+    Returns the given StudentModules queryset with the students of the
+    StudentModules, and without their states, which `BatchRescoreContext`
+    loads a chunk at a time.  It is the `filter_fcn` of
+    `perform_module_state_update` when rescoring in batch.
+    """
+    return student_modules.select_related('student').defer('state')
+
+
+def _is_open_to_learners(module_descriptor):
+    """
+    Returns whether any student can load the given problem, as checked by
+    `has_access`, so that the access of its students needn't be checked one by one.
+
+    The problem is checked without binding it to a student, which ignores
+    the overrides of its fields.  So only problems which aren't restricted to
+    groups or to staff, and which have started, are open to all the students.
+    """
+    if module_descriptor.merged_group_access or module_descriptor.visible_to_staff_only:
+        return False
+    return (
+        settings.FEATURES['DISABLE_START_DATES'] or
+        module_descriptor.start is None or
+        datetime.now(UTC) > module_descriptor.start
+    )
+
+
+def batch_rescore_problem_module_state(xmodule_instance_args, context, module_descriptor, student_module,
+                                       task_input):
+    """
+    Performs rescoring on the student's problem submission like
+    `rescore_problem_module_state`, but grades the submission with the batch
+    rescorer of the problem, when it has one, rather than with an instance of
+    the problem for the student.
+
+    `context` is the BatchRescoreContext of the task, which holds the batch
+    rescorers of the problems, so that a problem is only parsed once for all
+    the students of the task, and the states of the students.  The submissions
+    which can't be rescored in a batch are rescored by
+    `rescore_problem_module_state`.
+    """
+    course_id = student_module.course_id
+    student = student_module.student
+    usage_key = student_module.module_state_key
+
+    rescorer = context.get_rescorer(course_id, usage_key, module_descriptor)
+    if rescorer is None:
+        return rescore_problem_module_state(xmodule_instance_args, module_descriptor, student_module, task_input)
+
+    state = context.get_state(student_module)
+    if not state.get('done'):
+        return UPDATE_STATUS_SKIPPED
+
+    # Set the tracking info before this call, because it makes downstream
+    # calls that create events.
+    create_new_event_transaction_id()
+    set_event_transaction_type(grades_events.GRADES_RESCORE_EVENT_TYPE)
+
+    try:
+        rescored = rescorer.rescore(state, _get_track_function_for_task(student, xmodule_instance_args))
+    except (LoncapaProblemError, StudentInputError, ResponseError):
+        TASK_LOG.warning(
+            u"error processing rescore call for course %(course)s, problem %(loc)s "
+            u"and student %(student)s",
+            dict(
+                course=course_id,
+                loc=usage_key,
+                student=student
+            )
+        )
+        return UPDATE_STATUS_FAILED
+
+    if rescored is None:
+        return rescore_problem_module_state(xmodule_instance_args, module_descriptor, student_module, task_input)
+    new_state, new_score = rescored
+
+    with outer_atomic():
+        responses = grades_signals.SCORE_PUBLISHED.send(
+            sender=None,
+            block=RescoredProblem(module_descriptor.location, module_descriptor.weight),
+            user=student,
+            raw_earned=new_score.raw_earned,
+            raw_possible=new_score.raw_possible,
+            only_if_higher=task_input['only_if_higher'],
+            score_deleted=None,
+            grader_response=None,
+        )
+        # The score is updated, unless it isn't higher than before and only higher scores are kept.
+        if any(score_updated for _, score_updated in responses):
+            rescorer.set_score(new_state, new_score)
+            student_module.grade = new_score.raw_earned
+            student_module.max_grade = new_score.raw_possible
+        student_module.state = json.dumps(new_state)
+        student_module.save()
+
+    TASK_LOG.debug(
+        u"successfully processed batch rescore call for course %(course)s, problem %(loc)s "
+        u"and student %(student)s",
+        dict(
+            course=course_id,
+            loc=usage_key,
+            student=student
+        )
+    )
+    return UPDATE_STATUS_SUCCEEDED
+
+
 @outer_atomic
 def override_score_module_state(xmodule_instance_args, module_descriptor, student_module, task_input):
     '''
@@ -18,6 +18,7 @@ from celery.states import FAILURE, SUCCESS
 from django.contrib.auth.models import User
 from django.test.utils import override_settings
 from django.urls import reverse
+from edx_toggles.toggles.testutils import override_waffle_flag
 from mock import patch
 from six import text_type
 from six.moves import range
@@ -32,6 +33,7 @@ from lms.djangoapps.instructor_task.api import (
     submit_rescore_problem_for_student,
     submit_reset_problem_attempts_for_all_students
 )
+from lms.djangoapps.instructor_task.config.waffle import RESCORE_PROBLEMS_IN_BATCH, waffle_flags
 from lms.djangoapps.instructor_task.models import InstructorTask
 from lms.djangoapps.instructor_task.tasks_helper.grades import CourseGradeReport
 from lms.djangoapps.instructor_task.tests.test_base import (
@@ -232,6 +234,56 @@ class TestRescoringTask(TestIntegrationTask):
             problem_edit, new_expected_scores, new_expected_max, rescore_if_higher=True,
         )
 
+    @ddt.data(
+        RescoreTestData(edit=dict(correct_answer=OPTION_2), new_expected_scores=(0, 1, 1, 2), new_expected_max=2),
+        RescoreTestData(edit=dict(num_inputs=2), new_expected_scores=(2, 1, 1, 0), new_expected_max=4),
+    )
+    @ddt.unpack
+    def test_rescoring_option_problem_in_batch(self, problem_edit, new_expected_scores, new_expected_max):
+        """
+        Verify rescoring in batch updates grades like rescoring the problem of each student.
+        """
+        with override_waffle_flag(waffle_flags()[RESCORE_PROBLEMS_IN_BATCH], active=True):
+            with patch(
+                'lms.djangoapps.instructor_task.tasks_helper.module_state._get_module_instance_for_task'
+            ) as mock_get_module_instance:
+                self.verify_rescore_results(
+                    problem_edit, new_expected_scores, new_expected_max, rescore_if_higher=False,
+                )
+        mock_get_module_instance.assert_not_called()
+
+    def test_rescoring_in_batch_leaves_problem_unscored(self):
+        """
+        Verify rescoring in batch doesn't set the scores of the students on the problem shared by them.
+        """
+        problem_url_name = 'H1P1'
+        self.define_option_problem(problem_url_name)
+        location = InstructorTaskModuleTestCase.problem_location(problem_url_name)
+        self.submit_student_answer('u1', problem_url_name, [OPTION_1, OPTION_1])
+        self.submit_student_answer('u2', problem_url_name, [OPTION_2, OPTION_2])
+        self.redefine_option_problem(problem_url_name, correct_answer=OPTION_2)
+
+        descriptors = []
+        get_item = self.module_store.get_item
+
+        def record_problem(usage_key, *args, **kwargs):
+            """
+            Gets the item, recording the descriptor of the rescored problem.
+            """
+            item = get_item(usage_key, *args, **kwargs)
+            if usage_key == location:
+                descriptors.append(item)
+            return item
+
+        with override_waffle_flag(waffle_flags()[RESCORE_PROBLEMS_IN_BATCH], active=True):
+            with patch.object(self.module_store, 'get_item', side_effect=record_problem):
+                self.submit_rescore_all_student_answers('instructor', problem_url_name)
+
+        self.assertEqual(self.get_student_module('u1', descriptors[0]).grade, 0)
+        self.assertEqual(self.get_student_module('u2', descriptors[0]).grade, 2)
+        for descriptor in descriptors:
+            self.assertNotIn(descriptor.fields['score'], descriptor.get_dirty_fields())
+
     def test_rescoring_if_higher_scores_equal(self):
         """
         Specifically tests rescore when the previous and new raw scores are equal. In this case, the scores should
@@ -433,6 +485,13 @@ class TestRescoringTask(TestIntegrationTask):
         for user in self.users:
             self.check_state(user, descriptor, 0, 1, expected_attempts=2)
 
+    def test_rescoring_randomized_problem_in_batch(self):
+        """
+        Custom response problems are rescored by the problem of each student, even in batch.
+        """
+        with override_waffle_flag(waffle_flags()[RESCORE_PROBLEMS_IN_BATCH], active=True):
+            self.test_rescoring_randomized_problem()
+
 
 @override_settings(RATELIMIT_ENABLE=False)
 class TestResetAttemptsTask(TestIntegrationTask):
@@ -7,12 +7,13 @@ import copy
 import time
 from six import StringIO
 
+import unicodecsv
 from django.conf import settings
 from django.test import SimpleTestCase, TestCase, override_settings
 from opaque_keys.edx.locator import CourseLocator
 
 from common.test.utils import MockS3BotoMixin
-from lms.djangoapps.instructor_task.models import InstructorTask, ReportStore, TASK_INPUT_LENGTH
+from lms.djangoapps.instructor_task.models import InstructorTask, ReportFile, ReportStore, TASK_INPUT_LENGTH
 from lms.djangoapps.instructor_task.tests.test_base import TestReportMixin
 
 
@@ -69,6 +70,24 @@ class ReportStoreTestMixin(object):
             ['new_file', 'middle_file', 'old_file']
         )
 
+    def test_store_report_file(self):
+        """
+        Test that the rows appended to a ReportFile are stored as a CSV.
+        """
+        report_store = self.create_report_store()
+        report_file = ReportFile()
+        report_file.write_rows([[u'Username', u'Grade']])
+        report_file.write_rows([[u'ni\xf1o', 0.5], [u'student', 1]])
+        self.assertEqual(report_file.row_count, 3)
+        report_store.store_report_file(self.course_id, 'report.csv', report_file)
+
+        self.assertEqual([link[0] for link in report_store.links_for(self.course_id)], ['report.csv'])
+        with report_store.storage.open(report_store.path_to(self.course_id, 'report.csv')) as csv_file:
+            self.assertEqual(
+                list(unicodecsv.reader(csv_file, encoding='utf-8-sig')),
+                [[u'Username', u'Grade'], [u'ni\xf1o', u'0.5'], [u'student', u'1']],
+            )
+
 
 class LocalFSReportStoreTestCase(ReportStoreTestMixin, TestReportMixin, SimpleTestCase):
     """
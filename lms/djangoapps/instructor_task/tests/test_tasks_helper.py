@@ -9,17 +9,20 @@ Unit tests for LMS instructor-initiated background tasks helper functions.
 """
 
 
+import json
 import os
 import shutil
 import tempfile
 from collections import OrderedDict
 from contextlib import contextmanager, ExitStack
 from datetime import datetime, timedelta
+from functools import partial
 from io import BytesIO
 from zipfile import ZipFile
 
 import ddt
 import unicodecsv
+from celery.states import SUCCESS
 from django.conf import settings
 from django.test.utils import override_settings
 from django.urls import reverse
@@ -55,7 +58,8 @@ from lms.djangoapps.instructor_task.tasks_helper.grades import (
     NOT_ENROLLED_IN_COURSE,
     CourseGradeReport,
     ProblemGradeReport,
-    ProblemResponses
+    ProblemResponses,
+    ShardedCourseGradeReport
 )
 from lms.djangoapps.instructor_task.tasks_helper.misc import (
     cohort_students_and_upload,
@@ -68,6 +72,7 @@ from lms.djangoapps.instructor_task.tests.test_base import (
     InstructorTaskModuleTestCase,
     TestReportMixin
 )
+from lms.djangoapps.instructor_task.tests.factories import InstructorTaskFactory
 from lms.djangoapps.teams.tests.factories import CourseTeamFactory, CourseTeamMembershipFactory
 from lms.djangoapps.verify_student.tests.factories import SoftwareSecurePhotoVerificationFactory
 from openedx.core.djangoapps.course_groups.models import CohortMembership, CourseUserGroupPartitionGroup
@@ -84,7 +89,8 @@ from xmodule.modulestore.tests.django_utils import SharedModuleStoreTestCase
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory, check_mongo_calls
 from xmodule.partitions.partitions import Group, UserPartition
 
-from ..models import ReportStore
+from ..models import InstructorTask, ReportStore
+from ..tasks import _create_grades_csv_shard_subtask
 from ..tasks_helper.utils import UPDATE_STATUS_FAILED, UPDATE_STATUS_SUCCEEDED
 
 _TEAMS_CONFIG = TeamsConfig({
@@ -440,6 +446,113 @@ class TestInstructorGradeReport(InstructorGradeReportTestCase):
             {'attempted': expected_students, 'succeeded': expected_students, 'failed': 0}, result
         )
 
+    @patch('lms.djangoapps.instructor_task.tasks_helper.grades.CourseGradeReport.USER_BATCH_SIZE', 2)
+    def test_rows_written_in_batches(self):
+        """
+        Test that the rows of every batch of users are written to the report,
+        after a single header row.
+        """
+        usernames = [u'student{}'.format(i) for i in range(5)]
+        for username in usernames:
+            self.create_student(username, u'{}@example.com'.format(username))
+
+        with patch('lms.djangoapps.instructor_task.tasks_helper.runner._get_current_task'):
+            result = CourseGradeReport.generate(None, None, self.course.id, None, 'graded')
+        self.assertDictContainsSubset({'attempted': 5, 'succeeded': 5, 'failed': 0}, result)
+
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        report_csv_filename = report_store.links_for(self.course.id)[0][0]
+        report_path = report_store.path_to(self.course.id, report_csv_filename)
+        with report_store.storage.open(report_path) as csv_file:
+            rows = list(unicodecsv.DictReader(csv_file))
+        self.assertEqual(sorted(row['Username'] for row in rows), usernames)
+
+
+@patch('lms.djangoapps.instructor_task.tasks_helper.runner._get_current_task')
+@override_settings(COURSE_GRADE_REPORT_SHARDS=2)
+class TestShardedCourseGradeReport(InstructorGradeReportTestCase):
+    """
+    Tests that course grade reports can be generated in shards.
+    """
+    def setUp(self):
+        super(TestShardedCourseGradeReport, self).setUp()
+        self.course = CourseFactory.create()
+        self.usernames = [u'student{}'.format(i) for i in range(5)]
+        for username in self.usernames:
+            self.create_student(username, u'{}@example.com'.format(username))
+        self.entry = InstructorTaskFactory.create(
+            course_id=self.course.id, task_type='grade_course', task_id='sharded-grade-report',
+        )
+
+    def _queue_shards(self):
+        """
+        Queues the shards of a grade report, which are run eagerly.
+        """
+        create_shard_subtask = partial(_create_grades_csv_shard_subtask, self.entry.id, None)
+        return ShardedCourseGradeReport.queue_shards(
+            create_shard_subtask, None, self.entry.id, self.course.id, {}, 'graded',
+        )
+
+    def test_sharded_report(self, _get_current_task):
+        progress = self._queue_shards()
+        self.assertDictContainsSubset({'total': 5}, progress)
+
+        entry = InstructorTask.objects.get(pk=self.entry.id)
+        self.assertEqual(entry.task_state, SUCCESS)
+        self.assertDictContainsSubset(
+            {'attempted': 5, 'succeeded': 5, 'failed': 0, 'total': 5}, json.loads(entry.task_output)
+        )
+        self.assertDictContainsSubset({'total': 3, 'succeeded': 3, 'failed': 0}, json.loads(entry.subtasks))
+
+        # Only the merged report is left, with the users of all the shards in order.
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        links = report_store.links_for(self.course.id)
+        self.assertEqual(len(links), 1)
+        with report_store.open(self.course.id, links[0][0]) as csv_file:
+            rows = list(unicodecsv.DictReader(csv_file))
+        self.assertEqual([row['Username'] for row in rows], self.usernames)
+        shard_file_name, _ = ShardedCourseGradeReport()._shard_file_names(self.entry.task_id, 0)
+        self.assertFalse(report_store.exists(self.course.id, shard_file_name))
+
+    def test_failed_shard(self, _get_current_task):
+        generate_shard = ShardedCourseGradeReport._generate_shard
+
+        def fail_second_shard(report, context, task_id, shard):
+            if shard['index'] == 1:
+                raise TypeError('Cannot grade shard')
+            return generate_shard(report, context, task_id, shard)
+
+        with patch.object(ShardedCourseGradeReport, '_generate_shard', autospec=True, side_effect=fail_second_shard):
+            self._queue_shards()
+
+        entry = InstructorTask.objects.get(pk=self.entry.id)
+        # Both the shard and the merge failed, and no report was uploaded.
+        self.assertDictContainsSubset({'total': 3, 'succeeded': 1, 'failed': 2}, json.loads(entry.subtasks))
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        self.assertEqual(report_store.links_for(self.course.id), [])
+        self.assert_no_shard_files()
+
+    def test_merge_not_queued(self, _get_current_task):
+        create_merge_subtask = Mock()
+        create_merge_subtask.return_value.apply_async.side_effect = RuntimeError('Cannot queue merge')
+        with patch(
+            'lms.djangoapps.instructor_task.tasks._create_merge_grades_csv_shards_subtask', create_merge_subtask,
+        ):
+            self._queue_shards()
+
+        self.assertTrue(create_merge_subtask.return_value.apply_async.called)
+        self.assert_no_shard_files()
+
+    def assert_no_shard_files(self):
+        """
+        Asserts that no partial CSV of the shards of the report is left.
+        """
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        report = ShardedCourseGradeReport()
+        for index in range(2):
+            for file_name in report._shard_file_names(self.entry.task_id, index):
+                self.assertFalse(report_store.exists(self.course.id, file_name))
+
 
 class TestTeamGradeReport(InstructorGradeReportTestCase):
     """ Test that teams appear correctly in the grade report when it is enabled for the course. """
@@ -876,6 +989,91 @@ class TestProblemGradeReport(TestReportMixin, InstructorTaskModuleTestCase):
             )))
         ])
 
+    @patch('lms.djangoapps.instructor_task.tasks_helper.runner._get_current_task')
+    def test_single_problem_batched_grading(self, _get_current_task):
+        vertical = ItemFactory.create(
+            parent_location=self.problem_section.location,
+            category='vertical',
+            metadata={'graded': True},
+            display_name='Problem Vertical'
+        )
+        self.define_option_problem(u'Problem1', parent=vertical)
+        hidden_vertical = ItemFactory.create(
+            parent_location=self.problem_section.location,
+            category='vertical',
+            metadata={'graded': True, 'visible_to_staff_only': True},
+            display_name='Hidden Problem Vertical'
+        )
+        self.define_option_problem(u'Problem2', parent=hidden_vertical)
+
+        self.submit_student_answer(self.student_1.username, u'Problem1', ['Option 1'])
+        with patch(
+            'lms.djangoapps.instructor_task.tasks_helper.grades.batched_problem_grade_report_enabled',
+            return_value=True,
+        ):
+            result = ProblemGradeReport.generate(None, None, self.course.id, None, 'graded')
+        self.assertDictContainsSubset({'action_name': 'graded', 'attempted': 2, 'succeeded': 2, 'failed': 0}, result)
+        problem_names = [u'Homework 1: Subsection - Problem1', u'Homework 1: Subsection - Problem2']
+        header_row = self.csv_header_row + [
+            problem_name + suffix for problem_name in problem_names for suffix in [' (Earned)', ' (Possible)']
+        ]
+        self.verify_rows_in_csv([
+            dict(list(zip(
+                header_row,
+                [
+                    text_type(self.student_1.id),
+                    self.student_1.email,
+                    self.student_1.username,
+                    ENROLLED_IN_COURSE,
+                    '0.01', '1.0', '2.0', u'Not Available', u'Not Available',
+                ]
+            ))),
+            dict(list(zip(
+                header_row,
+                [
+                    text_type(self.student_2.id),
+                    self.student_2.email,
+                    self.student_2.username,
+                    ENROLLED_IN_COURSE,
+                    '0.0', u'Not Attempted', '2.0', u'Not Available', u'Not Available',
+                ]
+            )))
+        ])
+
+    @patch('lms.djangoapps.instructor_task.tasks_helper.runner._get_current_task')
+    def test_batched_grading_persisted_grade(self, _get_current_task):
+        vertical = ItemFactory.create(
+            parent_location=self.problem_section.location,
+            category='vertical',
+            metadata={'graded': True},
+            display_name='Problem Vertical'
+        )
+        self.define_option_problem(u'Problem1', parent=vertical)
+        self.submit_student_answer(self.student_1.username, u'Problem1', ['Option 1'])
+        # The persisted grade, e.g. a frozen one, is reported rather than the current scores.
+        PersistentCourseGrade.update_or_create(
+            user_id=self.student_1.id,
+            course_id=self.course.id,
+            passed=False,
+            percent_grade=0.5,
+            grading_policy_hash=GradesTransformer.grading_policy_hash(self.course),
+        )
+
+        with patch(
+            'lms.djangoapps.instructor_task.tasks_helper.grades.batched_problem_grade_report_enabled',
+            return_value=True,
+        ), patch(
+            'lms.djangoapps.grades.course_grade_factory.CourseGradeFactory.read',
+            return_value=None,
+        ) as mock_read:
+            ProblemGradeReport.generate(None, None, self.course.id, None, 'graded')
+        # The grade is read only for the student without a persisted one.
+        self.assertEqual([call_args[0][0] for call_args in mock_read.call_args_list], [self.student_2])
+        self.verify_rows_in_csv([
+            {u'Student ID': text_type(self.student_1.id), u'Grade': '0.5'},
+            {u'Student ID': text_type(self.student_2.id), u'Grade': '0.0'},
+        ], ignore_other_columns=True)
+
     @patch('lms.djangoapps.instructor_task.tasks_helper.runner._get_current_task')
     def test_single_problem_verified_student_only(self, _get_current_task):
         with patch(
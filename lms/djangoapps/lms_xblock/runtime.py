@@ -14,6 +14,7 @@ from lms.djangoapps.badges.service import BadgingService
 from lms.djangoapps.badges.utils import badges_enabled
 from lms.djangoapps.lms_xblock.models import XBlockAsidesConfig
 from lms.djangoapps.teams.services import TeamsService
+from openedx.core.djangoapps.content.capa_script_contexts.services import ScriptContextsService
 from openedx.core.djangoapps.user_api.course_tag import api as user_course_tag_api
 from openedx.core.lib.url_utils import quote_slashes
 from openedx.core.lib.xblock_services.call_to_action import CallToActionService
@@ -166,6 +167,8 @@ class LmsModuleSystem(ModuleSystem):  # pylint: disable=abstract-method
         services['teams'] = TeamsService()
         services['teams_configuration'] = TeamsConfigurationService()
         services['call_to_action'] = CallToActionService()
+        if settings.FEATURES.get('PRECOMPUTE_CAPA_SCRIPT_CONTEXTS', False):
+            services['capa_script_contexts'] = ScriptContextsService()
         super(LmsModuleSystem, self).__init__(**kwargs)
 
     def handler_url(self, *args, **kwargs):
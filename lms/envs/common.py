@@ -704,6 +704,35 @@ FEATURES = {
     # .. toggle_tickets: https://openedx.atlassian.net/browse/ENT-3818
     # .. toggle_warnings: None.
     'ENABLE_COURSE_ASSESSMENT_GRADE_CHANGE_SIGNAL': False,
+
+    # .. toggle_name: FEATURES['COALESCE_SUBSECTION_GRADE_UPDATES']
+    # .. toggle_implementation: DjangoSetting
+    # .. toggle_default: False
+    # .. toggle_description: Set to True to coalesce the score changes of a learner in a course for a few seconds into
+    #   a single task, which updates each subsection containing changed scores once, instead of queueing a subsection
+    #   grade update task per score change.
+    # .. toggle_use_cases: temporary
+    # .. toggle_creation_date: 2026-10-18
+    # .. toggle_target_removal_date: 2027-04-18
+    # .. toggle_tickets: None
+    # .. toggle_warnings: The pending score changes are kept in the default cache, which must be shared by the LMS and
+    #   its workers, and support atomic increments, such as memcached.
+    'COALESCE_SUBSECTION_GRADE_UPDATES': False,
+
+    # .. toggle_name: FEATURES['PRECOMPUTE_CAPA_SCRIPT_CONTEXTS']
+    # .. toggle_implementation: DjangoSetting
+    # .. toggle_default: False
+    # .. toggle_description: Set to True to run the scripts of the problems of a course once for each seed their
+    #   learners can have when the course is published, and store the resulting contexts, for problems that aren't
+    #   randomized or are randomized per student.  When it is enabled in the LMS, problems read these contexts instead
+    #   of running their scripts in the sandbox.
+    # .. toggle_use_cases: temporary
+    # .. toggle_creation_date: 2026-10-18
+    # .. toggle_target_removal_date: 2027-04-18
+    # .. toggle_tickets: None
+    # .. toggle_warnings: Enable it in both Studio and the LMS.  Run the precompute_capa_script_contexts command for
+    #   the courses published before it was enabled.
+    'PRECOMPUTE_CAPA_SCRIPT_CONTEXTS': False,
 }
 
 # Specifies extra XBlock fields that should available when requested via the Course Blocks API
@@ -841,6 +870,10 @@ CACHES = {
     },
 }
 
+# The codec with which course structures are encoded in the 'course_structure_cache':
+# 'pickle' or, if installed, 'msgpack'.  See xmodule.modulestore.split_mongo.structure_codec.
+COURSE_STRUCTURE_CACHE_CODEC = 'pickle'
+
 ############################ OAUTH2 Provider ###################################
 OAUTH_EXPIRE_CONFIDENTIAL_CLIENT_DAYS = 365
 OAUTH_EXPIRE_PUBLIC_CLIENT_DAYS = 30
@@ -1344,6 +1377,17 @@ CODE_JAIL = {
     "limit_overrides": {},
 }
 
+# Pool of sandboxed Python processes, started like the processes of CODE_JAIL,
+# which import the modules available to jailed code once, and then run many
+# executions.  Each worker runs as the CODE_JAIL user, so the workers count
+# against the NPROC limit of the executions which don't use the pool.
+CODE_JAIL_POOL = {
+    # How many workers can each process use?  0 disables the pool.
+    'size': 0,
+    # After how many executions is a worker replaced?
+    'max_executions': 100,
+}
+
 # Some courses are allowed to run unsafe code. This is a list of regexes, one
 # of them must match the course id for that course to run unsafe code.
 #
@@ -2363,6 +2407,17 @@ BLOCK_STRUCTURES_SETTINGS = dict(
 
     # Backend storage options
     PRUNING_ACTIVE=False,
+
+    # Maximum total size, in bytes of serialized data, of the collected
+    # block structures kept in each process's in-process cache. The
+    # in-process cache is used only when storage backing is enabled.
+    # Set to 0 to disable it.
+    LOCAL_CACHE_MAX_SIZE=0,
+
+    # Whether to record the cost of each transformer when block
+    # structures are transformed, and report it as custom monitoring
+    # attributes.  The cost of collecting is always reported.
+    PROFILE_TRANSFORMERS=False,
 )
 
 ################################ Bulk Email ###################################
@@ -2619,6 +2674,9 @@ INSTALLED_APPS = [
     'openedx.core.djangoapps.content.block_structure.apps.BlockStructureConfig',
     'lms.djangoapps.course_blocks',
 
+    # Precomputed contexts of the scripts of problems
+    'openedx.core.djangoapps.content.capa_script_contexts.apps.CapaScriptContextsConfig',
+
 
     # Coursegraph
     'openedx.core.djangoapps.coursegraph.apps.CoursegraphConfig',
@@ -3075,6 +3133,11 @@ GRADES_DOWNLOAD = {
     'ROOT_PATH': None,
 }
 
+# Number of shards, each generated by its own subtask, that course grade reports
+# are split into when the instructor_task.generate_sharded_course_grade_report
+# course waffle flag is enabled.
+COURSE_GRADE_REPORT_SHARDS = 8
+
 FINANCIAL_REPORTS = {
     'STORAGE_TYPE': 'localfs',
     'BUCKET': None,
@@ -2,6 +2,8 @@
 Module with family of classes for block structures.
     BlockStructure - responsible for block existence and relations.
     BlockStructureBlockData - responsible for block & transformer data.
+    CompactBlockStructureBlockData - BlockStructureBlockData backed by an
+        integer-indexed graph of block relations.
     BlockStructureModulestoreData - responsible for xBlock data.
 
 The following internal data structures are implemented:
@@ -19,6 +21,7 @@ import six
 from openedx.core.lib.graph_traversals import traverse_post_order, traverse_topologically
 
 from .exceptions import TransformerException
+from .graph import BlockGraph
 
 logger = getLogger(__name__)  # pylint: disable=invalid-name
 
@@ -53,6 +56,11 @@ class BlockStructure(object):
     the existence of the blocks, and their parents and children
     relationships (graph nodes and edges).
     """
+    # The number of blocks yielded by traversals of this structure, when
+    # counted for profiling; see TransformerTimings.  None if not
+    # counted.
+    _num_visited = None
+
     def __init__(self, root_block_usage_key):
 
         # The usage key of the root block for this structure.
@@ -65,6 +73,14 @@ class BlockStructure(object):
         # dict {UsageKey: _BlockRelations}
         self._block_relations = {}
 
+        # Whether the _BlockRelations in _block_relations may be shared
+        # with copies of this structure, in which case they are copied
+        # before being mutated.  See _mutable_relations.
+        self._relations_shared = False
+        # Set of the usage keys of the blocks whose _BlockRelations are
+        # no longer shared.
+        self._owned_relations = set()
+
         # Add the root block.
         self._add_block(self._block_relations, root_block_usage_key)
 
@@ -110,6 +126,20 @@ class BlockStructure(object):
         """
         return self._block_relations[usage_key].children if usage_key in self else []
 
+    def sort_children(self, usage_key, key):
+        """
+        Sorts the children of the block identified by the given
+        usage_key.
+
+        Arguments:
+            usage_key - The usage key of the block whose children
+                are to be sorted.
+
+            key ((UsageKey)->any) - Function that returns the sort key
+                of a child's usage key.
+        """
+        self._mutable_relations(usage_key).children.sort(key=key)
+
     def set_root_block(self, usage_key):
         """
         Sets the given usage key as the new root of the block structure.
@@ -123,7 +153,7 @@ class BlockStructure(object):
                 new root of the block structure.
         """
         self.root_block_usage_key = usage_key
-        self._block_relations[usage_key].parents = []
+        self._mutable_relations(usage_key).parents = []
 
     def __contains__(self, usage_key):
         """
@@ -170,13 +200,13 @@ class BlockStructure(object):
             generator - A generator object created from the
                 traverse_topologically method.
         """
-        return traverse_topologically(
+        return self._count_visits(traverse_topologically(
             start_node=start_node or self.root_block_usage_key,
             get_parents=self.get_parents,
             get_children=self.get_children,
             filter_func=filter_func,
             yield_descendants_of_unyielded=yield_descendants_of_unyielded,
-        )
+        ))
 
     def post_order_traversal(
             self,
@@ -195,15 +225,34 @@ class BlockStructure(object):
             generator - A generator object created from the
                 traverse_post_order method.
         """
-        return traverse_post_order(
+        return self._count_visits(traverse_post_order(
             start_node=start_node or self.root_block_usage_key,
             get_children=self.get_children,
             filter_func=filter_func,
-        )
+        ))
 
     #--- Internal methods ---#
     # To be used within the block_structure framework or by tests.
 
+    def _count_visits(self, usage_keys):
+        """
+        Returns the given iterable of traversed usage keys, counting
+        them in _num_visited if visits are being counted.
+        """
+        if self._num_visited is None:
+            return usage_keys
+        return self._counting_visits(usage_keys)
+
+    def _counting_visits(self, usage_keys):
+        """
+        Generator that yields the given usage keys while counting them
+        in _num_visited.
+        """
+        for usage_key in usage_keys:
+            if self._num_visited is not None:
+                self._num_visited += 1
+            yield usage_key
+
     def _prune_unreachable(self):
         """
         Mutates this block structure by removing any unreachable blocks.
@@ -231,6 +280,8 @@ class BlockStructure(object):
 
         # Replace this structure's relations with the newly pruned one.
         self._block_relations = pruned_block_relations
+        self._relations_shared = False
+        self._owned_relations = set()
 
     def _add_relation(self, parent_key, child_key):
         """
@@ -240,8 +291,25 @@ class BlockStructure(object):
             parent_key (UsageKey) - Usage key of the parent block.
             child_key (UsageKey) - Usage key of the child block.
         """
+        for usage_key in (parent_key, child_key):
+            if usage_key in self._block_relations:
+                self._mutable_relations(usage_key)
         self._add_to_relations(self._block_relations, parent_key, child_key)
 
+    def _mutable_relations(self, usage_key):
+        """
+        Returns the _BlockRelations of the given block, first copying
+        them if they may be shared with a copy of this structure.
+        """
+        if self._relations_shared and usage_key not in self._owned_relations:
+            shared_relations = self._block_relations[usage_key]
+            block_relations = _BlockRelations()
+            block_relations.parents = list(shared_relations.parents)
+            block_relations.children = list(shared_relations.children)
+            self._block_relations[usage_key] = block_relations
+            self._owned_relations.add(usage_key)
+        return self._block_relations[usage_key]
+
     @staticmethod
     def _add_to_relations(block_relations, parent_key, child_key):
         """
@@ -324,12 +392,29 @@ class FieldData(object):
         """
         return field_name in self.class_field_names()
 
+    def _copy_fields_to(self, field_data):
+        """
+        Copies this instance's fields dict to the given FieldData.  The
+        field values themselves are not copied.
+        """
+        # Fields that are lazily deserialized are copied without
+        # deserializing them.
+        lazy_copy = getattr(self.fields, 'lazy_copy', None)
+        field_data.fields = lazy_copy() if lazy_copy else dict(self.fields)
+
 
 class TransformerData(FieldData):
     """
     Data structure to encapsulate collected data for a transformer.
     """
-    pass
+    def shallow_copy(self):
+        """
+        Returns a copy of this TransformerData that shares its field
+        values.
+        """
+        transformer_data = TransformerData()
+        self._copy_fields_to(transformer_data)
+        return transformer_data
 
 
 class TransformerDataMap(dict):
@@ -394,6 +479,17 @@ class BlockData(FieldData):
         # Map of transformer name to its block-specific data.
         self.transformer_data = TransformerDataMap()
 
+    def shallow_copy(self):
+        """
+        Returns a copy of this BlockData, including its transformers'
+        data, that shares its field values.
+        """
+        block_data = BlockData(self.location)
+        self._copy_fields_to(block_data)
+        for transformer_name, transformer_data in six.iteritems(self.transformer_data):
+            block_data.transformer_data[transformer_name] = transformer_data.shallow_copy()
+        return block_data
+
 
 class BlockStructureBlockData(BlockStructure):
     """
@@ -404,7 +500,7 @@ class BlockStructureBlockData(BlockStructure):
     # update this value whenever the data structure changes. Dependent storage
     # layers can then use this value when serializing/deserializing block
     # structures, and invalidating any previously cached/stored data.
-    VERSION = 2
+    VERSION = 3
 
     def __init__(self, root_block_usage_key):
         super(BlockStructureBlockData, self).__init__(root_block_usage_key)
@@ -414,41 +510,60 @@ class BlockStructureBlockData(BlockStructure):
         # dict {UsageKey: BlockData}
         self._block_data_map = {}
 
+        # Whether the BlockData in _block_data_map may be shared with
+        # copies of this structure, in which case they are copied before
+        # being handed out for mutation.  See _mutable_block.
+        self._block_data_shared = False
+        # Set of the usage keys of the blocks whose BlockData are no
+        # longer shared.
+        self._owned_block_data = set()
+
         # Map of a transformer's name to its non-block-specific data.
         self.transformer_data = TransformerDataMap()
 
     def copy(self):
         """
         Returns a new instance of BlockStructureBlockData with a
-        deep-copy of this instance's contents.
+        copy-on-write copy of this instance's contents.
+
+        The copy initially shares its block relations and block data
+        with this instance, and copies those of a block only when the
+        block is modified in either structure.  Values returned by
+        get_xblock_field and get_transformer_block_field may therefore
+        be shared, and should be replaced rather than modified in place.
         """
         from .factory import BlockStructureFactory
-        return BlockStructureFactory.create_new(
+        block_structure = BlockStructureFactory.create_new(
             self.root_block_usage_key,
-            deepcopy(self._block_relations),
+            dict(self._block_relations),
             deepcopy(self.transformer_data),
-            deepcopy(self._block_data_map),
+            dict(self._block_data_map),
         )
+        for structure in (self, block_structure):
+            structure._relations_shared = True  # pylint: disable=protected-access
+            structure._owned_relations = set()  # pylint: disable=protected-access
+        self._share_block_data_with(block_structure)
+        return block_structure
 
     def iteritems(self):
         """
         Returns iterator of (UsageKey, BlockData) pairs for all
         blocks in the BlockStructure.
         """
-        return six.iteritems(self._block_data_map)
+        return ((usage_key, self._mutable_block(usage_key)) for usage_key in list(self._block_data_map))
 
     def itervalues(self):
         """
         Returns iterator of BlockData for all blocks in the
         BlockStructure.
         """
-        return six.itervalues(self._block_data_map)
+        return (block_data for _, block_data in self.iteritems())
 
     def __getitem__(self, usage_key):
         """
         Returns the BlockData associated with the given key.
         """
-        return self._block_data_map[usage_key]
+        return self._mutable_block(usage_key)
 
     def get_xblock_field(self, usage_key, field_name, default=None):
         """
@@ -532,7 +647,7 @@ class BlockStructureBlockData(BlockStructure):
             transformer (BlockStructureTransformer) - The transformer
                 whose dictionary data is requested.
         """
-        return self._block_data_map[usage_key].transformer_data[transformer]
+        return self._mutable_block(usage_key).transformer_data[transformer]
 
     def get_transformer_block_field(self, usage_key, transformer, key, default=None):
         """
@@ -554,7 +669,7 @@ class BlockStructureBlockData(BlockStructure):
                 entry is not found.
         """
         try:
-            transformer_data = self.get_transformer_block_data(usage_key, transformer)
+            transformer_data = self._block_data_map[usage_key].transformer_data[transformer]
         except KeyError:
             return default
         return getattr(transformer_data, key, default)
@@ -626,11 +741,11 @@ class BlockStructureBlockData(BlockStructure):
 
         # Remove block from its children.
         for child in children:
-            self._block_relations[child].parents.remove(usage_key)
+            self._mutable_relations(child).parents.remove(usage_key)
 
         # Remove block from its parents.
         for parent in parents:
-            self._block_relations[parent].children.remove(usage_key)
+            self._mutable_relations(parent).children.remove(usage_key)
 
         # Remove block.
         self._block_relations.pop(usage_key, None)
@@ -760,12 +875,172 @@ class BlockStructureBlockData(BlockStructure):
         maps it to the given key.
         """
         try:
-            return self._block_data_map[usage_key]
+            return self._mutable_block(usage_key)
         except KeyError:
             block_data = BlockData(usage_key)
             self._block_data_map[usage_key] = block_data
+            self._owned_block_data.add(usage_key)
             return block_data
 
+    def _mutable_block(self, usage_key):
+        """
+        Returns the BlockData associated with the given usage_key,
+        first copying it if it may be shared with a copy of this
+        structure.
+
+        Raises KeyError if not found.
+        """
+        if self._block_data_shared and usage_key not in self._owned_block_data:
+            self._block_data_map[usage_key] = self._block_data_map[usage_key].shallow_copy()
+            self._owned_block_data.add(usage_key)
+        return self._block_data_map[usage_key]
+
+    def _share_block_data_with(self, block_structure):
+        """
+        Marks the BlockData of this structure as shared with the given
+        copy of it.
+        """
+        for structure in (self, block_structure):
+            structure._block_data_shared = True  # pylint: disable=protected-access
+            structure._owned_block_data = set()  # pylint: disable=protected-access
+
+
+class CompactBlockStructureBlockData(BlockStructureBlockData):
+    """
+    Subclass of BlockStructureBlockData whose block relations are backed
+    by a compact, integer-indexed BlockGraph instead of a map of
+    _BlockRelations, so relation lookups and traversals do not hash
+    usage keys.
+
+    Used for block structures that are loaded from the store for the
+    Transform phase.
+    """
+    def __init__(self, root_block_usage_key, graph=None):  # pylint: disable=super-init-not-called
+        self.root_block_usage_key = root_block_usage_key
+
+        # Graph of the blocks in the structure and their relations.
+        # BlockGraph
+        self._graph = graph if graph is not None else BlockGraph([])
+        self._graph.add_block(root_block_usage_key)
+
+        self._block_data_map = {}
+        self._block_data_shared = False
+        self._owned_block_data = set()
+        self.transformer_data = TransformerDataMap()
+
+    @property
+    def _block_relations(self):
+        """
+        Returns a map of a block's usage key to its block relations,
+        materialized from the graph.  Changes to the returned map are
+        not reflected in this block structure.
+        """
+        block_relations = {}
+        for usage_key in self._graph.keys():
+            relations = _BlockRelations()
+            relations.parents = self._graph.parents_keys(usage_key)
+            relations.children = self._graph.children_keys(usage_key)
+            block_relations[usage_key] = relations
+        return block_relations
+
+    def __len__(self):
+        return len(self._graph)
+
+    def __contains__(self, usage_key):
+        return usage_key in self._graph
+
+    def get_parents(self, usage_key):
+        return self._graph.parents_keys(usage_key)
+
+    def get_children(self, usage_key):
+        return self._graph.children_keys(usage_key)
+
+    def sort_children(self, usage_key, key):
+        children = self._graph.children_keys(usage_key)
+        children.sort(key=key)
+        self._graph.set_children(self._get_index(usage_key), [self._graph.index(child) for child in children])
+
+    def set_root_block(self, usage_key):
+        self._graph.set_parents(self._get_index(usage_key), [])
+        self.root_block_usage_key = usage_key
+
+    def get_block_keys(self):
+        return self._graph.keys()
+
+    def topological_traversal(
+            self,
+            filter_func=None,
+            yield_descendants_of_unyielded=False,
+            start_node=None,
+    ):
+        start_index = self._graph.index(start_node or self.root_block_usage_key)
+        if start_index is None:
+            return super(CompactBlockStructureBlockData, self).topological_traversal(
+                filter_func, yield_descendants_of_unyielded, start_node,
+            )
+        return self._count_visits(self._keys_of(self._graph.traverse_topologically(
+            start_index,
+            filter_func=filter_func,
+            yield_descendants_of_unyielded=yield_descendants_of_unyielded,
+        )))
+
+    def post_order_traversal(
+            self,
+            filter_func=None,
+            start_node=None,
+    ):
+        start_index = self._graph.index(start_node or self.root_block_usage_key)
+        if start_index is None:
+            return super(CompactBlockStructureBlockData, self).post_order_traversal(filter_func, start_node)
+        return self._count_visits(self._keys_of(self._graph.traverse_post_order(start_index, filter_func=filter_func)))
+
+    def copy(self):
+        """
+        Returns a new instance of CompactBlockStructureBlockData with a
+        copy of this instance's graph and a copy-on-write copy of its
+        data.  See BlockStructureBlockData.copy.
+        """
+        from .factory import BlockStructureFactory
+        block_structure = BlockStructureFactory.create_compact(
+            self.root_block_usage_key,
+            self._graph.copy(),
+            deepcopy(self.transformer_data),
+            dict(self._block_data_map),
+        )
+        self._share_block_data_with(block_structure)
+        return block_structure
+
+    def remove_block(self, usage_key, keep_descendants):
+        self._graph.remove_block(self._get_index(usage_key), keep_descendants)
+        self._block_data_map.pop(usage_key, None)
+
+    #--- Internal methods ---#
+    # To be used within the block_structure framework or by tests.
+
+    def _prune_unreachable(self):
+        self._graph.prune_unreachable(self._graph.index(self.root_block_usage_key))
+
+    def _add_relation(self, parent_key, child_key):
+        self._graph.add_relation(self._graph.add_block(parent_key), self._graph.add_block(child_key))
+
+    def _get_index(self, usage_key):
+        """
+        Returns the graph index of the given block.
+
+        Raises KeyError if the block is not in the structure.
+        """
+        index = self._graph.index(usage_key)
+        if index is None:
+            raise KeyError(usage_key)
+        return index
+
+    def _keys_of(self, indices):
+        """
+        Returns a generator of the usage keys of the given block indices.
+        """
+        key = self._graph.key
+        return (key(index) for index in indices)
+
 
 class BlockStructureModulestoreData(BlockStructureBlockData):
     """
@@ -789,6 +1064,22 @@ class BlockStructureModulestoreData(BlockStructureBlockData):
         # set(string)
         self._requested_xblock_fields = set()
 
+        # Set of the usage keys of the blocks that are being collected,
+        # when collecting incrementally.  Traversals only yield these
+        # blocks.  If None, all blocks are collected.
+        # set(UsageKey)
+        self._collect_scope = None
+
+    def topological_traversal(self, *args, **kwargs):
+        return self._in_collect_scope(
+            super(BlockStructureModulestoreData, self).topological_traversal(*args, **kwargs)
+        )
+
+    def post_order_traversal(self, *args, **kwargs):
+        return self._in_collect_scope(
+            super(BlockStructureModulestoreData, self).post_order_traversal(*args, **kwargs)
+        )
+
     def request_xblock_fields(self, *field_names):
         """
         Records request for collecting data for the given xBlock fields.
@@ -833,12 +1124,23 @@ class BlockStructureModulestoreData(BlockStructureBlockData):
         """
         self._xblock_map[usage_key] = xblock
 
+    def _in_collect_scope(self, usage_keys):
+        """
+        Returns the given iterable of usage keys, limited to the blocks
+        in the collect scope, if any.
+        """
+        if self._collect_scope is None:
+            return usage_keys
+        return (usage_key for usage_key in usage_keys if usage_key in self._collect_scope)
+
     def _collect_requested_xblock_fields(self):
         """
         Iterates through all instantiated xBlocks that were added and
         collects all xBlock fields that were requested.
         """
         for xblock_usage_key, xblock in six.iteritems(self._xblock_map):
+            if self._collect_scope is not None and xblock_usage_key not in self._collect_scope:
+                continue
             block_data = self._get_or_create_block(xblock_usage_key)
             for field_name in self._requested_xblock_fields:
                 self._set_xblock_field(block_data, xblock, field_name)
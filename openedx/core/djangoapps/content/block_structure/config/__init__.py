@@ -19,6 +19,12 @@ STORAGE_BACKING_FOR_CACHE = WaffleSwitch(
 RAISE_ERROR_WHEN_NOT_FOUND = WaffleSwitch(
     "block_structure.raise_error_when_not_found", __name__
 )
+COMPACT_BLOCK_RELATIONS = WaffleSwitch(
+    "block_structure.compact_block_relations", __name__
+)
+INCREMENTAL_COLLECT = WaffleSwitch(
+    "block_structure.incremental_collect", __name__
+)
 
 
 def enable_storage_backing_for_cache_in_request():
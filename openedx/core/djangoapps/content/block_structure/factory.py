@@ -1,7 +1,11 @@
 """
 Module for factory class for BlockStructure objects.
 """
-from .block_structure import BlockStructureBlockData, BlockStructureModulestoreData
+from .block_structure import (
+    BlockStructureBlockData,
+    BlockStructureModulestoreData,
+    CompactBlockStructureBlockData
+)
 
 
 class BlockStructureFactory(object):
@@ -95,3 +99,14 @@ class BlockStructureFactory(object):
         block_structure.transformer_data = transformer_data
         block_structure._block_data_map = block_data_map  # pylint: disable=protected-access
         return block_structure
+
+    @classmethod
+    def create_compact(cls, root_block_usage_key, graph, transformer_data, block_data_map):
+        """
+        Returns a new block structure, backed by the given BlockGraph,
+        for the given arguments.
+        """
+        block_structure = CompactBlockStructureBlockData(root_block_usage_key, graph)
+        block_structure.transformer_data = transformer_data
+        block_structure._block_data_map = block_data_map  # pylint: disable=protected-access
+        return block_structure
@@ -0,0 +1,419 @@
+"""
+Module with a compact, integer-indexed graph of block relations.
+
+BlockGraph interns the usage keys of a block structure to dense integer
+indices and keeps the parents and children of each block in CSR-style
+arrays, so that relation lookups and traversals operate on ints rather
+than hashing opaque usage keys.  Usage keys are only looked up when
+crossing the API boundary: when a block is requested by key, and when
+a key is passed to a traversal's filter function or yielded.
+
+The CSR arrays are never mutated once built and may be shared across
+copies of the graph.  Blocks whose relations change are recorded in
+per-block override lists, and removed blocks are flagged in a bytearray.
+"""
+
+
+from array import array
+
+# Type code of the arrays holding block indices.
+INDEX_TYPECODE = 'I'
+
+# Traversal states of a block.
+_UNVISITED = 0
+_VISITED = 1
+_YIELDED = 2
+
+
+class BlockGraph(object):
+    """
+    Integer-indexed graph of block relations (nodes and edges).
+    """
+    def __init__(self, keys, children_offsets=None, children=None, parents_offsets=None, parents=None):
+        """
+        Arguments:
+            keys (list(UsageKey)) - The usage keys of the blocks, in
+                index order.
+
+            children_offsets (array) - CSR offsets of each block's
+                children; has len(keys) + 1 entries.
+
+            children (array) - CSR block indices of the children.
+
+            parents_offsets (array) - CSR offsets of each block's
+                parents; has len(keys) + 1 entries.
+
+            parents (array) - CSR block indices of the parents.
+        """
+        self._keys = keys
+        self._index_of = {key: index for index, key in enumerate(keys)}
+        # Whether _keys and _index_of are shared with another graph.
+        self._keys_shared = False
+
+        empty_offsets = array(INDEX_TYPECODE, [0] * (len(keys) + 1))
+        self._children_offsets = children_offsets if children_offsets is not None else empty_offsets
+        self._children = children if children is not None else array(INDEX_TYPECODE)
+        self._parents_offsets = parents_offsets if parents_offsets is not None else empty_offsets
+        self._parents = parents if parents is not None else array(INDEX_TYPECODE)
+        # Number of blocks covered by the CSR arrays.
+        self._num_csr_blocks = len(self._children_offsets) - 1
+
+        # Map of block index to its list of children (or parents)
+        # indices, for blocks whose relations have changed.
+        self._children_overrides = {}
+        self._parents_overrides = {}
+
+        self._removed = bytearray(len(keys))
+        self._num_removed = 0
+
+        # Incremented on every mutation of the graph.
+        self._version = 0
+        # Map of start index to the precomputed topological order of
+        # the graph at _topological_order_version.
+        self._topological_orders = {}
+        self._topological_order_version = 0
+
+    @classmethod
+    def from_relations(cls, keys, get_children, get_parents):
+        """
+        Returns a new BlockGraph for the given keys, with relations
+        provided by the given accessor functions.
+        """
+        index_of = {key: index for index, key in enumerate(keys)}
+        csr = []
+        for get_relations in (get_children, get_parents):
+            offsets = array(INDEX_TYPECODE, [0])
+            targets = array(INDEX_TYPECODE)
+            for key in keys:
+                targets.extend(index_of[target] for target in get_relations(key))
+                offsets.append(len(targets))
+            csr.extend((offsets, targets))
+        return cls(keys, *csr)
+
+    def copy(self):
+        """
+        Returns a copy of this graph.  The CSR arrays and the interned
+        keys are shared with the copy.
+        """
+        graph = BlockGraph.__new__(BlockGraph)
+        graph.__dict__.update(self.__dict__)
+        graph._children_overrides = {index: list(indices) for index, indices in self._children_overrides.items()}
+        graph._parents_overrides = {index: list(indices) for index, indices in self._parents_overrides.items()}
+        graph._removed = bytearray(self._removed)
+        graph._topological_orders = dict(self._topological_orders)
+        graph._keys_shared = self._keys_shared = True
+        return graph
+
+    def __len__(self):
+        return len(self._keys) - self._num_removed
+
+    def __contains__(self, key):
+        return self.index(key) is not None
+
+    def index(self, key):
+        """
+        Returns the index of the block with the given key, or None if
+        the block is not in the graph.
+        """
+        index = self._index_of.get(key)
+        if index is None or self._removed[index]:
+            return None
+        return index
+
+    def key(self, index):
+        """
+        Returns the usage key of the block at the given index.
+        """
+        return self._keys[index]
+
+    def keys(self):
+        """
+        Returns an iterator of the usage keys of all blocks in the graph.
+        """
+        removed = self._removed
+        return (key for index, key in enumerate(self._keys) if not removed[index])
+
+    def children(self, index):
+        """
+        Returns the indices of the children of the block at the given
+        index.
+        """
+        return self._relations(index, self._children_overrides, self._children_offsets, self._children)
+
+    def parents(self, index):
+        """
+        Returns the indices of the parents of the block at the given
+        index.
+        """
+        return self._relations(index, self._parents_overrides, self._parents_offsets, self._parents)
+
+    def children_keys(self, key):
+        """
+        Returns a list of the usage keys of the children of the block
+        with the given key.
+        """
+        index = self.index(key)
+        if index is None:
+            return []
+        keys = self._keys
+        return [keys[child] for child in self.children(index)]
+
+    def parents_keys(self, key):
+        """
+        Returns a list of the usage keys of the parents of the block
+        with the given key.
+        """
+        index = self.index(key)
+        if index is None:
+            return []
+        keys = self._keys
+        return [keys[parent] for parent in self.parents(index)]
+
+    #--- Mutation methods ---#
+
+    def add_block(self, key):
+        """
+        Adds a block with the given key, if not already present, and
+        returns its index.
+        """
+        index = self._index_of.get(key)
+        if index is not None:
+            if self._removed[index]:
+                self._removed[index] = 0
+                self._num_removed -= 1
+                self._children_overrides[index] = []
+                self._parents_overrides[index] = []
+                self._mutated()
+            return index
+
+        if self._keys_shared:
+            self._keys = list(self._keys)
+            self._index_of = dict(self._index_of)
+            self._keys_shared = False
+        index = len(self._keys)
+        self._keys.append(key)
+        self._index_of[key] = index
+        self._removed.append(0)
+        self._mutated()
+        return index
+
+    def add_relation(self, parent_index, child_index):
+        """
+        Adds a parent to child relationship between the blocks at the
+        given indices.
+        """
+        self._mutable_parents(child_index).append(parent_index)
+        self._mutable_children(parent_index).append(child_index)
+        self._mutated()
+
+    def set_children(self, index, child_indices):
+        """
+        Replaces the children of the block at the given index.
+        """
+        self._children_overrides[index] = list(child_indices)
+        self._mutated()
+
+    def set_parents(self, index, parent_indices):
+        """
+        Replaces the parents of the block at the given index.
+        """
+        self._parents_overrides[index] = list(parent_indices)
+        self._mutated()
+
+    def remove_block(self, index, keep_descendants):
+        """
+        Removes the block at the given index from the graph, along
+        with its relations.  If keep_descendants is True, the removed
+        block's children become children of its parents.
+        """
+        children = list(self.children(index))
+        parents = list(self.parents(index))
+
+        for child in children:
+            self._mutable_parents(child).remove(index)
+        for parent in parents:
+            self._mutable_children(parent).remove(index)
+
+        self._removed[index] = 1
+        self._num_removed += 1
+        self._children_overrides.pop(index, None)
+        self._parents_overrides.pop(index, None)
+        self._mutated()
+
+        if keep_descendants:
+            for child in children:
+                for parent in parents:
+                    self.add_relation(parent, child)
+
+    def prune_unreachable(self, start_index):
+        """
+        Removes all blocks that are unreachable from the block at the
+        given index, along with any relations to them.  If the index is
+        None, all blocks are removed.
+        """
+        reachable = bytearray(len(self._keys))
+        if start_index is not None:
+            for index in self.traverse_post_order(start_index):
+                reachable[index] = 1
+
+        for index in range(len(self._keys)):
+            if self._removed[index]:
+                continue
+            if not reachable[index]:
+                self._removed[index] = 1
+                self._num_removed += 1
+                self._children_overrides.pop(index, None)
+                self._parents_overrides.pop(index, None)
+                continue
+            relation_overrides = ((self.children, self._children_overrides), (self.parents, self._parents_overrides))
+            for relations, overrides in relation_overrides:
+                indices = relations(index)
+                if not all(reachable[other] for other in indices):
+                    overrides[index] = [other for other in indices if reachable[other]]
+        self._mutated()
+
+    #--- Traversal methods ---#
+
+    def traverse_topologically(self, start_index, filter_func=None, yield_descendants_of_unyielded=False):
+        """
+        Generator for yielding block indices in a topological sort,
+        starting at the given index.
+
+        This is the integer-indexed equivalent of
+        openedx.core.lib.graph_traversals.traverse_topologically and
+        yields blocks in the same order, while tolerating mutations of
+        the graph during the traversal.  The filter_func is called
+        with each block's usage key.
+        """
+        if filter_func is None:
+            return self._traverse_precomputed(start_index)
+        return self._traverse_topologically(start_index, filter_func, yield_descendants_of_unyielded)
+
+    def traverse_post_order(self, start_index, filter_func=None):
+        """
+        Generator for yielding block indices in a post-order sort,
+        starting at the given index.
+
+        This is the integer-indexed equivalent of
+        openedx.core.lib.graph_traversals.traverse_post_order.  The
+        filter_func is called with each block's usage key.
+        """
+        keys = self._keys
+        visited = bytearray(len(keys))
+        stack = [(start_index, iter(self.children(start_index)))]
+
+        while stack:
+            current, children = stack[-1]
+            if len(visited) < len(keys):
+                visited.extend(bytearray(len(keys) - len(visited)))
+
+            if visited[current] or (filter_func is not None and not filter_func(keys[current])):
+                stack.pop()
+                continue
+
+            next_child = next(children, None)
+            if next_child is None:
+                yield current
+                visited[current] = 1
+                stack.pop()
+            else:
+                stack.append((next_child, iter(self.children(next_child))))
+
+    #--- Internal methods ---#
+
+    def _relations(self, index, overrides, offsets, targets):
+        """
+        Returns the relation indices of the block at the given index.
+        """
+        indices = overrides.get(index)
+        if indices is not None:
+            return indices
+        if self._removed[index] or index >= self._num_csr_blocks:
+            return ()
+        return targets[offsets[index]:offsets[index + 1]]
+
+    def _mutable_children(self, index):
+        """
+        Returns the overridable list of children of the given block.
+        """
+        if index not in self._children_overrides:
+            self._children_overrides[index] = list(self.children(index))
+        return self._children_overrides[index]
+
+    def _mutable_parents(self, index):
+        """
+        Returns the overridable list of parents of the given block.
+        """
+        if index not in self._parents_overrides:
+            self._parents_overrides[index] = list(self.parents(index))
+        return self._parents_overrides[index]
+
+    def _mutated(self):
+        """
+        Records a mutation of the graph.
+        """
+        self._version += 1
+
+    def _traverse_precomputed(self, start_index):
+        """
+        Yields the unfiltered topological order from the given index,
+        computing it once per version of the graph.  If the graph is
+        mutated while the order is being consumed, the remaining blocks
+        are traversed live on the mutated graph.
+        """
+        if self._topological_order_version != self._version:
+            self._topological_orders = {}
+            self._topological_order_version = self._version
+
+        order = self._topological_orders.get(start_index)
+        if order is None:
+            order = list(self._traverse_topologically(start_index, None, False))
+            self._topological_orders[start_index] = order
+
+        version = self._version
+        yielded = bytearray(len(self._keys))
+        for index in order:
+            if self._version != version:
+                break
+            yielded[index] = 1
+            yield index
+        else:
+            return
+
+        for index in self._traverse_topologically(start_index, None, False):
+            if index >= len(yielded) or not yielded[index]:
+                yield index
+
+    def _traverse_topologically(self, start_index, filter_func, yield_descendants_of_unyielded):
+        """
+        Implementation of the topological traversal over block indices.
+        Mirrors openedx.core.lib.graph_traversals._traverse_generic.
+        """
+        keys = self._keys
+        states = bytearray(len(keys))
+        stack = [start_index]
+
+        while stack:
+            current = stack.pop()
+            if len(states) < len(keys):
+                states.extend(bytearray(len(keys) - len(states)))
+
+            if current != start_index:
+                parents = self.parents(current)
+                if not all(states[parent] for parent in parents):
+                    continue
+                elif not yield_descendants_of_unyielded and not any(
+                        states[parent] == _YIELDED for parent in parents
+                ):
+                    continue
+
+            if not states[current]:
+                unvisited_children = list(self.children(current))
+                unvisited_children.reverse()
+                stack.extend(unvisited_children)
+
+                should_yield_node = filter_func is None or filter_func(keys[current])
+                if should_yield_node:
+                    yield current
+
+                states[current] = _YIELDED if should_yield_node else _VISITED
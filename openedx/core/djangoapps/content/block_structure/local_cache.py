@@ -0,0 +1,137 @@
+"""
+Module for the in-process cache tier of collected block structures.
+
+The BlockStructureStore consults this tier before the django cache and
+storage, so a worker that recently served a course does not fetch and
+deserialize its block structure again.  Entries are keyed by the
+version data of the course, so they become unreachable as soon as a
+new version of the course is collected, and are evicted in least
+recently used order once the configured size is exceeded.
+"""
+
+
+from collections import OrderedDict
+from threading import Lock
+
+from django.conf import settings
+
+
+class LocalBlockStructureCache(object):
+    """
+    Bounded, size-aware, least recently used cache of collected block
+    structures, local to the process.
+    """
+    def __init__(self, max_size):
+        """
+        Arguments:
+            max_size (int) - The maximum total size, in bytes of
+                serialized data, of the cached block structures.
+        """
+        self.max_size = max_size
+
+        # Map of cache key to a tuple of the block structure and its
+        # size, in least recently used order.
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        Returns the block structure cached for the given key, or None.
+
+        The returned block structure is shared across requests, so it
+        must not be modified; copy it first.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, block_structure, size):
+        """
+        Caches the given block structure for the given key, evicting
+        the least recently used block structures as needed.
+
+        Arguments:
+            key (hashable) - The cache key.
+
+            block_structure (BlockStructureBlockData) - The collected
+                block structure to cache.
+
+            size (int) - The size of the block structure, in bytes of
+                serialized data.
+        """
+        if size > self.max_size:
+            return
+
+        with self._lock:
+            previous_entry = self._entries.pop(key, None)
+            if previous_entry is not None:
+                self._size -= previous_entry[1]
+
+            while self._entries and self._size + size > self.max_size:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+                self.evictions += 1
+
+            self._entries[key] = (block_structure, size)
+            self._size += size
+
+    def delete_matching(self, predicate):
+        """
+        Removes the block structures whose keys satisfy the given
+        predicate.
+        """
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                self._size -= self._entries.pop(key)[1]
+
+    def clear(self):
+        """
+        Removes all block structures from the cache.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        """
+        Returns a dict of the cache's counters and current usage.
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'size': self._size,
+                'max_size': self.max_size,
+            }
+
+
+_local_cache = None
+
+
+def get_local_cache():
+    """
+    Returns the process-wide LocalBlockStructureCache, or None if the
+    in-process tier is disabled.
+
+    The tier is configured by the LOCAL_CACHE_MAX_SIZE entry, in bytes,
+    of the BLOCK_STRUCTURES_SETTINGS django setting.
+    """
+    global _local_cache  # pylint: disable=global-statement
+    max_size = settings.BLOCK_STRUCTURES_SETTINGS.get('LOCAL_CACHE_MAX_SIZE', 0)
+    if not max_size:
+        return None
+    if _local_cache is None or _local_cache.max_size != max_size:
+        _local_cache = LocalBlockStructureCache(max_size)
+    return _local_cache
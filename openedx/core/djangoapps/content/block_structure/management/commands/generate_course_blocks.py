@@ -4,21 +4,31 @@ Command to load course blocks.
 
 
 import logging
+import multiprocessing
+import time
+from datetime import timedelta
+from functools import partial
 
 import six
-from django.core.management.base import BaseCommand
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Count
+from django.utils import timezone
 from six import text_type
 
 import openedx.core.djangoapps.content.block_structure.api as api
 import openedx.core.djangoapps.content.block_structure.store as store
 import openedx.core.djangoapps.content.block_structure.tasks as tasks
+from common.djangoapps.student.models import CourseEnrollment
 from openedx.core.djangoapps.content.block_structure.config import enable_storage_backing_for_cache_in_request
 from openedx.core.lib.command_utils import (
     get_mutually_exclusive_required_option,
     parse_course_keys,
     validate_dependent_option
 )
-from xmodule.modulestore.django import modulestore
+from xmodule.contentstore.django import _CONTENTSTORE
+from xmodule.modulestore.django import clear_existing_modulestores, modulestore
 
 log = logging.getLogger(__name__)
 
@@ -28,6 +38,12 @@ class Command(BaseCommand):
     Example usage:
         $ ./manage.py lms generate_course_blocks --all_courses --settings=devstack
         $ ./manage.py lms generate_course_blocks 'edX/DemoX/Demo_Course' --settings=devstack
+
+    To rewarm all courses after a deploy, in 8 local processes, starting
+    with the courses with the most enrollments in the last 30 days, and
+    resumable from where it left off if interrupted:
+        $ ./manage.py lms generate_course_blocks --all_courses --processes 8 \
+            --prioritize_by_enrollment_days 30 --checkpoint_file /tmp/course_blocks.checkpoint
     """
     args = u'<course_id course_id ...>'
     help = u'Generates and stores course blocks for one or more courses.'
@@ -83,6 +99,23 @@ class Command(BaseCommand):
             action='store_true',
             default=False,
         )
+        parser.add_argument(
+            '--processes',
+            help=u'Number of local processes over which to generate the course blocks in parallel.',
+            default=0,
+            type=int,
+        )
+        parser.add_argument(
+            '--prioritize_by_enrollment_days',
+            help=u'Generate course blocks first for the courses with the most enrollments in this many past days.',
+            default=0,
+            type=int,
+        )
+        parser.add_argument(
+            '--checkpoint_file',
+            dest='checkpoint_file',
+            help=u'File in which to record the courses whose blocks were generated, which are skipped when rerun.',
+        )
 
     def handle(self, *args, **options):
 
@@ -90,6 +123,9 @@ class Command(BaseCommand):
         validate_dependent_option(options, 'routing_key', 'enqueue_task')
         validate_dependent_option(options, 'start_index', 'all_courses')
         validate_dependent_option(options, 'end_index', 'all_courses')
+        for local_option in ('processes', 'checkpoint_file'):
+            if options.get(local_option) and options.get('enqueue_task'):
+                raise CommandError(u'Option --{} cannot be used with option --enqueue_task.'.format(local_option))
 
         if courses_mode == 'all_courses':
             course_keys = [course.id for course in modulestore().get_course_summaries()]
@@ -99,6 +135,11 @@ class Command(BaseCommand):
         else:
             course_keys = parse_course_keys(options['courses'])
 
+        if options.get('prioritize_by_enrollment_days'):
+            course_keys = self._prioritize_by_enrollment(course_keys, options['prioritize_by_enrollment_days'])
+        if options.get('checkpoint_file'):
+            course_keys = self._skip_checkpointed(course_keys, options['checkpoint_file'])
+
         self._set_log_levels(options)
 
         log.critical(u'BlockStructure: STARTED generating Course Blocks for %d courses.', len(course_keys))
@@ -134,30 +175,151 @@ class Command(BaseCommand):
         if options.get('with_storage'):
             enable_storage_backing_for_cache_in_request()
 
-        for course_key in course_keys:
-            try:
-                self._generate_for_course(options, course_key)
-            except Exception as ex:  # pylint: disable=broad-except
-                log.exception(
-                    u'BlockStructure: An error occurred while generating course blocks for %s: %s',
-                    six.text_type(course_key),
-                    text_type(ex),
-                )
+        if options.get('enqueue_task'):
+            for course_key in course_keys:
+                try:
+                    self._enqueue_for_course(options, course_key)
+                except Exception as ex:  # pylint: disable=broad-except
+                    log.exception(
+                        u'BlockStructure: An error occurred while enqueuing course blocks for %s: %s',
+                        six.text_type(course_key),
+                        text_type(ex),
+                    )
+            return
+
+        generate = partial(_generate_for_course, force_update=options.get('force_update'))
+        if options.get('processes', 0) > 1:
+            results = self._generate_in_processes(options, course_keys, generate)
+        else:
+            results = six.moves.map(generate, course_keys)
+
+        start_time = time.time()
+        num_generated = num_failed = 0
+        for course_key, generated in results:
+            if generated:
+                num_generated += 1
+                self._checkpoint(options, course_key)
+            else:
+                num_failed += 1
+        elapsed_time = time.time() - start_time
+
+        log.critical(
+            u'BlockStructure: Generated course blocks for %d courses, with %d failures, '
+            u'in %.1f seconds (%.2f courses per second).',
+            num_generated,
+            num_failed,
+            elapsed_time,
+            (num_generated + num_failed) / elapsed_time if elapsed_time else 0,
+        )
 
-    def _generate_for_course(self, options, course_key):
+    def _enqueue_for_course(self, options, course_key):
         """
-        Generates course blocks for the given course_key per the given options.
+        Enqueues the task generating course blocks for the given course_key
+        per the given options.
         """
-        if options.get('enqueue_task'):
-            action = tasks.update_course_in_cache_v2 if options.get('force_update') else tasks.get_course_in_cache_v2
-            task_options = {'routing_key': options['routing_key']} if options.get('routing_key') else {}
-            result = action.apply_async(
-                kwargs=dict(course_id=six.text_type(course_key), with_storage=options.get('with_storage')),
-                **task_options
-            )
-            log.info(u'BlockStructure: ENQUEUED generating for course: %s, task_id: %s.', course_key, result.id)
-        else:
-            log.info(u'BlockStructure: STARTED generating for course: %s.', course_key)
-            action = api.update_course_in_cache if options.get('force_update') else api.get_course_in_cache
-            action(course_key)
-            log.info(u'BlockStructure: FINISHED generating for course: %s.', course_key)
+        action = tasks.update_course_in_cache_v2 if options.get('force_update') else tasks.get_course_in_cache_v2
+        task_options = {'routing_key': options['routing_key']} if options.get('routing_key') else {}
+        result = action.apply_async(
+            kwargs=dict(course_id=six.text_type(course_key), with_storage=options.get('with_storage')),
+            **task_options
+        )
+        log.info(u'BlockStructure: ENQUEUED generating for course: %s, task_id: %s.', course_key, result.id)
+
+    def _generate_in_processes(self, options, course_keys, generate):
+        """
+        Generator of the results of calling the given generate function
+        for each of the given course_keys, in a pool of local processes,
+        in the order in which they complete.
+        """
+        # The forked processes must not share the connections of this
+        # process; they create their own.
+        connections.close_all()
+        for cache in caches.all():
+            cache.close()
+
+        pool = multiprocessing.Pool(
+            options['processes'],
+            initializer=_initialize_process,
+            initargs=(options.get('with_storage'),),
+        )
+        try:
+            for result in pool.imap_unordered(generate, course_keys):
+                yield result
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def _prioritize_by_enrollment(self, course_keys, num_days):
+        """
+        Returns the given course_keys, ordered by their number of
+        enrollments in the given number of past days, most first.
+        """
+        num_recent_enrollments = dict(
+            CourseEnrollment.objects.filter(
+                created__gte=timezone.now() - timedelta(days=num_days),
+            ).order_by().values_list('course_id').annotate(Count('id'))
+        )
+        return sorted(course_keys, key=lambda course_key: -num_recent_enrollments.get(course_key, 0))
+
+    def _skip_checkpointed(self, course_keys, checkpoint_file):
+        """
+        Returns the given course_keys, without those recorded in the
+        given checkpoint file by a previous run.
+        """
+        try:
+            with open(checkpoint_file) as checkpoint:
+                checkpointed = {line.strip() for line in checkpoint}
+        except IOError:
+            return course_keys
+
+        remaining_course_keys = [
+            course_key for course_key in course_keys if six.text_type(course_key) not in checkpointed
+        ]
+        log.critical(
+            u'BlockStructure: Skipping %d courses recorded in checkpoint file %s.',
+            len(course_keys) - len(remaining_course_keys),
+            checkpoint_file,
+        )
+        return remaining_course_keys
+
+    def _checkpoint(self, options, course_key):
+        """
+        Records the given course_key in the checkpoint file, if any.
+        """
+        if options.get('checkpoint_file'):
+            with open(options['checkpoint_file'], 'a') as checkpoint:
+                checkpoint.write(six.text_type(course_key) + u'\n')
+
+
+def _initialize_process(with_storage):
+    """
+    Initializes a process of the pool generating course blocks.
+    """
+    # Create new modulestore connections rather than using the ones
+    # inherited from the parent process.
+    clear_existing_modulestores()
+    _CONTENTSTORE.clear()
+
+    if with_storage:
+        enable_storage_backing_for_cache_in_request()
+
+
+def _generate_for_course(course_key, force_update):
+    """
+    Generates course blocks for the given course_key.  Returns a tuple
+    of the course_key and whether the course blocks were generated.
+    """
+    try:
+        log.info(u'BlockStructure: STARTED generating for course: %s.', course_key)
+        action = api.update_course_in_cache if force_update else api.get_course_in_cache
+        action(course_key)
+        log.info(u'BlockStructure: FINISHED generating for course: %s.', course_key)
+        return course_key, True
+    except Exception as ex:  # pylint: disable=broad-except
+        log.exception(
+            u'BlockStructure: An error occurred while generating course blocks for %s: %s',
+            six.text_type(course_key),
+            text_type(ex),
+        )
+        return course_key, False
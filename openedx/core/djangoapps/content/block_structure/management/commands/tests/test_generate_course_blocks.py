@@ -4,6 +4,8 @@ Tests for generate_course_blocks management command.
 
 
 import itertools
+import os
+import tempfile
 
 import ddt
 from django.core.management.base import CommandError
@@ -11,6 +13,7 @@ from mock import patch
 import six
 from six.moves import range
 
+from common.djangoapps.student.tests.factories import CourseEnrollmentFactory
 from openedx.core.djangoapps.content.block_structure.tests.helpers import (
     is_course_in_block_structure_cache,
     is_course_in_block_structure_storage
@@ -150,6 +153,58 @@ class TestGenerateCourseBlocks(ModuleStoreTestCase):
                     else:
                         self.assertNotIn('routing_key', task_options)
 
+    def test_checkpoint_file(self):
+        checkpoint_file, checkpoint_path = tempfile.mkstemp()
+        os.close(checkpoint_file)
+        self.addCleanup(os.remove, checkpoint_path)
+
+        self.command.handle(courses=[six.text_type(self.course_keys[0])], checkpoint_file=checkpoint_path)
+        with open(checkpoint_path) as checkpoint:
+            self.assertEqual(checkpoint.read().split(), [six.text_type(self.course_keys[0])])
+
+        with patch(
+            'openedx.core.djangoapps.content.block_structure.management.commands.generate_course_blocks.api'
+        ) as mock_api:
+            self.command.handle(all_courses=True, force_update=True, checkpoint_file=checkpoint_path)
+            self.assertCountEqual(
+                [call_args[0][0] for call_args in mock_api.update_course_in_cache.call_args_list],
+                self.course_keys[1:],
+            )
+        with open(checkpoint_path) as checkpoint:
+            self.assertCountEqual(checkpoint.read().split(), [six.text_type(key) for key in self.course_keys])
+
+    def test_prioritize_by_enrollment(self):
+        for num_enrollments, course_key in enumerate(self.course_keys, 1):
+            for _ in range(num_enrollments):
+                CourseEnrollmentFactory.create(course_id=course_key)
+        with patch(
+            'openedx.core.djangoapps.content.block_structure.management.commands.generate_course_blocks.api'
+        ) as mock_api:
+            self.command.handle(all_courses=True, prioritize_by_enrollment_days=1)
+            self.assertEqual(
+                [call_args[0][0] for call_args in mock_api.get_course_in_cache.call_args_list],
+                list(reversed(self.course_keys)),
+            )
+
+    def test_processes(self):
+        with patch(
+            'openedx.core.djangoapps.content.block_structure.management.commands.generate_course_blocks.multiprocessing'
+        ) as mock_multiprocessing:
+            mock_pool = mock_multiprocessing.Pool.return_value
+            mock_pool.imap_unordered.side_effect = lambda func, iterable: [func(item) for item in iterable]
+            self.command.handle(all_courses=True, processes=2)
+
+            self.assertEqual(mock_multiprocessing.Pool.call_args[0][0], 2)
+            self.assertTrue(mock_pool.terminate.called)
+        self._assert_courses_in_block_cache(*self.course_keys)
+
+    @ddt.data('processes', 'checkpoint_file')
+    def test_local_option_with_enqueue_task(self, local_option):
+        with self.assertRaisesMessage(
+            CommandError, 'Option --{} cannot be used with option --enqueue_task.'.format(local_option),
+        ):
+            self.command.handle(all_courses=True, enqueue_task=True, **{local_option: 2})
+
     @patch('openedx.core.djangoapps.content.block_structure.management.commands.generate_course_blocks.log')
     def test_not_found_key(self, mock_log):
         self.command.handle(courses=['fake/course/id'])
@@ -12,7 +12,7 @@ from . import config
 from .exceptions import BlockStructureNotFound, TransformerDataIncompatible, UsageKeyNotInBlockStructure
 from .factory import BlockStructureFactory
 from .store import BlockStructureStore
-from .transformers import BlockStructureTransformers
+from .transformers import BlockStructureTransformers, SharedTransformCache
 
 
 class BlockStructureManager(object):
@@ -67,19 +67,51 @@ class BlockStructureManager(object):
         block_structure = collected_block_structure.copy() if collected_block_structure else self.get_collected()
 
         if starting_block_usage_key:
-            # Override the root_block_usage_key so traversals start at the
-            # requested location.  The rest of the structure will be pruned
-            # as part of the transformation.
-            if starting_block_usage_key not in block_structure:
-                raise UsageKeyNotInBlockStructure(
-                    u"The requested usage_key '{0}' is not found in the block_structure with root '{1}'",
-                    six.text_type(starting_block_usage_key),
-                    six.text_type(self.root_block_usage_key),
-                )
-            block_structure.set_root_block(starting_block_usage_key)
+            self._set_starting_block(block_structure, starting_block_usage_key)
         transformers.transform(block_structure)
         return block_structure
 
+    def get_transformed_for_usages(
+            self,
+            transformers_list,
+            starting_block_usage_key=None,
+            collected_block_structure=None,
+    ):
+        """
+        Generator of the transformed Block Structures for the
+        root_block_usage_key, one for each of the given collections of
+        transformers, in order.
+
+        Details: Similar to calling get_transformed for each collection
+        of transformers, except that the output of transformers whose
+        transform signatures are equal across the collections' usage_infos
+        is computed only once and shared.
+
+        Arguments:
+            transformers_list (iterable(BlockStructureTransformers)) -
+                Collections of transformers to apply, each with the
+                usage_info to transform for.
+
+            starting_block_usage_key (UsageKey) - See get_transformed.
+
+            collected_block_structure (BlockStructureBlockData) - See
+                get_transformed.
+
+        Yields:
+            BlockStructureBlockData - A transformed block structure,
+                starting at starting_block_usage_key, for each
+                collection of transformers.
+        """
+        block_structure = collected_block_structure or self.get_collected()
+
+        if starting_block_usage_key:
+            block_structure = block_structure.copy()
+            self._set_starting_block(block_structure, starting_block_usage_key)
+
+        shared_transform_cache = SharedTransformCache(block_structure)
+        for transformers in transformers_list:
+            yield shared_transform_cache.transform(transformers)
+
     def get_collected(self):
         """
         Returns the collected Block Structure for the root_block_usage_key,
@@ -127,10 +159,28 @@ class BlockStructureManager(object):
                 self.root_block_usage_key,
                 self.modulestore,
             )
-            BlockStructureTransformers.collect(block_structure)
+            if not self._collect_incrementally(block_structure):
+                BlockStructureTransformers.collect(block_structure)
             self.store.add(block_structure)
             return block_structure
 
+    def _collect_incrementally(self, block_structure):
+        """
+        Collects transformers data for the given block structure, newly
+        created from the modulestore, by reusing the data of the
+        unchanged blocks in the previously stored block structure.
+
+        Returns whether the data was collected; if not, it must be
+        fully collected instead.
+        """
+        if not config.INCREMENTAL_COLLECT.is_enabled():
+            return False
+        try:
+            previous_block_structure = self.store.get(self.root_block_usage_key)
+        except BlockStructureNotFound:
+            return False
+        return BlockStructureTransformers.collect_incrementally(block_structure, previous_block_structure)
+
     def clear(self):
         """
         Removes data for the block structure associated with the given
@@ -138,6 +188,20 @@ class BlockStructureManager(object):
         """
         self.store.delete(self.root_block_usage_key)
 
+    def _set_starting_block(self, block_structure, starting_block_usage_key):
+        """
+        Overrides the root_block_usage_key of the given block structure so
+        traversals start at the requested location.  The rest of the
+        structure will be pruned as part of the transformation.
+        """
+        if starting_block_usage_key not in block_structure:
+            raise UsageKeyNotInBlockStructure(
+                u"The requested usage_key '{0}' is not found in the block_structure with root '{1}'",
+                six.text_type(starting_block_usage_key),
+                six.text_type(self.root_block_usage_key),
+            )
+        block_structure.set_root_block(starting_block_usage_key)
+
     @contextmanager
     def _bulk_operations(self):
         """
@@ -0,0 +1,130 @@
+"""
+Module for profiling the cost of each transformer in the Collect and
+Transform phases of the Block Structure framework.
+"""
+
+
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from edx_django_utils.monitoring import set_custom_attribute
+
+
+class TransformerTiming(object):
+    """
+    The accumulated cost of a single transformer in a single phase.
+    """
+    def __init__(self, phase, transformer_name):
+        self.phase = phase
+        self.transformer_name = transformer_name
+
+        # Wall time, in seconds.
+        self.time = 0.0
+
+        # The number of blocks yielded by traversals of the block
+        # structure, or, for filters, the number of blocks the filters
+        # were applied to.
+        self.blocks_visited = 0
+
+        # The number of blocks removed from the block structure, or,
+        # for filters, the number of blocks the filters rejected.
+        self.blocks_removed = 0
+
+    def as_dict(self):
+        """
+        Returns a serializable dict of this timing.
+        """
+        return OrderedDict([
+            ('phase', self.phase),
+            ('transformer', self.transformer_name),
+            ('time_ms', round(self.time * 1000, 3)),
+            ('blocks_visited', self.blocks_visited),
+            ('blocks_removed', self.blocks_removed),
+        ])
+
+
+class TransformerTimings(object):
+    """
+    Records the wall time, the number of blocks visited and the number
+    of blocks removed by each transformer, in the order in which the
+    transformers were run.
+    """
+    COLLECT = 'collect'
+    TRANSFORM = 'transform'
+
+    def __init__(self):
+        # Map of (phase, transformer name) to its TransformerTiming.
+        self._timings = OrderedDict()
+
+    def __iter__(self):
+        return iter(self._timings.values())
+
+    def get(self, phase, transformer):
+        """
+        Returns the TransformerTiming of the given transformer in the
+        given phase, creating it if needed.
+        """
+        key = (phase, transformer.name())
+        timing = self._timings.get(key)
+        if timing is None:
+            timing = self._timings[key] = TransformerTiming(phase, transformer.name())
+        return timing
+
+    @contextmanager
+    def record(self, phase, transformer, block_structure):
+        """
+        A context manager that records the cost of the given transformer
+        acting on the given block structure within its context.
+        """
+        timing = self.get(phase, transformer)
+        num_blocks = len(block_structure)
+        block_structure._num_visited = 0  # pylint: disable=protected-access
+        start = time.time()
+        try:
+            yield timing
+        finally:
+            timing.time += time.time() - start
+            timing.blocks_visited += block_structure._num_visited  # pylint: disable=protected-access
+            timing.blocks_removed += max(num_blocks - len(block_structure), 0)
+            block_structure._num_visited = None  # pylint: disable=protected-access
+
+    def profile_filters(self, transformer, filters):
+        """
+        Returns the given filter functions of the given transformer,
+        wrapped to record their cost.  See transform_block_filters.
+        """
+        timing = self.get(self.TRANSFORM, transformer)
+        return [_profiled_filter(timing, filter_func) for filter_func in filters]
+
+    def report(self):
+        """
+        Returns a list of serializable dicts of the recorded timings.
+        """
+        return [timing.as_dict() for timing in self]
+
+    def set_custom_attributes(self):
+        """
+        Reports the recorded timings as custom monitoring attributes.
+        """
+        for timing in self:
+            prefix = u'block_structure_{}_{}'.format(timing.phase, timing.transformer_name)
+            set_custom_attribute(prefix + u'_time_ms', round(timing.time * 1000, 3))
+            set_custom_attribute(prefix + u'_blocks_visited', timing.blocks_visited)
+            set_custom_attribute(prefix + u'_blocks_removed', timing.blocks_removed)
+
+
+def _profiled_filter(timing, filter_func):
+    """
+    Returns a filter function that calls the given filter function and
+    records its cost in the given TransformerTiming.
+    """
+    def profiled_filter(block_key):  # pylint: disable=missing-docstring
+        start = time.time()
+        retained = filter_func(block_key)
+        timing.time += time.time() - start
+        timing.blocks_visited += 1
+        if not retained:
+            timing.blocks_removed += 1
+        return retained
+    return profiled_filter
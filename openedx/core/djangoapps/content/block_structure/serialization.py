@@ -0,0 +1,501 @@
+"""
+Module for the columnar serialization format of collected BlockStructures.
+
+Rather than pickling the structure's _BlockRelations and BlockData
+objects wholesale, the collected data is laid out in columns:
+
+    * Block keys are interned to dense integer indices.
+    * Parent and child relations are stored as CSR-style adjacency
+      arrays of those integer indices, which can back a BlockGraph
+      directly.
+    * Each collected field (an xBlock field, or a field of a
+      transformer's block-specific data) is stored in its own column,
+      holding the indices of the blocks that have a value for it along
+      with the encoded values themselves.
+
+Deserialization only parses the header and the adjacency arrays.  The
+value columns are decoded lazily - on first access of the field by any
+block - so the cost of loading a structure is proportional to the
+fields that the transformers actually read, rather than to the total
+collected data.
+
+Collected field values may be of any picklable type, so the values
+within a single column are still encoded with zpickle.  Data serialized
+with the previous (fully pickled) format is still readable.
+"""
+
+
+import json
+import struct
+import sys
+from array import array
+from copy import deepcopy
+from threading import Lock
+
+import six
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey, UsageKey
+
+from openedx.core.lib.cache_utils import zpickle, zunpickle
+
+from .block_structure import BlockData, TransformerData, _BlockRelations
+from .graph import INDEX_TYPECODE, BlockGraph
+
+# Leading bytes of data serialized with the columnar format.
+MAGIC = b'BSC'
+
+# The latest version of the columnar format.  Incrementally update this
+# value whenever the layout below changes.
+FORMAT_VERSION = 1
+
+# Namespace of the columns that hold xBlock fields, as opposed to a
+# transformer's block-specific fields.
+XBLOCK_FIELDS_NAMESPACE = ''
+
+# Fixed-size preamble: magic, format version, length of the JSON header.
+_PREAMBLE = struct.Struct('<3sBI')
+
+_KEY_ENCODING_USAGE_KEY = 'usage_key'
+_KEY_ENCODING_PICKLE = 'pickle'
+
+
+class _SectionWriter(object):
+    """
+    Accumulates the binary sections of a serialized block structure,
+    returning the (offset, length) of each section as it is added.
+    """
+    def __init__(self):
+        self._chunks = []
+        self._length = 0
+
+    def add(self, data):
+        """
+        Appends the given bytes and returns their location.
+        """
+        location = [self._length, len(data)]
+        self._chunks.append(data)
+        self._length += len(data)
+        return location
+
+    def add_indices(self, indices):
+        """
+        Appends the given iterable of block indices as a packed array.
+        """
+        return self.add(array(INDEX_TYPECODE, indices).tobytes())
+
+    def getvalue(self):
+        """
+        Returns the concatenation of all sections added so far.
+        """
+        return b''.join(self._chunks)
+
+
+class _SectionReader(object):
+    """
+    Provides zero-copy access to the sections of a serialized block
+    structure.
+    """
+    def __init__(self, payload, byteorder):
+        self._payload = payload
+        self._swap = byteorder != sys.byteorder
+
+    def raw(self, location):
+        """
+        Returns a memoryview of the section at the given location.
+        """
+        offset, length = location
+        return self._payload[offset:offset + length]
+
+    def indices(self, location):
+        """
+        Returns the packed array of block indices at the given location.
+        """
+        indices = array(INDEX_TYPECODE)
+        indices.frombytes(self.raw(location))
+        if self._swap:
+            indices.byteswap()
+        return indices
+
+
+class _Column(object):
+    """
+    A lazily decoded column of collected values for a single field.
+
+    Deserialized block structures may be shared across threads, so the
+    values are decoded under a lock.
+    """
+    __slots__ = ('_indices', '_encoded_values', '_positions', '_values', '_lock')
+
+    def __init__(self, indices, encoded_values):
+        # Array of the indices of the blocks that have a value for the field.
+        self._indices = indices
+        self._encoded_values = encoded_values
+        self._positions = None
+        self._values = None
+        self._lock = Lock()
+
+    @property
+    def is_decoded(self):
+        """
+        Returns whether the values of this column were decoded.
+        """
+        return self._values is not None
+
+    def lookup(self, block_index):
+        """
+        Returns a tuple of whether the block at the given index has a
+        value in this column, and that value.
+        """
+        positions = self._positions
+        if positions is None:
+            positions = self._positions = {index: position for position, index in enumerate(self._indices)}
+
+        position = positions.get(block_index)
+        if position is None:
+            return False, None
+
+        values = self._values
+        if values is None:
+            with self._lock:
+                if self._values is None:
+                    self._values = zunpickle(self._encoded_values)
+                    self._encoded_values = None
+                values = self._values
+        return True, values[position]
+
+
+class _LazyFields(dict):
+    """
+    The fields dict of a deserialized BlockData or TransformerData.
+    A field's value is materialized from its column the first time the
+    field is accessed; operations that need all the fields, such as
+    iteration, copying and pickling, materialize them all.
+
+    Copies of a cached block structure share its BlockData, possibly
+    across threads, so fields are materialized and copied under a lock
+    shared by the whole deserialized structure.
+    """
+    def __init__(self, columns, block_index, lock):
+        super(_LazyFields, self).__init__()
+        # Map of field name to its _Column.
+        self._columns = columns
+        self._block_index = block_index
+        self._lock = lock
+        # Names of fields that were already materialized, set or deleted.
+        self._resolved = set()
+
+    def _resolve(self, field_name):
+        """
+        Materializes the value of the given field, if not already done.
+        """
+        if field_name in self._resolved:
+            return
+        with self._lock:
+            if field_name in self._resolved:
+                return
+            column = self._columns.get(field_name)
+            if column is not None:
+                found, value = column.lookup(self._block_index)
+                if found:
+                    dict.__setitem__(self, field_name, value)
+            # Only mark the field once its value is set, for the unlocked
+            # check above.
+            self._resolved.add(field_name)
+
+    def _resolve_all(self):
+        """
+        Materializes the values of all fields.
+        """
+        for field_name in self._columns:
+            self._resolve(field_name)
+
+    def __missing__(self, field_name):
+        self._resolve(field_name)
+        if dict.__contains__(self, field_name):
+            return dict.__getitem__(self, field_name)
+        raise KeyError(field_name)
+
+    def __contains__(self, field_name):
+        self._resolve(field_name)
+        return dict.__contains__(self, field_name)
+
+    def __setitem__(self, field_name, value):
+        with self._lock:
+            dict.__setitem__(self, field_name, value)
+            self._resolved.add(field_name)
+
+    def __delitem__(self, field_name):
+        self._resolve(field_name)
+        dict.__delitem__(self, field_name)
+
+    def get(self, field_name, default=None):
+        self._resolve(field_name)
+        return dict.get(self, field_name, default)
+
+    def pop(self, field_name, *args):
+        self._resolve(field_name)
+        return dict.pop(self, field_name, *args)
+
+    def setdefault(self, field_name, default=None):
+        self._resolve(field_name)
+        return dict.setdefault(self, field_name, default)
+
+    def update(self, *args, **kwargs):
+        for field_name, value in six.iteritems(dict(*args, **kwargs)):
+            self[field_name] = value
+
+    def clear(self):
+        with self._lock:
+            self._resolved.update(self._columns)
+            dict.clear(self)
+
+    def popitem(self):
+        self._resolve_all()
+        return dict.popitem(self)
+
+    def __iter__(self):
+        self._resolve_all()
+        return dict.__iter__(self)
+
+    def __len__(self):
+        self._resolve_all()
+        return dict.__len__(self)
+
+    def __eq__(self, other):
+        self._resolve_all()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        self._resolve_all()
+        return dict.__repr__(self)
+
+    def keys(self):
+        self._resolve_all()
+        return dict.keys(self)
+
+    def values(self):
+        self._resolve_all()
+        return dict.values(self)
+
+    def items(self):
+        self._resolve_all()
+        return dict.items(self)
+
+    def copy(self):
+        self._resolve_all()
+        return dict(dict.items(self))
+
+    def lazy_copy(self):
+        """
+        Returns a copy of this dict that shares its columns, so fields
+        that were not yet materialized remain so.
+        """
+        fields = _LazyFields(self._columns, self._block_index, self._lock)
+        with self._lock:
+            dict.update(fields, dict.items(self))
+            fields._resolved = set(self._resolved)
+        return fields
+
+    def __deepcopy__(self, memo):
+        return deepcopy(self.copy(), memo)
+
+    def __reduce__(self):
+        # Pickle as a plain dict so no column data is carried along.
+        return dict, (self.copy(),)
+
+
+def is_columnar(serialized_data):
+    """
+    Returns whether the given data was serialized with the columnar
+    format.
+    """
+    return bytes(serialized_data[:len(MAGIC)]) == MAGIC
+
+
+def serialize_block_structure(block_structure):
+    """
+    Serializes the block relations, transformer data and block data of
+    the given block structure in the columnar format.
+
+    Arguments:
+        block_structure (BlockStructureBlockData) - The collected block
+            structure to serialize.
+
+    Returns:
+        bytes - The serialized data.
+    """
+    block_data_map = block_structure._block_data_map  # pylint: disable=protected-access
+
+    # Intern the block keys: blocks in the graph first, followed by any
+    # blocks that only have collected data.
+    keys = list(block_structure.get_block_keys())
+    num_graph_blocks = len(keys)
+    keys.extend(key for key in block_data_map if key not in block_structure)
+    index_of = {key: index for index, key in enumerate(keys)}
+
+    sections = _SectionWriter()
+    header = {
+        'byteorder': sys.byteorder,
+        'num_graph_blocks': num_graph_blocks,
+    }
+
+    if all(isinstance(key, UsageKey) for key in keys):
+        header['key_encoding'] = _KEY_ENCODING_USAGE_KEY
+        header['course_key'] = six.text_type(block_structure.root_block_usage_key.course_key)
+        header['keys'] = [six.text_type(key) for key in keys]
+    else:
+        header['key_encoding'] = _KEY_ENCODING_PICKLE
+        header['keys'] = sections.add(zpickle(keys))
+
+    # Adjacency arrays.
+    for relation, get_relations in (
+            ('children', block_structure.get_children),
+            ('parents', block_structure.get_parents),
+    ):
+        offsets = [0]
+        targets = []
+        for key in keys[:num_graph_blocks]:
+            targets.extend(index_of[target] for target in get_relations(key))
+            offsets.append(len(targets))
+        header[relation] = [sections.add_indices(offsets), sections.add_indices(targets)]
+
+    # Value columns, keyed by namespace and then by field name.
+    columns = {}
+    namespace_members = {}
+    data_indices = []
+    for key, block_data in six.iteritems(block_data_map):
+        block_index = index_of[key]
+        data_indices.append(block_index)
+        _add_to_columns(columns, XBLOCK_FIELDS_NAMESPACE, block_index, block_data.fields)
+        for transformer_name, transformer_block_data in six.iteritems(block_data.transformer_data):
+            namespace_members.setdefault(transformer_name, []).append(block_index)
+            _add_to_columns(columns, transformer_name, block_index, transformer_block_data.fields)
+
+    header['block_data'] = sections.add_indices(data_indices)
+    header['namespaces'] = {
+        namespace: sections.add_indices(members)
+        for namespace, members in six.iteritems(namespace_members)
+    }
+    header['columns'] = [
+        [namespace, field_name, sections.add_indices(indices), sections.add(zpickle(values))]
+        for (namespace, field_name), (indices, values) in six.iteritems(columns)
+    ]
+    header['transformer_data'] = sections.add(zpickle(block_structure.transformer_data))
+
+    encoded_header = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    return b''.join([
+        _PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(encoded_header)),
+        encoded_header,
+        sections.getvalue(),
+    ])
+
+
+def deserialize_block_structure(serialized_data, compact=False):
+    """
+    Deserializes the given data, as serialized by
+    serialize_block_structure or by the previous pickled format.
+
+    Arguments:
+        serialized_data (bytes-like object) - The serialized data.
+
+        compact (bool) - Whether to return the block relations as a
+            BlockGraph rather than as a map of _BlockRelations.
+
+    Returns:
+        tuple - The block relations, transformer data and block data
+            map, as expected by BlockStructureFactory.create_new, or
+            by BlockStructureFactory.create_compact if compact is True.
+    """
+    if not is_columnar(serialized_data):
+        relations_map, transformer_data, block_data_map = zunpickle(serialized_data)
+        if not compact:
+            return relations_map, transformer_data, block_data_map
+        graph = BlockGraph.from_relations(
+            list(relations_map),
+            get_children=lambda key: relations_map[key].children,
+            get_parents=lambda key: relations_map[key].parents,
+        )
+        return graph, transformer_data, block_data_map
+
+    data = memoryview(serialized_data)
+    _, format_version, header_length = _PREAMBLE.unpack_from(data)
+    if format_version != FORMAT_VERSION:
+        raise ValueError(u'Unsupported block structure format version {}'.format(format_version))
+
+    header_end = _PREAMBLE.size + header_length
+    header = json.loads(bytes(data[_PREAMBLE.size:header_end]).decode('utf-8'))
+    sections = _SectionReader(data[header_end:], header['byteorder'])
+
+    keys = _decode_keys(header, sections)
+
+    children_offsets, children = (sections.indices(location) for location in header['children'])
+    parents_offsets, parents = (sections.indices(location) for location in header['parents'])
+    num_graph_blocks = header['num_graph_blocks']
+    if compact:
+        block_relations = BlockGraph(keys[:num_graph_blocks], children_offsets, children, parents_offsets, parents)
+    else:
+        block_relations = {}
+        for index in range(num_graph_blocks):
+            relations = _BlockRelations()
+            children_range = children[children_offsets[index]:children_offsets[index + 1]]
+            parents_range = parents[parents_offsets[index]:parents_offsets[index + 1]]
+            relations.children = [keys[child] for child in children_range]
+            relations.parents = [keys[parent] for parent in parents_range]
+            block_relations[keys[index]] = relations
+
+    columns = {}
+    for namespace, field_name, indices_location, values_location in header['columns']:
+        columns.setdefault(namespace, {})[field_name] = _Column(
+            sections.indices(indices_location),
+            sections.raw(values_location),
+        )
+
+    lock = Lock()
+    block_data_map = {}
+    for block_index in sections.indices(header['block_data']):
+        block_data = BlockData(keys[block_index])
+        block_data.fields = _LazyFields(columns.get(XBLOCK_FIELDS_NAMESPACE, {}), block_index, lock)
+        block_data_map[keys[block_index]] = block_data
+
+    for namespace, members_location in six.iteritems(header['namespaces']):
+        namespace_columns = columns.get(namespace, {})
+        for block_index in sections.indices(members_location):
+            transformer_block_data = TransformerData()
+            transformer_block_data.fields = _LazyFields(namespace_columns, block_index, lock)
+            block_data_map[keys[block_index]].transformer_data[namespace] = transformer_block_data
+
+    transformer_data = zunpickle(sections.raw(header['transformer_data']))
+    return block_relations, transformer_data, block_data_map
+
+
+def _add_to_columns(columns, namespace, block_index, fields):
+    """
+    Adds the given fields of the block at block_index to the columns of
+    the given namespace.
+    """
+    for field_name, value in six.iteritems(fields):
+        indices, values = columns.setdefault((namespace, field_name), ([], []))
+        indices.append(block_index)
+        values.append(value)
+
+
+def _decode_keys(header, sections):
+    """
+    Returns the list of interned block keys described by the header.
+    """
+    if header['key_encoding'] == _KEY_ENCODING_PICKLE:
+        return zunpickle(sections.raw(header['keys']))
+
+    try:
+        course_key = CourseKey.from_string(header['course_key'])
+        keys = [UsageKey.from_string(key) for key in header['keys']]
+    except InvalidKeyError:
+        raise ValueError(u'Invalid usage key in serialized block structure')
+
+    # Deprecated usage keys lose the run of their course in strings.
+    return [key.map_into_course(course_key) if key.run is None else key for key in keys]
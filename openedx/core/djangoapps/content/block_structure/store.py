@@ -8,14 +8,15 @@ from logging import getLogger
 
 import six
 from django.utils.encoding import python_2_unicode_compatible
-
-from openedx.core.lib.cache_utils import zpickle, zunpickle
+from edx_django_utils.monitoring import set_custom_attribute
 
 from . import config
 from .block_structure import BlockStructureBlockData
 from .exceptions import BlockStructureNotFound
 from .factory import BlockStructureFactory
+from .local_cache import get_local_cache
 from .models import BlockStructureModel
+from .serialization import deserialize_block_structure, serialize_block_structure
 from .transformer_registry import TransformerRegistry
 
 logger = getLogger(__name__)  # pylint: disable=C0103
@@ -58,8 +59,8 @@ class BlockStructureStore(object):
 
     def add(self, block_structure):
         """
-        Stores and caches a compressed and pickled serialization of
-        the given block structure.
+        Stores and caches a columnar serialization of the given block
+        structure.
 
         The data stored includes the structure's
         block relations, transformer data, and block data.
@@ -72,6 +73,7 @@ class BlockStructureStore(object):
 
         bs_model = self._update_or_create_model(block_structure, serialized_data)
         self._add_to_cache(serialized_data, bs_model)
+        self._delete_from_local_cache(bs_model)
 
     def get(self, root_block_usage_key):
         """
@@ -96,13 +98,27 @@ class BlockStructureStore(object):
         """
         bs_model = self._get_model(root_block_usage_key)
 
+        local_cache = get_local_cache()
+        local_cache_key = self._encode_local_cache_key(bs_model) if local_cache else None
+        if local_cache_key:
+            block_structure = local_cache.get(local_cache_key)
+            set_custom_attribute('block_structure_local_cache_hit', block_structure is not None)
+            if block_structure is not None:
+                return block_structure.copy()
+
         try:
             serialized_data = self._get_from_cache(bs_model)
         except BlockStructureNotFound:
             serialized_data = self._get_from_store(bs_model)
             self._add_to_cache(serialized_data, bs_model)
 
-        return self._deserialize(serialized_data, root_block_usage_key)
+        block_structure = self._deserialize(serialized_data, root_block_usage_key)
+        if local_cache_key:
+            # Cache the deserialized structure itself, and hand out
+            # copy-on-write copies of it.
+            local_cache.set(local_cache_key, block_structure, len(serialized_data))
+            return block_structure.copy()
+        return block_structure
 
     def delete(self, root_block_usage_key):
         """
@@ -116,6 +132,7 @@ class BlockStructureStore(object):
         bs_model = self._get_model(root_block_usage_key)
         self._cache.delete(self._encode_root_cache_key(bs_model))
         bs_model.delete()
+        self._delete_from_local_cache(bs_model)
         logger.info(u"BlockStructure: Deleted from cache and store; %s.", bs_model)
 
     def is_up_to_date(self, root_block_usage_key, modulestore):
@@ -167,6 +184,17 @@ class BlockStructureStore(object):
         self._cache.set(cache_key, serialized_data, timeout=config.cache_timeout_in_seconds())
         logger.info(u"BlockStructure: Added to cache; %s, size: %d", bs_model, len(serialized_data))
 
+    @staticmethod
+    def _delete_from_local_cache(bs_model):
+        """
+        Removes all versions of the block structure for the given
+        BlockStructureModel from the in-process cache.  Outdated
+        versions are never served, but are removed to free memory.
+        """
+        local_cache = get_local_cache()
+        if local_cache:
+            local_cache.delete_matching(lambda key: key[0] == bs_model.data_usage_key)
+
     def _get_from_cache(self, bs_model):
         """
         Returns the serialized data for the given BlockStructureModel
@@ -198,27 +226,27 @@ class BlockStructureStore(object):
         """
         Serializes the data for the given block_structure.
         """
-        data_to_cache = (
-            block_structure._block_relations,
-            block_structure.transformer_data,
-            block_structure._block_data_map,
-        )
-        return zpickle(data_to_cache)
+        return serialize_block_structure(block_structure)
 
     def _deserialize(self, serialized_data, root_block_usage_key):
         """
         Deserializes the given data and returns the parsed block_structure.
         """
+        compact = config.COMPACT_BLOCK_RELATIONS.is_enabled()
 
         try:
-            block_relations, transformer_data, block_data_map = zunpickle(serialized_data)
+            block_relations, transformer_data, block_data_map = deserialize_block_structure(
+                serialized_data,
+                compact=compact,
+            )
         except Exception:
             # Somehow failed to de-serialized the data, assume it's corrupt.
             bs_model = self._get_model(root_block_usage_key)
             logger.exception(u"BlockStructure: Failed to load data from cache for %s", bs_model)
             raise BlockStructureNotFound(bs_model.data_usage_key)
 
-        return BlockStructureFactory.create_new(
+        create = BlockStructureFactory.create_compact if compact else BlockStructureFactory.create_new
+        return create(
             root_block_usage_key,
             block_relations,
             transformer_data,
@@ -238,6 +266,25 @@ class BlockStructureStore(object):
             root_usage_key=six.text_type(bs_model.data_usage_key),
         )
 
+    @classmethod
+    def _encode_local_cache_key(cls, bs_model):
+        """
+        Returns the key to use in the in-process cache for the given
+        BlockStructureModel, or None if the block structure's version
+        is not known, i.e. when storage backing is disabled.
+
+        The key includes the version data that was recorded from the
+        root block when the block structure was collected, so a newly
+        collected version of the block structure is never served from
+        a stale entry.
+        """
+        if not config.STORAGE_BACKING_FOR_CACHE.is_enabled():
+            return None
+        version_data = cls._version_data_of_model(bs_model)
+        return (bs_model.data_usage_key, config.COMPACT_BLOCK_RELATIONS.is_enabled()) + tuple(
+            version_data[field_name] for field_name in BlockStructureModel.VERSION_FIELDS
+        )
+
     @staticmethod
     def _version_data_of_block(root_block):
         """
@@ -16,7 +16,9 @@ from six.moves import range
 
 from openedx.core.lib.graph_traversals import traverse_post_order
 
-from ..block_structure import BlockStructure, BlockStructureModulestoreData
+from ..block_structure import BlockStructure, BlockStructureBlockData, BlockStructureModulestoreData
+from ..factory import BlockStructureFactory
+from ..graph import BlockGraph
 from ..exceptions import TransformerException
 from .helpers import ChildrenMapTestMixin, MockTransformer, MockXBlock
 
@@ -312,3 +314,100 @@ class TestBlockStructureData(TestCase, ChildrenMapTestMixin):
         _set_value(new_copy, 'edit2')
         self.assertEqual(_get_value(block_structure), 'edit1')
         self.assertEqual(_get_value(new_copy), 'edit2')
+
+    def test_copy_on_write(self):
+        block_structure = self.create_block_structure(ChildrenMapTestMixin.SIMPLE_CHILDREN_MAP)
+        for block in block_structure:
+            block_structure.override_xblock_field(block, 'field', [block])
+        new_copy = block_structure.copy()
+
+        # unmodified blocks are shared with the copy
+        self.assertIs(new_copy.get_xblock_field(2, 'field'), block_structure.get_xblock_field(2, 'field'))
+
+        new_copy.override_xblock_field(1, 'field', 'overridden')
+        new_copy.set_transformer_block_field(2, 'transformer', 'test_key', 'value')
+        new_copy.sort_children(1, key=lambda block: -block)
+        new_copy.set_root_block(1)
+        new_copy._prune_unreachable()
+
+        self.assert_block_structure(new_copy, [[], [4, 3], [], [], []], missing_blocks=[0, 2])
+        self.assertEqual(new_copy.get_xblock_field(1, 'field'), 'overridden')
+        self.assertEqual(new_copy.get_xblock_field(3, 'field'), [3])
+
+        self.assert_block_structure(block_structure, ChildrenMapTestMixin.SIMPLE_CHILDREN_MAP)
+        self.assertEqual(block_structure.get_xblock_field(1, 'field'), [1])
+        self.assertIsNone(block_structure.get_transformer_block_field(2, 'transformer', 'test_key'))
+
+
+@ddt.ddt
+class TestCompactBlockStructureData(TestBlockStructureData):
+    """
+    Tests for CompactBlockStructureBlockData, run against the same
+    scenarios as BlockStructureBlockData.
+    """
+    def create_block_structure(self, children_map, block_structure_cls=BlockStructureBlockData):
+        """
+        Returns a compact block structure, with its graph backed by CSR
+        arrays, for the given children_map.
+        """
+        block_structure = super(TestCompactBlockStructureData, self).create_block_structure(
+            children_map, block_structure_cls,
+        )
+        graph = BlockGraph.from_relations(
+            list(block_structure.get_block_keys()),
+            get_children=block_structure.get_children,
+            get_parents=block_structure.get_parents,
+        )
+        return BlockStructureFactory.create_compact(
+            block_structure.root_block_usage_key,
+            graph,
+            block_structure.transformer_data,
+            block_structure._block_data_map,
+        )
+
+    @ddt.data(
+        ChildrenMapTestMixin.SIMPLE_CHILDREN_MAP,
+        ChildrenMapTestMixin.LINEAR_CHILDREN_MAP,
+        ChildrenMapTestMixin.DAG_CHILDREN_MAP,
+    )
+    def test_traversals_match(self, children_map):
+        expected = super(TestCompactBlockStructureData, self).create_block_structure(children_map)
+        compact = self.create_block_structure(children_map)
+
+        self.assertEqual(list(compact.topological_traversal()), list(expected.topological_traversal()))
+        self.assertEqual(list(compact.post_order_traversal()), list(expected.post_order_traversal()))
+        for block_structure in (expected, compact):
+            block_structure.set_root_block(1)
+        for filter_func in (lambda block: block != 3, lambda block: block % 2 == 0):
+            for yield_descendants_of_unyielded in (True, False):
+                self.assertEqual(
+                    list(compact.topological_traversal(
+                        filter_func=filter_func,
+                        yield_descendants_of_unyielded=yield_descendants_of_unyielded,
+                    )),
+                    list(expected.topological_traversal(
+                        filter_func=filter_func,
+                        yield_descendants_of_unyielded=yield_descendants_of_unyielded,
+                    )),
+                )
+            self.assertEqual(
+                list(compact.post_order_traversal(filter_func=filter_func)),
+                list(expected.post_order_traversal(filter_func=filter_func)),
+            )
+
+    @ddt.data(True, False)
+    def test_removal_during_traversal(self, keep_descendants):
+        expected = super(TestCompactBlockStructureData, self).create_block_structure(self.DAG_CHILDREN_MAP)
+        compact = self.create_block_structure(self.DAG_CHILDREN_MAP)
+
+        traversed = {}
+        for name, block_structure in (('expected', expected), ('compact', compact)):
+            traversed[name] = []
+            for block_key in block_structure.topological_traversal():
+                traversed[name].append(block_key)
+                if block_key == 2:
+                    block_structure.remove_block(block_key, keep_descendants)
+            block_structure._prune_unreachable()
+            self.assertEqual(set(block_structure), set(expected))
+
+        self.assertEqual(traversed['compact'], traversed['expected'])
@@ -0,0 +1,52 @@
+"""
+Tests for local_cache.py
+"""
+
+
+from unittest import TestCase
+
+from ..local_cache import LocalBlockStructureCache
+
+
+class TestLocalBlockStructureCache(TestCase):
+    """
+    Tests for LocalBlockStructureCache
+    """
+    def setUp(self):
+        super(TestLocalBlockStructureCache, self).setUp()
+        self.local_cache = LocalBlockStructureCache(max_size=10)
+
+    def test_get_and_set(self):
+        self.assertIsNone(self.local_cache.get('a'))
+        self.local_cache.set('a', 'structure a', size=4)
+        self.assertEqual(self.local_cache.get('a'), 'structure a')
+        self.assertEqual(self.local_cache.stats()['size'], 4)
+        self.assertEqual((self.local_cache.hits, self.local_cache.misses), (1, 1))
+
+    def test_least_recently_used_eviction(self):
+        self.local_cache.set('a', 'structure a', size=4)
+        self.local_cache.set('b', 'structure b', size=4)
+        self.local_cache.get('a')
+        self.local_cache.set('c', 'structure c', size=4)
+
+        self.assertIsNone(self.local_cache.get('b'))
+        self.assertEqual(self.local_cache.get('a'), 'structure a')
+        self.assertEqual(self.local_cache.get('c'), 'structure c')
+        self.assertEqual(self.local_cache.evictions, 1)
+        self.assertEqual(self.local_cache.stats()['size'], 8)
+
+    def test_too_large(self):
+        self.local_cache.set('a', 'structure a', size=11)
+        self.assertIsNone(self.local_cache.get('a'))
+        self.assertEqual(self.local_cache.stats()['entries'], 0)
+
+    def test_replace_and_delete(self):
+        self.local_cache.set(('a', 1), 'structure a1', size=4)
+        self.local_cache.set(('a', 1), 'structure a1', size=6)
+        self.local_cache.set(('b', 1), 'structure b1', size=4)
+        self.assertEqual(self.local_cache.stats()['size'], 10)
+
+        self.local_cache.delete_matching(lambda key: key[0] == 'a')
+        self.assertIsNone(self.local_cache.get(('a', 1)))
+        self.assertEqual(self.local_cache.get(('b', 1)), 'structure b1')
+        self.assertEqual(self.local_cache.stats()['size'], 4)
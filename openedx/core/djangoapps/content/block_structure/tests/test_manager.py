@@ -7,9 +7,10 @@ import ddt
 import six
 from django.test import TestCase
 from edx_toggles.toggles.testutils import override_waffle_switch
+from mock import patch
 
 from ..block_structure import BlockStructureBlockData
-from ..config import RAISE_ERROR_WHEN_NOT_FOUND, STORAGE_BACKING_FOR_CACHE
+from ..config import INCREMENTAL_COLLECT, RAISE_ERROR_WHEN_NOT_FOUND, STORAGE_BACKING_FOR_CACHE
 from ..exceptions import BlockStructureNotFound, UsageKeyNotInBlockStructure
 from ..manager import BlockStructureManager
 from ..transformers import BlockStructureTransformers
@@ -31,6 +32,7 @@ class TestTransformer1(MockTransformer):
     collect_data_key = 't1.collect'
     transform_data_key = 't1.transform'
     collect_call_count = 0
+    collected_block_keys = None
 
     @classmethod
     def collect(cls, block_structure):
@@ -39,6 +41,7 @@ class TestTransformer1(MockTransformer):
         """
         cls._set_block_values(block_structure, cls.collect_data_key)
         cls.collect_call_count += 1
+        cls.collected_block_keys = set(block_structure.topological_traversal())
 
     def transform(self, usage_info, block_structure):
         """
@@ -132,6 +135,14 @@ class TestBlockStructureManager(UsageKeyFactoryMixin, ChildrenMapTestMixin, Test
         expected_count = 1 if expect_cache_updated else 0
         assert self.cache.set_call_count == expected_count
 
+    def set_update_versions(self, block_ids, update_version):
+        """
+        Sets the update_version of the given blocks in the modulestore.
+        """
+        for block_id in block_ids:
+            xblock = self.modulestore.blocks[self.block_key_factory(block_id)]
+            xblock.field_map['update_version'] = update_version
+
     def test_get_transformed(self):
         with mock_registered_transformers(self.registered_transformers):
             block_structure = self.bs_manager.get_transformed(self.transformers)
@@ -173,6 +184,29 @@ class TestBlockStructureManager(UsageKeyFactoryMixin, ChildrenMapTestMixin, Test
             with self.assertRaises(UsageKeyNotInBlockStructure):
                 self.bs_manager.get_transformed(self.transformers, starting_block_usage_key=100)
 
+    def test_get_transformed_for_usages(self):
+        with mock_registered_transformers(self.registered_transformers):
+            transformers_list = [
+                BlockStructureTransformers(self.registered_transformers, usage_info=usage_info)
+                for usage_info in ('first', 'second')
+            ]
+            block_structures = list(self.bs_manager.get_transformed_for_usages(
+                transformers_list,
+                starting_block_usage_key=self.block_key_factory(1),
+            ))
+        self.assertEqual(len(block_structures), 2)
+        substructure_of_children_map = [[], [3, 4], [], [], []]
+        for block_structure in block_structures:
+            self.assert_block_structure(block_structure, substructure_of_children_map, missing_blocks=[0, 2])
+            TestTransformer1.assert_collected(block_structure)
+            TestTransformer1.assert_transformed(block_structure)
+        self.assertIsNot(block_structures[0], block_structures[1])
+
+    def test_get_transformed_for_usages_with_nonexistent_starting_block(self):
+        with mock_registered_transformers(self.registered_transformers):
+            with self.assertRaises(UsageKeyNotInBlockStructure):
+                next(self.bs_manager.get_transformed_for_usages([self.transformers], starting_block_usage_key=100))
+
     def test_get_collected_cached(self):
         self.collect_and_verify(expect_modulestore_called=True, expect_cache_updated=True)
         self.collect_and_verify(expect_modulestore_called=False, expect_cache_updated=False)
@@ -227,3 +261,59 @@ class TestBlockStructureManager(UsageKeyFactoryMixin, ChildrenMapTestMixin, Test
         self.bs_manager.clear()
         self.collect_and_verify(expect_modulestore_called=True, expect_cache_updated=True)
         assert TestTransformer1.collect_call_count == 2
+
+    @ddt.data(
+        (MockTransformer.COLLECT_SCOPE_BLOCK, [], []),
+        (MockTransformer.COLLECT_SCOPE_BLOCK, [3], [3]),
+        (MockTransformer.COLLECT_SCOPE_ANCESTORS, [1], [1, 3, 4]),
+        (MockTransformer.COLLECT_SCOPE_ANCESTORS, [2, 4], [2, 4]),
+        (MockTransformer.COLLECT_SCOPE_DESCENDANTS, [3], [0, 1, 3]),
+        (MockTransformer.COLLECT_SCOPE_DESCENDANTS, [1], [0, 1, 3, 4]),
+        (None, [2, 4], [0, 1, 2, 4]),
+    )
+    @ddt.unpack
+    def test_update_collected_incrementally(self, collect_scope, changed_block_ids, expected_collected_block_ids):
+        all_block_ids = range(len(self.children_map))
+        self.set_update_versions(all_block_ids, 'version1')
+        with override_waffle_switch(INCREMENTAL_COLLECT, active=True):
+            with patch.object(TestTransformer1, 'COLLECT_SCOPE', collect_scope):
+                with mock_registered_transformers(self.registered_transformers):
+                    self.bs_manager.update_collected_if_needed()
+                    assert TestTransformer1.collected_block_keys == {self.block_key_factory(i) for i in all_block_ids}
+
+                    self.set_update_versions(changed_block_ids, 'version2')
+                    self.bs_manager.update_collected_if_needed()
+                    assert TestTransformer1.collected_block_keys == {
+                        self.block_key_factory(i) for i in expected_collected_block_ids
+                    }
+
+        # The data of the blocks that were not recollected is retained.
+        self.collect_and_verify(expect_modulestore_called=False, expect_cache_updated=False)
+        with mock_registered_transformers(self.registered_transformers):
+            block_structure = self.bs_manager.get_collected()
+        for block_id in all_block_ids:
+            expected_version = 'version2' if block_id in changed_block_ids else 'version1'
+            assert block_structure.get_xblock_field(self.block_key_factory(block_id), 'update_version') == expected_version
+
+    def test_update_collected_incrementally_reuses_data(self):
+        block_keys = [self.block_key_factory(i) for i in range(len(self.children_map))]
+        self.set_update_versions(range(len(self.children_map)), 'version1')
+        with override_waffle_switch(INCREMENTAL_COLLECT, active=True):
+            with patch.object(TestTransformer1, 'COLLECT_SCOPE', TestTransformer1.COLLECT_SCOPE_BLOCK):
+                with mock_registered_transformers(self.registered_transformers):
+                    self.bs_manager.update_collected_if_needed()
+                    self.set_update_versions([3], 'version2')
+                    with patch.object(TestTransformer1, 'collect_data_key', 't1.recollect'):
+                        self.bs_manager.update_collected_if_needed()
+                    block_structure = self.bs_manager.get_collected()
+
+        # The data of the changed block is replaced, while the data of
+        # its ancestors is reused though their xBlock fields are
+        # recollected.
+        changed_block_key = self.block_key_factory(3)
+        assert block_structure.get_transformer_block_field(changed_block_key, TestTransformer1, 't1.collect') is None
+        assert block_structure.get_transformer_block_field(changed_block_key, TestTransformer1, 't1.recollect')
+        for block_key in block_keys:
+            if block_key != changed_block_key:
+                assert block_structure.get_transformer_block_field(block_key, TestTransformer1, 't1.collect')
+                assert block_structure.get_transformer_block_field(block_key, TestTransformer1, 't1.recollect') is None
@@ -0,0 +1,173 @@
+"""
+Tests for serialization.py
+"""
+# pylint: disable=protected-access
+
+
+import pickle
+from copy import deepcopy
+from threading import Thread
+from unittest import TestCase
+
+import ddt
+import six
+from opaque_keys.edx.locator import CourseLocator
+
+from openedx.core.lib.cache_utils import zpickle
+
+from ..block_structure import BlockStructureBlockData
+from ..factory import BlockStructureFactory
+from ..serialization import deserialize_block_structure, is_columnar, serialize_block_structure
+from .helpers import ChildrenMapTestMixin, MockTransformer, UsageKeyFactoryMixin
+
+
+@ddt.ddt
+class TestColumnarSerialization(UsageKeyFactoryMixin, ChildrenMapTestMixin, TestCase):
+    """
+    Tests for the columnar serialization of block structures.
+    """
+    def create_collected_block_structure(self, children_map):
+        """
+        Returns a block structure for the given children_map, with
+        mock collected xBlock and transformer data.
+        """
+        block_structure = self.create_block_structure(children_map)
+        block_structure._add_transformer(MockTransformer)
+        for block_id in range(len(children_map)):
+            block_key = self.block_key_factory(block_id)
+            block_structure.override_xblock_field(block_key, 'display_name', u'Block {}'.format(block_id))
+            if block_id % 2:
+                block_structure.override_xblock_field(block_key, 'graded', True)
+                block_structure.set_transformer_block_field(block_key, MockTransformer, 'test', [block_id])
+        return block_structure
+
+    def round_trip(self, block_structure):
+        """
+        Serializes and deserializes the given block structure.
+        """
+        serialized_data = serialize_block_structure(block_structure)
+        self.assertTrue(is_columnar(serialized_data))
+        return BlockStructureFactory.create_new(
+            block_structure.root_block_usage_key,
+            *deserialize_block_structure(serialized_data)
+        )
+
+    @ddt.data(
+        ChildrenMapTestMixin.SIMPLE_CHILDREN_MAP,
+        ChildrenMapTestMixin.LINEAR_CHILDREN_MAP,
+        ChildrenMapTestMixin.DAG_CHILDREN_MAP,
+    )
+    def test_round_trip(self, children_map):
+        block_structure = self.create_collected_block_structure(children_map)
+        deserialized = self.round_trip(block_structure)
+
+        self.assert_block_structure(deserialized, children_map)
+        self.assertEqual(
+            deserialized._get_transformer_data_version(MockTransformer),
+            MockTransformer.WRITE_VERSION,
+        )
+        for block_id in range(len(children_map)):
+            block_key = self.block_key_factory(block_id)
+            self.assertEqual(deserialized.get_xblock_field(block_key, 'display_name'), u'Block {}'.format(block_id))
+            self.assertEqual(deserialized.get_xblock_field(block_key, 'graded'), True if block_id % 2 else None)
+            self.assertEqual(
+                deserialized.get_transformer_block_field(block_key, MockTransformer, 'test'),
+                [block_id] if block_id % 2 else None,
+            )
+
+    def test_deprecated_usage_keys(self):
+        self.course_key = CourseLocator('org', 'course', 'run', deprecated=True)
+        self.block_key_factory = lambda block_id: self.course_key.make_usage_key('course', six.text_type(block_id))
+        block_structure = self.create_collected_block_structure(self.SIMPLE_CHILDREN_MAP)
+        deserialized = self.round_trip(block_structure)
+
+        self.assert_block_structure(deserialized, self.SIMPLE_CHILDREN_MAP)
+        for block_key in deserialized:
+            self.assertEqual(block_key.course_key.run, 'run')
+        self.assertEqual(deserialized.get_xblock_field(self.block_key_factory(1), 'display_name'), u'Block 1')
+
+    def test_non_usage_keys(self):
+        block_structure = BlockStructureBlockData(root_block_usage_key=0)
+        for parent, children in enumerate(self.SIMPLE_CHILDREN_MAP):
+            for child in children:
+                block_structure._add_relation(parent, child)
+        block_structure.override_xblock_field(1, 'graded', True)
+
+        deserialized = self.round_trip(block_structure)
+        for parent, children in enumerate(self.SIMPLE_CHILDREN_MAP):
+            self.assertEqual(deserialized.get_children(parent), children)
+        self.assertEqual(deserialized.get_parents(3), [1])
+        self.assertTrue(deserialized.get_xblock_field(1, 'graded'))
+
+    def test_lazy_columns(self):
+        block_structure = self.create_collected_block_structure(self.SIMPLE_CHILDREN_MAP)
+        deserialized = self.round_trip(block_structure)
+        block_data = deserialized[self.block_key_factory(1)]
+        graded_column = block_data.fields._columns['graded']
+        display_name_column = block_data.fields._columns['display_name']
+
+        self.assertFalse(graded_column.is_decoded)
+        self.assertTrue(block_data.graded)
+        self.assertTrue(graded_column.is_decoded)
+        self.assertFalse(display_name_column.is_decoded)
+
+    def test_mutations_after_load(self):
+        deserialized = self.round_trip(self.create_collected_block_structure(self.SIMPLE_CHILDREN_MAP))
+        block_key = self.block_key_factory(1)
+
+        deserialized.override_xblock_field(block_key, 'display_name', u'Overridden')
+        self.assertEqual(deserialized.get_xblock_field(block_key, 'display_name'), u'Overridden')
+
+        deserialized.remove_transformer_block_field(block_key, MockTransformer, 'test')
+        self.assertIsNone(deserialized.get_transformer_block_field(block_key, MockTransformer, 'test'))
+
+        deserialized.remove_block(block_key, keep_descendants=False)
+        self.assertNotIn(block_key, deserialized)
+
+    def test_copy_and_pickle(self):
+        deserialized = self.round_trip(self.create_collected_block_structure(self.SIMPLE_CHILDREN_MAP))
+        block_key = self.block_key_factory(3)
+
+        for block_data in (deepcopy(deserialized[block_key]), pickle.loads(pickle.dumps(deserialized[block_key]))):
+            self.assertIs(type(block_data.fields), dict)
+            self.assertEqual(block_data.fields, {'display_name': u'Block 3', 'graded': True})
+            self.assertEqual(block_data.transformer_data[MockTransformer].test, [3])
+
+    def test_shared_across_threads(self):
+        deserialized = self.round_trip(self.create_collected_block_structure(self.LINEAR_CHILDREN_MAP))
+        block_keys = [self.block_key_factory(block_id) for block_id in range(len(self.LINEAR_CHILDREN_MAP))]
+        errors = []
+
+        def read_fields():
+            try:
+                block_structure = deserialized.copy()
+                for block_id, block_key in enumerate(block_keys):
+                    display_name = block_structure.get_xblock_field(block_key, 'display_name')
+                    self.assertEqual(display_name, u'Block {}'.format(block_id))
+                    block_structure.override_xblock_field(block_key, 'graded', False)
+            except Exception as error:  # pylint: disable=broad-except
+                errors.append(error)
+
+        threads = [Thread(target=read_fields) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertTrue(deserialized.get_xblock_field(block_keys[1], 'graded'))
+
+    def test_legacy_format(self):
+        block_structure = self.create_collected_block_structure(self.SIMPLE_CHILDREN_MAP)
+        serialized_data = zpickle((
+            block_structure._block_relations,
+            block_structure.transformer_data,
+            block_structure._block_data_map,
+        ))
+        self.assertFalse(is_columnar(serialized_data))
+
+        deserialized = BlockStructureFactory.create_new(
+            block_structure.root_block_usage_key,
+            *deserialize_block_structure(serialized_data)
+        )
+        self.assert_block_structure(deserialized, self.SIMPLE_CHILDREN_MAP)
+        self.assertEqual(deserialized.get_xblock_field(self.block_key_factory(1), 'graded'), True)
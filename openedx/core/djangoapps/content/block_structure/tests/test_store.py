@@ -4,13 +4,17 @@ Tests for block_structure/cache.py
 
 
 import ddt
+from django.conf import settings
 from edx_toggles.toggles.testutils import override_waffle_switch
+from mock import patch
 
 from openedx.core.djangolib.testing.utils import CacheIsolationTestCase
 
-from ..config import STORAGE_BACKING_FOR_CACHE
+from ..block_structure import CompactBlockStructureBlockData
+from ..config import COMPACT_BLOCK_RELATIONS, STORAGE_BACKING_FOR_CACHE
 from ..config.models import BlockStructureConfiguration
 from ..exceptions import BlockStructureNotFound
+from ..local_cache import get_local_cache
 from ..store import BlockStructureStore
 from .helpers import ChildrenMapTestMixin, MockCache, MockTransformer, UsageKeyFactoryMixin
 
@@ -60,6 +64,15 @@ class TestBlockStructureStore(UsageKeyFactoryMixin, ChildrenMapTestMixin, CacheI
             self.assertIsNotNone(stored_value)
             self.assert_block_structure(stored_value, self.children_map)
 
+    @ddt.data(True, False)
+    def test_add_and_get_compact(self, with_storage_backing):
+        with override_waffle_switch(STORAGE_BACKING_FOR_CACHE, active=with_storage_backing):
+            with override_waffle_switch(COMPACT_BLOCK_RELATIONS, active=True):
+                self.store.add(self.block_structure)
+                stored_value = self.store.get(self.block_structure.root_block_usage_key)
+                self.assertIsInstance(stored_value, CompactBlockStructureBlockData)
+                self.assert_block_structure(stored_value, self.children_map)
+
     @ddt.data(True, False)
     def test_delete(self, with_storage_backing):
         with override_waffle_switch(STORAGE_BACKING_FOR_CACHE, active=with_storage_backing):
@@ -91,3 +104,28 @@ class TestBlockStructureStore(UsageKeyFactoryMixin, ChildrenMapTestMixin, CacheI
         assert self.mock_cache.timeout_from_last_call == 0
         self.store.add(self.block_structure)
         assert self.mock_cache.timeout_from_last_call == timeout
+
+    @patch.dict(settings.BLOCK_STRUCTURES_SETTINGS, {'LOCAL_CACHE_MAX_SIZE': 10 ** 6})
+    def test_local_cache(self):
+        local_cache = get_local_cache()
+        local_cache.clear()
+        with override_waffle_switch(STORAGE_BACKING_FOR_CACHE, active=True):
+            self.store.add(self.block_structure)
+            root_block_usage_key = self.block_structure.root_block_usage_key
+
+            first_value = self.store.get(root_block_usage_key)
+            self.assertEqual((local_cache.hits, local_cache.misses), (0, 1))
+
+            # Served from the local cache, even if the django cache is empty.
+            self.mock_cache.map.clear()
+            first_value.remove_block(self.block_key_factory(1), keep_descendants=False)
+            second_value = self.store.get(root_block_usage_key)
+            self.assertEqual((local_cache.hits, local_cache.misses), (1, 1))
+            self.assert_block_structure(second_value, self.children_map)
+
+            # A newly added version of the block structure is not served from the local cache.
+            self.store.add(self.block_structure)
+            self.assertEqual(local_cache.stats()['entries'], 0)
+            self.store.delete(root_block_usage_key)
+            with self.assertRaises(BlockStructureNotFound):
+                self.store.get(root_block_usage_key)
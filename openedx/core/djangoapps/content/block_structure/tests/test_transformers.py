@@ -9,10 +9,73 @@ from mock import MagicMock, patch
 
 from ..block_structure import BlockStructureModulestoreData
 from ..exceptions import TransformerDataIncompatible, TransformerException
-from ..transformers import BlockStructureTransformers
+from ..profiling import TransformerTimings
+from ..transformers import BlockStructureTransformers, SharedTransformCache
 from .helpers import ChildrenMapTestMixin, MockFilteringTransformer, MockTransformer, mock_registered_transformers
 
 
+class SharedTransformer(MockTransformer):
+    """
+    Mock transformer whose transform depends only on the usage_info's
+    group, and which removes block 2 for group 'a'.
+    """
+    transform_call_count = 0
+
+    def transform_signature(self, usage_info, block_structure):
+        return usage_info.group
+
+    def transform(self, usage_info, block_structure):
+        SharedTransformer.transform_call_count += 1
+        if usage_info.group == 'a':
+            block_structure.remove_block(2, keep_descendants=False)
+
+
+class UsageTransformer(MockTransformer):
+    """
+    Mock transformer whose transform is specific to the usage_info, and
+    which records the usage_info's name on the root block.
+    """
+    transform_call_count = 0
+
+    def transform(self, usage_info, block_structure):
+        UsageTransformer.transform_call_count += 1
+        block_structure.override_xblock_field(block_structure.root_block_usage_key, 'name', usage_info.name)
+
+
+class UsageFilteringTransformer(MockFilteringTransformer):
+    """
+    Mock filtering transformer whose filters are specific to the
+    usage_info.
+    """
+    pass
+
+
+class SharedFilteringTransformer(MockFilteringTransformer):
+    """
+    Mock filtering transformer whose filters are the same for all
+    usage_infos.
+    """
+    def transform_signature(self, usage_info, block_structure):
+        return 'all'
+
+
+class UnsignedTransformer(object):
+    """
+    Mock transformer that does not inherit from
+    BlockStructureTransformer, and so does not define
+    transform_signature.
+    """
+    WRITE_VERSION = 1
+    READ_VERSION = 1
+
+    @classmethod
+    def name(cls):
+        return cls.__name__
+
+    def transform(self, usage_info, block_structure):
+        pass
+
+
 class TestBlockStructureTransformers(ChildrenMapTestMixin, TestCase):
     """
     Test class for testing BlockStructureTransformers
@@ -71,6 +134,26 @@ class TestBlockStructureTransformers(ChildrenMapTestMixin, TestCase):
             self.transformers.transform(block_structure=MagicMock())
             self.assertTrue(mock_transform_call.called)
 
+    def test_transform_timings(self):
+        transformers = [SharedTransformer(), SharedFilteringTransformer()]
+        with mock_registered_transformers(transformers):
+            self.transformers += transformers
+        self.transformers.usage_info = MagicMock(group='a')
+        self.transformers.timings = TransformerTimings()
+
+        block_structure = self.create_block_structure(self.SIMPLE_CHILDREN_MAP)
+        with patch(
+            'openedx.core.djangoapps.content.block_structure.profiling.set_custom_attribute'
+        ) as mock_set_custom_attribute:
+            self.transformers.transform(block_structure)
+
+        timings = {timing.transformer_name: timing for timing in self.transformers.timings}
+        self.assertEqual(set(timings), {'SharedTransformer', 'SharedFilteringTransformer'})
+        self.assertEqual(timings['SharedFilteringTransformer'].blocks_visited, len(self.SIMPLE_CHILDREN_MAP))
+        self.assertEqual(timings['SharedFilteringTransformer'].blocks_removed, 0)
+        self.assertEqual(timings['SharedTransformer'].blocks_removed, 1)
+        mock_set_custom_attribute.assert_any_call('block_structure_transform_SharedTransformer_blocks_removed', 1)
+
     def test_verify_versions(self):
         block_structure = self.create_block_structure(
             self.SIMPLE_CHILDREN_MAP,
@@ -82,3 +165,80 @@ class TestBlockStructureTransformers(ChildrenMapTestMixin, TestCase):
                 self.transformers.verify_versions(block_structure)
             self.transformers.collect(block_structure)
             self.assertTrue(self.transformers.verify_versions(block_structure))
+
+
+class TestSharedTransforms(ChildrenMapTestMixin, TestCase):
+    """
+    Test class for transforming block structures for many usage_infos.
+    """
+    def setUp(self):
+        super(TestSharedTransforms, self).setUp()
+        SharedTransformer.transform_call_count = 0
+        UsageTransformer.transform_call_count = 0
+
+    def create_transformers(self, transformers, group, name):
+        """
+        Returns a BlockStructureTransformers for the given transformers
+        with a usage_info of the given group and name.
+        """
+        usage_info = MagicMock(group=group)
+        usage_info.name = name
+        with mock_registered_transformers(transformers):
+            return BlockStructureTransformers(transformers, usage_info=usage_info)
+
+    def test_split_by_signature(self):
+        shared, usage = SharedTransformer(), UsageTransformer()
+        shared_filtering, usage_filtering = SharedFilteringTransformer(), UsageFilteringTransformer()
+
+        signature, shared_stage, usage_stage = self.create_transformers(
+            [shared, usage, shared_filtering], 'a', 'first',
+        ).split_by_signature(MagicMock())
+        self.assertIsNotNone(signature)
+        self.assertEqual(shared_stage, ([shared_filtering], [shared]))
+        self.assertEqual(usage_stage, ([], [usage]))
+
+        # Transformers that follow a usage-specific one, or any of them
+        # if a filtering transformer is usage-specific, are not shared.
+        signature, shared_stage, usage_stage = self.create_transformers(
+            [usage, shared, shared_filtering, usage_filtering], 'a', 'first',
+        ).split_by_signature(MagicMock())
+        self.assertEqual(shared_stage, ([shared_filtering], []))
+        self.assertEqual(usage_stage, ([usage_filtering], [usage, shared]))
+
+        signature, shared_stage, usage_stage = self.create_transformers(
+            [usage, usage_filtering], 'a', 'first',
+        ).split_by_signature(MagicMock())
+        self.assertIsNone(signature)
+        self.assertEqual(shared_stage, ([], []))
+
+        # Transformers without a transform_signature are usage-specific.
+        unsigned = UnsignedTransformer()
+        signature, shared_stage, usage_stage = self.create_transformers(
+            [shared, unsigned, shared_filtering], 'a', 'first',
+        ).split_by_signature(MagicMock())
+        self.assertEqual(shared_stage, ([shared_filtering], [shared]))
+        self.assertEqual(usage_stage, ([], [unsigned]))
+
+    def test_shared_transform_cache(self):
+        block_structure = self.create_block_structure(self.SIMPLE_CHILDREN_MAP)
+        shared_transform_cache = SharedTransformCache(block_structure)
+        results = [
+            shared_transform_cache.transform(
+                self.create_transformers([SharedTransformer(), UsageTransformer()], group, name)
+            )
+            for group, name in [('a', 'first'), ('b', 'second'), ('a', 'third')]
+        ]
+
+        self.assertEqual(SharedTransformer.transform_call_count, 2)
+        self.assertEqual(UsageTransformer.transform_call_count, 3)
+        for result, name, missing_blocks in zip(results, ['first', 'second', 'third'], [[2], [], [2]]):
+            self.assertEqual(result.get_xblock_field(0, 'name'), name)
+            for block_key in range(len(self.SIMPLE_CHILDREN_MAP)):
+                if block_key in missing_blocks:
+                    self.assertNotIn(block_key, result)
+                else:
+                    self.assertIn(block_key, result)
+
+        # The given block structure is not mutated.
+        self.assert_block_structure(block_structure, self.SIMPLE_CHILDREN_MAP)
+        self.assertIsNone(block_structure.get_xblock_field(0, 'name'))
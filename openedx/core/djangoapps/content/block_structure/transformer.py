@@ -58,6 +58,32 @@ class BlockStructureTransformer(object):
     WRITE_VERSION = 0
     READ_VERSION = 0
 
+    # Transformers may declare which blocks their collected data for a
+    # block is derived from, so that block structures can be collected
+    # incrementally when a course is published.  See
+    # BlockStructureTransformers.collect_incrementally.
+    #
+    # COLLECT_SCOPE_BLOCK - The data collected for a block is derived
+    #     only from the block itself, including its inherited xBlock
+    #     fields.
+    # COLLECT_SCOPE_ANCESTORS - The data collected for a block is also
+    #     derived from the data collected for its ancestors.
+    # COLLECT_SCOPE_DESCENDANTS - The data collected for a block is
+    #     also derived from its descendants.
+    #
+    # A transformer must collect its data for a block only for blocks
+    # yielded by the block structure's traversals, which are restricted
+    # to the blocks it recollects in incremental collects.  Its
+    # non-block-specific data is always recollected.
+    #
+    # A transformer that leaves COLLECT_SCOPE as None recollects its
+    # data for all blocks in the subtrees affected by the changes, as
+    # with COLLECT_SCOPE_DESCENDANTS.
+    COLLECT_SCOPE_BLOCK = 'block'
+    COLLECT_SCOPE_ANCESTORS = 'ancestors'
+    COLLECT_SCOPE_DESCENDANTS = 'descendants'
+    COLLECT_SCOPE = None
+
     @classmethod
     def name(cls):
         """
@@ -158,6 +184,29 @@ class BlockStructureTransformer(object):
         """
         raise NotImplementedError
 
+    def transform_signature(self, usage_info, block_structure):
+        """
+        Returns a hashable value that captures everything about the
+        given usage_info that this transformer's transform depends on,
+        or None if the transform is specific to the usage_info (for
+        example, to an individual user).
+
+        When a block structure is transformed for many usage_infos at
+        once, the output of transformers whose signatures are equal is
+        computed once and shared across those usage_infos.  See
+        BlockStructureManager.get_transformed_for_usages.
+
+        By default, transforms are assumed to be usage-specific.
+
+        Arguments:
+            usage_info (any negotiated type) - See transform.
+
+            block_structure (BlockStructureBlockData) - The collected
+                block structure that is to be transformed.  It should
+                not be mutated.
+        """
+        return None
+
 
 class FilteringTransformerMixin(BlockStructureTransformer):
     """
@@ -6,12 +6,21 @@ Module for a collection of BlockStructureTransformers.
 import functools
 from logging import getLogger
 
+import six
+from django.conf import settings
+
+from .block_structure import BlockStructureBlockData
 from .exceptions import TransformerDataIncompatible, TransformerException
-from .transformer import FilteringTransformerMixin, combine_filters
+from .profiling import TransformerTimings
+from .transformer import BlockStructureTransformer, FilteringTransformerMixin, combine_filters
 from .transformer_registry import TransformerRegistry
 
 logger = getLogger(__name__)  # pylint: disable=C0103
 
+# The xBlock field, set by the modulestore, that identifies the version
+# of the course in which a block was last changed.
+UPDATE_VERSION_FIELD = 'update_version'
+
 
 class BlockStructureTransformers(object):
     """
@@ -43,6 +52,13 @@ class BlockStructureTransformers(object):
         """
         self.usage_info = usage_info
         self._transformers = {'supports_filter': [], 'no_filter': []}
+
+        # TransformerTimings recording the cost of each transformer in
+        # transform, or None if the transformers are not profiled.  The
+        # timings are reported as custom attributes.
+        self.timings = None
+        if settings.BLOCK_STRUCTURES_SETTINGS.get('PROFILE_TRANSFORMERS', False):
+            self.timings = TransformerTimings()
         if transformers:
             self.__iadd__(transformers)
 
@@ -75,13 +91,116 @@ class BlockStructureTransformers(object):
     def collect(cls, block_structure):
         """
         Collects data for each registered transformer.
+
+        The cost of each transformer's collect is reported as custom
+        attributes.
         """
-        for transformer in TransformerRegistry.get_registered_transformers():
-            block_structure._add_transformer(transformer)  # pylint: disable=protected-access
-            transformer.collect(block_structure)
+        cls._collect(block_structure)
+
+    @classmethod
+    def collect_incrementally(cls, block_structure, previous_block_structure):
+        """
+        Collects data for each registered transformer, reusing the data
+        from the given previously collected block structure for the
+        blocks that were not affected by changes since.
+
+        A block is changed if its update_version, as recorded by the
+        modulestore, or its relations differ from the previous block
+        structure.  Since xBlock fields are inherited, the descendants
+        of the changed blocks are affected too.  Each transformer
+        recollects its data for the affected blocks and, depending on
+        its COLLECT_SCOPE, their ancestors:
+
+            COLLECT_SCOPE_BLOCK, COLLECT_SCOPE_ANCESTORS - the affected
+                blocks only.
+            COLLECT_SCOPE_DESCENDANTS, None - the affected blocks and
+                their ancestors.
 
-        # Collect all fields that were requested by the transformers.
-        block_structure._collect_requested_xblock_fields()  # pylint: disable=protected-access
+        The data of all other blocks is copied from the previous block
+        structure.
+
+        Arguments:
+            block_structure (BlockStructureModulestoreData) - The block
+                structure to collect, created from the modulestore.
+
+            previous_block_structure (BlockStructureBlockData) - The
+                previously collected block structure for the same root.
+
+        Returns:
+            bool - Whether the data was collected.  If False, no data
+                was collected since the block structure cannot be
+                collected incrementally, and collect should be called
+                instead.
+        """
+        try:
+            cls.verify_versions(previous_block_structure)
+        except TransformerDataIncompatible:
+            return False
+
+        changed_blocks = _get_changed_blocks(block_structure, previous_block_structure)
+        if changed_blocks is None:
+            return False
+        affected_blocks = _get_descendants(block_structure, changed_blocks)
+        affected_subtrees = _get_ancestors(block_structure, affected_blocks)
+        scope_blocks = {
+            BlockStructureTransformer.COLLECT_SCOPE_BLOCK: affected_blocks,
+            BlockStructureTransformer.COLLECT_SCOPE_ANCESTORS: affected_blocks,
+            BlockStructureTransformer.COLLECT_SCOPE_DESCENDANTS: affected_subtrees,
+        }
+        collect_scopes = {
+            transformer.name(): scope_blocks.get(transformer.COLLECT_SCOPE, affected_subtrees)
+            for transformer in TransformerRegistry.get_registered_transformers()
+        }
+
+        # Reuse the previously collected data of each block, except for
+        # the data of the transformers that recollect it.
+        for block_key in block_structure._xblock_map:  # pylint: disable=protected-access
+            if block_key not in previous_block_structure:
+                continue
+            block_data = previous_block_structure[block_key]
+            if block_key in affected_subtrees:
+                block_data = block_data.shallow_copy()
+                for transformer_name, collect_scope in six.iteritems(collect_scopes):
+                    if block_key in collect_scope:
+                        block_data.transformer_data.pop(transformer_name, None)
+            block_structure._block_data_map[block_key] = block_data  # pylint: disable=protected-access
+
+        logger.info(
+            u'BlockStructure: Incrementally collecting %d of %d blocks for %s.',
+            len(affected_subtrees),
+            len(block_structure),
+            block_structure.root_block_usage_key,
+        )
+        cls._collect(block_structure, collect_scopes, affected_subtrees)
+        return True
+
+    @classmethod
+    def _collect(cls, block_structure, collect_scopes=None, xblock_fields_scope=None):
+        """
+        Collects data for each registered transformer, limiting the
+        traversals of the block structure to the blocks in the
+        transformer's collect scope, if any, and collecting the
+        requested xBlock fields for the blocks in xblock_fields_scope,
+        if any.
+        """
+        # pylint: disable=protected-access
+        timings = TransformerTimings()
+        try:
+            for transformer in TransformerRegistry.get_registered_transformers():
+                if collect_scopes is not None:
+                    block_structure._collect_scope = collect_scopes[transformer.name()]
+                block_structure._add_transformer(transformer)
+                with timings.record(TransformerTimings.COLLECT, transformer, block_structure):
+                    transformer.collect(block_structure)
+
+            # Collect all fields that were requested by the transformers.
+            block_structure._collect_scope = xblock_fields_scope
+            block_structure.request_xblock_fields(UPDATE_VERSION_FIELD)
+            block_structure._collect_requested_xblock_fields()
+        finally:
+            block_structure._collect_scope = None
+
+        timings.set_custom_attributes()
 
     @classmethod
     def verify_versions(cls, block_structure):
@@ -119,25 +238,209 @@ class BlockStructureTransformers(object):
         # Prune the block structure to remove any unreachable blocks.
         block_structure._prune_unreachable()  # pylint: disable=protected-access
 
-    def _transform_with_filters(self, block_structure):
+        if self.timings is not None:
+            self.timings.set_custom_attributes()
+
+    def split_by_signature(self, block_structure):
+        """
+        Splits the transformers in the collection into a shared stage,
+        whose output depends only on the transformers' signatures for
+        the collection's usage_info, and a usage-specific stage.
+
+        Filtering transformers are independent of each other, so each
+        of them may be in either stage.  Other transformers depend on
+        the output of the transformers before them, so only a prefix of
+        them may be shared, and only if all filtering transformers are.
+
+        Arguments:
+            block_structure (BlockStructureBlockData) - The collected
+                block structure that is to be transformed.
+
+        Returns:
+            tuple - The signature of the shared stage (None if the
+                stage is empty), the shared stage and the usage-specific
+                stage.  Each stage is a tuple of the filtering and the
+                non-filtering transformers it contains.
+        """
+        signature = []
+        shared_filtering, usage_filtering = [], []
+        for transformer in self._transformers['supports_filter']:
+            transformer_signature = _get_transform_signature(transformer, self.usage_info, block_structure)
+            if transformer_signature is None:
+                usage_filtering.append(transformer)
+            else:
+                shared_filtering.append(transformer)
+                signature.append((transformer.name(), transformer_signature))
+
+        shared_non_filtering = []
+        usage_non_filtering = list(self._transformers['no_filter'])
+        while usage_non_filtering and not usage_filtering:
+            transformer_signature = _get_transform_signature(usage_non_filtering[0], self.usage_info, block_structure)
+            if transformer_signature is None:
+                break
+            shared_non_filtering.append(usage_non_filtering.pop(0))
+            signature.append((shared_non_filtering[-1].name(), transformer_signature))
+
+        if signature:
+            # Only share across collections of the same transformers.
+            all_names = tuple(
+                transformer.name()
+                for transformer in self._transformers['supports_filter'] + self._transformers['no_filter']
+            )
+            signature = (all_names, tuple(signature))
+        else:
+            signature = None
+
+        return (
+            signature,
+            (shared_filtering, shared_non_filtering),
+            (usage_filtering, usage_non_filtering),
+        )
+
+    def transform_stage(self, block_structure, stage):
+        """
+        Transforms the given block_structure with the transformers of
+        the given stage, as returned by split_by_signature, without
+        pruning it.
+        """
+        filtering_transformers, non_filtering_transformers = stage
+        self._transform_with_filters(block_structure, filtering_transformers)
+        self._transform_without_filters(block_structure, non_filtering_transformers)
+
+    def _transform_with_filters(self, block_structure, transformers=None):
         """
         Transforms the given block_structure using the transform_block_filters
         method from the given transformers.
         """
-        if not self._transformers['supports_filter']:
+        if transformers is None:
+            transformers = self._transformers['supports_filter']
+        if not transformers:
             return
 
         filters = []
-        for transformer in self._transformers['supports_filter']:
-            filters.extend(transformer.transform_block_filters(self.usage_info, block_structure))
+        for transformer in transformers:
+            if self.timings is None:
+                filters.extend(transformer.transform_block_filters(self.usage_info, block_structure))
+            else:
+                with self.timings.record(TransformerTimings.TRANSFORM, transformer, block_structure):
+                    transformer_filters = transformer.transform_block_filters(self.usage_info, block_structure)
+                filters.extend(self.timings.profile_filters(transformer, transformer_filters))
 
         combined_filters = combine_filters(block_structure, filters)
         block_structure.filter_topological_traversal(combined_filters)
 
-    def _transform_without_filters(self, block_structure):
+    def _transform_without_filters(self, block_structure, transformers=None):
         """
         Transforms the given block_structure using the transform
         method from the given transformers.
         """
-        for transformer in self._transformers['no_filter']:
-            transformer.transform(self.usage_info, block_structure)
+        if transformers is None:
+            transformers = self._transformers['no_filter']
+        for transformer in transformers:
+            if self.timings is None:
+                transformer.transform(self.usage_info, block_structure)
+            else:
+                with self.timings.record(TransformerTimings.TRANSFORM, transformer, block_structure):
+                    transformer.transform(self.usage_info, block_structure)
+
+
+class SharedTransformCache(object):
+    """
+    Transforms copies of a collected block structure for many
+    usage_infos, computing the output of the transformers' shared stage
+    (see BlockStructureTransformers.split_by_signature) only once per
+    distinct signature.
+    """
+    def __init__(self, block_structure):
+        """
+        Arguments:
+            block_structure (BlockStructureBlockData) - The collected
+                block structure to transform.  It is not mutated.
+        """
+        self._block_structure = block_structure
+
+        # Map of a shared stage's signature to the block structure
+        # transformed by that stage.
+        self._shared_structures = {}
+
+    def transform(self, transformers):
+        """
+        Returns a transformed copy of the block structure for the given
+        BlockStructureTransformers.
+        """
+        signature, shared_stage, usage_stage = transformers.split_by_signature(self._block_structure)
+
+        if signature is None:
+            block_structure = self._block_structure.copy()
+            transformers.transform(block_structure)
+            return block_structure
+
+        shared_structure = self._shared_structures.get(signature)
+        if shared_structure is None:
+            shared_structure = self._block_structure.copy()
+            transformers.transform_stage(shared_structure, shared_stage)
+            self._shared_structures[signature] = shared_structure
+
+        block_structure = shared_structure.copy()
+        transformers.transform_stage(block_structure, usage_stage)
+        block_structure._prune_unreachable()  # pylint: disable=protected-access
+        if transformers.timings is not None:
+            transformers.timings.set_custom_attributes()
+        return block_structure
+
+
+def _get_transform_signature(transformer, usage_info, block_structure):
+    """
+    Returns the transform signature of the given transformer for the
+    given usage_info, or None if the transformer does not define
+    transform_signature, as transformers that do not inherit from
+    BlockStructureTransformer may not.
+    """
+    transform_signature = getattr(transformer, 'transform_signature', None)
+    if transform_signature is None:
+        return None
+    return transform_signature(usage_info, block_structure)
+
+
+def _get_changed_blocks(block_structure, previous_block_structure):
+    """
+    Returns the set of the usage keys of the blocks in the given block
+    structure that were added or changed since the given previously
+    collected block structure, or None if the changes cannot be
+    determined.
+    """
+    changed_blocks = set()
+    for block_key, xblock in six.iteritems(block_structure._xblock_map):  # pylint: disable=protected-access
+        update_version = getattr(xblock, UPDATE_VERSION_FIELD, None)
+        if update_version is None:
+            return None
+        if (
+                block_key not in previous_block_structure or
+                previous_block_structure.get_xblock_field(block_key, UPDATE_VERSION_FIELD) != update_version or
+                previous_block_structure.get_children(block_key) != block_structure.get_children(block_key) or
+                previous_block_structure.get_parents(block_key) != block_structure.get_parents(block_key)
+        ):
+            changed_blocks.add(block_key)
+    return changed_blocks
+
+
+def _get_descendants(block_structure, block_keys):
+    """
+    Returns the set of the given blocks and their descendants.
+    """
+    descendants = set(block_keys)
+    for block_key in BlockStructureBlockData.topological_traversal(block_structure):
+        if any(parent in descendants for parent in block_structure.get_parents(block_key)):
+            descendants.add(block_key)
+    return descendants
+
+
+def _get_ancestors(block_structure, block_keys):
+    """
+    Returns the set of the given blocks and their ancestors.
+    """
+    ancestors = set(block_keys)
+    for block_key in BlockStructureBlockData.post_order_traversal(block_structure):
+        if any(child in ancestors for child in block_structure.get_children(block_key)):
+            ancestors.add(block_key)
+    return ancestors
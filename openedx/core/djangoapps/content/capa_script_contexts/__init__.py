@@ -0,0 +1,5 @@
+"""
+The contexts of the scripts of published capa problems, precomputed for each
+seed their learners can have, so that rendering and grading the problems
+doesn't run their scripts in the sandbox.
+"""
@@ -0,0 +1,19 @@
+"""
+Configuration for the capa_script_contexts Django app
+"""
+
+
+from django.apps import AppConfig
+
+
+class CapaScriptContextsConfig(AppConfig):
+    """
+    Configuration class for the capa_script_contexts Django app
+    """
+    name = 'openedx.core.djangoapps.content.capa_script_contexts'
+    verbose_name = "Capa Script Contexts"
+
+    def ready(self):
+        # Import signals to precompute the script contexts of the problems of a
+        # course every time it is published, and tasks to register them.
+        from . import signals, tasks  # pylint: disable=unused-variable
@@ -0,0 +1,28 @@
+"""
+Command to precompute the script contexts of the problems of courses.
+"""
+
+
+from django.core.management.base import BaseCommand
+from opaque_keys.edx.keys import CourseKey
+
+from ...tasks import precompute_course_script_contexts
+
+
+class Command(BaseCommand):
+    """
+    Precomputes the script contexts of the published problems of the given
+    courses, e.g. of the courses published before the contexts were
+    precomputed at publish time.
+
+    Example usage:
+        $ ./manage.py cms precompute_capa_script_contexts course-v1:edX+DemoX+Demo_Course
+    """
+    help = "Precomputes the script contexts of the published problems of the given courses."
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_keys', nargs='+')
+
+    def handle(self, *args, **options):
+        for course_key in options['course_keys']:
+            precompute_course_script_contexts(CourseKey.from_string(course_key))
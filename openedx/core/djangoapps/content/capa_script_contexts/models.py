@@ -0,0 +1,111 @@
+"""
+Models of the precomputed contexts of the scripts of capa problems.
+"""
+
+
+import json
+import zlib
+
+import six
+from django.core.cache import cache
+from django.db import models
+from django.utils.encoding import python_2_unicode_compatible
+from model_utils.models import TimeStampedModel
+from opaque_keys.edx.django.models import CourseKeyField
+
+from openedx.core.djangoapps.xmodule_django.models import UsageKeyWithRunField
+
+
+@python_2_unicode_compatible
+class ProblemScriptContexts(TimeStampedModel):
+    """
+    The contexts of the script of a published problem, computed by running
+    the script once for each seed the learners of the problem can have.
+
+    The contexts are stored as compressed JSON, mapping each seed to the
+    error message of the execution of the script, if any, and to the
+    JSON-safe context it produced.
+
+    .. no_pii:
+    """
+    class Meta(object):
+        app_label = 'capa_script_contexts'
+
+    usage_key = UsageKeyWithRunField(max_length=255, unique=True)
+    course_key = CourseKeyField(max_length=255, db_index=True)
+    # The hash of the script, with its Python path and extra files, when the
+    # contexts were computed.
+    script_hash = models.CharField(max_length=40)
+    data = models.BinaryField()
+
+    # The contexts of a script only depend on its hash, so they are cached by
+    # problem and hash, with an empty value when none were computed.
+    CACHE_TIMEOUT = 24 * 60 * 60
+
+    @classmethod
+    def update(cls, usage_key, script_hash, contexts):
+        """
+        Stores the given contexts of the script of the given problem, with
+        the given hash, replacing its previous contexts.
+        """
+        data = cls.encode_contexts(contexts)
+        cls.objects.update_or_create(
+            usage_key=usage_key,
+            defaults={
+                'course_key': usage_key.course_key,
+                'script_hash': script_hash,
+                'data': data,
+            },
+        )
+        cache.set(cls._cache_key(usage_key, script_hash), data, cls.CACHE_TIMEOUT)
+
+    @classmethod
+    def read_data(cls, usage_key, script_hash):
+        """
+        Returns the compressed contexts of the script of the given problem,
+        if they were computed for the given hash, or None.
+        """
+        cache_key = cls._cache_key(usage_key, script_hash)
+        data = cache.get(cache_key)
+        if data is None:
+            data = cls.objects.filter(
+                usage_key=usage_key,
+                script_hash=script_hash,
+            ).values_list('data', flat=True).first()
+            data = b'' if data is None else bytes(data)
+            cache.set(cache_key, data, cls.CACHE_TIMEOUT)
+        return data or None
+
+    @staticmethod
+    def _cache_key(usage_key, script_hash):
+        return u'capa_script_contexts.{}.{}'.format(usage_key, script_hash)
+
+    @staticmethod
+    def encode_contexts(contexts):
+        """
+        Returns the compressed JSON of the given dict of contexts by seed.
+        """
+        return zlib.compress(json.dumps(
+            {six.text_type(seed): context for seed, context in contexts.items()},
+            sort_keys=True,
+        ).encode('utf-8'))
+
+    @staticmethod
+    def decode_contexts_json(data):
+        """
+        Returns a dict mapping each seed to the JSON of its (error message,
+        context) pair in the given compressed contexts, so that each read of
+        a context can build its own copy.
+        """
+        contexts = json.loads(zlib.decompress(data).decode('utf-8'))
+        return {int(seed): json.dumps(context) for seed, context in contexts.items()}
+
+    def get_contexts_json(self):
+        """
+        Returns a dict mapping each seed to the JSON of its (error message,
+        context) pair.
+        """
+        return self.decode_contexts_json(bytes(self.data))
+
+    def __str__(self):
+        return u'ProblemScriptContexts: {}'.format(self.usage_key)
@@ -0,0 +1,41 @@
+"""
+XBlock service reading the precomputed contexts of the scripts of problems.
+"""
+
+
+import json
+
+from openedx.core.lib.cache_utils import get_cache
+
+from .models import ProblemScriptContexts
+
+CACHE_NAMESPACE = 'capa_script_contexts'
+
+
+class ScriptContextsService(object):
+    """
+    Service providing problems with the contexts of their scripts precomputed
+    when they were published.
+
+    The contexts of a problem are read from the Django cache, or the
+    database, once per request, and cached by problem and script hash
+    across requests.
+    """
+    def get_context(self, usage_key, script_hash, seed):
+        """
+        Returns the (error message, context) pair precomputed for the given
+        seed, if the script of the given problem had the given hash when it
+        was published, or None.
+        """
+        usage_key = usage_key.for_branch(None)
+        cache = get_cache(CACHE_NAMESPACE)
+        cache_key = (usage_key, script_hash)
+        if cache_key not in cache:
+            data = ProblemScriptContexts.read_data(usage_key, script_hash)
+            cache[cache_key] = None if data is None else ProblemScriptContexts.decode_contexts_json(data)
+
+        contexts_json = cache[cache_key]
+        if contexts_json is None or seed not in contexts_json:
+            return None
+        emsg, context = json.loads(contexts_json[seed])
+        return emsg, context
@@ -0,0 +1,38 @@
+"""
+Signal handlers precomputing the script contexts of the problems of
+published courses.
+"""
+
+
+import six
+from django.conf import settings
+from django.dispatch.dispatcher import receiver
+from opaque_keys.edx.locator import LibraryLocator
+
+from xmodule.modulestore.django import SignalHandler
+
+from .models import ProblemScriptContexts
+from .tasks import precompute_script_contexts
+
+
+@receiver(SignalHandler.course_published)
+def precompute_script_contexts_on_course_publish(sender, course_key, **kwargs):  # pylint: disable=unused-argument
+    """
+    Catches the signal that a course has been published in the module store
+    and precomputes the script contexts of its problems.
+    Ignores publish signals from content libraries.
+    """
+    if isinstance(course_key, LibraryLocator):
+        return
+
+    if settings.FEATURES.get('PRECOMPUTE_CAPA_SCRIPT_CONTEXTS', False):
+        precompute_script_contexts.delay(course_id=six.text_type(course_key))
+
+
+@receiver(SignalHandler.course_deleted)
+def delete_script_contexts_on_course_delete(sender, course_key, **kwargs):  # pylint: disable=unused-argument
+    """
+    Catches the signal that a course has been deleted from the module store
+    and deletes the script contexts of its problems.
+    """
+    ProblemScriptContexts.objects.filter(course_key=course_key).delete()
@@ -0,0 +1,55 @@
+"""
+Asynchronous tasks precomputing the contexts of the scripts of problems.
+"""
+
+
+import logging
+
+from celery.task import task
+from django.core.cache import cache
+from edx_django_utils.monitoring import set_code_owner_attribute
+from opaque_keys.edx.keys import CourseKey
+
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.django import modulestore
+
+from .models import ProblemScriptContexts
+
+log = logging.getLogger(__name__)
+
+
+@task
+@set_code_owner_attribute
+def precompute_script_contexts(course_id):
+    """
+    Precomputes the script contexts of the published problems of a course.
+
+    Arguments:
+        course_id (string) - The string serialized value of the course key.
+    """
+    precompute_course_script_contexts(CourseKey.from_string(course_id))
+
+
+def precompute_course_script_contexts(course_key):
+    """
+    Precomputes and stores the script contexts of the published problems of
+    the given course, and deletes the contexts of its other problems.
+
+    Since the executions of the scripts are cached, republishing a course
+    only runs the scripts which changed.
+    """
+    store = modulestore()
+    precomputed_keys = []
+    with store.branch_setting(ModuleStoreEnum.Branch.published_only, course_key):
+        for problem in store.get_items(course_key, qualifiers={'category': 'problem'}):
+            usage_key = problem.location.for_branch(None)
+            try:
+                precomputed = problem.precompute_script_contexts(cache=cache)
+            except Exception:  # pylint: disable=broad-except
+                log.exception(u'Failed to precompute the script contexts of problem %s', usage_key)
+                continue
+            if precomputed is not None:
+                ProblemScriptContexts.update(usage_key, *precomputed)
+                precomputed_keys.append(usage_key)
+
+    ProblemScriptContexts.objects.filter(course_key=course_key).exclude(usage_key__in=precomputed_keys).delete()
@@ -0,0 +1,64 @@
+"""
+Tests of the service reading the precomputed script contexts of problems.
+"""
+
+
+from django.core.cache import cache
+from edx_django_utils.cache import RequestCache
+from opaque_keys.edx.keys import UsageKey
+
+from openedx.core.djangolib.testing.utils import CacheIsolationTestCase
+
+from ..models import ProblemScriptContexts
+from ..services import ScriptContextsService
+
+
+class ScriptContextsServiceTest(CacheIsolationTestCase):
+    """
+    Tests the reads of the precomputed script contexts of problems.
+    """
+    ENABLED_CACHES = ['default']
+
+    def setUp(self):
+        super(ScriptContextsServiceTest, self).setUp()
+        self.usage_key = UsageKey.from_string(u'block-v1:edX+DemoX+Demo_Course+type@problem+block@problem')
+        ProblemScriptContexts.update(self.usage_key, u'hash', {
+            1: (None, {'x': [1, 2]}),
+            2: (u'ZeroDivisionError', {}),
+        })
+        self.service = ScriptContextsService()
+
+    def test_get_context(self):
+        self.assertEqual(self.service.get_context(self.usage_key, u'hash', 1), (None, {'x': [1, 2]}))
+        self.assertEqual(self.service.get_context(self.usage_key, u'hash', 2), (u'ZeroDivisionError', {}))
+
+    def test_not_precomputed(self):
+        self.assertIsNone(self.service.get_context(self.usage_key, u'other hash', 1))
+        self.assertIsNone(self.service.get_context(self.usage_key, u'hash', 3))
+        self.assertIsNone(self.service.get_context(self.usage_key.replace(block_id=u'other'), u'hash', 1))
+
+    def test_read_once_per_request(self):
+        cache.clear()
+        with self.assertNumQueries(1):
+            self.service.get_context(self.usage_key, u'hash', 1)
+            self.service.get_context(self.usage_key, u'hash', 2)
+
+    def test_cached_across_requests(self):
+        cache.clear()
+        self.service.get_context(self.usage_key, u'hash', 1)
+        self.service.get_context(self.usage_key, u'other hash', 1)
+        RequestCache.clear_all_namespaces()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.service.get_context(self.usage_key, u'hash', 1), (None, {'x': [1, 2]}))
+            self.assertIsNone(self.service.get_context(self.usage_key, u'other hash', 1))
+
+    def test_cached_until_updated(self):
+        self.assertIsNone(self.service.get_context(self.usage_key, u'other hash', 1))
+        ProblemScriptContexts.update(self.usage_key, u'other hash', {1: (None, {})})
+        RequestCache.clear_all_namespaces()
+        self.assertEqual(self.service.get_context(self.usage_key, u'other hash', 1), (None, {}))
+
+    def test_copies(self):
+        _, context = self.service.get_context(self.usage_key, u'hash', 1)
+        context['x'].append(3)
+        self.assertEqual(self.service.get_context(self.usage_key, u'hash', 1), (None, {'x': [1, 2]}))
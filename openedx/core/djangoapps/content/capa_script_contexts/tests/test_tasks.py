@@ -0,0 +1,109 @@
+"""
+Tests of the precomputation of the script contexts of the problems of courses.
+"""
+
+
+import textwrap
+
+import six
+from django.conf import settings
+from mock import patch
+
+from capa.tests.helpers import new_loncapa_problem
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+
+from ..models import ProblemScriptContexts
+from ..services import ScriptContextsService
+from ..tasks import precompute_course_script_contexts
+
+PROBLEM_XML = textwrap.dedent("""
+    <problem>
+        <script type="loncapa/python">
+    x = random.randint(0, 1000000)
+        </script>
+        <stringresponse answer="$x">
+            <textline size="20"/>
+        </stringresponse>
+    </problem>
+""")
+
+
+class PrecomputeScriptContextsTest(ModuleStoreTestCase):
+    """
+    Tests the precomputation of the script contexts of the problems of a course.
+    """
+    def setUp(self):
+        super(PrecomputeScriptContextsTest, self).setUp()
+        self.course = CourseFactory.create()
+        self.vertical = ItemFactory.create(parent=self.course, category='vertical')
+
+    def _create_problem(self, rerandomize, data=PROBLEM_XML):
+        """
+        Returns a new problem of the course, with the given randomization.
+        """
+        return ItemFactory.create(
+            parent=self.vertical, category='problem', data=data, metadata={'rerandomize': rerandomize},
+        )
+
+    def test_precompute(self):
+        never = self._create_problem('never')
+        per_student = self._create_problem('per_student')
+        always = self._create_problem('always')
+        learner_dependent = self._create_problem(
+            'never', data=PROBLEM_XML.replace('random.randint(0, 1000000)', 'len(anonymous_student_id)'),
+        )
+        no_script = self._create_problem('never', data=u'<problem><stringresponse answer="a"/></problem>')
+
+        precompute_course_script_contexts(self.course.id)
+
+        self.assertEqual(
+            set(ProblemScriptContexts.objects.values_list('usage_key', flat=True)),
+            {never.location, per_student.location},
+        )
+        self.assertEqual(
+            sorted(ProblemScriptContexts.objects.get(usage_key=per_student.location).get_contexts_json()),
+            list(range(20)),
+        )
+        for problem in (always, learner_dependent, no_script):
+            self.assertFalse(ProblemScriptContexts.objects.filter(usage_key=problem.location).exists())
+
+        # The precomputed contexts are those of the problems of learners.
+        problem_contexts = ProblemScriptContexts.objects.get(usage_key=never.location)
+        emsg, context = ScriptContextsService().get_context(never.location, problem_contexts.script_hash, 1)
+        self.assertIsNone(emsg)
+        self.assertEqual(context['x'], new_loncapa_problem(PROBLEM_XML, seed=1).context['x'])
+
+    def test_deleted_problem(self):
+        problem = self._create_problem('never')
+        precompute_course_script_contexts(self.course.id)
+        self.assertTrue(ProblemScriptContexts.objects.filter(usage_key=problem.location).exists())
+
+        self.store.delete_item(problem.location, self.user.id)
+        precompute_course_script_contexts(self.course.id)
+        self.assertFalse(ProblemScriptContexts.objects.filter(usage_key=problem.location).exists())
+
+    def test_script_error(self):
+        problem = self._create_problem('never', data=PROBLEM_XML.replace('random.randint(0, 1000000)', '1 / 0'))
+        precompute_course_script_contexts(self.course.id)
+        problem_contexts = ProblemScriptContexts.objects.get(usage_key=problem.location)
+        emsg, _ = ScriptContextsService().get_context(problem.location, problem_contexts.script_hash, 1)
+        self.assertIn('ZeroDivisionError', emsg)
+
+
+class PrecomputeScriptContextsSignalTest(ModuleStoreTestCase):
+    """
+    Tests that publishing a course precomputes the script contexts of its problems.
+    """
+    ENABLED_SIGNALS = ['course_published']
+
+    @patch('openedx.core.djangoapps.content.capa_script_contexts.signals.precompute_script_contexts.delay')
+    def test_disabled(self, mock_delay):
+        CourseFactory.create()
+        self.assertFalse(mock_delay.called)
+
+    @patch.dict(settings.FEATURES, {'PRECOMPUTE_CAPA_SCRIPT_CONTEXTS': True})
+    @patch('openedx.core.djangoapps.content.capa_script_contexts.signals.precompute_script_contexts.delay')
+    def test_enabled(self, mock_delay):
+        course = CourseFactory.create()
+        mock_delay.assert_called_with(course_id=six.text_type(course.id))
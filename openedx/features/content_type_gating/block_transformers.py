@@ -4,6 +4,8 @@ Limits access for certain users to certain types of content.
 """
 
 
+from copy import deepcopy
+
 from django.conf import settings
 
 from lms.djangoapps.course_blocks.transformers.user_partitions import UserPartitionTransformer
@@ -21,6 +23,7 @@ class ContentTypeGateTransformer(BlockStructureTransformer):
     """
     WRITE_VERSION = 1
     READ_VERSION = 1
+    COLLECT_SCOPE = BlockStructureTransformer.COLLECT_SCOPE_BLOCK
 
     @classmethod
     def name(cls):
@@ -62,13 +65,25 @@ class ContentTypeGateTransformer(BlockStructureTransformer):
             block_key, UserPartitionTransformer, 'merged_group_access', None
         )
         if merged_access:
+            # The returned access is modified by the caller, so copy the merged access, which may be shared
+            # with other block structures, and store the copy so UserPartitionTransformer enforces it.
+            merged_access = deepcopy(merged_access)
+            block_structure.set_transformer_block_field(
+                block_key, UserPartitionTransformer, 'merged_group_access', merged_access
+            )
             current_access = merged_access.get_allowed_groups()
         else:
             # This fallback code has a bug if UserPartitionTranformer is not being used -- it does not consider
             # inheritance from parent blocks. This is why our class docstring recommends UserPartitionTranformer.
-            current_access = block_structure.get_xblock_field(block_key, 'group_access')
+            current_access = deepcopy(block_structure.get_xblock_field(block_key, 'group_access'))
         return current_access or {}
 
+    def transform_signature(self, usage_info, block_structure):
+        return ContentTypeGatingConfig.enabled_for_enrollment(
+            user=usage_info.user,
+            course_key=usage_info.course_key,
+        )
+
     def transform(self, usage_info, block_structure):
         if not ContentTypeGatingConfig.enabled_for_enrollment(
             user=usage_info.user,